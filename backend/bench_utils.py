@@ -0,0 +1,86 @@
+"""
+Bench Utils
+Shared helpers for the benchmark and load scripts run against a live server
+(test_login_throughput.py, test_async_throughput.py, test_load_scenarios.py):
+- percentile: nearest-rank percentile of a list of latencies
+- Results: latencies and failures per endpoint label, with throughput and
+  p50 / p95 / p99 reporting
+- timed: one httpx request recorded on a Results (transport errors count as failures)
+- run_bounded: await coroutines with at most `concurrency` in flight
+"""
+import time
+import asyncio
+import httpx
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Results:
+    """Latencies and failures per endpoint label for one run"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies = {}
+        self.failures = {}
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def record(self, label: str, seconds: float, ok: bool):
+        self.latencies.setdefault(label, []).append(seconds)
+        if not ok:
+            self.failures[label] = self.failures.get(label, 0) + 1
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+
+    def total_failures(self) -> int:
+        return sum(self.failures.values())
+
+    def rate(self, label: str = None) -> float:
+        """Requests per second for one label, or for all of them"""
+        if not self.elapsed:
+            return 0.0
+        if label is None:
+            return sum(len(values) for values in self.latencies.values()) / self.elapsed
+        return len(self.latencies.get(label, [])) / self.elapsed
+
+    def latency_ms(self, label: str, pct: float) -> float:
+        return percentile(self.latencies.get(label, []), pct) * 1000
+
+    def print_report(self):
+        total = sum(len(values) for values in self.latencies.values())
+        print(f"\n   {self.name}: {total} requests in {self.elapsed:.1f}s ({self.rate():.1f} req/s)")
+        print(f"   {'endpoint':<42} {'reqs':>6} {'failed':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for label, values in self.latencies.items():
+            print(f"   {label:<42} {len(values):>6} {self.failures.get(label, 0):>7} "
+                  f"{self.rate(label):>8.1f} {self.latency_ms(label, 50):>8.0f} "
+                  f"{self.latency_ms(label, 95):>8.0f} {self.latency_ms(label, 99):>8.0f}")
+
+
+async def timed(client: httpx.AsyncClient, results: Results, label: str, method: str, path: str,
+                token: str = None, **kwargs) -> httpx.Response:
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, path, headers=headers, **kwargs)
+    except httpx.HTTPError:
+        results.record(label, time.perf_counter() - started, False)
+        return None
+    results.record(label, time.perf_counter() - started, response.status_code == 200)
+    return response
+
+
+async def run_bounded(concurrency: int, jobs: list):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(job):
+        async with semaphore:
+            await job
+
+    await asyncio.gather(*(bounded(job) for job in jobs))
@@ -26,6 +26,43 @@ class Settings(BaseSettings):
     # Google Maps API Key
     GOOGLE_MAPS_API_KEY: str = ""
     
+    # WhatsApp provider - URL can be pointed at a local HTTP stub for testing
+    WHATSAPP_API_URL: str = "https://backend.api-wa.co/campaign/smartping/api/v2"
+    WHATSAPP_MAX_CONCURRENCY: int = 5  # Concurrent requests per provider
+    WHATSAPP_MAX_ATTEMPTS: int = 5
+    
+    # Bulk payslip emails - SMTP sessions used in parallel and provider send rate limit
+    PAYSLIP_EMAIL_CONCURRENCY: int = 3
+    PAYSLIP_EMAIL_RATE_PER_MINUTE: int = 60
+    PAYSLIP_EMAIL_MAX_ATTEMPTS: int = 3
+    
+    # Login - bcrypt cost (older hashes are re-hashed on login), dedicated hashing threads,
+    # and how long an unknown username is remembered before the database is asked again
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    LOGIN_UNKNOWN_USER_CACHE_SECONDS: int = 30
+    
+    # Query instrumentation - X-DB-* response headers and N+1 logging (debug only),
+    # and how many executions of the same statement in one request count as N+1
+    QUERY_DEBUG_HEADERS: bool = False
+    QUERY_REPEAT_THRESHOLD: int = 5
+    
+    # GET /metrics - with a token set, scrapers must send "Authorization: Bearer <token>"
+    # (required from every client, loopback included). Without one it is served to
+    # loopback clients only unless METRICS_ALLOW_REMOTE is set; that check trusts the
+    # socket peer, so behind a reverse proxy on the same host set a token instead.
+    METRICS_TOKEN: str = ""
+    METRICS_ALLOW_REMOTE: bool = False
+    
+    # Logging - level and format ("text" or "json") for the tms.* loggers, and
+    # one in every N per-record debug lines is written in batch jobs
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "text"
+    LOG_DEBUG_SAMPLE_EVERY: int = 100
+    
+    # Responses of at least this many bytes are brotli/gzip compressed when the client accepts it
+    RESPONSE_COMPRESSION_MIN_BYTES: int = 1024
+    
     class Config:
         env_file = ".env"
         extra = "allow"
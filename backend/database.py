@@ -1,7 +1,9 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from config import settings
+from utils.metrics import TimedQueuePool
 
 # Update connection string to use psycopg3 driver
 database_url = settings.DATABASE_URL.replace("postgresql://", "postgresql+psycopg://")
@@ -9,6 +11,7 @@ database_url = settings.DATABASE_URL.replace("postgresql://", "postgresql+psycop
 # Optimize connection pooling for better performance
 engine = create_engine(
     database_url,
+    poolclass=TimedQueuePool,  # QueuePool that records checkout wait for /metrics
     pool_size=10,  # Number of connections to maintain in the pool
     max_overflow=20,  # Maximum number of connections beyond pool_size
     pool_pre_ping=True,  # Verify connections before using them
@@ -16,6 +19,22 @@ engine = create_engine(
     echo=False  # Set to True for SQL query debugging
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Async engine on the same psycopg3 driver for async (I/O-bound) routes;
+# it keeps its own pool, sized like the sync one
+async_engine = create_async_engine(
+    database_url,
+    pool_size=10,
+    max_overflow=20,
+    pool_pre_ping=True,
+    pool_recycle=3600,
+    echo=False
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
 Base = declarative_base()
 
 def get_db():
@@ -24,3 +43,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,14 +1,15 @@
-"""Google Calendar API integration for creating meetings with Meet links"""
-from google.oauth2.credentials import Credentials
-from google.oauth2 import service_account
-from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-from google.auth.transport.requests import Request
+"""Google Calendar API integration for creating meetings with Meet links
+
+The google-auth / googleapiclient / requests imports are made inside the
+functions that use them: they take longer to import than the rest of the app
+and most workers never touch the calendar, so they stay out of start-up.
+"""
 from datetime import datetime, timedelta
+from collections import OrderedDict
+import hashlib
+import threading
 import json
 import os
-import requests
 import time
 from config import settings
 
@@ -45,6 +46,7 @@ def get_authorization_url(user_email=None):
     Args:
         user_email: Optional email address to pre-fill in OAuth (hint parameter)
     """
+    from google_auth_oauthlib.flow import Flow
     _validate_google_credentials()
     flow = Flow.from_client_config(
         {
@@ -77,10 +79,11 @@ def get_user_email_from_credentials(credentials_dict):
     """Get user email from Google credentials"""
     try:
         from google.oauth2.credentials import Credentials
+        from google.auth.transport.requests import Request
+        import requests
         credentials = Credentials.from_authorized_user_info(credentials_dict)
         
         # Use tokeninfo endpoint to get user email
-        import requests
         token_info_url = f"https://www.googleapis.com/oauth2/v1/tokeninfo?access_token={credentials.token}"
         response = requests.get(token_info_url)
         
@@ -121,6 +124,9 @@ def get_user_email_from_credentials(credentials_dict):
 
 def get_credentials_from_code(code: str):
     """Exchange authorization code for credentials"""
+    from google_auth_oauthlib.flow import Flow
+    from google.oauth2.credentials import Credentials
+    import requests
     _validate_google_credentials()
     try:
         flow = Flow.from_client_config(
@@ -191,6 +197,7 @@ def credentials_to_dict(credentials):
 
 def dict_to_credentials(creds_dict):
     """Convert dictionary back to credentials object"""
+    from google.oauth2.credentials import Credentials
     return Credentials(
         token=creds_dict.get('token'),
         refresh_token=creds_dict.get('refresh_token'),
@@ -200,6 +207,178 @@ def dict_to_credentials(creds_dict):
         scopes=creds_dict.get('scopes', SCOPES)
     )
 
+# ============ Calendar client cache ============
+# The discovery document is parsed once per process and Calendar service objects
+# are cached per credential, so creating an event no longer rebuilds the client
+# and re-authenticates on every call.
+SERVICE_ACCOUNT_CACHE_KEY = "service_account"
+SERVICE_CACHE_MAX_SIZE = 256
+# Refresh access tokens this long before they expire
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
+_discovery_document = None
+_service_cache = OrderedDict()  # cache key -> {"credentials", "service", "lock"}
+_service_cache_lock = threading.Lock()
+
+def _get_discovery_document():
+    """Load and parse the Calendar v3 discovery document once"""
+    global _discovery_document
+    if _discovery_document is None:
+        try:
+            from googleapiclient.discovery_cache import get_static_doc
+            doc = get_static_doc('calendar', 'v3')
+            _discovery_document = json.loads(doc) if doc else None
+        except ImportError:
+            _discovery_document = None
+    return _discovery_document
+
+def _build_service(credentials):
+    """Build a Calendar API service from the cached discovery document"""
+    from googleapiclient.discovery import build, build_from_document
+    discovery_document = _get_discovery_document()
+    if discovery_document:
+        return build_from_document(discovery_document, credentials=credentials)
+    return build('calendar', 'v3', credentials=credentials, cache_discovery=False)
+
+def _credentials_cache_key(credentials_dict):
+    """Cache key for OAuth credentials - stable across access token refreshes"""
+    identity = f"{credentials_dict.get('client_id', '')}:{credentials_dict.get('refresh_token') or credentials_dict.get('token', '')}"
+    return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+def _ensure_fresh_credentials(credentials):
+    """Refresh the access token proactively when it is missing or about to expire"""
+    from google.oauth2 import service_account
+    from google.auth.transport.requests import Request
+    # Stored credentials carry no expiry, so a newly cached credential is refreshed once up front
+    needs_refresh = not credentials.token or not credentials.expiry or credentials.expired
+    if not needs_refresh:
+        needs_refresh = credentials.expiry - datetime.utcnow() < TOKEN_REFRESH_MARGIN
+    if needs_refresh and (getattr(credentials, 'refresh_token', None) or isinstance(credentials, service_account.Credentials)):
+        credentials.refresh(Request())
+
+def _get_cached_service(cache_key, credentials_factory):
+    """Get (or build and cache) the Calendar service entry for a credential"""
+    with _service_cache_lock:
+        entry = _service_cache.get(cache_key)
+        if entry:
+            _service_cache.move_to_end(cache_key)
+            return entry
+    
+    credentials = credentials_factory()
+    entry = {
+        "credentials": credentials,
+        "service": _build_service(credentials),
+        "lock": threading.Lock()  # Service objects are not thread-safe
+    }
+    with _service_cache_lock:
+        _service_cache[cache_key] = entry
+        while len(_service_cache) > SERVICE_CACHE_MAX_SIZE:
+            _service_cache.popitem(last=False)
+    return entry
+
+def invalidate_calendar_service(credentials_dict=None):
+    """Drop a cached service (e.g. after the user disconnects Google Calendar)"""
+    cache_key = _credentials_cache_key(credentials_dict) if credentials_dict else SERVICE_ACCOUNT_CACHE_KEY
+    with _service_cache_lock:
+        _service_cache.pop(cache_key, None)
+
+def get_calendar_service(credentials_dict=None):
+    """
+    Get a cached Calendar service entry with fresh credentials.
+    
+    Args:
+        credentials_dict: User's OAuth credentials, or None to use the service account
+    
+    Returns:
+        dict with 'service', 'credentials' and 'lock' - hold the lock while executing requests
+    """
+    if credentials_dict:
+        _validate_google_credentials()
+        entry = _get_cached_service(
+            _credentials_cache_key(credentials_dict),
+            lambda: dict_to_credentials(credentials_dict)
+        )
+    else:
+        entry = _get_cached_service(SERVICE_ACCOUNT_CACHE_KEY, get_service_account_credentials)
+    
+    with entry["lock"]:
+        _ensure_fresh_credentials(entry["credentials"])
+    return entry
+
+def _build_event_body(title, description, start_datetime, duration_minutes, attendees_emails=None, request_id=None):
+    """Build the Calendar event body; a request_id adds a Google Meet conference"""
+    end_datetime = start_datetime + timedelta(minutes=duration_minutes)
+    event = {
+        'summary': title,
+        'description': description or '',
+        'start': {
+            'dateTime': start_datetime.isoformat(),
+            'timeZone': 'UTC',
+        },
+        'end': {
+            'dateTime': end_datetime.isoformat(),
+            'timeZone': 'UTC',
+        },
+        'attendees': [{'email': email} for email in (attendees_emails or [])],
+        'reminders': {
+            'useDefault': False,
+            'overrides': [
+                {'method': 'email', 'minutes': 24 * 60},  # 1 day before
+                {'method': 'popup', 'minutes': 15},  # 15 minutes before
+            ],
+        },
+    }
+    if request_id:
+        event['conferenceData'] = {
+            'createRequest': {
+                'requestId': request_id,
+                'conferenceSolutionKey': {
+                    'type': 'hangoutsMeet'
+                }
+            }
+        }
+    return event
+
+def _extract_meet_link(created_event):
+    """Extract the Google Meet link from a created event, None if not present"""
+    meet_link = None
+    
+    # Method 1: Check hangoutLink (legacy)
+    if 'hangoutLink' in created_event:
+        meet_link = created_event['hangoutLink']
+    
+    # Method 2: Check conferenceData.entryPoints
+    conference_data = created_event.get('conferenceData') or {}
+    if not meet_link:
+        for entry in conference_data.get('entryPoints', []):
+            if entry.get('entryPointType') == 'video' and entry.get('uri'):
+                meet_link = entry['uri']
+                break
+    
+    # Method 3: Check conferenceData.hangoutLink
+    if not meet_link and 'hangoutLink' in conference_data:
+        meet_link = conference_data['hangoutLink']
+    
+    # Ensure it's a proper Meet URL
+    if meet_link and not meet_link.startswith('https://meet.google.com/'):
+        if meet_link.startswith('meet.google.com/'):
+            meet_link = 'https://' + meet_link
+        elif '/' not in meet_link and '-' in meet_link:
+            # If it's just the code like "abc-defg-hij", construct URL
+            meet_link = f'https://meet.google.com/{meet_link}'
+    
+    return meet_link
+
+def _http_error_message(error):
+    """Readable message from a googleapiclient HttpError"""
+    try:
+        if hasattr(error, 'content') and error.content:
+            error_details = json.loads(error.content.decode('utf-8'))
+            return error_details.get('error', {}).get('message', str(error))
+    except Exception:
+        pass
+    return str(error)
+
 def create_calendar_event(credentials_dict, title, description, start_datetime, duration_minutes, attendees_emails=None):
     """
     Create a Google Calendar event with Google Meet link
@@ -215,101 +394,25 @@ def create_calendar_event(credentials_dict, title, description, start_datetime,
     Returns:
         dict with 'meeting_link' (Google Meet link) and 'calendar_event_id'
     """
-    _validate_google_credentials()
+    from googleapiclient.errors import HttpError
     try:
-        # Convert credentials dict to Credentials object
-        credentials = dict_to_credentials(credentials_dict)
-        
-        # Refresh token if needed
-        if credentials.expired and credentials.refresh_token:
-            credentials.refresh(Request())
-        
-        # Build Calendar API service
-        service = build('calendar', 'v3', credentials=credentials)
-        
-        # Calculate end time
-        end_datetime = start_datetime + timedelta(minutes=duration_minutes)
-        
-        # Prepare attendees list
-        attendees = []
-        if attendees_emails:
-            attendees = [{'email': email} for email in attendees_emails]
-        
-        # Create event
-        event = {
-            'summary': title,
-            'description': description or '',
-            'start': {
-                'dateTime': start_datetime.isoformat(),
-                'timeZone': 'UTC',
-            },
-            'end': {
-                'dateTime': end_datetime.isoformat(),
-                'timeZone': 'UTC',
-            },
-            'attendees': attendees,
-            'conferenceData': {
-                'createRequest': {
-                    'requestId': f"meet-{datetime.now().timestamp()}",
-                    'conferenceSolutionKey': {
-                        'type': 'hangoutsMeet'
-                    }
-                }
-            },
-            'reminders': {
-                'useDefault': False,
-                'overrides': [
-                    {'method': 'email', 'minutes': 24 * 60},  # 1 day before
-                    {'method': 'popup', 'minutes': 15},  # 15 minutes before
-                ],
-            },
-        }
-        
-        # Insert event
-        created_event = service.events().insert(
-            calendarId=GOOGLE_CALENDAR_ID,
-            body=event,
-            conferenceDataVersion=1,
-            sendUpdates='none'  # do not send invites; avoids DWD requirement
-        ).execute()
-        
-        # Extract Google Meet link - check multiple possible locations
-        meet_link = None
-        
-        # Method 1: Check hangoutLink (legacy)
-        if 'hangoutLink' in created_event:
-            meet_link = created_event['hangoutLink']
-        
-        # Method 2: Check conferenceData.entryPoints
-        if not meet_link and 'conferenceData' in created_event:
-            conference_data = created_event['conferenceData']
-            
-            if 'entryPoints' in conference_data:
-                for entry in conference_data['entryPoints']:
-                    entry_type = entry.get('entryPointType')
-                    uri = entry.get('uri')
-                    
-                    if entry_type == 'video' and uri:
-                        meet_link = uri
-                        break
+        entry = get_calendar_service(credentials_dict)
+        event = _build_event_body(
+            title, description, start_datetime, duration_minutes,
+            attendees_emails=attendees_emails,
+            request_id=f"meet-{datetime.now().timestamp()}"
+        )
         
-        # Method 3: Check conferenceData.hangoutLink
-        if not meet_link and 'conferenceData' in created_event:
-            conference_data = created_event['conferenceData']
-            if 'hangoutLink' in conference_data:
-                meet_link = conference_data['hangoutLink']
+        with entry["lock"]:
+            created_event = entry["service"].events().insert(
+                calendarId=GOOGLE_CALENDAR_ID,
+                body=event,
+                conferenceDataVersion=1,
+                sendUpdates='none'  # do not send invites; avoids DWD requirement
+            ).execute()
         
-        # Validate Meet link format
-        if meet_link:
-            # Ensure it's a proper Meet URL
-            if not meet_link.startswith('https://meet.google.com/'):
-                # If it's just a meeting code, construct full URL
-                if meet_link.startswith('meet.google.com/'):
-                    meet_link = 'https://' + meet_link
-                elif '/' not in meet_link and '-' in meet_link:
-                    # If it's just the code like "abc-defg-hij", construct URL
-                    meet_link = f'https://meet.google.com/{meet_link}'
-        else:
+        meet_link = _extract_meet_link(created_event)
+        if not meet_link:
             # Raise error if no Meet link found
             raise Exception("Failed to extract Google Meet link from created calendar event. Please check your Google Calendar API permissions.")
         
@@ -326,16 +429,44 @@ def create_calendar_event(credentials_dict, title, description, start_datetime,
         print(f'Error in create_calendar_event: {e}')
         raise Exception(f"Failed to create calendar event: {str(e)}")
 
+def update_calendar_event(credentials_dict, event_id, title, description, start_datetime, duration_minutes):
+    """
+    Update title, description and time of an existing Google Calendar event
+    
+    Args:
+        credentials_dict: User's OAuth credentials, or None for an event created with the service account
+        event_id: Calendar event ID
+    
+    Returns:
+        bool: True if the event was updated
+    """
+    from googleapiclient.errors import HttpError
+    try:
+        entry = get_calendar_service(credentials_dict)
+        event = _build_event_body(title, description, start_datetime, duration_minutes)
+        # Attendees and conference data are left untouched by the patch
+        event.pop('attendees')
+        with entry["lock"]:
+            entry["service"].events().patch(
+                calendarId=GOOGLE_CALENDAR_ID,
+                eventId=event_id,
+                body=event,
+                sendUpdates='none'
+            ).execute()
+        return True
+    except HttpError as error:
+        print(f'Error updating calendar event: {_http_error_message(error)}')
+        return False
+    except Exception as e:
+        print(f'Error updating calendar event: {e}')
+        return False
+
 def delete_calendar_event(credentials_dict, event_id):
-    """Delete a Google Calendar event"""
-    _validate_google_credentials()
+    """Delete a Google Calendar event (credentials_dict None uses the service account)"""
     try:
-        credentials = dict_to_credentials(credentials_dict)
-        if credentials.expired and credentials.refresh_token:
-            credentials.refresh(Request())
-        
-        service = build('calendar', 'v3', credentials=credentials)
-        service.events().delete(calendarId=GOOGLE_CALENDAR_ID, eventId=event_id).execute()
+        entry = get_calendar_service(credentials_dict)
+        with entry["lock"]:
+            entry["service"].events().delete(calendarId=GOOGLE_CALENDAR_ID, eventId=event_id).execute()
         return True
     except Exception as e:
         print(f'Error deleting calendar event: {e}')
@@ -343,6 +474,7 @@ def delete_calendar_event(credentials_dict, event_id):
 
 def get_service_account_credentials():
     """Get service account credentials from JSON file or .env JSON string"""
+    from google.oauth2 import service_account
     try:
         # Priority 1: Try JSON string from .env
         if settings.GOOGLE_SERVICE_ACCOUNT_JSON:
@@ -389,111 +521,34 @@ def create_calendar_event_with_service_account(title, description, start_datetim
     Returns:
         dict with 'meeting_link' (Google Meet link) and 'calendar_event_id'
     """
+    from googleapiclient.errors import HttpError
     # Service account doesn't need OAuth credentials, but check if service account file exists
     try:
-        # Get service account credentials
-        credentials = get_service_account_credentials()
-        if not credentials:
-            raise Exception("Service account credentials not available. Please ensure service_account.json exists in backend directory.")
-        
-        # Build Calendar API service
-        service = build('calendar', 'v3', credentials=credentials)
-        
-        # Calculate end time
-        end_datetime = start_datetime + timedelta(minutes=duration_minutes)
+        entry = get_calendar_service(None)
         
-        # Prepare attendees list
         # IMPORTANT: Service accounts cannot invite attendees without Domain-Wide Delegation.
         # We deliberately ignore any attendees passed in to avoid 403 errors.
-        attendees = []
-        
-        # Generate unique request ID for conference
-        request_id = f"meet-{int(time.time() * 1000)}"
-        
-        # Create event with Google Meet conference
-        event = {
-            'summary': title,
-            'description': description or '',
-            'start': {
-                'dateTime': start_datetime.isoformat(),
-                'timeZone': 'UTC',
-            },
-            'end': {
-                'dateTime': end_datetime.isoformat(),
-                'timeZone': 'UTC',
-            },
-            'attendees': attendees,
-            'conferenceData': {
-                'createRequest': {
-                    'requestId': request_id,
-                    'conferenceSolutionKey': {
-                        'type': 'hangoutsMeet'
-                    }
-                }
-            },
-            'reminders': {
-                'useDefault': False,
-                'overrides': [
-                    {'method': 'email', 'minutes': 24 * 60},  # 1 day before
-                    {'method': 'popup', 'minutes': 15},  # 15 minutes before
-                ],
-            },
-        }
+        event = _build_event_body(
+            title, description, start_datetime, duration_minutes,
+            attendees_emails=[],
+            request_id=f"meet-{int(time.time() * 1000)}"
+        )
         
-        print(f"Creating calendar event with service account...")
-        print(f"Event details: {title}, Start: {start_datetime}, Duration: {duration_minutes} minutes")
+        print(f"Creating calendar event with service account: {title}, Start: {start_datetime}, Duration: {duration_minutes} minutes")
         
         # Insert event with conference data
-        created_event = service.events().insert(
-            calendarId=GOOGLE_CALENDAR_ID,
-            body=event,
-            conferenceDataVersion=1,
-            sendUpdates='all' if attendees else 'none'
-        ).execute()
+        with entry["lock"]:
+            created_event = entry["service"].events().insert(
+                calendarId=GOOGLE_CALENDAR_ID,
+                body=event,
+                conferenceDataVersion=1,
+                sendUpdates='none'
+            ).execute()
         
         print(f"Calendar event created successfully. Event ID: {created_event.get('id')}")
         
-        # Extract Google Meet link - check multiple possible locations
-        meet_link = None
-        
-        # Method 1: Check hangoutLink (legacy)
-        if 'hangoutLink' in created_event:
-            meet_link = created_event['hangoutLink']
-            print(f"Found Meet link in hangoutLink: {meet_link}")
-        
-        # Method 2: Check conferenceData.entryPoints
-        if not meet_link and 'conferenceData' in created_event:
-            conference_data = created_event['conferenceData']
-            print(f"Conference data: {json.dumps(conference_data, indent=2)}")
-            
-            if 'entryPoints' in conference_data:
-                for entry in conference_data['entryPoints']:
-                    entry_type = entry.get('entryPointType')
-                    uri = entry.get('uri')
-                    print(f"Entry point - Type: {entry_type}, URI: {uri}")
-                    
-                    if entry_type == 'video' and uri:
-                        meet_link = uri
-                        print(f"Found Meet link in entryPoints: {meet_link}")
-                        break
-        
-        # Method 3: Check conferenceData.hangoutLink
-        if not meet_link and 'conferenceData' in created_event:
-            conference_data = created_event['conferenceData']
-            if 'hangoutLink' in conference_data:
-                meet_link = conference_data['hangoutLink']
-        
-        # Validate Meet link format
-        if meet_link:
-            # Ensure it's a proper Meet URL
-            if not meet_link.startswith('https://meet.google.com/'):
-                # If it's just a meeting code, construct full URL
-                if meet_link.startswith('meet.google.com/'):
-                    meet_link = 'https://' + meet_link
-                elif '/' not in meet_link and '-' in meet_link:
-                    # If it's just the code like "abc-defg-hij", construct URL
-                    meet_link = f'https://meet.google.com/{meet_link}'
-        else:
+        meet_link = _extract_meet_link(created_event)
+        if not meet_link:
             raise Exception("Failed to extract Google Meet link from created event")
         
         return {
@@ -502,19 +557,12 @@ def create_calendar_event_with_service_account(title, description, start_datetim
             'event_link': created_event.get('htmlLink', '')
         }
         
+    except FileNotFoundError:
+        # Re-raise so callers can allow meetings without a link
+        raise
     except HttpError as error:
-        try:
-            if hasattr(error, 'content') and error.content:
-                error_details = json.loads(error.content.decode('utf-8'))
-                error_message = error_details.get('error', {}).get('message', str(error))
-                error_code = error_details.get('error', {}).get('code', '')
-            else:
-                error_message = str(error)
-        except Exception as parse_error:
-            error_message = str(error)
-        raise Exception(f"Failed to create calendar event: {error_message}")
+        raise Exception(f"Failed to create calendar event: {_http_error_message(error)}")
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise Exception(f"Failed to create calendar event: {str(e)}")
-
@@ -1,107 +1,55 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
-from database import engine, Base
+from starlette.responses import Response, PlainTextResponse
+from database import engine, async_engine
+from config import settings
+import hmac
 import os
 
 # Import routes
-from routes import auth, users, projects, tasks, meetings, issues, ratings, dashboard, reports, notifications, calendar_auth, conversations, hr, vms, payroll, leaves, permissions, requests, holidays, work_reports, week_offs, company, policies, payslip_calculate, employee_data, letters, chatbot, loans, resignations
+from routes import auth, users, projects, tasks, meetings, issues, ratings, dashboard, reports, notifications, calendar_auth, conversations, hr, vms, payroll, leaves, permissions, requests, holidays, work_reports, week_offs, company, policies, payslip_calculate, employee_data, letters, chatbot, loans, resignations, async_reads, diagnostics
 
 # Import email scheduler
 from utils.email_scheduler import start_email_scheduler
+from utils.whatsapp_dispatcher import whatsapp_dispatcher
+from utils.payslip_renderer import shutdown_render_pool
+from utils.password_hasher import shutdown_hash_executor
+from utils.payslip_email_dispatcher import payslip_email_dispatcher
+from utils.query_stats import QueryStatsMiddleware, install_query_listeners
+from utils.metrics import metrics, MetricsMiddleware, add_pool_collector, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from utils.tracing import configure_logging
+from utils.fast_json import ORJSONResponse, CompressionMiddleware
+from utils.security_headers import SecurityHeadersMiddleware
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Structured logging for the tms.* loggers (LOG_LEVEL / LOG_FORMAT)
+configure_logging()
+
+# Tables and schema changes are applied by `python migrate.py` before the
+# workers start, not on import
 
 app = FastAPI(
     title="Task Management System API",
     description="A comprehensive task management system with role-based access control",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
-# Security Headers Middleware
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        
-        # Check if this is a docs endpoint - use more permissive CSP
-        # FastAPI docs endpoints: /docs, /redoc, /openapi.json
-        is_docs_endpoint = (
-            request.url.path.startswith("/docs") or 
-            request.url.path.startswith("/redoc") or 
-            request.url.path.startswith("/openapi.json")
-        )
-        
-        # Add security headers to all responses
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains; preload"
-        
-        # Content-Security-Policy: More restrictive but allows necessary features
-        # Note: 'unsafe-inline' and 'unsafe-eval' are required for React/Vite build
-        # In production, consider using nonces for better security
-        if is_docs_endpoint:
-            # More permissive CSP for Swagger UI docs
-            response.headers["Content-Security-Policy"] = (
-                "default-src 'self'; "
-                "script-src 'self' 'unsafe-inline' 'unsafe-eval' https://maps.googleapis.com https://cdn.jsdelivr.net https://unpkg.com; "
-                "script-src-elem 'self' 'unsafe-inline' https://maps.googleapis.com https://cdn.jsdelivr.net https://unpkg.com; "
-                "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com https://cdn.jsdelivr.net https://unpkg.com; "
-                "img-src 'self' data: https: blob: https://i.pinimg.com https://lovenamepix.com; "
-                "font-src 'self' data: https://fonts.gstatic.com https://cdn.jsdelivr.net; "
-                "connect-src 'self' http://127.0.0.1:8007 https://tms.brihaspathi.com https://maps.googleapis.com https: wss: ws:; "
-                "frame-src 'self' https://maps.googleapis.com; "
-                "frame-ancestors 'self'; "
-                "base-uri 'self'; "
-                "form-action 'self'; "
-                "object-src 'none'; "
-                "upgrade-insecure-requests"
-            )
-        else:
-            # Standard CSP for application endpoints
-            response.headers["Content-Security-Policy"] = (
-                "default-src 'self'; "
-                "script-src 'self' 'unsafe-inline' 'unsafe-eval' https://maps.googleapis.com; "
-                "script-src-elem 'self' 'unsafe-inline' https://maps.googleapis.com; "
-                "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com; "
-                "img-src 'self' data: https: blob: https://i.pinimg.com https://lovenamepix.com; "
-                "font-src 'self' data: https://fonts.gstatic.com; "
-                "connect-src 'self' http://127.0.0.1:8007 https://tms.brihaspathi.com https://maps.googleapis.com https: wss: ws:; "
-                "frame-src 'self' https://maps.googleapis.com; "
-                "frame-ancestors 'self'; "
-                "base-uri 'self'; "
-                "form-action 'self'; "
-                "object-src 'none'; "
-                "upgrade-insecure-requests"
-            )
-        
-        response.headers["X-Frame-Options"] = "SAMEORIGIN"
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        
-        # Referrer-Policy: Control referrer information
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        
-        # Permissions-Policy: Allow necessary features for the application
-        # geolocation: Required for punch in/out location tracking
-        # camera: Required for selfie capture in attendance
-        # microphone: Not currently used but may be needed for future features
-        response.headers["Permissions-Policy"] = (
-            "geolocation=(self), "
-            "camera=(self), "
-            "microphone=(self), "
-            "payment=(), "
-            "usb=(), "
-            "magnetometer=(), "
-            "gyroscope=(), "
-            "accelerometer=()"
-        )
-        
-        return response
-
 # Add security headers middleware (should be added before CORS)
 app.add_middleware(SecurityHeadersMiddleware)
 
+# Per-request query counting (X-DB-* headers in debug mode, /api/diagnostics/queries)
+install_query_listeners(engine, async_engine)
+app.add_middleware(QueryStatsMiddleware)
+
+# Per-route latency / status metrics and pool gauges for GET /metrics
+add_pool_collector("sync", engine)
+add_pool_collector("async", async_engine)
+app.add_middleware(MetricsMiddleware)
+
+# brotli / gzip for responses above RESPONSE_COMPRESSION_MIN_BYTES
+app.add_middleware(CompressionMiddleware)
+
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
@@ -149,6 +97,8 @@ app.include_router(letters.router, prefix="/api")
 app.include_router(chatbot.router, prefix="/api")
 app.include_router(loans.router, prefix="/api")
 app.include_router(resignations.router, prefix="/api")
+app.include_router(async_reads.router, prefix="/api")
+app.include_router(diagnostics.router, prefix="/api")
 
 # Mount static files for uploaded files (policies, vms images, etc.)
 uploads_dir = os.path.join(os.path.dirname(__file__), "uploads")
@@ -167,12 +117,43 @@ def root():
 def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint(request: Request):
+    """
+    Prometheus text exposition.
+    With METRICS_TOKEN set, a matching bearer token is required from every client.
+    Otherwise only loopback peers are served (unless METRICS_ALLOW_REMOTE) - this
+    assumes no reverse proxy on the same host, which would make every request
+    look local.
+    """
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        if not hmac.compare_digest(request.headers.get("authorization", "").encode(), expected.encode()):
+            return PlainTextResponse("Unauthorized\n", status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    else:
+        client_host = request.client.host if request.client else None
+        if not settings.METRICS_ALLOW_REMOTE and client_host not in ("127.0.0.1", "::1", "localhost"):
+            return PlainTextResponse("Forbidden\n", status_code=403)
+    return PlainTextResponse(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
 # Start email scheduler on application startup
 @app.on_event("startup")
 async def startup_event():
     start_email_scheduler()
+    await whatsapp_dispatcher.start()
+    # Continue bulk payslip email runs interrupted by a restart (and keep polling for abandoned ones)
+    payslip_email_dispatcher.resume_pending_batches()
     print("Application started - Email scheduler is running")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await whatsapp_dispatcher.stop()
+    shutdown_render_pool()
+    shutdown_hash_executor()
+    await async_engine.dispose()
+
 if __name__ == "__main__":
     import uvicorn
+    from migrate import run_migrations
+    run_migrations()
     uvicorn.run(app, host="0.0.0.0", port=8000)
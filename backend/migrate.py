@@ -0,0 +1,106 @@
+"""
+Schema migrations, run once per deploy before the workers start
+(the app no longer touches the schema when main.py is imported).
+- Creates any missing model tables (Base.metadata.create_all), then applies
+  migrations/versions/*.sql in file-name order, each in its own transaction,
+  recording applied versions in schema_migrations
+- A Postgres advisory lock serialises concurrent runs (several hosts deploying
+  at once), so each version is applied exactly once
+- The loose scripts in migrations/ predate versioning and are not run; new
+  schema changes go in migrations/versions/ as NNNN_description.sql
+- create_all runs first, so on a fresh database a version may find its
+  tables already there: versions use IF NOT EXISTS / ON CONFLICT and still
+  do what create_all cannot (backfills, indexes and columns on existing tables)
+
+Usage:
+    python migrate.py            apply pending migrations
+    python migrate.py --status   list applied and pending versions
+"""
+import os
+import sys
+from sqlalchemy import text
+from database import engine, Base
+import models  # noqa: F401  (registers the tables on Base.metadata)
+
+VERSIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations", "versions")
+# Arbitrary constant shared by every migrate.py run
+ADVISORY_LOCK_KEY = 804611
+
+
+def _ensure_migrations_table(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR(255) PRIMARY KEY,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+
+
+def available_versions() -> list:
+    """Versioned .sql files (without extension) in apply order"""
+    if not os.path.isdir(VERSIONS_DIR):
+        return []
+    return sorted(name[:-4] for name in os.listdir(VERSIONS_DIR) if name.endswith(".sql"))
+
+
+def applied_versions(conn) -> set:
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def _has_statements(sql: str) -> bool:
+    """False for files containing only comments / whitespace"""
+    return any(line.strip() and not line.strip().startswith("--") for line in sql.splitlines())
+
+
+def run_migrations() -> list:
+    """Create missing tables and apply pending versions; returns the versions applied"""
+    applied_now = []
+    with engine.connect() as lock_conn:
+        lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+        try:
+            Base.metadata.create_all(bind=engine)
+            with engine.begin() as conn:
+                _ensure_migrations_table(conn)
+                done = applied_versions(conn)
+
+            for version in available_versions():
+                if version in done:
+                    continue
+                with open(os.path.join(VERSIONS_DIR, f"{version}.sql"), encoding="utf-8") as f:
+                    sql = f.read()
+                print(f"Applying {version}...")
+                with engine.begin() as conn:
+                    if _has_statements(sql):
+                        conn.exec_driver_sql(sql)
+                    conn.execute(text("INSERT INTO schema_migrations (version) VALUES (:version)"), {"version": version})
+                applied_now.append(version)
+                print(f"✓ {version}")
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+            lock_conn.commit()
+    return applied_now
+
+
+def print_status():
+    with engine.begin() as conn:
+        _ensure_migrations_table(conn)
+        done = applied_versions(conn)
+    versions = available_versions()
+    for version in versions:
+        print(f"   {'applied' if version in done else 'pending'}  {version}")
+    pending = [version for version in versions if version not in done]
+    print(f"\n{len(versions) - len(pending)} applied, {len(pending)} pending")
+
+
+if __name__ == "__main__":
+    try:
+        if "--status" in sys.argv[1:]:
+            print_status()
+        else:
+            applied = run_migrations()
+            print(f"\n✅ Schema up to date ({len(applied)} migration(s) applied)")
+    except Exception as e:
+        print(f"\n❌ Error during migration: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
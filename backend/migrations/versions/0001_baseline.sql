@@ -0,0 +1,4 @@
+-- Baseline: the schema as created from models.py by Base.metadata.create_all
+-- plus the one-off scripts in migrations/ that were applied by hand.
+-- Later schema changes are added here as NNNN_description.sql and applied by
+-- `python migrate.py`.
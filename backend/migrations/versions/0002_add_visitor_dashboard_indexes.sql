@@ -0,0 +1,6 @@
+-- Migration: Add indexes for the VMS dashboard aggregate
+-- Covers the grouped count over checkintime ranges and purpose,
+-- and the role-based whometomeet filter for Employee/Manager users
+
+CREATE INDEX IF NOT EXISTS idx_visitors_checkintime_purpose ON visitors(checkintime, purpose);
+CREATE INDEX IF NOT EXISTS idx_visitors_whometomeet_checkintime ON visitors(whometomeet, checkintime);
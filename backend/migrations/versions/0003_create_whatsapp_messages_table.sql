@@ -0,0 +1,23 @@
+-- Migration: Create whatsapp_messages table
+-- Persistent queue and per-message delivery status for the WhatsApp dispatcher
+
+CREATE TABLE IF NOT EXISTS whatsapp_messages (
+    id SERIAL PRIMARY KEY,
+    provider VARCHAR(30) NOT NULL DEFAULT 'smartping',
+    context VARCHAR(30),
+    user_id INTEGER REFERENCES users(id),
+    destination VARCHAR(20) NOT NULL,
+    payload JSONB NOT NULL,
+    status VARCHAR(15) NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    next_attempt_at TIMESTAMP,
+    last_status_code INTEGER,
+    last_error TEXT,
+    sent_at TIMESTAMP,
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_whatsapp_messages_id ON whatsapp_messages(id);
+CREATE INDEX IF NOT EXISTS idx_whatsapp_messages_status_next_attempt ON whatsapp_messages(status, next_attempt_at);
@@ -0,0 +1,8 @@
+-- Migration: Add Google Calendar sync columns to meetings table
+-- Calendar events are created/updated/deleted by a background worker,
+-- which writes the event ID and Meet link back to the meeting row
+
+ALTER TABLE meetings
+ADD COLUMN IF NOT EXISTS calendar_event_id VARCHAR(255),
+ADD COLUMN IF NOT EXISTS calendar_source VARCHAR(20),
+ADD COLUMN IF NOT EXISTS calendar_sync_status VARCHAR(20);
@@ -0,0 +1,42 @@
+-- Migration: Create project_task_rollups table
+-- Per-project task counters maintained on task create/update/delete
+
+CREATE TABLE IF NOT EXISTS project_task_rollups (
+    project_id INTEGER PRIMARY KEY REFERENCES projects(id) ON DELETE CASCADE,
+    total_tasks INTEGER NOT NULL DEFAULT 0,
+    todo_count INTEGER NOT NULL DEFAULT 0,
+    in_progress_count INTEGER NOT NULL DEFAULT 0,
+    done_count INTEGER NOT NULL DEFAULT 0,
+    blocked_count INTEGER NOT NULL DEFAULT 0,
+    percent_complete_sum INTEGER NOT NULL DEFAULT 0,
+    overdue_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP
+);
+
+-- Backfill from existing tasks
+INSERT INTO project_task_rollups (
+    project_id, total_tasks, todo_count, in_progress_count, done_count,
+    blocked_count, percent_complete_sum, overdue_count, updated_at
+)
+SELECT
+    project_id,
+    COUNT(*),
+    COUNT(*) FILTER (WHERE status = 'todo'),
+    COUNT(*) FILTER (WHERE status = 'in-progress'),
+    COUNT(*) FILTER (WHERE status = 'done'),
+    COUNT(*) FILTER (WHERE status = 'blocked'),
+    COALESCE(SUM(percent_complete), 0),
+    COUNT(*) FILTER (WHERE due_date < CURRENT_DATE AND status <> 'done'),
+    NOW()
+FROM tasks
+WHERE project_id IS NOT NULL
+GROUP BY project_id
+ON CONFLICT (project_id) DO UPDATE SET
+    total_tasks = EXCLUDED.total_tasks,
+    todo_count = EXCLUDED.todo_count,
+    in_progress_count = EXCLUDED.in_progress_count,
+    done_count = EXCLUDED.done_count,
+    blocked_count = EXCLUDED.blocked_count,
+    percent_complete_sum = EXCLUDED.percent_complete_sum,
+    overdue_count = EXCLUDED.overdue_count,
+    updated_at = EXCLUDED.updated_at;
@@ -0,0 +1,43 @@
+-- Migration: Create employee_rating_summaries table
+-- Per-employee rating counters maintained on rating create/update/delete
+
+CREATE TABLE IF NOT EXISTS employee_rating_summaries (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    total_ratings INTEGER NOT NULL DEFAULT 0,
+    score_sum INTEGER NOT NULL DEFAULT 0,
+    score_1 INTEGER NOT NULL DEFAULT 0,
+    score_2 INTEGER NOT NULL DEFAULT 0,
+    score_3 INTEGER NOT NULL DEFAULT 0,
+    score_4 INTEGER NOT NULL DEFAULT 0,
+    score_5 INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_task_ratings_ratee ON task_ratings(ratee_id);
+
+-- Backfill from existing ratings
+INSERT INTO employee_rating_summaries (
+    user_id, total_ratings, score_sum, score_1, score_2, score_3, score_4, score_5, updated_at
+)
+SELECT
+    ratee_id,
+    COUNT(*),
+    COALESCE(SUM(score), 0),
+    COUNT(*) FILTER (WHERE score = 1),
+    COUNT(*) FILTER (WHERE score = 2),
+    COUNT(*) FILTER (WHERE score = 3),
+    COUNT(*) FILTER (WHERE score = 4),
+    COUNT(*) FILTER (WHERE score = 5),
+    NOW()
+FROM task_ratings
+WHERE ratee_id IS NOT NULL
+GROUP BY ratee_id
+ON CONFLICT (user_id) DO UPDATE SET
+    total_ratings = EXCLUDED.total_ratings,
+    score_sum = EXCLUDED.score_sum,
+    score_1 = EXCLUDED.score_1,
+    score_2 = EXCLUDED.score_2,
+    score_3 = EXCLUDED.score_3,
+    score_4 = EXCLUDED.score_4,
+    score_5 = EXCLUDED.score_5,
+    updated_at = EXCLUDED.updated_at;
@@ -0,0 +1,39 @@
+-- Migration: Create payslip_email_batches and payslip_email_deliveries tables
+-- Bulk payslip email runs with per-employee delivery status (resumable after restart)
+
+CREATE TABLE IF NOT EXISTS payslip_email_batches (
+    id SERIAL PRIMARY KEY,
+    month INTEGER NOT NULL,
+    year INTEGER NOT NULL,
+    company_id INTEGER,
+    branch_id INTEGER,
+    dept_id INTEGER,
+    subject VARCHAR(300) NOT NULL,
+    message TEXT,
+    status VARCHAR(15) NOT NULL DEFAULT 'queued',
+    total INTEGER NOT NULL DEFAULT 0,
+    sent_count INTEGER NOT NULL DEFAULT 0,
+    failed_count INTEGER NOT NULL DEFAULT 0,
+    skipped_count INTEGER NOT NULL DEFAULT 0,
+    created_by VARCHAR(50),
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    completed_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_payslip_email_batches_status ON payslip_email_batches(status);
+
+CREATE TABLE IF NOT EXISTS payslip_email_deliveries (
+    id SERIAL PRIMARY KEY,
+    batch_id INTEGER NOT NULL REFERENCES payslip_email_batches(id) ON DELETE CASCADE,
+    payslip_id INTEGER NOT NULL,
+    emp_id INTEGER,
+    full_name VARCHAR(100),
+    to_email VARCHAR(100),
+    status VARCHAR(15) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    sent_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_payslip_email_deliveries_batch_status ON payslip_email_deliveries(batch_id, status);
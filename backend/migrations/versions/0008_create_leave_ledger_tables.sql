@@ -0,0 +1,35 @@
+-- Migration: Create leave_ledger and leave_month_balances tables
+-- Append-only leave balance movements plus a running balance snapshot per
+-- employee, leave type, year and month. Snapshots are built from the leaves
+-- table on first use, so no backfill is needed here.
+
+CREATE TABLE IF NOT EXISTS leave_ledger (
+    id SERIAL PRIMARY KEY,
+    empid VARCHAR(20) NOT NULL,
+    leave_type VARCHAR(20) NOT NULL,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    entry_type VARCHAR(20) NOT NULL,
+    days NUMERIC(10, 4) NOT NULL,
+    leave_id INTEGER,
+    note TEXT,
+    created_by VARCHAR(50),
+    created_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_leave_ledger_empid_year ON leave_ledger(empid, year);
+CREATE INDEX IF NOT EXISTS idx_leave_ledger_leave_id ON leave_ledger(leave_id);
+
+CREATE TABLE IF NOT EXISTS leave_month_balances (
+    empid VARCHAR(20) NOT NULL,
+    leave_type VARCHAR(20) NOT NULL,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    credited NUMERIC(10, 4) NOT NULL DEFAULT 0,
+    carry_in NUMERIC(10, 4) NOT NULL DEFAULT 0,
+    used NUMERIC(10, 4) NOT NULL DEFAULT 0,
+    pending NUMERIC(10, 4) NOT NULL DEFAULT 0,
+    year_used NUMERIC(10, 4) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP,
+    PRIMARY KEY (empid, leave_type, year, month)
+);
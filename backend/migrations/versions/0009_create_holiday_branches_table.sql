@@ -0,0 +1,27 @@
+-- Migration: Create holiday_branches table
+-- One row per (holiday, branch) taken from holidays.holiday_permissions, so
+-- branch holiday lookups are indexed range scans instead of JSONB scans
+
+CREATE TABLE IF NOT EXISTS holiday_branches (
+    holiday_id INTEGER NOT NULL REFERENCES holidays(id) ON DELETE CASCADE,
+    branch_id INTEGER NOT NULL,
+    holiday_date DATE NOT NULL,
+    PRIMARY KEY (holiday_id, branch_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_holiday_branches_branch_date ON holiday_branches(branch_id, holiday_date);
+CREATE INDEX IF NOT EXISTS idx_holiday_branches_date ON holiday_branches(holiday_date);
+
+-- Backfill from existing holiday_permissions (array of {branch_id, branch_name})
+INSERT INTO holiday_branches (holiday_id, branch_id, holiday_date)
+SELECT DISTINCT h.id, (perm->>'branch_id')::INTEGER, h.date
+FROM holidays h
+CROSS JOIN LATERAL jsonb_array_elements(
+    CASE jsonb_typeof(h.holiday_permissions)
+        WHEN 'array' THEN h.holiday_permissions
+        WHEN 'object' THEN jsonb_build_array(h.holiday_permissions)
+        ELSE '[]'::jsonb
+    END
+) AS perm
+WHERE perm->>'branch_id' ~ '^[0-9]+$'
+ON CONFLICT (holiday_id, branch_id) DO NOTHING;
@@ -0,0 +1,13 @@
+-- Migration: Make week_off_dates unique per (employee_id, date)
+-- Required by bulk week-off generation (INSERT ... ON CONFLICT DO NOTHING).
+-- The unique index replaces the plain idx_employee_date index.
+
+-- Remove duplicate rows, keeping the oldest
+DELETE FROM week_off_dates a
+USING week_off_dates b
+WHERE a.employee_id = b.employee_id
+  AND a.date = b.date
+  AND a.id > b.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_week_off_employee_date ON week_off_dates(employee_id, date);
+DROP INDEX IF EXISTS idx_employee_date;
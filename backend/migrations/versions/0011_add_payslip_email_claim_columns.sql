@@ -0,0 +1,10 @@
+-- Migration: Worker claims and retry backoff for bulk payslip email runs
+-- A run is owned by one worker under a lease; deliveries are claimed per chunk
+-- (status 'sending') so two workers never send the same payslip
+
+ALTER TABLE payslip_email_batches ADD COLUMN IF NOT EXISTS claimed_by VARCHAR(100);
+ALTER TABLE payslip_email_batches ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP;
+
+ALTER TABLE payslip_email_deliveries ADD COLUMN IF NOT EXISTS claimed_by VARCHAR(100);
+ALTER TABLE payslip_email_deliveries ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMP;
+ALTER TABLE payslip_email_deliveries ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMP;
@@ -98,6 +98,20 @@ class Project(Base):
         CheckConstraint('progress_percent >= 0 AND progress_percent <= 100', name='check_progress'),
     )
 
+class ProjectTaskRollup(Base):
+    __tablename__ = "project_task_rollups"
+    
+    # Maintained transactionally by utils/project_rollups on task create/update/delete
+    project_id = Column(Integer, ForeignKey('projects.id', ondelete='CASCADE'), primary_key=True)
+    total_tasks = Column(Integer, nullable=False, default=0)
+    todo_count = Column(Integer, nullable=False, default=0)
+    in_progress_count = Column(Integer, nullable=False, default=0)
+    done_count = Column(Integer, nullable=False, default=0)
+    blocked_count = Column(Integer, nullable=False, default=0)
+    percent_complete_sum = Column(Integer, nullable=False, default=0)
+    overdue_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=get_ist_now, onupdate=get_ist_now)
+
 class Task(Base):
     __tablename__ = "tasks"
     
@@ -181,8 +195,23 @@ class TaskRating(Base):
     
     __table_args__ = (
         CheckConstraint('score >= 1 AND score <= 5', name='check_score'),
+        Index('idx_task_ratings_ratee', 'ratee_id'),
     )
 
+class EmployeeRatingSummary(Base):
+    __tablename__ = "employee_rating_summaries"
+    
+    # Maintained transactionally by utils/rating_summaries on rating create/update/delete
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    total_ratings = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Integer, nullable=False, default=0)
+    score_1 = Column(Integer, nullable=False, default=0)
+    score_2 = Column(Integer, nullable=False, default=0)
+    score_3 = Column(Integer, nullable=False, default=0)
+    score_4 = Column(Integer, nullable=False, default=0)
+    score_5 = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=get_ist_now, onupdate=get_ist_now)
+
 class Meeting(Base):
     __tablename__ = "meetings"
     
@@ -196,6 +225,9 @@ class Meeting(Base):
     meeting_type = Column(String(20), default='online')  # online / offline
     location = Column(Text)
     status = Column(String(20), default='scheduled')
+    calendar_event_id = Column(String(255), nullable=True)  # Google Calendar event ID
+    calendar_source = Column(String(20), nullable=True)  # oauth / service_account
+    calendar_sync_status = Column(String(20), nullable=True)  # pending / synced / failed
     created_by = Column(Integer, ForeignKey('users.id'), nullable=True)
     created_by_name = Column(String(100))
     created_at = Column(DateTime, default=get_ist_now)
@@ -291,6 +323,29 @@ class NotificationLog(Base):
     sent_at = Column(DateTime, default=get_ist_now)
     is_read = Column(Boolean, default=False)
 
+class WhatsAppMessage(Base):
+    __tablename__ = "whatsapp_messages"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    provider = Column(String(30), nullable=False, default='smartping')
+    context = Column(String(30))  # vms, visitor, meeting, ...
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=True)
+    destination = Column(String(20), nullable=False)
+    payload = Column(JSONB, nullable=False)
+    status = Column(String(15), nullable=False, default='queued')  # queued, sending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    next_attempt_at = Column(DateTime, default=get_ist_now)
+    last_status_code = Column(Integer, nullable=True)
+    last_error = Column(Text, nullable=True)
+    sent_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=get_ist_now)
+    updated_at = Column(DateTime, default=get_ist_now, onupdate=get_ist_now)
+    
+    __table_args__ = (
+        Index('idx_whatsapp_messages_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
 class AuditLog(Base):
     __tablename__ = "audit_logs"
     
@@ -392,6 +447,11 @@ class Visitor(Base):
     status = Column(String(20), default='IN')  # IN, OUT
     created_at = Column(DateTime, default=get_ist_now)
     updated_at = Column(DateTime, default=get_ist_now, onupdate=get_ist_now)
+    
+    __table_args__ = (
+        Index('idx_visitors_checkintime_purpose', 'checkintime', 'purpose'),
+        Index('idx_visitors_whometomeet_checkintime', 'whometomeet', 'checkintime'),
+    )
 
 # Payroll Module Models
 class PayrollStructure(Base):
@@ -535,6 +595,20 @@ class Holiday(Base):
         Index('idx_holiday_date', 'date'),
     )
 
+class HolidayBranch(Base):
+    __tablename__ = "holiday_branches"
+
+    # Normalized copy of Holiday.holiday_permissions, rewritten by the holiday routes
+    # (holiday_date is denormalized so branch/date range lookups hit one index)
+    holiday_id = Column(Integer, ForeignKey('holidays.id', ondelete='CASCADE'), primary_key=True)
+    branch_id = Column(Integer, primary_key=True)
+    holiday_date = Column(Date, nullable=False)
+
+    __table_args__ = (
+        Index('idx_holiday_branches_branch_date', 'branch_id', 'holiday_date'),
+        Index('idx_holiday_branches_date', 'holiday_date'),
+    )
+
 # WeekOff Model
 class WeekOff(Base):
     __tablename__ = "week_offs"
@@ -562,7 +636,7 @@ class WeekOffDate(Base):
     created_at = Column(DateTime, default=get_ist_now)
     
     __table_args__ = (
-        Index('idx_employee_date', 'employee_id', 'date'),
+        Index('uq_week_off_employee_date', 'employee_id', 'date', unique=True),
         Index('idx_weekoff_year', 'year'),
         Index('idx_weekoff_month', 'month'),
     )
@@ -741,6 +815,54 @@ class PayslipData(Base):
         Index('idx_payslip_freaze_status', 'freaze_status'),
     )
 
+class PayslipEmailBatch(Base):
+    __tablename__ = "payslip_email_batches"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    month = Column(Integer, nullable=False)
+    year = Column(Integer, nullable=False)
+    company_id = Column(Integer, nullable=True)
+    branch_id = Column(Integer, nullable=True)
+    dept_id = Column(Integer, nullable=True)
+    subject = Column(String(300), nullable=False)
+    message = Column(Text)
+    status = Column(String(15), nullable=False, default='queued')  # queued, running, completed, cancelled
+    claimed_by = Column(String(100), nullable=True)  # host:pid of the worker sending the run
+    lease_expires_at = Column(DateTime, nullable=True)  # renewed every chunk; another worker may take over once expired
+    total = Column(Integer, nullable=False, default=0)
+    sent_count = Column(Integer, nullable=False, default=0)
+    failed_count = Column(Integer, nullable=False, default=0)
+    skipped_count = Column(Integer, nullable=False, default=0)
+    created_by = Column(String(50))
+    created_at = Column(DateTime, default=get_ist_now)
+    updated_at = Column(DateTime, default=get_ist_now, onupdate=get_ist_now)
+    completed_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index('idx_payslip_email_batches_status', 'status'),
+    )
+
+class PayslipEmailDelivery(Base):
+    __tablename__ = "payslip_email_deliveries"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    batch_id = Column(Integer, ForeignKey('payslip_email_batches.id', ondelete='CASCADE'), nullable=False)
+    payslip_id = Column(Integer, nullable=False)
+    emp_id = Column(Integer)
+    full_name = Column(String(100))
+    to_email = Column(String(100))
+    status = Column(String(15), nullable=False, default='pending')  # pending, sending, sent, failed, skipped
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    claimed_by = Column(String(100), nullable=True)
+    claimed_at = Column(DateTime, nullable=True)
+    next_attempt_at = Column(DateTime, nullable=True)  # retry backoff after a failed send
+    sent_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index('idx_payslip_email_deliveries_batch_status', 'batch_id', 'status'),
+    )
+
 class Policy(Base):
     __tablename__ = "policies"
     
@@ -777,6 +899,42 @@ class LeaveBalanceList(Base):
         Index('idx_leave_balance_empid_year', 'empid', 'year'),
     )
 
+class LeaveLedgerEntry(Base):
+    __tablename__ = "leave_ledger"
+    
+    # Append-only - balance movements are never updated or deleted
+    id = Column(Integer, primary_key=True, index=True)
+    empid = Column(String(20), nullable=False)
+    leave_type = Column(String(20), nullable=False)  # casual, sick, comp_off
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    entry_type = Column(String(20), nullable=False)  # opening, credit, consumption, reversal
+    days = Column(Numeric(10, 4), nullable=False)  # Positive adds to the balance, negative consumes it
+    leave_id = Column(Integer, nullable=True)
+    note = Column(Text, nullable=True)
+    created_by = Column(String(50), nullable=True)
+    created_at = Column(DateTime, default=get_ist_now)
+    
+    __table_args__ = (
+        Index('idx_leave_ledger_empid_year', 'empid', 'year'),
+        Index('idx_leave_ledger_leave_id', 'leave_id'),
+    )
+
+class LeaveMonthBalance(Base):
+    __tablename__ = "leave_month_balances"
+    
+    # Running balance snapshot maintained by utils/leave_ledger
+    empid = Column(String(20), primary_key=True)
+    leave_type = Column(String(20), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    credited = Column(Numeric(10, 4), nullable=False, default=0)
+    carry_in = Column(Numeric(10, 4), nullable=False, default=0)  # Unused credit carried from earlier months
+    used = Column(Numeric(10, 4), nullable=False, default=0)  # Approved days starting in this month
+    pending = Column(Numeric(10, 4), nullable=False, default=0)  # Pending days starting in this month
+    year_used = Column(Numeric(10, 4), nullable=False, default=0)  # Approved days in the whole year
+    updated_at = Column(DateTime, default=get_ist_now, onupdate=get_ist_now)
+
 # EmployeeLoan Model
 class EmployeeLoan(Base):
     __tablename__ = "employee_loans"
@@ -0,0 +1,303 @@
+"""
+Async read endpoints
+Async (AsyncSession) versions of the hottest read endpoints, served side by
+side with the sync routes under /api/async/... so both can be load-tested
+against the same data (see test_async_throughput.py).
+- Sync `def` routes run on Starlette's bounded threadpool; these run on the
+  event loop and wait on the database without holding a thread
+- Responses match the sync endpoints; shared response building lives with
+  the sync routes (routes.auth, routes.hr, routes.tasks)
+"""
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select, func, or_, and_, cast
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import datetime, timedelta
+from database import get_async_db
+from models import User, SalaryStructure, NotificationLog, Attendance, Project, Task, Issue, Meeting
+from schemas import UserResponse, DashboardStats, TaskResponse
+from routes.auth import get_token_identity, is_front_desk_identity, front_desk_user, front_desk_me_response
+from routes.hr import parse_attendance_day, today_attendance_response
+from routes.tasks import annotate_task_delays, _normalize_empid
+
+router = APIRouter(prefix="/async", tags=["Async reads"])
+
+
+async def get_current_user_async(request: Request, db: AsyncSession = Depends(get_async_db)) -> User:
+    user_id, role = get_token_identity(request)
+
+    if is_front_desk_identity(user_id, role):
+        return front_desk_user()
+
+    user = await db.get(User, user_id)
+    if not user or not user.is_active:
+        raise HTTPException(status_code=401, detail="User not found or inactive")
+
+    return user
+
+
+async def get_all_subordinate_user_ids_async(db: AsyncSession, manager_empid) -> List[int]:
+    """Async routes.tasks.get_all_subordinate_user_ids: self + all direct and indirect reports, one query per level"""
+    manager_str = _normalize_empid(manager_empid)
+    if not manager_str:
+        return []
+    ids = []
+    manager_id = (await db.execute(select(User.id).where(User.empid == manager_str).limit(1))).scalar()
+    if manager_id is not None:
+        ids.append(manager_id)
+    visited = {manager_str}
+    level = [manager_str]
+    while level:
+        rows = (await db.execute(
+            select(User.id, User.empid).where(User.report_to_id.in_(level), User.is_active == True)
+        )).all()
+        level = []
+        for user_id, empid in rows:
+            if user_id not in ids:
+                ids.append(user_id)
+            empid = _normalize_empid(empid)
+            if empid and empid not in visited:
+                visited.add(empid)
+                level.append(empid)
+    return ids
+
+
+@router.get("/auth/me", response_model=UserResponse)
+async def get_me_async(
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if is_front_desk_identity(current_user.id, current_user.role):
+        return front_desk_me_response()
+
+    try:
+        salary = (await db.execute(
+            select(SalaryStructure.salary_per_annum).where(SalaryStructure.empid == current_user.empid).limit(1)
+        )).scalar()
+        salary_per_annum = float(salary) if salary else None
+    except Exception as e:
+        print(f"Error fetching salary_per_annum: {e}")
+        salary_per_annum = None
+
+    user_dict = UserResponse.model_validate(current_user).model_dump()
+    user_dict['salary_per_annum'] = salary_per_annum
+
+    return user_dict
+
+
+@router.get("/notifications/")
+async def get_notifications_async(
+    unread_only: bool = False,
+    limit: int = 20,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    query = select(NotificationLog).where(NotificationLog.user_id == current_user.id)
+
+    if unread_only:
+        query = query.where(NotificationLog.is_read == False)
+
+    result = await db.execute(query.order_by(NotificationLog.sent_at.desc()).limit(limit))
+    return result.scalars().all()
+
+
+@router.get("/notifications/unread-count")
+async def get_unread_count_async(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    count = (await db.execute(
+        select(func.count(NotificationLog.id)).where(
+            NotificationLog.user_id == current_user.id,
+            NotificationLog.is_read == False
+        )
+    )).scalar_one()
+
+    return {"unread_count": count}
+
+
+@router.get("/attendance/today")
+async def get_today_attendance_async(
+    date: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """Get today's attendance for current user"""
+    target_date = parse_attendance_day(date)
+
+    attendance = (await db.execute(
+        select(Attendance).where(
+            and_(
+                Attendance.employee_id == current_user.empid,
+                Attendance.date == target_date
+            )
+        ).limit(1)
+    )).scalars().first()
+
+    return today_attendance_response(attendance)
+
+
+async def _first_statuses(db: AsyncSession, query) -> List[str]:
+    """Statuses of the first 500 matching rows (the sync dashboard caps each list at 500)"""
+    return (await db.execute(query.limit(500))).scalars().all()
+
+
+@router.get("/dashboard/stats", response_model=DashboardStats)
+async def get_dashboard_stats_async(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    try:
+        # Projects
+        project_query = select(Project.status)
+        if current_user.role == "Manager":
+            project_query = project_query.where(Project.project_head_id == current_user.id)
+        elif current_user.role == "Employee":
+            project_query = project_query.where(
+                Project.teams.contains([{"empid": current_user.empid}])
+            )
+        project_statuses = await _first_statuses(db, project_query)
+
+        team_ids = None
+        if current_user.role == "Manager":
+            team_ids = list((await db.execute(
+                select(User.id).where(User.report_to_id == current_user.empid).limit(100)
+            )).scalars().all())
+            team_ids.append(current_user.id)
+
+        # Tasks
+        task_query = select(Task.status)
+        if current_user.role == "Employee":
+            task_query = task_query.where(
+                or_(
+                    Task.assigned_to_id == current_user.id,
+                    cast(Task.assigned_to_ids, JSONB).contains([{"empid": current_user.empid}])
+                )
+            )
+        elif current_user.role == "Manager":
+            task_query = task_query.where(
+                or_(
+                    Task.assigned_by_id == current_user.id,
+                    Task.assigned_to_id.in_(team_ids)
+                )
+            )
+        task_statuses = await _first_statuses(db, task_query)
+
+        # Issues
+        issue_query = select(Issue.status)
+        if current_user.role == "Employee":
+            issue_query = issue_query.where(
+                or_(
+                    Issue.raised_by == current_user.id,
+                    Issue.assigned_to == current_user.id
+                )
+            )
+        elif current_user.role == "Manager":
+            issue_query = issue_query.where(
+                or_(
+                    Issue.raised_by.in_(team_ids),
+                    Issue.assigned_to.in_(team_ids)
+                )
+            )
+        issue_statuses = await _first_statuses(db, issue_query)
+
+        # Teams count
+        if current_user.role == "Admin":
+            total_teams = (await db.execute(
+                select(func.count(User.id)).where(User.is_active == True, User.role == "Employee")
+            )).scalar_one()
+        elif current_user.role == "Manager":
+            total_teams = (await db.execute(
+                select(func.count(User.id)).where(User.report_to_id == current_user.empid, User.is_active == True)
+            )).scalar_one()
+        else:
+            total_teams = 0
+
+        # Today's meetings
+        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        today_end = today_start + timedelta(days=1)
+
+        meeting_query = select(func.count(Meeting.id)).where(
+            Meeting.meeting_datetime >= today_start,
+            Meeting.meeting_datetime < today_end
+        )
+        if current_user.role != "Admin":
+            meeting_query = meeting_query.where(
+                or_(
+                    Meeting.created_by == current_user.id,
+                    cast(Meeting.participants, JSONB).contains([{"empid": current_user.empid}])
+                )
+            )
+        today_meetings = (await db.execute(meeting_query)).scalar_one()
+
+        return DashboardStats(
+            total_projects=len(project_statuses),
+            pending_projects=sum(1 for s in project_statuses if s == "planning"),
+            in_progress_projects=sum(1 for s in project_statuses if s == "active"),
+            completed_projects=sum(1 for s in project_statuses if s == "completed"),
+            total_tasks=len(task_statuses),
+            pending_tasks=sum(1 for s in task_statuses if s == "todo"),
+            in_progress_tasks=sum(1 for s in task_statuses if s == "in-progress"),
+            completed_tasks=sum(1 for s in task_statuses if s == "done"),
+            total_issues=len(issue_statuses),
+            pending_issues=sum(1 for s in issue_statuses if s in ["open", "in-progress"]),
+            resolved_issues=sum(1 for s in issue_statuses if s in ["resolved", "closed"]),
+            total_teams=total_teams,
+            today_meetings=today_meetings
+        )
+    except Exception as e:
+        print(f"Error in get_dashboard_stats_async: {e}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Error fetching dashboard stats: {str(e)}")
+
+
+@router.get("/tasks/", response_model=List[TaskResponse])
+async def get_tasks_async(
+    project_id: int = None,
+    status: str = None,
+    assigned_to_id: int = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    try:
+        query = select(Task)
+
+        if project_id:
+            query = query.where(Task.project_id == project_id)
+        if status:
+            query = query.where(Task.status == status)
+        if assigned_to_id:
+            query = query.where(Task.assigned_to_id == assigned_to_id)
+
+        # Filter based on role
+        if current_user.role == "Employee":
+            query = query.where(
+                or_(
+                    Task.assigned_to_id == current_user.id,
+                    cast(Task.assigned_to_ids, JSONB).contains([{"empid": current_user.empid}])
+                )
+            )
+        elif current_user.role == "Manager":
+            team_ids = await get_all_subordinate_user_ids_async(db, current_user.empid)
+            if team_ids:
+                query = query.where(
+                    or_(
+                        Task.assigned_by_id == current_user.id,
+                        Task.assigned_to_id.in_(team_ids)
+                    )
+                )
+            else:
+                query = query.where(Task.assigned_by_id == current_user.id)
+
+        # Limit to 500 tasks for performance
+        tasks = (await db.execute(query.order_by(Task.created_at.desc()).limit(500))).scalars().all()
+        annotate_task_delays(tasks)
+
+        return tasks
+    except Exception as e:
+        print(f"Error in get_tasks_async: {e}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Error fetching tasks: {str(e)}")
@@ -1,16 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Body
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta, timezone
 from utils import get_ist_now
 from database import get_db
 from models import User, AuthToken, SalaryStructure
 from schemas import LoginRequest, TokenResponse, UserResponse, ChangePasswordRequest, ForgotPasswordRequest
-from utils import verify_password, create_access_token, decode_token, hash_password
+from utils import create_access_token, decode_token, hash_password
 from config import settings
+from utils.password_hasher import (
+    verify_and_update_password, is_known_unknown_username, remember_unknown_username
+)
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
-def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
+def get_token_identity(request: Request) -> tuple:
+    """(user_id, role) from the Bearer token, 401 if it is missing or invalid"""
     auth_header = request.headers.get("Authorization")
     if not auth_header or not auth_header.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Not authenticated")
@@ -27,22 +32,32 @@ def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
     if user_id is None:
         raise HTTPException(status_code=401, detail="Invalid token payload")
     
+    return user_id, role
+
+def is_front_desk_identity(user_id, role) -> bool:
+    return user_id == 0 and role == "Front Desk"
+
+def front_desk_user() -> User:
+    """Virtual User object for Front Desk (no database row)"""
+    return User(
+        id=0,
+        empid="99",
+        name="Receptionist",
+        email="receptionist@brihaspathi.com",
+        username="99",
+        password="",  # Not used for Front Desk
+        role="Front Desk",
+        is_active=True,
+        image_base64=None,
+        created_at=get_ist_now()
+    )
+
+def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
+    user_id, role = get_token_identity(request)
+    
     # Handle Front Desk virtual user (user_id = 0)
-    if user_id == 0 and role == "Front Desk":
-        # Create a virtual User object for Front Desk (no database query)
-        virtual_user = User(
-            id=0,
-            empid="99",
-            name="Receptionist",
-            email="receptionist@brihaspathi.com",
-            username="99",
-            password="",  # Not used for Front Desk
-            role="Front Desk",
-            is_active=True,
-            image_base64=None,
-            created_at=get_ist_now()
-        )
-        return virtual_user
+    if is_front_desk_identity(user_id, role):
+        return front_desk_user()
     
     # Normal user lookup from database
     user = db.query(User).filter(User.id == user_id).first()
@@ -51,15 +66,65 @@ def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
     
     return user
 
+def _find_login_user(db: Session, username: str):
+    return db.query(User).filter(
+        (User.username == username) | (User.empid == username)
+    ).first()
+
+def _complete_login(db: Session, user: User, device_info: str, new_password_hash: str = None) -> dict:
+    """Issue the token, record it (and any re-hashed password) in one commit and build the response"""
+    expires_at = get_ist_now() + timedelta(days=settings.ACCESS_TOKEN_EXPIRE_DAYS)
+    token = create_access_token({"user_id": user.id, "role": user.role})
+    
+    # Save token (optional - for tracking) - Skip for Front Desk role
+    if user.role != "Front Desk" or new_password_hash:
+        try:
+            if new_password_hash:
+                # Stored hash used an outdated bcrypt cost - replace it transparently
+                user.password = new_password_hash
+            if user.role != "Front Desk":
+                db.add(AuthToken(
+                    user_id=user.id,
+                    token=token,
+                    device_info=device_info,
+                    expires_at=expires_at
+                ))
+            db.commit()
+        except Exception as e:
+            # Token tracking is optional, log but don't fail
+            # Rollback the transaction to avoid issues
+            db.rollback()
+            print(f"Warning: Could not save auth token: {e}")
+    
+    # Validate user response
+    user_response = UserResponse.model_validate(user)
+    
+    # Check Google Calendar connection status
+    calendar_connected = user.google_calendar_credentials is not None
+    
+    response = TokenResponse(
+        access_token=token,
+        user=user_response,
+        expires_at=expires_at
+    )
+    
+    # Add calendar connection status to response (as dict to include extra field)
+    response_dict = response.model_dump()
+    response_dict['calendar_connected'] = calendar_connected
+    
+    return response_dict
+
 @router.post("/login", response_model=TokenResponse)
-def login(request: LoginRequest, db: Session = Depends(get_db)):
+async def login(request: LoginRequest, db: Session = Depends(get_db)):
+    """
+    Log in with username or empid.
+    Database work runs on the request threadpool and bcrypt on the dedicated
+    hashing pool, so no request thread is held while a password is verified.
+    """
     try:
         # Check for default Receptionist credentials (no database check)
         if request.username == "99" and request.password == "123123":
             # Create virtual user object for Receptionist
-            from datetime import datetime
-            from decimal import Decimal
-            
             expires_at = get_ist_now() + timedelta(days=settings.ACCESS_TOKEN_EXPIRE_DAYS)
             # Use a special user_id for Front Desk (0 or -1) to avoid conflicts
             token = create_access_token({"user_id": 0, "role": "Front Desk"})
@@ -113,57 +178,23 @@ def login(request: LoginRequest, db: Session = Depends(get_db)):
             return response_dict
         
         # Normal database authentication for other users
-        user = db.query(User).filter(
-            (User.username == request.username) | (User.empid == request.username)
-        ).first()
+        if is_known_unknown_username(request.username):
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        
+        user = await run_in_threadpool(_find_login_user, db, request.username)
         
         if not user:
+            remember_unknown_username(request.username)
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
-        if not verify_password(request.password, user.password):
+        valid, new_password_hash = await verify_and_update_password(request.password, user.password)
+        if not valid:
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
         if not user.is_active:
             raise HTTPException(status_code=401, detail="Account is deactivated")
         
-        # Create token
-        expires_at = get_ist_now() + timedelta(days=settings.ACCESS_TOKEN_EXPIRE_DAYS)
-        token = create_access_token({"user_id": user.id, "role": user.role})
-        
-        # Save token (optional - for tracking) - Skip for Front Desk role
-        if user.role != "Front Desk":
-            try:
-                auth_token = AuthToken(
-                    user_id=user.id,
-                    token=token,
-                    device_info=request.device_info,
-                    expires_at=expires_at
-                )
-                db.add(auth_token)
-                db.commit()
-            except Exception as e:
-                # Token tracking is optional, log but don't fail
-                # Rollback the transaction to avoid issues
-                db.rollback()
-                print(f"Warning: Could not save auth token: {e}")
-        
-        # Validate user response
-        user_response = UserResponse.model_validate(user)
-        
-        # Check Google Calendar connection status
-        calendar_connected = user.google_calendar_credentials is not None
-        
-        response = TokenResponse(
-            access_token=token,
-            user=user_response,
-            expires_at=expires_at
-        )
-        
-        # Add calendar connection status to response (as dict to include extra field)
-        response_dict = response.model_dump()
-        response_dict['calendar_connected'] = calendar_connected
-        
-        return response_dict
+        return await run_in_threadpool(_complete_login, db, user, request.device_info, new_password_hash)
     except HTTPException:
         raise
     except Exception as e:
@@ -182,45 +213,48 @@ def logout(request: Request, db: Session = Depends(get_db), current_user: User =
     
     return {"message": "Logged out successfully"}
 
+def front_desk_me_response() -> UserResponse:
+    """/auth/me response for the virtual Front Desk user"""
+    return UserResponse(
+        id=0,
+        empid="99",
+        name="Receptionist",
+        email="receptionist@brihaspathi.com",
+        phone=None,
+        username="99",
+        role="Front Desk",
+        sms_consent=False,
+        whatsapp_consent=False,
+        email_consent=False,
+        report_to_id=None,
+        image_base64=None,
+        is_active=True,
+        dob=None,
+        doj=None,
+        emp_inactive_date=None,
+        designation=None,
+        company_id=None,
+        branch_id=None,
+        department_id=None,
+        company_name=None,
+        branch_name=None,
+        department_name=None,
+        salary_per_annum=None,
+        is_late=False,
+        bank_details=None,
+        family_details=None,
+        nominee_details=None,
+        education_details=None,
+        experience_details=None,
+        documents=None,
+        created_at=get_ist_now()
+    )
+
 @router.get("/me", response_model=UserResponse)
 def get_me(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     # Handle virtual Front Desk user (no database queries needed)
     if current_user.id == 0 and current_user.role == "Front Desk":
-        user_response = UserResponse(
-            id=0,
-            empid="99",
-            name="Receptionist",
-            email="receptionist@brihaspathi.com",
-            phone=None,
-            username="99",
-            role="Front Desk",
-            sms_consent=False,
-            whatsapp_consent=False,
-            email_consent=False,
-            report_to_id=None,
-            image_base64=None,
-            is_active=True,
-            dob=None,
-            doj=None,
-            emp_inactive_date=None,
-            designation=None,
-            company_id=None,
-            branch_id=None,
-            department_id=None,
-            company_name=None,
-            branch_name=None,
-            department_name=None,
-            salary_per_annum=None,
-            is_late=False,
-            bank_details=None,
-            family_details=None,
-            nominee_details=None,
-            education_details=None,
-            experience_details=None,
-            documents=None,
-            created_at=get_ist_now()
-        )
-        return user_response
+        return front_desk_me_response()
     
     # Fetch salary_per_annum from SalaryStructure for normal users
     # Query only the columns that exist in the database to avoid errors
@@ -5,7 +5,7 @@ from pydantic import BaseModel
 from database import get_db
 from models import User
 from routes.auth import get_current_user
-from google_calendar import get_authorization_url, get_credentials_from_code, credentials_to_dict
+from google_calendar import get_authorization_url, get_credentials_from_code, credentials_to_dict, invalidate_calendar_service
 
 router = APIRouter(prefix="/auth/google", tags=["Google Calendar Auth"])
 
@@ -177,6 +177,8 @@ def disconnect_google_calendar(
     db: Session = Depends(get_db)
 ):
     """Disconnect Google Calendar"""
+    if current_user.google_calendar_credentials:
+        invalidate_calendar_service(current_user.google_calendar_credentials)
     current_user.google_calendar_credentials = None
     db.commit()
     return {"message": "Google Calendar disconnected successfully"}
@@ -743,14 +743,6 @@ def get_chatbot_response(question: str, user_role: str, db: Session = None, curr
                         if len(users) > 1:
                             selection_data = []
                             for user in users:
-                                # Get leave balance for each user
-                                leave_balance = db.query(LeaveBalanceList).filter(
-                                    and_(
-                                        LeaveBalanceList.empid == int(user.empid) if user.empid and str(user.empid).isdigit() else None,
-                                        LeaveBalanceList.year == current_year
-                                    )
-                                ).first() if user.empid and str(user.empid).isdigit() else None
-                                
                                 selection_data.append({
                                     'empid': user.empid,
                                     'name': user.name,
@@ -8,7 +8,6 @@ from routes.auth import get_current_user
 from utils import is_admin_or_hr
 from typing import Optional, List
 from pydantic import BaseModel
-import requests
 import base64
 
 router = APIRouter()
@@ -73,6 +72,7 @@ def get_company_logo(
     
     # Try to fetch default logo and convert to base64 to avoid CORS
     try:
+        import requests
         logo_url = "https://www.brihaspathi.com/highbtlogo%20tm%20(1).png"
         response = requests.get(logo_url, timeout=10)
         if response.status_code == 200:
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, HTTPException
+from models import User
+from routes.auth import get_current_user
+from utils.query_stats import query_stats_report
+
+router = APIRouter(prefix="/diagnostics", tags=["Diagnostics"])
+
+
+def require_admin(current_user: User):
+    if current_user.role != "Admin":
+        raise HTTPException(status_code=403, detail="Only Admin can view diagnostics")
+
+
+@router.get("/queries")
+def get_query_report(
+    sort_by: str = "avg_queries",
+    limit: int = 50,
+    current_user: User = Depends(get_current_user)
+):
+    """Per-route query counts, DB time and N+1 statements since start-up (or the last reset)"""
+    require_admin(current_user)
+    return query_stats_report.snapshot(sort_by=sort_by, limit=limit)
+
+
+@router.delete("/queries")
+def reset_query_report(current_user: User = Depends(get_current_user)):
+    require_admin(current_user)
+    query_stats_report.reset()
+    return {"message": "Query report reset"}
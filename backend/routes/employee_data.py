@@ -8,9 +8,11 @@ from datetime import date, datetime
 from typing import Optional
 import io
 import zipfile
-import base64
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, FileResponse
+from fastapi.concurrency import run_in_threadpool
 import json
+import os
+from utils.document_import import import_document_zip, get_document_path
 
 router = APIRouter(prefix="/employee-data", tags=["Employee Data"])
 
@@ -446,7 +448,7 @@ async def upload_documents_folder(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Upload a zip folder containing images named by empid and update documents JSONB column"""
+    """Upload a zip folder containing documents named by empid and store them for each employee"""
     if current_user.role not in ["Admin", "HR"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
@@ -455,90 +457,48 @@ async def upload_documents_folder(
         if not file.filename.endswith('.zip'):
             raise HTTPException(status_code=400, detail="Please upload a ZIP file")
         
-        # Read zip file
-        zip_content = await file.read()
-        zip_file = zipfile.ZipFile(io.BytesIO(zip_content))
-        
-        updated_count = 0
-        skipped_count = 0
-        error_count = 0
-        
-        # Process each file in the zip
-        for file_info in zip_file.filelist:
-            if file_info.is_dir():
-                continue
-            
-            # Get filename without path and extension
-            filename = file_info.filename.split('/')[-1]  # Handle nested paths
-            empid = filename.rsplit('.', 1)[0]  # Remove extension
-            
-            # Find user by empid
-            user = db.query(User).filter(User.empid == empid).first()
-            
-            if not user:
-                skipped_count += 1
-                continue
-            
-            try:
-                # Read image file
-                image_data = zip_file.read(file_info.filename)
-                image_base64 = base64.b64encode(image_data).decode('utf-8')
-                
-                # Determine image format
-                file_ext = filename.rsplit('.', 1)[-1].lower()
-                if file_ext in ['jpg', 'jpeg']:
-                    image_data_uri = f"data:image/jpeg;base64,{image_base64}"
-                elif file_ext == 'png':
-                    image_data_uri = f"data:image/png;base64,{image_base64}"
-                else:
-                    image_data_uri = f"data:image/{file_ext};base64,{image_base64}"
-                
-                # Get existing documents or initialize
-                documents = user.documents if user.documents else []
-                if not isinstance(documents, list):
-                    documents = []
-                
-                # Check if document with same name exists
-                doc_exists = False
-                for idx, doc in enumerate(documents):
-                    if isinstance(doc, dict) and doc.get('name') == folder_name:
-                        # Update existing document
-                        documents[idx] = {
-                            'name': folder_name,
-                            'image': image_data_uri
-                        }
-                        doc_exists = True
-                        break
-                
-                if not doc_exists:
-                    # Add new document
-                    documents.append({
-                        'name': folder_name,
-                        'image': image_data_uri
-                    })
-                
-                # Update user
-                user.documents = documents
-                db.commit()
-                updated_count += 1
-                
-            except Exception as e:
-                error_count += 1
-                print(f"Error processing file {filename}: {str(e)}")
-                continue
+        # The upload is already spooled to a temporary file - read entries from it lazily
+        # on a worker thread so large archives neither fill memory nor block the event loop
+        result = await run_in_threadpool(import_document_zip, db, file.file, folder_name)
         
         return {
             "message": "Documents uploaded successfully",
-            "updated": updated_count,
-            "skipped": skipped_count,
-            "errors": error_count
+            **result
         }
         
     except zipfile.BadZipFile:
         raise HTTPException(status_code=400, detail="Invalid ZIP file")
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error uploading documents: {str(e)}")
 
+@router.get("/documents/{empid}")
+def download_employee_document(
+    empid: str,
+    name: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Download a stored employee document (own documents, or any for Admin/HR)"""
+    if current_user.role not in ["Admin", "HR"] and current_user.empid != empid:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    user = db.query(User).filter(User.empid == empid).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="Employee not found")
+    
+    documents = user.documents if isinstance(user.documents, list) else []
+    document = next((doc for doc in documents if isinstance(doc, dict) and doc.get('name') == name), None)
+    path = get_document_path(document) if document else None
+    if not path:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    return FileResponse(
+        path,
+        media_type=document.get('content_type') or 'application/octet-stream',
+        filename=os.path.basename(path)
+    )
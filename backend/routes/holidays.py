@@ -8,6 +8,9 @@ from routes.auth import get_current_user
 from typing import Optional, List, Dict
 from pydantic import BaseModel
 from utils import is_admin_or_hr
+from utils.working_calendar import (
+    working_calendar, sync_holiday_branches, get_branch_holidays, get_holidays_by_branch
+)
 import json
 
 router = APIRouter()
@@ -52,6 +55,40 @@ def get_holidays(
         for holiday in holidays
     ]
 
+def _parse_date_range(from_date: str, to_date: str):
+    try:
+        start = datetime.fromisoformat(from_date).date()
+        end = datetime.fromisoformat(to_date).date()
+    except:
+        raise HTTPException(status_code=400, detail="Invalid date format")
+    if end < start:
+        raise HTTPException(status_code=400, detail="to_date must be on or after from_date")
+    return start, end
+
+@router.get("/holidays/branch/{branch_id}")
+def get_holidays_for_branch(
+    branch_id: int,
+    from_date: str,
+    to_date: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get a branch's holidays in a date range"""
+    start, end = _parse_date_range(from_date, to_date)
+    return get_branch_holidays(db, branch_id, start, end)
+
+@router.get("/holidays/by-branch")
+def get_holidays_for_all_branches(
+    from_date: str,
+    to_date: str,
+    branch_ids: Optional[List[int]] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get holidays in a date range grouped by branch_id (all branches unless branch_ids given)"""
+    start, end = _parse_date_range(from_date, to_date)
+    return get_holidays_by_branch(db, start, end, branch_ids)
+
 @router.post("/holidays")
 def create_holiday(
     holiday_data: HolidayCreate,
@@ -76,8 +113,10 @@ def create_holiday(
     )
     
     db.add(new_holiday)
+    sync_holiday_branches(db, new_holiday)
     db.commit()
     db.refresh(new_holiday)
+    working_calendar.invalidate_holidays(holiday_date.year)
     
     return {
         "message": "Holiday created successfully",
@@ -104,14 +143,17 @@ def update_holiday(
     except:
         raise HTTPException(status_code=400, detail="Invalid date format")
     
+    previous_year = holiday.date.year
     holiday.name = holiday_data.name
     holiday.date = holiday_date
     holiday.description = holiday_data.description
     if holiday_data.holiday_permissions is not None:
         holiday.holiday_permissions = holiday_data.holiday_permissions
+    sync_holiday_branches(db, holiday)
     
     db.commit()
     db.refresh(holiday)
+    working_calendar.invalidate_holidays(previous_year, holiday_date.year)
     
     return {
         "message": "Holiday updated successfully",
@@ -132,8 +174,10 @@ def delete_holiday(
     if not holiday:
         raise HTTPException(status_code=404, detail="Holiday not found")
     
+    holiday_year = holiday.date.year
     db.delete(holiday)
     db.commit()
+    working_calendar.invalidate_holidays(holiday_year)
     
     return {"message": "Holiday deleted successfully"}
 
@@ -171,8 +215,10 @@ def update_holiday_permissions(
         permissions = [p for p in permissions if p.get('branch_id') != permission_data.branch_id]
     
     holiday.holiday_permissions = permissions
+    sync_holiday_branches(db, holiday)
     db.commit()
     db.refresh(holiday)
+    working_calendar.invalidate_holidays(holiday.date.year)
     
     return {
         "message": "Holiday permissions updated successfully",
@@ -1,11 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, Body, File, UploadFile
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_, extract, String, cast
+from sqlalchemy import func, and_, or_, extract, String, Integer, cast, case, select, exists, literal
+from sqlalchemy import insert as sa_insert
 from datetime import datetime, date, timedelta
 from utils import get_ist_now
 from database import get_db
-from models import Attendance, User, PunchLog, AttendanceList, WeekOffDate, Holiday, Leave, AttendanceCycle, LeaveBalanceList
+from models import Attendance, User, PunchLog, AttendanceList, Leave, AttendanceCycle, LeaveBalanceList, LeaveLedgerEntry, LeaveMonthBalance
+from utils.leave_ledger import apply_leave_change
+from utils.working_calendar import working_calendar
+from utils.tracing import get_logger, log_event, Sampler, PhaseTimer
+from utils.fast_json import fast_json_response
+import logging
 from routes.auth import get_current_user
 from typing import Optional, List
 from pydantic import BaseModel
@@ -13,6 +19,7 @@ from config import settings
 import io
 
 router = APIRouter()
+logger = get_logger("hr")
 
 # Attendance Generation Schema
 class AttendanceGenerateRequest(BaseModel):
@@ -288,6 +295,13 @@ def export_attendance_excel(
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error exporting attendance: {str(e)}")
 
+def attendance_list_empid(employee: User) -> int:
+    """attendance_list.empid is INTEGER: the numeric empid, or the user id when the empid is not numeric"""
+    try:
+        return int(employee.empid) if employee.empid and str(employee.empid).isdigit() else employee.id
+    except (TypeError, ValueError):
+        return employee.id
+
 @router.post("/attendance/generate")
 def generate_attendance(
     request: AttendanceGenerateRequest,
@@ -300,11 +314,14 @@ def generate_attendance(
     
     try:
         from calendar import monthrange
-        import traceback
+        from collections import defaultdict
         
         month = request.month
         year = request.year
         employee_id = request.employee_id
+        timer = PhaseTimer()
+        debug = logger.isEnabledFor(logging.DEBUG)
+        sample = Sampler()
         
         # Get attendance cycle (default to id=1)
         cycle = db.query(AttendanceCycle).filter(AttendanceCycle.id == 1).first()
@@ -333,17 +350,18 @@ def generate_attendance(
         last_date = date(year, month, end_day)
         
         # Get employees to process (only active employees, matching reference code Status = '1')
-        if employee_id:
-            employees = db.query(User).filter(
-                and_(
-                    User.empid == employee_id,
-                    User.is_active == True
-                )
-            ).all()
-            print(f"Found {len(employees)} active employee(s) with empid: {employee_id}")
-        else:
-            employees = db.query(User).filter(User.is_active == True).all()
-            print(f"Processing all {len(employees)} active employees")
+        with timer.phase("load_employees"):
+            if employee_id:
+                employees = db.query(User).filter(
+                    and_(
+                        User.empid == employee_id,
+                        User.is_active == True
+                    )
+                ).all()
+            else:
+                employees = db.query(User).filter(User.is_active == True).all()
+        log_event(logger, logging.INFO, "attendance.generate.start", month=month, year=year,
+                  employee_id=employee_id, employees=len(employees))
         
         if not employees:
             raise HTTPException(status_code=404, detail=f"No employees found for employee_id: {employee_id}")
@@ -358,31 +376,47 @@ def generate_attendance(
         total_days = len(dates_in_cycle)
         month_days = monthrange(year, month)[1]
         
-        # Get all holidays in cycle range (will be filtered per employee by branch_id)
-        all_holiday_records = db.query(Holiday).filter(
-            and_(
-                Holiday.date >= first_date,
-                Holiday.date <= last_date
-            )
-        ).all()
-        
-        all_week_off_dates = set()
-        all_week_off_records = db.query(WeekOffDate).filter(
-            and_(
-                WeekOffDate.date >= first_date,
-                WeekOffDate.date <= last_date
-            )
-        ).all()
-        for wo in all_week_off_records:
-            wo_date = wo.date if isinstance(wo.date, date) else wo.date.date() if hasattr(wo.date, 'date') else wo.date
-            all_week_off_dates.add(wo_date)
+        # Approved leaves, punch times and existing attendance_list rows for all
+        # employees, one query each instead of three per employee
+        with timer.phase("prefetch"):
+            employee_empids = [str(employee.empid) for employee in employees]
+            leaves_by_empid = defaultdict(list)
+            for leave in db.query(Leave).filter(
+                and_(
+                    Leave.empid.in_(employee_empids),
+                    Leave.status == 'approved',  # Only count approved leaves
+                    Leave.from_date <= last_date,
+                    Leave.to_date >= first_date
+                )
+            ):
+                leaves_by_empid[str(leave.empid)].append(leave)
+            
+            punches_by_empid = defaultdict(list)
+            for log in db.query(PunchLog.employee_id, PunchLog.date, PunchLog.punch_time).filter(
+                and_(
+                    PunchLog.employee_id.in_(employee_empids),
+                    PunchLog.date >= first_date,
+                    PunchLog.date <= last_date
+                )
+            ):
+                punches_by_empid[str(log.employee_id)].append(log)
+            
+            existing_by_empid = {}
+            for record in db.query(AttendanceList).filter(
+                and_(
+                    AttendanceList.empid.in_([attendance_list_empid(employee) for employee in employees]),
+                    AttendanceList.month == str(month),
+                    AttendanceList.year == year
+                )
+            ):
+                existing_by_empid.setdefault(record.empid, record)
         
         # Process each employee
         generated_count = 0
         errors = []
         for employee in employees:
             try:
-                print(f"Processing employee: {employee.name} (ID: {employee.empid})")
+                sampled = debug and sample()
                 
                 # Calculate employee-specific date range based on DOJ and emp_inactive_date
                 # Logic:
@@ -412,13 +446,12 @@ def generate_attendance(
                     # emp_inactive_date is null/empty: use full month
                     emp_end_date = last_date
                 
-                print(f"  Employee date range: DOJ={employee.doj}, emp_inactive_date={emp_inactive_date}, "
-                      f"emp_start_date={emp_start_date}, emp_end_date={emp_end_date}")
-                
                 # Calculate employee total days in their active period
                 emp_total_days = (emp_end_date - emp_start_date).days + 1
                 if emp_total_days <= 0:
-                    print(f"  Skipping employee {employee.name}: no days in period")
+                    if sampled:
+                        log_event(logger, logging.DEBUG, "attendance.employee.skipped", empid=employee.empid,
+                                  doj=employee.doj, inactive=emp_inactive_date, reason="no days in period")
                     continue
                 
                 # Count week-offs and holidays within employee's effective period ONLY
@@ -426,149 +459,80 @@ def generate_attendance(
                 # Dates before DOJ should NOT count holidays/week-offs
                 # Dates after emp_inactive_date should NOT count holidays/week-offs
                 # Holidays are filtered by employee's branch_id (same logic as punch.jsx)
-                emp_week_off_count = 0
-                emp_holiday_count = 0
-                
-                # Build employee-specific holiday dates set based on branch_id
-                # Logic: If employee's branch_id matches an entry in holiday's holiday_permissions → Count as holiday
-                # If employee's branch_id is null or empty, default to branch_id = 1
-                emp_holiday_dates = set()
-                # Use employee's branch_id, or default to 1 if null/empty
-                employee_branch_id = employee.branch_id if employee.branch_id else 1
-                
-                for holiday in all_holiday_records:
-                    h_date = holiday.date if isinstance(holiday.date, date) else holiday.date.date() if hasattr(holiday.date, 'date') else holiday.date
-                    # Check if holiday is within employee's effective period
-                    if h_date < emp_start_date or h_date > emp_end_date:
-                        continue
-                    
-                    # If holiday has no permissions, don't count it
-                    if not holiday.holiday_permissions or len(holiday.holiday_permissions) == 0:
-                        continue
-                    
-                    # Check if employee's branch_id (or default 1) exists in the holiday's holiday_permissions array
-                    # Logic: If employee's branch_id matches any branch_id in holiday_permissions → Show holiday
-                    # Example:
-                    #   - Employee branch_id = 1 (or null/empty, defaulted to 1)
-                    #   - holiday_permissions = [{"branch_id": 1, "branch_name": "CORPORATE OFFICE"}, {"branch_id": 2, "branch_name": "MUMBAI"}]
-                    #   - Since branch_id 1 exists in the array → Count as holiday ✓
-                    #   - If holiday_permissions = [{"branch_id": 2, "branch_name": "MUMBAI"}] → Don't count as holiday ✗
-                    if any(perm.get('branch_id') == employee_branch_id for perm in holiday.holiday_permissions):
-                        emp_holiday_dates.add(h_date)
-                
-                for day in [emp_start_date + timedelta(days=x) for x in range(emp_total_days)]:
-                    # Check if it's a week-off (employee-specific or global)
-                    is_week_off = False
-                    week_off_check = db.query(WeekOffDate).filter(
-                        and_(
-                            or_(
-                                WeekOffDate.employee_id == employee.empid,
-                                WeekOffDate.employee_id == "0"
-                            ),
-                            WeekOffDate.date == day
-                        )
-                    ).first()
-                    if week_off_check:
-                        is_week_off = True
-                        emp_week_off_count += 1
-                    
-                    # Check if it's a holiday (filtered by employee's branch_id)
-                    if day in emp_holiday_dates:
-                        emp_holiday_count += 1
-                
-                # Get approved leaves for this employee in cycle range (ONLY APPROVED)
-                leave_records = db.query(Leave).filter(
-                    and_(
-                        Leave.empid == employee.empid,
-                        Leave.status == 'approved',  # Only count approved leaves
-                        Leave.from_date <= emp_end_date,
-                        Leave.to_date >= emp_start_date
-                    )
-                ).all()
-                
-                # Create a set of leave dates to check before processing attendance
-                # Priority: Leave > Attendance (if leave exists on a date, skip attendance processing)
-                leave_dates_set = set()
-                leave_dates_by_type = {}  # {date: leave_type} for quick lookup
-                
-                # Calculate leaves by type (sum of durations)
-                cl = 0.0  # Casual Leave
-                sl = 0.0  # Sick Leave
-                comp_offs = 0.0  # Comp-Off Leave
-                lop_leaves = 0.0  # LOP Leave
-                
-                for leave in leave_records:
-                    # Get all dates in the leave range within employee period
-                    leave_start = max(leave.from_date, emp_start_date)
-                    leave_end = min(leave.to_date, emp_end_date)
+                with timer.phase("calendar"):
+                    emp_week_off_dates = working_calendar.week_off_dates(db, employee.empid, emp_start_date, emp_end_date)
+                    emp_holiday_dates = set(working_calendar.branch_holidays(db, employee.branch_id, emp_start_date, emp_end_date))
+                emp_week_off_count = len(emp_week_off_dates)
+                emp_holiday_count = len(emp_holiday_dates)
+                
+                # Approved leaves for this employee overlapping their period
+                with timer.phase("leaves"):
+                    leave_records = [
+                        leave for leave in leaves_by_empid.get(str(employee.empid), [])
+                        if leave.from_date <= emp_end_date and leave.to_date >= emp_start_date
+                    ]
+                
+                    # Create a set of leave dates to check before processing attendance
+                    # Priority: Leave > Attendance (if leave exists on a date, skip attendance processing)
+                    leave_dates_set = set()
+                    leave_dates_by_type = {}  # {date: leave_type} for quick lookup
+                
+                    # Calculate leaves by type (sum of durations)
+                    cl = 0.0  # Casual Leave
+                    sl = 0.0  # Sick Leave
+                    comp_offs = 0.0  # Comp-Off Leave
+                    lop_leaves = 0.0  # LOP Leave
+                
+                    for leave in leave_records:
+                        # Get all dates in the leave range within employee period
+                        leave_start = max(leave.from_date, emp_start_date)
+                        leave_end = min(leave.to_date, emp_end_date)
                     
-                    # Add all dates in leave range to the set
-                    current_leave_date = leave_start
-                    while current_leave_date <= leave_end:
-                        # Skip if it's a week-off (week-off takes priority over leave)
-                        is_week_off = False
-                        week_off_check = db.query(WeekOffDate).filter(
-                            and_(
-                                or_(
-                                    WeekOffDate.employee_id == employee.empid,
-                                    WeekOffDate.employee_id == "0"
-                                ),
-                                WeekOffDate.date == current_leave_date
-                            )
-                        ).first()
-                        if week_off_check:
-                            is_week_off = True
+                        # Add all dates in leave range to the set
+                        current_leave_date = leave_start
+                        while current_leave_date <= leave_end:
+                            # Skip if it's a week-off (week-off takes priority over leave)
+                            is_week_off = current_leave_date in emp_week_off_dates
                         
-                        # Only add to leave dates if not a week-off or holiday (use employee-specific holiday dates)
-                        if not is_week_off and current_leave_date not in emp_holiday_dates:
-                            leave_dates_set.add(current_leave_date)
-                            leave_dates_by_type[current_leave_date] = leave.leave_type
-                        current_leave_date += timedelta(days=1)
+                            # Only add to leave dates if not a week-off or holiday (use employee-specific holiday dates)
+                            if not is_week_off and current_leave_date not in emp_holiday_dates:
+                                leave_dates_set.add(current_leave_date)
+                                leave_dates_by_type[current_leave_date] = leave.leave_type
+                            current_leave_date += timedelta(days=1)
                     
-                    # Calculate leave duration for counting (excluding week-offs and holidays)
-                    leave_duration = 0
-                    temp_date = leave_start
-                    while temp_date <= leave_end:
-                        is_week_off = False
-                        week_off_check = db.query(WeekOffDate).filter(
-                            and_(
-                                or_(
-                                    WeekOffDate.employee_id == employee.empid,
-                                    WeekOffDate.employee_id == "0"
-                                ),
-                                WeekOffDate.date == temp_date
-                            )
-                        ).first()
-                        if week_off_check:
-                            is_week_off = True
+                        # Calculate leave duration for counting (excluding week-offs and holidays)
+                        leave_duration = 0
+                        temp_date = leave_start
+                        while temp_date <= leave_end:
+                            is_week_off = temp_date in emp_week_off_dates
                         
-                        if not is_week_off and temp_date not in emp_holiday_dates:
-                            leave_duration += 1
-                        temp_date += timedelta(days=1)
+                            if not is_week_off and temp_date not in emp_holiday_dates:
+                                leave_duration += 1
+                            temp_date += timedelta(days=1)
                     
-                    if leave_duration <= 0:
-                        continue
+                        if leave_duration <= 0:
+                            continue
                     
-                    leave_type = leave.leave_type.lower().strip() if leave.leave_type else ''
+                        leave_type = leave.leave_type.lower().strip() if leave.leave_type else ''
                     
-                    # Match leave types (case-insensitive, handle variations)
-                    # Check for exact matches and common variations
-                    if leave_type in ['casual', 'casual leave', 'casualleave']:
-                        cl += leave_duration
-                    elif leave_type in ['sick', 'sick leave', 'sickleave']:
-                        sl += leave_duration
-                    elif leave_type in ['comp-off', 'compensatory', 'compensatory-off', 'comp off', 'compensatory off', 'compensatoryoff', 'compoff']:
-                        comp_offs += leave_duration
-                    elif leave_type in ['lop', 'loss of pay', 'loss-of-pay', 'lop leave', 'lossofpay', 'lopleave']:
-                        lop_leaves += leave_duration
-                    else:
-                        # Debug: Print unmatched leave types
-                        print(f"  Warning: Unmatched leave type '{leave.leave_type}' for employee {employee.name}")
+                        # Match leave types (case-insensitive, handle variations)
+                        # Check for exact matches and common variations
+                        if leave_type in ['casual', 'casual leave', 'casualleave']:
+                            cl += leave_duration
+                        elif leave_type in ['sick', 'sick leave', 'sickleave']:
+                            sl += leave_duration
+                        elif leave_type in ['comp-off', 'compensatory', 'compensatory-off', 'comp off', 'compensatory off', 'compensatoryoff', 'compoff']:
+                            comp_offs += leave_duration
+                        elif leave_type in ['lop', 'loss of pay', 'loss-of-pay', 'lop leave', 'lossofpay', 'lopleave']:
+                            lop_leaves += leave_duration
+                        else:
+                            log_event(logger, logging.WARNING, "attendance.leave_type.unmatched",
+                                      empid=employee.empid, leave_type=leave.leave_type)
                 
-                # Debug: Print leave counts
-                print(f"  Leaves for {employee.name}: CL={cl}, SL={sl}, COMP={comp_offs}, LOP={lop_leaves}, Total Approved Leaves={len(leave_records)}, Leave Dates={len(leave_dates_set)}")
-                if len(leave_records) > 0:
-                    print(f"    Leave details: {[(l.leave_type, l.status, l.from_date, l.to_date, l.duration) for l in leave_records[:5]]}")
+                if sampled:
+                    log_event(logger, logging.DEBUG, "attendance.employee.leaves", empid=employee.empid,
+                              cl=cl, sl=sl, comp_offs=comp_offs, lop=lop_leaves,
+                              approved=len(leave_records), leave_dates=len(leave_dates_set))
                 
                 # Process attendance records
                 presents = 0
@@ -576,291 +540,226 @@ def generate_attendance(
                 late_log_count = 0
                 processed_dates = set()
                 
-                # Get all punch logs for this employee in their period
-                from datetime import datetime as dt_datetime
-                emp_end_datetime = dt_datetime.combine(emp_end_date, dt_datetime.max.time())
-                
-                punch_logs_query = db.query(PunchLog).filter(
-                    and_(
-                        PunchLog.employee_id == str(employee.empid),
-                        PunchLog.date >= emp_start_date,
-                        PunchLog.date <= emp_end_date
-                    )
-                ).all()
-                
-                # Group punch logs by date
-                from collections import defaultdict
-                punches_by_date = defaultdict(list)
-                for log in punch_logs_query:
-                    log_date = log.date if isinstance(log.date, date) else log.date.date() if hasattr(log.date, 'date') else log.date
-                    if emp_start_date <= log_date <= emp_end_date:
-                        punches_by_date[log_date].append(log)
-                
-                # Process each date with punch logs
-                for t_date, logs in punches_by_date.items():
-                    # Priority: Week-off > Holiday > Leave > Attendance
-                    # Skip if week-off or holiday (even if punch logs exist, don't count attendance)
-                    is_week_off = False
-                    week_off_check = db.query(WeekOffDate).filter(
-                        and_(
-                            or_(
-                                WeekOffDate.employee_id == employee.empid,
-                                WeekOffDate.employee_id == "0"
-                            ),
-                            WeekOffDate.date == t_date
-                        )
-                    ).first()
-                    if week_off_check:
-                        is_week_off = True
+                with timer.phase("punches"):
+                    # Group this employee's punch logs by date
+                    punches_by_date = defaultdict(list)
+                    for log in punches_by_empid.get(str(employee.empid), []):
+                        log_date = log.date if isinstance(log.date, date) else log.date.date() if hasattr(log.date, 'date') else log.date
+                        if emp_start_date <= log_date <= emp_end_date:
+                            punches_by_date[log_date].append(log)
+                
+                    # Process each date with punch logs
+                    for t_date, logs in punches_by_date.items():
+                        # Priority: Week-off > Holiday > Leave > Attendance
+                        # Skip if week-off or holiday (even if punch logs exist, don't count attendance)
+                        is_week_off = t_date in emp_week_off_dates
                     
-                    if is_week_off:
-                        # Skip attendance processing - only count as week-off (already counted in emp_week_off_count)
-                        print(f"    Skipping attendance for {t_date} - is week-off (punch logs ignored)")
-                        continue
+                        if is_week_off:
+                            # Skip attendance processing - only count as week-off (already counted in emp_week_off_count)
+                            continue
                     
-                    if t_date in emp_holiday_dates:
-                        # Skip attendance processing - only count as holiday (already counted in emp_holiday_count)
-                        print(f"    Skipping attendance for {t_date} - is holiday (punch logs ignored)")
-                        continue
+                        if t_date in emp_holiday_dates:
+                            # Skip attendance processing - only count as holiday (already counted in emp_holiday_count)
+                            continue
                     
-                    # IMPORTANT: If date has an approved leave, skip attendance processing
-                    # Even if punch logs exist, we should NOT count attendance, only the leave
-                    if t_date in leave_dates_set:
-                        # This date has a leave, skip attendance processing
-                        # The leave is already counted above
-                        print(f"    Skipping attendance for {t_date} - has approved leave ({leave_dates_by_type.get(t_date, 'unknown')})")
-                        continue
+                        # IMPORTANT: If date has an approved leave, skip attendance processing
+                        # Even if punch logs exist, we should NOT count attendance, only the leave
+                        if t_date in leave_dates_set:
+                            # This date has a leave, skip attendance processing
+                            # The leave is already counted above
+                            continue
                     
-                    # Filter valid punch times (not midnight)
-                    from datetime import time as dt_time
-                    midnight = dt_time(0, 0, 0)
-                    valid_logs = [log for log in logs if log.punch_time and log.punch_time.time() != midnight]
+                        # Filter valid punch times (not midnight)
+                        from datetime import time as dt_time
+                        midnight = dt_time(0, 0, 0)
+                        valid_logs = [log for log in logs if log.punch_time and log.punch_time.time() != midnight]
                     
-                    if not valid_logs:
-                        continue
+                        if not valid_logs:
+                            continue
                     
-                    # Calculate in-time and out-time
-                    punch_times = [log.punch_time for log in valid_logs]
-                    min_time = min(punch_times)
-                    max_time = max(punch_times)
+                        # Calculate in-time and out-time
+                        punch_times = [log.punch_time for log in valid_logs]
+                        min_time = min(punch_times)
+                        max_time = max(punch_times)
                     
-                    in_time = min_time.time()
-                    out_time = max_time.time()
+                        in_time = min_time.time()
+                        out_time = max_time.time()
                     
-                    # Calculate duration
-                    duration_seconds = (max_time - min_time).total_seconds()
-                    duration_hours = duration_seconds / 3600
+                        # Calculate duration
+                        duration_seconds = (max_time - min_time).total_seconds()
+                        duration_hours = duration_seconds / 3600
                     
-                    if duration_hours < 0:
-                        continue
+                        if duration_hours < 0:
+                            continue
                     
-                    # Check for late log (previous code - calculate normally)
-                    late_log_time = cycle.late_log_time
-                    is_late = in_time > late_log_time
+                        # Check for late log (previous code - calculate normally)
+                        late_log_time = cycle.late_log_time
+                        is_late = in_time > late_log_time
                     
-                    # Get duration thresholds
-                    full_day_hours = (cycle.full_day_duration.hour * 3600 + cycle.full_day_duration.minute * 60) / 3600
-                    half_day_hours = (cycle.half_day_duration.hour * 3600 + cycle.half_day_duration.minute * 60) / 3600
+                        # Get duration thresholds
+                        full_day_hours = (cycle.full_day_duration.hour * 3600 + cycle.full_day_duration.minute * 60) / 3600
+                        half_day_hours = (cycle.half_day_duration.hour * 3600 + cycle.half_day_duration.minute * 60) / 3600
                     
-                    # Classify attendance
-                    if duration_hours >= full_day_hours:
-                        presents += 1
-                        if is_late:
-                            late_log_count += 1
-                    elif duration_hours >= half_day_hours:
-                        half_day_count += 1
-                        if is_late:
-                            late_log_count += 1
+                        # Classify attendance
+                        if duration_hours >= full_day_hours:
+                            presents += 1
+                            if is_late:
+                                late_log_count += 1
+                        elif duration_hours >= half_day_hours:
+                            half_day_count += 1
+                            if is_late:
+                                late_log_count += 1
                     
-                    processed_dates.add(t_date)
+                        processed_dates.add(t_date)
                 
-                # Calculate uncovered absents (dates not processed, not weekoffs, not holidays, not leaves)
-                potential_absents = 0
-                for day in [emp_start_date + timedelta(days=x) for x in range(emp_total_days)]:
-                    is_week_off = False
-                    week_off_check = db.query(WeekOffDate).filter(
-                        and_(
-                            or_(
-                                WeekOffDate.employee_id == employee.empid,
-                                WeekOffDate.employee_id == "0"
-                            ),
-                            WeekOffDate.date == day
-                        )
-                    ).first()
-                    if week_off_check:
-                        is_week_off = True
+                with timer.phase("compute"):
+                    # Calculate uncovered absents (dates not processed, not weekoffs, not holidays, not leaves)
+                    potential_absents = 0
+                    for day in [emp_start_date + timedelta(days=x) for x in range(emp_total_days)]:
+                        is_week_off = day in emp_week_off_dates
                     
-                    # Skip if: processed (has attendance), week-off, holiday, or has leave
-                    if (day not in processed_dates and 
-                        not is_week_off and 
-                        day not in emp_holiday_dates and
-                        day not in leave_dates_set):  # Exclude leave dates
-                        potential_absents += 1
-                
-                # Calculate total paid leaves (except LOP)
-                total_paid_leaves = cl + sl + comp_offs
-                
-                # Absents = potential_absents - total_paid_leaves (minimum 0)
-                absents = max(0.0, float(potential_absents) - total_paid_leaves)
-                
-                # Calculate half days as decimal
-                half_days = half_day_count * 0.5
-                
-                # Calculate working days
-                working_days = emp_total_days - emp_week_off_count - emp_holiday_count
-                
-                # Check if employee has is_late flag set to True
-                # If is_late is False or None, set late_log_count to 0
-                # Employee is already a User object, so we can access is_late directly
-                employee_is_late_enabled = getattr(employee, 'is_late', False) or False
-                if not employee_is_late_enabled:
-                    late_log_count = 0
-                
-                # Calculate late log deduction (every 3 late logs = 0.5 day)
-                late_log_deduction = (late_log_count // 3) * 0.5
-                
-                # Calculate payable days (before scaling to month)
-                # payableDays = presents + halfDays + totalPaidLeaves + weekOffs + holidays - lateDeduction
-                payable_days = presents + half_days + total_paid_leaves + emp_week_off_count + emp_holiday_count - late_log_deduction
-                
-                # Calculate LOPs
-                lops = float(emp_total_days) - payable_days
-                if lops < 0:
-                    lops = 0.0
-                
-                # Calculate final payable days (scaled to selected month)
-                # Reference: finalPayableDays = (payableDays / empTotalDays) * selectedMonthDays
-                # But user requirement: use full cycle range (total_days) as denominator, not emp_total_days
-                # Example: Employee 1030 with DOJ 2025-12-16, period 2025-11-26 to 2025-12-25
-                #   - emp_total_days = 10 (2025-12-16 to 2025-12-25)
-                #   - total_days = 30 (full cycle: 2025-11-26 to 2025-12-25)
-                #   - finalPayableDays = (payableDays / 30) * 31
-                if total_days > 0:
-                    final_payable_days = (payable_days / total_days) * month_days
-                else:
-                    final_payable_days = 0.0
-                
-                # Special rounding logic for payble_days
-                # Rounding rules:
-                # - 0.1-0.4 → rounds to 0.5 (e.g., 28.1, 28.2, 28.3, 28.4 → 28.5)
-                # - 0.6-0.9 → rounds to 1.0 (e.g., 28.6, 28.7, 28.8, 28.9 → 29.0)
-                # - 0.5 → stays as is (e.g., 28.5 → 28.5)
-                # - Whole numbers → stay as is (e.g., 28.0 → 28.0)
-                def round_payble_days(value):
-                    # Handle edge cases
-                    if value is None:
-                        return 0.0
-                    if value <= 0:
-                        return 0.0
+                        # Skip if: processed (has attendance), week-off, holiday, or has leave
+                        if (day not in processed_dates and 
+                            not is_week_off and 
+                            day not in emp_holiday_dates and
+                            day not in leave_dates_set):  # Exclude leave dates
+                            potential_absents += 1
+                
+                    # Calculate total paid leaves (except LOP)
+                    total_paid_leaves = cl + sl + comp_offs
+                
+                    # Absents = potential_absents - total_paid_leaves (minimum 0)
+                    absents = max(0.0, float(potential_absents) - total_paid_leaves)
+                
+                    # Calculate half days as decimal
+                    half_days = half_day_count * 0.5
+                
+                    # Calculate working days
+                    working_days = emp_total_days - emp_week_off_count - emp_holiday_count
+                
+                    # Check if employee has is_late flag set to True
+                    # If is_late is False or None, set late_log_count to 0
+                    # Employee is already a User object, so we can access is_late directly
+                    employee_is_late_enabled = getattr(employee, 'is_late', False) or False
+                    if not employee_is_late_enabled:
+                        late_log_count = 0
+                
+                    # Calculate late log deduction (every 3 late logs = 0.5 day)
+                    late_log_deduction = (late_log_count // 3) * 0.5
+                
+                    # Calculate payable days (before scaling to month)
+                    # payableDays = presents + halfDays + totalPaidLeaves + weekOffs + holidays - lateDeduction
+                    payable_days = presents + half_days + total_paid_leaves + emp_week_off_count + emp_holiday_count - late_log_deduction
+                
+                    # Calculate LOPs
+                    lops = float(emp_total_days) - payable_days
+                    if lops < 0:
+                        lops = 0.0
+                
+                    # Calculate final payable days (scaled to selected month)
+                    # Reference: finalPayableDays = (payableDays / empTotalDays) * selectedMonthDays
+                    # But user requirement: use full cycle range (total_days) as denominator, not emp_total_days
+                    # Example: Employee 1030 with DOJ 2025-12-16, period 2025-11-26 to 2025-12-25
+                    #   - emp_total_days = 10 (2025-12-16 to 2025-12-25)
+                    #   - total_days = 30 (full cycle: 2025-11-26 to 2025-12-25)
+                    #   - finalPayableDays = (payableDays / 30) * 31
+                    if total_days > 0:
+                        final_payable_days = (payable_days / total_days) * month_days
+                    else:
+                        final_payable_days = 0.0
+                
+                    # Special rounding logic for payble_days
+                    # Rounding rules:
+                    # - 0.1-0.4 → rounds to 0.5 (e.g., 28.1, 28.2, 28.3, 28.4 → 28.5)
+                    # - 0.6-0.9 → rounds to 1.0 (e.g., 28.6, 28.7, 28.8, 28.9 → 29.0)
+                    # - 0.5 → stays as is (e.g., 28.5 → 28.5)
+                    # - Whole numbers → stay as is (e.g., 28.0 → 28.0)
+                    def round_payble_days(value):
+                        # Handle edge cases
+                        if value is None:
+                            return 0.0
+                        if value <= 0:
+                            return 0.0
                     
-                    # Round to 1 decimal place first to handle floating point precision issues
-                    value = round(value, 1)
+                        # Round to 1 decimal place first to handle floating point precision issues
+                        value = round(value, 1)
                     
-                    # Check if it's a whole number
-                    if value == int(value):
-                        return float(int(value))
+                        # Check if it's a whole number
+                        if value == int(value):
+                            return float(int(value))
                     
-                    integer_part = int(value)
-                    # Round to 1 decimal to avoid floating point precision issues
-                    decimal_part = round(value - integer_part, 1)
+                        integer_part = int(value)
+                        # Round to 1 decimal to avoid floating point precision issues
+                        decimal_part = round(value - integer_part, 1)
                     
-                    # Apply rounding rules
-                    if 0.1 <= decimal_part <= 0.4:
-                        return float(integer_part) + 0.5
-                    elif 0.6 <= decimal_part <= 0.9:
-                        return float(integer_part) + 1.0
-                    elif decimal_part == 0.5:
-                        return value
+                        # Apply rounding rules
+                        if 0.1 <= decimal_part <= 0.4:
+                            return float(integer_part) + 0.5
+                        elif 0.6 <= decimal_part <= 0.9:
+                            return float(integer_part) + 1.0
+                        elif decimal_part == 0.5:
+                            return value
+                        else:
+                            # For values outside 0.1-0.9 range (shouldn't happen), return as is
+                            return value
+                
+                    final_payable_days = round_payble_days(final_payable_days)
+                
+                    if sampled:
+                        log_event(logger, logging.DEBUG, "attendance.employee.calculated", empid=employee.empid,
+                                  emp_total_days=emp_total_days, presents=presents, absents=absents,
+                                  half_days=half_days, week_offs=emp_week_off_count, holidays=emp_holiday_count,
+                                  late_logs=late_log_count, late_deduction=late_log_deduction,
+                                  payable_days=payable_days, final_payable_days=final_payable_days, lops=lops)
+                
+                with timer.phase("upsert"):
+                    # If a record exists for this employee, month and year, update it; otherwise insert one
+                    empid_value = attendance_list_empid(employee)
+                    existing = existing_by_empid.get(empid_value)
+                
+                    attendance_data = {
+                        'name': employee.name.upper() if employee.name else employee.name,  # Uppercase name like reference
+                        'empid': empid_value,
+                        'doj': employee.doj if employee.doj else emp_start_date,  # Use DOJ or fallback to start date
+                        'from_date': emp_start_date,  # Employee-specific start date
+                        'to_date': emp_end_date,  # Employee-specific end date
+                        'total_days': float(month_days),  # Selected month days (not emp_total_days)
+                        'working_days': float(working_days),
+                        'week_offs': emp_week_off_count,
+                        'holi_days': float(emp_holiday_count),
+                        'presents': float(presents),
+                        'absents': float(absents),
+                        'half_days': float(half_days),  # Already in decimal (half_day_count * 0.5)
+                        'late_logs': late_log_count,
+                        'cl': float(cl),
+                        'sl': float(sl),
+                        'comp_offs': float(comp_offs),
+                        'payble_days': final_payable_days,  # Already rounded with special logic
+                        'lops': round(lops, 1),
+                        'year': year,
+                        'month': str(month),
+                        'status': 1,  # Status = 1 (active) like reference code
+                        'updated_by': current_user.name or current_user.empid,
+                        'updated_date': get_ist_now()
+                    }
+                
+                    if existing:
+                        # Update existing record - update all fields (matching reference code)
+                        for key, value in attendance_data.items():
+                            setattr(existing, key, value)
+                        # Note: image_base64 is fetched from users table when querying, not stored here
                     else:
-                        # For values outside 0.1-0.9 range (shouldn't happen), return as is
-                        return value
-                
-                final_payable_days = round_payble_days(final_payable_days)
-                
-                # Debug: Print calculated values
-                print(f"  Calculated for {employee.name}: emp_total_days={emp_total_days}, presents={presents}, "
-                      f"absents={absents}, half_days={half_days}, week_offs={emp_week_off_count}, "
-                      f"holidays={emp_holiday_count}, cl={cl}, sl={sl}, comp_offs={comp_offs}, "
-                      f"late_logs={late_log_count}, late_deduction={late_log_deduction}, "
-                      f"payable_days={payable_days}, final_payable_days={final_payable_days}, lops={lops}")
-                
-                # Check if record already exists for this employee, month, year
-                # empid column is INTEGER - convert employee.empid (string) to integer if numeric
-                # Otherwise use employee.id as fallback
-                try:
-                    empid_value = int(employee.empid) if employee.empid and str(employee.empid).isdigit() else employee.id
-                except:
-                    empid_value = employee.id
-                
-                # Check if record exists based on empid, month, and year
-                # If record exists, update it; otherwise, insert new record
-                existing = db.query(AttendanceList).filter(
-                    and_(
-                        AttendanceList.empid == empid_value,
-                        AttendanceList.month == str(month),
-                        AttendanceList.year == year
-                    )
-                ).first()
-                
-                attendance_data = {
-                    'name': employee.name.upper() if employee.name else employee.name,  # Uppercase name like reference
-                    'empid': empid_value,
-                    'doj': employee.doj if employee.doj else emp_start_date,  # Use DOJ or fallback to start date
-                    'from_date': emp_start_date,  # Employee-specific start date
-                    'to_date': emp_end_date,  # Employee-specific end date
-                    'total_days': float(month_days),  # Selected month days (not emp_total_days)
-                    'working_days': float(working_days),
-                    'week_offs': emp_week_off_count,
-                    'holi_days': float(emp_holiday_count),
-                    'presents': float(presents),
-                    'absents': float(absents),
-                    'half_days': float(half_days),  # Already in decimal (half_day_count * 0.5)
-                    'late_logs': late_log_count,
-                    'cl': float(cl),
-                    'sl': float(sl),
-                    'comp_offs': float(comp_offs),
-                    'payble_days': final_payable_days,  # Already rounded with special logic
-                    'lops': round(lops, 1),
-                    'year': year,
-                    'month': str(month),
-                    'status': 1,  # Status = 1 (active) like reference code
-                    'updated_by': current_user.name or current_user.empid,
-                    'updated_date': get_ist_now()
-                }
-                
-                if existing:
-                    # Update existing record - update all fields (matching reference code)
-                    for key, value in attendance_data.items():
-                        setattr(existing, key, value)
-                    # Note: image_base64 is fetched from users table when querying, not stored here
-                    print(f"  ✓ Updated attendance for employee {employee.empid} ({employee.name}) - Month: {month}, Year: {year}")
-                else:
-                    # Create new record
-                    # Try with string empid first, if column is still INTEGER, use integer ID
-                    try:
-                        new_record = AttendanceList(**attendance_data)
-                        db.add(new_record)
-                        db.flush()  # Flush to get the ID and check for errors
-                        print(f"  ✓ Created attendance record for employee {employee.empid} ({employee.name}) - ID: {new_record.id}, Month: {month}, Year: {year}")
-                    except Exception as create_error:
-                        print(f"  ✗ Failed to create record for {employee.empid}: {create_error}")
-                        import traceback
-                        traceback.print_exc()
-                        raise  # Re-raise to be caught by outer exception handler
+                        # New records are inserted in batches by the commit below
+                        db.add(AttendanceList(**attendance_data))
                 
                 generated_count += 1
-                print(f"  Successfully processed {employee.name}. Total generated so far: {generated_count}")
             except Exception as e:
                 error_msg = f"Error processing employee {employee.empid} ({employee.name if employee else 'Unknown'}): {str(e)}"
-                print(error_msg)
-                traceback.print_exc()
+                log_event(logger, logging.ERROR, "attendance.employee.failed", exc_info=True, empid=employee.empid, error=str(e))
                 errors.append(error_msg)
                 # Don't continue silently - log the error but still try to commit others
                 continue
         
-        if errors:
-            print(f"Errors encountered: {errors}")
-        
         if generated_count == 0:
             db.rollback()
             error_details = f"No attendance records were generated. "
@@ -873,8 +772,10 @@ def generate_attendance(
                 detail=error_details
             )
         
-        db.commit()
-        print(f"Successfully committed {generated_count} attendance record(s)")
+        with timer.phase("commit"):
+            db.commit()
+        timer.log_summary(logger, "attendance.generate.done", month=month, year=year,
+                          generated=generated_count, errors=len(errors))
         
         return {
             "message": f"Attendance generated successfully for {generated_count} employee(s)",
@@ -884,16 +785,15 @@ def generate_attendance(
             "cycle_dates": {
                 "from_date": first_date.isoformat(),
                 "to_date": last_date.isoformat()
-            }
+            },
+            "timings": timer.summary()
         }
     
     except HTTPException:
         raise
     except Exception as e:
         db.rollback()
-        print(f"Error generating attendance: {e}")
-        import traceback
-        traceback.print_exc()
+        log_event(logger, logging.ERROR, "attendance.generate.failed", exc_info=True, error=str(e))
         raise HTTPException(status_code=500, detail=f"Failed to generate attendance: {str(e)}")
 
 @router.get("/attendance/history")
@@ -1128,21 +1028,7 @@ def get_attendance_history_month(
             
             current_date += timedelta(days=1)
     
-    # Fetch week_off_dates, holidays, and leaves for the month
-    week_off_dates = db.query(WeekOffDate).filter(
-        and_(
-            WeekOffDate.date >= first_date,
-            WeekOffDate.date <= last_date
-        )
-    ).all()
-    
-    holidays = db.query(Holiday).filter(
-        and_(
-            Holiday.date >= first_date,
-            Holiday.date <= last_date
-        )
-    ).all()
-    
+    # Fetch leaves for the month (week-offs and holidays come from the shared calendar)
     leaves = db.query(Leave).filter(
         and_(
             Leave.from_date <= last_date,
@@ -1151,46 +1037,16 @@ def get_attendance_history_month(
         )
     ).all()
     
-    # Build lookup maps for faster access
-    week_off_map = {}  # {date: [employee_ids]} where employee_id "0" means all
-    for wod in week_off_dates:
-        date_key = wod.date.isoformat()
-        if date_key not in week_off_map:
-            week_off_map[date_key] = []
-        week_off_map[date_key].append(wod.employee_id)
-    
-    # Build employee-specific holiday map based on branch_id matching
-    # Logic: If employee's branch_id (or default 1 if null) matches holiday's holiday_permissions → It's a holiday
-    holiday_map = {}  # {empid: {date_key: True}} - per employee holiday dates
+    # Build per-employee week-off and holiday date sets (holidays filtered by branch_id)
+    week_off_map = {}  # {empid: {date_key}} - includes "All" (employee_id "0") week-offs
+    holiday_map = {}  # {empid: {date_key}} - per employee holiday dates
     for emp in employees:
-        # Normalize employee branch_id to int (holiday_permissions may store as int or string)
-        raw_emp_branch_id = emp.branch_id if emp.branch_id else 1  # Default to 1 if null/empty
-        try:
-            emp_branch_id = int(raw_emp_branch_id)
-        except (ValueError, TypeError):
-            emp_branch_id = 1
-        
-        emp_holiday_dates = set()
-        for holiday in holidays:
-            # If holiday has no permissions, skip it
-            if not holiday.holiday_permissions or len(holiday.holiday_permissions) == 0:
-                continue
-            # Check if employee's branch_id exists in the holiday's holiday_permissions array
-            # Normalize permission branch_id to int for reliable comparison
-            match = False
-            for perm in holiday.holiday_permissions:
-                if perm and perm.get('branch_id') is not None:
-                    try:
-                        perm_branch_id = int(perm.get('branch_id'))
-                        if perm_branch_id == emp_branch_id:
-                            match = True
-                            break
-                    except (ValueError, TypeError):
-                        continue
-            if match:
-                date_key = holiday.date.isoformat()
-                emp_holiday_dates.add(date_key)
-        holiday_map[emp.empid] = emp_holiday_dates
+        week_off_map[emp.empid] = {
+            d.isoformat() for d in working_calendar.week_off_dates(db, emp.empid, first_date, last_date)
+        }
+        holiday_map[emp.empid] = {
+            d.isoformat() for d in working_calendar.branch_holidays(db, emp.branch_id, first_date, last_date)
+        }
     
     leave_map = {}  # {empid: [(from_date, to_date, leave_type)]}
     for leave in leaves:
@@ -1249,12 +1105,9 @@ def get_attendance_history_month(
             
             # 2. Check week_off_dates (second priority)
             if not special_status_found:
-                if date_key in week_off_map:
-                    # Check if this employee is affected (employee_id "0" means all, or specific empid)
-                    week_off_employee_ids = week_off_map[date_key]
-                    if "0" in week_off_employee_ids or str(emp.empid).strip() in [str(eid).strip() for eid in week_off_employee_ids]:
-                        final_status = "WO"
-                        special_status_found = True
+                if date_key in week_off_map.get(emp.empid, set()):
+                    final_status = "WO"
+                    special_status_found = True
             
             # 3. Check holidays (third priority) - filtered by employee's branch_id
             if not special_status_found:
@@ -1442,21 +1295,7 @@ def get_attendance_history_month_self(
         
         current_date += timedelta(days=1)
     
-    # Fetch week_off_dates, holidays, and leaves for the month
-    week_off_dates = db.query(WeekOffDate).filter(
-        and_(
-            WeekOffDate.date >= first_date,
-            WeekOffDate.date <= last_date
-        )
-    ).all()
-    
-    holidays = db.query(Holiday).filter(
-        and_(
-            Holiday.date >= first_date,
-            Holiday.date <= last_date
-        )
-    ).all()
-    
+    # Fetch leaves for the month (week-offs and holidays come from the shared calendar)
     leaves = db.query(Leave).filter(
         and_(
             Leave.empid == current_user.empid,
@@ -1466,26 +1305,13 @@ def get_attendance_history_month_self(
         )
     ).all()
     
-    # Build lookup maps for faster access
-    week_off_map = {}  # {date: [employee_ids]} where employee_id "0" means all
-    for wod in week_off_dates:
-        date_key = wod.date.isoformat()
-        if date_key not in week_off_map:
-            week_off_map[date_key] = []
-        week_off_map[date_key].append(wod.employee_id)
-    
-    # Build employee-specific holiday map based on branch_id matching
-    # Logic: If employee's branch_id (or default 1 if null) matches holiday's holiday_permissions → It's a holiday
-    emp_branch_id = current_user.branch_id if current_user.branch_id else 1  # Default to 1 if null/empty
-    holiday_dates = set()
-    for holiday in holidays:
-        # If holiday has no permissions, skip it
-        if not holiday.holiday_permissions or len(holiday.holiday_permissions) == 0:
-            continue
-        # Check if employee's branch_id exists in the holiday's holiday_permissions array
-        if any(perm.get('branch_id') == emp_branch_id for perm in holiday.holiday_permissions):
-            date_key = holiday.date.isoformat()
-            holiday_dates.add(date_key)
+    # Week-off dates (including "All") and branch holidays for the employee
+    week_off_dates = {
+        d.isoformat() for d in working_calendar.week_off_dates(db, current_user.empid, first_date, last_date)
+    }
+    holiday_dates = {
+        d.isoformat() for d in working_calendar.branch_holidays(db, current_user.branch_id, first_date, last_date)
+    }
     
     leave_map = []  # [(from_date, to_date, leave_type)]
     for leave in leaves:
@@ -1529,12 +1355,9 @@ def get_attendance_history_month_self(
         
         # 2. Check week_off_dates (second priority)
         if not special_status_found:
-            if date_key in week_off_map:
-                # Check if this employee is affected (employee_id "0" means all, or specific empid)
-                week_off_employee_ids = week_off_map[date_key]
-                if "0" in week_off_employee_ids or str(emp.empid).strip() in [str(eid).strip() for eid in week_off_employee_ids]:
-                    final_status = "WO"
-                    special_status_found = True
+            if date_key in week_off_dates:
+                final_status = "WO"
+                special_status_found = True
         
         # 3. Check holidays (third priority)
         if not special_status_found:
@@ -1595,30 +1418,14 @@ def get_attendance_history_month_self(
         "year": year
     }
 
-@router.get("/attendance/today")
-def get_today_attendance(
-    date: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Get today's attendance for current user"""
-    if not date:
-        date_str = datetime.now().date().isoformat()
-    else:
-        date_str = date
-    
+def parse_attendance_day(date_str: Optional[str]):
+    """Requested attendance day (today if missing or unparseable)"""
     try:
-        target_date = datetime.fromisoformat(date_str).date()
-    except:
-        target_date = datetime.now().date()
-    
-    attendance = db.query(Attendance).filter(
-        and_(
-            Attendance.employee_id == current_user.empid,
-            Attendance.date == target_date
-        )
-    ).first()
-    
+        return datetime.fromisoformat(date_str).date() if date_str else datetime.now().date()
+    except ValueError:
+        return datetime.now().date()
+
+def today_attendance_response(attendance: Optional[Attendance]) -> Optional[dict]:
     if not attendance:
         return None
     
@@ -1638,6 +1445,24 @@ def get_today_attendance(
         "remarks": attendance.remarks
     }
 
+@router.get("/attendance/today")
+def get_today_attendance(
+    date: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get today's attendance for current user"""
+    target_date = parse_attendance_day(date)
+    
+    attendance = db.query(Attendance).filter(
+        and_(
+            Attendance.employee_id == current_user.empid,
+            Attendance.date == target_date
+        )
+    ).first()
+    
+    return today_attendance_response(attendance)
+
 @router.get("/attendance/punch-history")
 def get_punch_history(
     db: Session = Depends(get_db),
@@ -1892,67 +1717,17 @@ def get_punch_calendar(
         )
     ).order_by(PunchLog.date, PunchLog.punch_time).all()
     
-    # Get week off dates (for current user or all employees)
-    wo_dates = {}
-    try:
-        week_off_dates = db.query(WeekOffDate).filter(
-            and_(
-                or_(
-                    WeekOffDate.employee_id == current_user.empid,
-                    WeekOffDate.employee_id == "0"
-                ),
-                WeekOffDate.date >= start_date,
-                WeekOffDate.date < end_date
-            )
-        ).all()
-        for wo in week_off_dates:
-            date_str = wo.date.isoformat()
-            wo_dates[date_str] = "Week-Off"
-    except Exception as e:
-        # If table doesn't exist, continue without week offs
-        print(f"Error fetching week off dates: {e}")
-        wo_dates = {}
-    
-    # Get holidays for the month - filter by branch_id for Employee/Manager
-    holidays = {}
-    try:
-        holiday_query = db.query(Holiday).filter(
-            and_(
-                Holiday.date >= start_date,
-                Holiday.date < end_date
-            )
-        )
-        
-        # For ALL roles (including Admin/HR): filter by branch_id for punch calendar
-        # This ensures users only see holidays relevant to their branch on the punch page
-        # If user's branch_id is null or empty, default to branch_id = 1
-        user_branch_id = current_user.branch_id if current_user.branch_id else 1
-        
-        # Filter holidays where user's branch_id (or default 1) matches an entry in holiday_permissions
-        # Example: user.branch_id = 1 (or null/empty, defaulted to 1), holiday_permissions = [{"branch_id": 1, ...}] → Show holiday
-        # Example: user.branch_id = 1 (or null/empty, defaulted to 1), holiday_permissions = [{"branch_id": 2, ...}] → Don't show holiday
-        holiday_records = []
-        all_holidays = holiday_query.all()
-        for holiday in all_holidays:
-            # If holiday has no permissions, don't show it
-            if not holiday.holiday_permissions or len(holiday.holiday_permissions) == 0:
-                continue
-            # Check if user's branch_id (or default 1) exists in the holiday's holiday_permissions array
-            # Logic: If logged user's branch_id matches any branch_id in holiday_permissions → Show holiday
-            # Example:
-            #   - User branch_id = 1 (or null/empty, defaulted to 1)
-            #   - holiday_permissions = [{"branch_id": 1, "branch_name": "CORPORATE OFFICE"}, {"branch_id": 2, "branch_name": "MUMBAI"}]
-            #   - Since branch_id 1 exists in the array → Show holiday ✓
-            #   - If holiday_permissions = [{"branch_id": 2, "branch_name": "MUMBAI"}] → Don't show holiday ✗
-            if any(perm.get('branch_id') == user_branch_id for perm in holiday.holiday_permissions):
-                holiday_records.append(holiday)
-        
-        for holiday in holiday_records:
-            date_str = holiday.date.isoformat()
-            holidays[date_str] = holiday.name
-    except Exception as e:
-        print(f"Error fetching holidays: {e}")
-        holidays = {}
+    # Week-off dates (current user or all employees) and branch holidays from the shared calendar
+    # Holidays are shown for the user's branch_id (default 1) for ALL roles on the punch page
+    month_last_date = end_date - timedelta(days=1)
+    wo_dates = {
+        d.isoformat(): "Week-Off"
+        for d in working_calendar.week_off_dates(db, current_user.empid, start_date, month_last_date)
+    }
+    holidays = {
+        d.isoformat(): name
+        for d, name in working_calendar.branch_holidays(db, current_user.branch_id, start_date, month_last_date).items()
+    }
     
     # Get leaves for current user (approved leaves only)
     leave_dates = {}
@@ -2531,6 +2306,7 @@ def generate_leave_balance(
         raise HTTPException(status_code=403, detail="Access denied")
     
     try:
+        timer = PhaseTimer()
         # Default to current year if not provided
         if not year:
             year = date.today().year
@@ -2538,110 +2314,108 @@ def generate_leave_balance(
         # Get current month
         current_month = date.today().month
         
-        # Get all employees from users table
-        employees = db.query(User).all()
+        # Calculate leave balances based on current month
+        # total_casual_leaves = 12, total_sick_leaves = 12
+        total_casual_leaves = 12.0
+        total_sick_leaves = 12.0
         
-        if not employees:
-            raise HTTPException(status_code=404, detail="No employees found")
+        # balance_casual_leaves = (12 - current_month + 1)
+        balance_casual_leaves = float(12 - current_month + 1)
+        balance_sick_leaves = float(12 - current_month + 1)
         
-        generated_count = 0
-        errors = []
+        # used_casual_leaves = total_casual_leaves - balance_casual_leaves
+        used_casual_leaves = total_casual_leaves - balance_casual_leaves
+        used_sick_leaves = total_sick_leaves - balance_sick_leaves
         
-        for employee in employees:
-            try:
-                # Convert empid to integer if it's numeric, otherwise use employee.id
-                try:
-                    empid_value = int(employee.empid) if employee.empid and str(employee.empid).isdigit() else employee.id
-                except:
-                    empid_value = employee.id
-                
-                # Calculate leave balances based on current month
-                # total_casual_leaves = 12, total_sick_leaves = 12
-                total_casual_leaves = 12.0
-                total_sick_leaves = 12.0
-                
-                # balance_casual_leaves = (12 - current_month + 1)
-                balance_casual_leaves = float(12 - current_month + 1)
-                balance_sick_leaves = float(12 - current_month + 1)
-                
-                # used_casual_leaves = total_casual_leaves - balance_casual_leaves
-                used_casual_leaves = total_casual_leaves - balance_casual_leaves
-                used_sick_leaves = total_sick_leaves - balance_sick_leaves
-                
-                # total_comp_off_leaves = 0
-                total_comp_off_leaves = 0.0
-                used_comp_off_leaves = 0.0
-                balance_comp_off_leaves = 0.0
-                
-                # Check if record already exists for this employee and year
-                existing = db.query(LeaveBalanceList).filter(
-                    and_(
-                        LeaveBalanceList.empid == empid_value,
-                        LeaveBalanceList.year == year
-                    )
-                ).first()
-                
-                # Skip if record already exists
-                if existing:
-                    print(f"  ⊘ Skipped employee {empid_value} ({employee.name}) - Year: {year} (already exists)")
-                    continue
-                
-                # Create new record only if it doesn't exist
-                leave_balance_data = {
-                    'empid': empid_value,
-                    'name': employee.name,
-                    'total_casual_leaves': total_casual_leaves,
-                    'used_casual_leaves': used_casual_leaves,
-                    'balance_casual_leaves': balance_casual_leaves,
-                    'total_sick_leaves': total_sick_leaves,
-                    'used_sick_leaves': used_sick_leaves,
-                    'balance_sick_leaves': balance_sick_leaves,
-                    'total_comp_off_leaves': total_comp_off_leaves,
-                    'used_comp_off_leaves': used_comp_off_leaves,
-                    'balance_comp_off_leaves': balance_comp_off_leaves,
-                    'year': year,
-                    'updated_by': current_user.name or current_user.empid,
-                    'updated_date': get_ist_now()
-                }
-                
-                new_record = LeaveBalanceList(**leave_balance_data)
-                db.add(new_record)
-                print(f"  ✓ Created leave balance for employee {empid_value} ({employee.name}) - Year: {year}")
-                generated_count += 1
-            except Exception as e:
-                error_msg = f"Error processing employee {employee.empid} ({employee.name if employee else 'Unknown'}): {str(e)}"
-                print(error_msg)
-                import traceback
-                traceback.print_exc()
-                errors.append(error_msg)
-                continue
+        if not db.query(User.id).first():
+            raise HTTPException(status_code=404, detail="No employees found")
         
-        if errors:
-            print(f"Errors encountered: {errors}")
+        # Numeric empids are stored as integers, otherwise the user id is used
+        empid_value = case(
+            (User.empid.op('~')('^[0-9]+$'), cast(User.empid, Integer)),
+            else_=User.id
+        )
+        # One INSERT ... SELECT for every employee without a record for this year
+        employees_without_record = select(
+            empid_value,
+            User.name,
+            literal(total_casual_leaves),
+            literal(used_casual_leaves),
+            literal(balance_casual_leaves),
+            literal(total_sick_leaves),
+            literal(used_sick_leaves),
+            literal(balance_sick_leaves),
+            literal(0.0),
+            literal(0.0),
+            literal(0.0),
+            literal(year),
+            literal(current_user.name or current_user.empid),
+            literal(get_ist_now())
+        ).where(
+            ~exists().where(
+                LeaveBalanceList.empid == empid_value,
+                LeaveBalanceList.year == year
+            )
+        )
+        with timer.phase("insert_balances"):
+            inserted = db.execute(
+                sa_insert(LeaveBalanceList).from_select(
+                    [
+                        'empid', 'name',
+                        'total_casual_leaves', 'used_casual_leaves', 'balance_casual_leaves',
+                        'total_sick_leaves', 'used_sick_leaves', 'balance_sick_leaves',
+                        'total_comp_off_leaves', 'used_comp_off_leaves', 'balance_comp_off_leaves',
+                        'year', 'updated_by', 'updated_date'
+                    ],
+                    employees_without_record
+                ).returning(LeaveBalanceList.empid)
+            ).all()
+        generated_count = len(inserted)
         
         if generated_count == 0:
             db.rollback()
-            error_details = f"No leave balance records were generated. "
-            if errors:
-                error_details += f"Errors encountered: {', '.join(errors[:3])}"
-            raise HTTPException(status_code=400, detail=error_details)
+            raise HTTPException(status_code=400, detail="No leave balance records were generated. All employees already have a record for this year.")
         
-        db.commit()
-        print(f"Successfully committed {generated_count} leave balance record(s)")
+        with timer.phase("ledger"):
+            # Ledger entries are keyed by User.empid (as Leave.empid is), not the balance list key
+            empids_by_key = dict(db.query(empid_value, User.empid).all())
+            # Opening allocations in the leave ledger, also as one bulk insert
+            db.execute(sa_insert(LeaveLedgerEntry), [
+                {
+                    "empid": str(empids_by_key[key]),
+                    "leave_type": leave_type,
+                    "year": year,
+                    "month": current_month,
+                    "entry_type": "opening",
+                    "days": balance,
+                    "note": "Yearly leave balance generation",
+                    "created_by": current_user.name or current_user.empid,
+                    "created_at": get_ist_now()
+                }
+                for (key,) in inserted
+                if empids_by_key.get(key)
+                for leave_type, balance in (("casual", balance_casual_leaves), ("sick", balance_sick_leaves))
+            ])
+        # Month snapshots are rebuilt from the new allocations on next read
+        with timer.phase("snapshots"):
+            db.query(LeaveMonthBalance).filter(LeaveMonthBalance.year == year).delete(synchronize_session=False)
+        
+        with timer.phase("commit"):
+            db.commit()
+        timer.log_summary(logger, "leave_balance.generate.done", year=year, generated=generated_count)
         
         return {
             "message": f"Leave balance generated successfully for {generated_count} employee(s)",
             "generated_count": generated_count,
-            "year": year
+            "year": year,
+            "timings": timer.summary()
         }
     
     except HTTPException:
         raise
     except Exception as e:
         db.rollback()
-        print(f"Error generating leave balance: {e}")
-        import traceback
-        traceback.print_exc()
+        log_event(logger, logging.ERROR, "leave_balance.generate.failed", exc_info=True, error=str(e))
         raise HTTPException(status_code=500, detail=f"Failed to generate leave balance: {str(e)}")
 
 class AttendanceExcelUploadRequest(BaseModel):
@@ -2921,7 +2695,10 @@ def get_punch_logs(
 ):
     """Get punch logs for attendance history"""
     try:
-        query = db.query(PunchLog)
+        query = db.query(
+            PunchLog.id, PunchLog.employee_id, PunchLog.employee_name, PunchLog.date,
+            PunchLog.punch_time, PunchLog.punch_type, PunchLog.image, PunchLog.location, PunchLog.remarks
+        )
         
         if employee_id:
             query = query.filter(PunchLog.employee_id == employee_id)
@@ -2944,7 +2721,7 @@ def get_punch_logs(
         
         punch_logs = query.order_by(PunchLog.date, PunchLog.punch_time).all()
         
-        return [
+        return fast_json_response([
             {
                 "id": log.id,
                 "employee_id": log.employee_id,
@@ -2957,7 +2734,7 @@ def get_punch_logs(
                 "remarks": log.remarks
             }
             for log in punch_logs
-        ]
+        ])
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch punch logs: {str(e)}")
 
@@ -3126,6 +2903,8 @@ def create_hr_self_leave(
     )
     
     db.add(new_leave)
+    db.flush()
+    apply_leave_change(db, new_leave, None, new_leave.status, actor=current_user.empid)
     db.commit()
     db.refresh(new_leave)
     
@@ -3176,6 +2955,8 @@ def create_hr_leave(
     )
     
     db.add(new_leave)
+    db.flush()
+    apply_leave_change(db, new_leave, None, new_leave.status, actor=current_user.empid)
     db.commit()
     db.refresh(new_leave)
     
@@ -3213,10 +2994,12 @@ def update_hr_leave_status(
     if status not in ["approved", "rejected"]:
         raise HTTPException(status_code=400, detail="Invalid status")
     
+    previous_status = leave.status
     leave.status = status
     leave.approved_by = current_user.empid
     leave.approved_date = get_ist_now()
     
+    apply_leave_change(db, leave, previous_status, leave.status, actor=current_user.empid)
     db.commit()
     db.refresh(leave)
     
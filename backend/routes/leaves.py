@@ -1,14 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, extract
+from sqlalchemy import and_, or_
 from datetime import datetime, date, timedelta
 from utils import get_ist_now
 from database import get_db
-from models import Leave, User, LeaveBalanceList, WeekOffDate, Holiday
+from models import Leave, User
 from routes.auth import get_current_user
 from typing import Optional
 from pydantic import BaseModel
 from utils.email_service import send_leave_email_to_manager
+from utils.working_calendar import working_calendar
+from utils.leave_ledger import (
+    normalize_leave_type, get_balance_list_row, get_month_balances,
+    available_this_month, application_balance, apply_leave_change
+)
 
 router = APIRouter()
 
@@ -41,51 +46,9 @@ def validate_leave_dates(
     except:
         raise HTTPException(status_code=400, detail="Invalid date format")
     
-    # Get week-off dates for this employee (including "All" employee_id="0")
-    week_off_records = db.query(WeekOffDate).filter(
-        and_(
-            or_(
-                WeekOffDate.employee_id == current_user.empid,
-                WeekOffDate.employee_id == "0"
-            ),
-            WeekOffDate.date >= from_date_obj,
-            WeekOffDate.date <= to_date_obj
-        )
-    ).all()
-    week_off_dates = {wo.date for wo in week_off_records}
-    
-    # Get holidays in the date range - filter by user's branch_id matching holiday_permissions
-    holiday_records = db.query(Holiday).filter(
-        and_(
-            Holiday.date >= from_date_obj,
-            Holiday.date <= to_date_obj
-        )
-    ).all()
-    
-    # Filter holidays by user's branch_id (default to 1 if null/empty)
-    user_branch_id = current_user.branch_id if current_user.branch_id else 1
-    holiday_dates = set()
-    
-    for holiday in holiday_records:
-        # If holiday has no permissions, skip it
-        if not holiday.holiday_permissions or len(holiday.holiday_permissions) == 0:
-            continue
-        
-        # Check if user's branch_id exists in the holiday's holiday_permissions array
-        # Normalize branch_id to int for comparison
-        match = False
-        for perm in holiday.holiday_permissions:
-            if perm and perm.get('branch_id') is not None:
-                try:
-                    perm_branch_id = int(perm.get('branch_id'))
-                    if perm_branch_id == user_branch_id:
-                        match = True
-                        break
-                except (ValueError, TypeError):
-                    continue
-        
-        if match:
-            holiday_dates.add(holiday.date)
+    # Week-offs (employee-specific and "All") and branch holidays from the shared calendar
+    week_off_dates = working_calendar.week_off_dates(db, current_user.empid, from_date_obj, to_date_obj)
+    holiday_dates = set(working_calendar.branch_holidays(db, current_user.branch_id, from_date_obj, to_date_obj))
     
     # Check for holidays and week-offs - only check from_date and to_date (not middle dates)
     invalid_dates = []
@@ -234,51 +197,9 @@ def create_leave(
     except:
         raise HTTPException(status_code=400, detail="Invalid date format")
     
-    # Get week-off dates and holidays
-    week_off_records = db.query(WeekOffDate).filter(
-        and_(
-            or_(
-                WeekOffDate.employee_id == current_user.empid,
-                WeekOffDate.employee_id == "0"
-            ),
-            WeekOffDate.date >= from_date,
-            WeekOffDate.date <= to_date
-        )
-    ).all()
-    week_off_dates = {wo.date for wo in week_off_records}
-    
-    # Get holidays in the date range - filter by user's branch_id matching holiday_permissions
-    holiday_records = db.query(Holiday).filter(
-        and_(
-            Holiday.date >= from_date,
-            Holiday.date <= to_date
-        )
-    ).all()
-    
-    # Filter holidays by user's branch_id (default to 1 if null/empty)
-    user_branch_id = current_user.branch_id if current_user.branch_id else 1
-    holiday_dates = set()
-    
-    for holiday in holiday_records:
-        # If holiday has no permissions, skip it
-        if not holiday.holiday_permissions or len(holiday.holiday_permissions) == 0:
-            continue
-        
-        # Check if user's branch_id exists in the holiday's holiday_permissions array
-        # Normalize branch_id to int for comparison
-        match = False
-        for perm in holiday.holiday_permissions:
-            if perm and perm.get('branch_id') is not None:
-                try:
-                    perm_branch_id = int(perm.get('branch_id'))
-                    if perm_branch_id == user_branch_id:
-                        match = True
-                        break
-                except (ValueError, TypeError):
-                    continue
-        
-        if match:
-            holiday_dates.add(holiday.date)
+    # Week-offs (employee-specific and "All") and branch holidays from the shared calendar
+    week_off_dates = working_calendar.week_off_dates(db, current_user.empid, from_date, to_date)
+    holiday_dates = set(working_calendar.branch_holidays(db, current_user.branch_id, from_date, to_date))
     
     # Check if from_date or to_date are week-offs or holidays (not middle dates)
     invalid_dates = []
@@ -303,12 +224,7 @@ def create_leave(
         )
     
     # Calculate actual working days (excluding week-offs and holidays)
-    current_date = from_date
-    actual_days = 0
-    while current_date <= to_date:
-        if current_date not in week_off_dates and current_date not in holiday_dates:
-            actual_days += 1
-        current_date += timedelta(days=1)
+    actual_days = working_calendar.working_days(db, current_user.empid, current_user.branch_id, from_date, to_date)
     
     # Check for existing leave applications on overlapping dates (excluding rejected)
     # You cannot have multiple leaves (even different types) on the same date
@@ -345,113 +261,21 @@ def create_leave(
             )
     
     # Check if all available balance is already pending (for casual and sick leaves)
-    if leave_data.leave_type in ['casual', 'Casual', 'CASUAL', 'sick', 'Sick', 'SICK']:
-        # Get leave balance to check available balance
-        current_year = date.today().year
-        current_month = date.today().month
-        
-        try:
-            empid_value = int(current_user.empid) if current_user.empid and str(current_user.empid).isdigit() else current_user.id
-        except:
-            empid_value = current_user.id
-        
-        leave_balance = db.query(LeaveBalanceList).filter(
-            LeaveBalanceList.empid == empid_value,
-            LeaveBalanceList.year == current_year
-        ).first()
+    ledger_type = normalize_leave_type(leave_data.leave_type)
+    if ledger_type in ('casual', 'sick'):
+        today = date.today()
+        leave_balance = get_balance_list_row(db, current_user, today.year)
         
         if leave_balance:
-            if leave_data.leave_type in ['casual', 'Casual', 'CASUAL']:
-                # Calculate available casual leave (same logic as balance endpoint)
-                total_casual_per_year = float(leave_balance.total_casual_leaves) if leave_balance.total_casual_leaves else 12
-                casual_per_month = total_casual_per_year / 12.0
-                casual_this_month = casual_per_month
-                
-                # Add unused from previous months
-                all_casual_leaves = db.query(Leave).filter(
-                    Leave.empid == current_user.empid,
-                    Leave.status == 'approved',
-                    extract('year', Leave.from_date) == current_year,
-                    Leave.leave_type.in_(['casual', 'Casual', 'CASUAL'])
-                ).all()
-                
-                for month in range(1, current_month):
-                    month_leaves = [leave for leave in all_casual_leaves 
-                                  if leave.from_date.month == month]
-                    used_in_month = sum((leave.to_date - leave.from_date).days + 1 for leave in month_leaves)
-                    unused_from_month = max(0, casual_per_month - used_in_month)
-                    casual_this_month += unused_from_month
-                
-                # Subtract used in current month
-                current_month_casual_leaves = [leave for leave in all_casual_leaves 
-                                             if leave.from_date.month == current_month]
-                used_in_current_month = sum((leave.to_date - leave.from_date).days + 1 for leave in current_month_casual_leaves)
-                
-                # Get pending casual leaves
-                pending_casual_leaves = db.query(Leave).filter(
-                    Leave.empid == current_user.empid,
-                    Leave.status == 'pending',
-                    extract('year', Leave.from_date) == current_year,
-                    extract('month', Leave.from_date) == current_month,
-                    Leave.leave_type.in_(['casual', 'Casual', 'CASUAL'])
-                ).all()
-                
-                pending_casual_days = sum((leave.to_date - leave.from_date).days + 1 for leave in pending_casual_leaves)
-                
-                available_casual = max(0, casual_this_month - used_in_current_month - pending_casual_days)
-                
-                if actual_days > available_casual:
-                    max_available = casual_this_month - used_in_current_month
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Leave Application Alert: You have already applied for {pending_casual_days} day(s) of casual leave, which is your maximum available balance ({max_available} days). Please wait until the pending leave request is approved or rejected before applying for additional leave."
-                    )
-            
-            elif leave_data.leave_type in ['sick', 'Sick', 'SICK']:
-                # Calculate available sick leave (same logic as casual - monthly credit, carry forward)
-                total_sick_per_year = float(leave_balance.total_sick_leaves) if leave_balance.total_sick_leaves else 12
-                sick_per_month = total_sick_per_year / 12.0
-                sick_this_month = sick_per_month
-                
-                # Add unused from previous months
-                all_sick_leaves = db.query(Leave).filter(
-                    Leave.empid == current_user.empid,
-                    Leave.status == 'approved',
-                    extract('year', Leave.from_date) == current_year,
-                    Leave.leave_type.in_(['sick', 'Sick', 'SICK'])
-                ).all()
-                
-                for month in range(1, current_month):
-                    month_leaves = [leave for leave in all_sick_leaves 
-                                  if leave.from_date.month == month]
-                    used_in_month = sum((leave.to_date - leave.from_date).days + 1 for leave in month_leaves)
-                    unused_from_month = max(0, sick_per_month - used_in_month)
-                    sick_this_month += unused_from_month
-                
-                # Subtract used in current month
-                current_month_sick_leaves = [leave for leave in all_sick_leaves 
-                                             if leave.from_date.month == current_month]
-                used_in_current_month = sum((leave.to_date - leave.from_date).days + 1 for leave in current_month_sick_leaves)
-                
-                # Get pending sick leaves
-                pending_sick_leaves = db.query(Leave).filter(
-                    Leave.empid == current_user.empid,
-                    Leave.status == 'pending',
-                    extract('year', Leave.from_date) == current_year,
-                    extract('month', Leave.from_date) == current_month,
-                    Leave.leave_type.in_(['sick', 'Sick', 'SICK'])
-                ).all()
-                
-                pending_sick_days = sum((leave.to_date - leave.from_date).days + 1 for leave in pending_sick_leaves)
-                
-                available_sick = max(0, sick_this_month - used_in_current_month - pending_sick_days)
-                
-                if actual_days > available_sick:
-                    max_available = sick_this_month - used_in_current_month
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Leave Application Alert: You have already applied for {pending_sick_days} day(s) of sick leave, which is your maximum available balance ({max_available} days). Please wait until the pending leave request is approved or rejected before applying for additional leave."
-                    )
+            # From the leave ledger snapshots: this month's credit plus unused credit of earlier
+            # months (casual and sick alike), less used and pending days
+            balance = application_balance(db, current_user.empid, today.year, today.month, ledger_type)
+            if balance and actual_days > balance[0]:
+                _, max_available, pending_days = balance
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Leave Application Alert: You have already applied for {pending_days:g} day(s) of {ledger_type} leave, which is your maximum available balance ({max_available:g} days). Please wait until the pending leave request is approved or rejected before applying for additional leave."
+                )
     
     # Use calculated duration
     duration = leave_data.duration if leave_data.duration else actual_days
@@ -478,6 +302,8 @@ def create_leave(
     )
     
     db.add(new_leave)
+    db.flush()
+    apply_leave_change(db, new_leave, None, 'pending', actor=current_user.empid)
     db.commit()
     db.refresh(new_leave)
     
@@ -625,10 +451,13 @@ def update_leave_status(
     if status_data.status not in ["approved", "rejected"]:
         raise HTTPException(status_code=400, detail="Invalid status")
     
+    previous_status = leave.status
     leave.status = status_data.status
     leave.approved_by = current_user.empid
     leave.approved_date = get_ist_now()
     
+    # Consumption/reversal recorded in the leave ledger in the same transaction
+    apply_leave_change(db, leave, previous_status, leave.status, actor=current_user.empid)
     db.commit()
     db.refresh(leave)
     
@@ -659,6 +488,7 @@ def delete_leave(
             detail=f"Cannot delete {leave.status} leave. Only pending leaves can be deleted."
         )
     
+    apply_leave_change(db, leave, leave.status, None, actor=current_user.empid)
     db.delete(leave)
     db.commit()
     
@@ -672,164 +502,32 @@ def get_leave_balance(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get leave balance for current user from leave_balance_list table and calculate this month availability"""
+    """Get leave balance for current user from leave_balance_list table and this month's ledger snapshot"""
     # Get current year and month
     current_year = date.today().year
     current_month = date.today().month
     
-    # Convert empid to integer if it's numeric, otherwise use user.id
-    try:
-        empid_value = int(current_user.empid) if current_user.empid and str(current_user.empid).isdigit() else current_user.id
-    except:
-        empid_value = current_user.id
-    
     # Get leave balance from leave_balance_list table
-    leave_balance = db.query(LeaveBalanceList).filter(
-        LeaveBalanceList.empid == empid_value,
-        LeaveBalanceList.year == current_year
-    ).first()
+    leave_balance = get_balance_list_row(db, current_user, current_year)
     
-    # Calculate this month's availability
-    # Casual and Comp-Off can be forwarded (unused leaves from previous months carry forward)
-    # Sick cannot be forwarded (only current month's balance)
+    # This month's availability comes from the leave ledger snapshot:
+    # Casual carries unused monthly credit forward, Sick does not (collapses at month end),
+    # Comp-Off uses the running balance in leave_balance_list
     
     if leave_balance:
-        # Get total casual leaves per year
-        total_casual_per_year = float(leave_balance.total_casual_leaves) if leave_balance.total_casual_leaves else 12
-        # Calculate leaves per month (e.g., 12 per year / 12 months = 1 per month)
-        casual_per_month = total_casual_per_year / 12.0
-        
-        # Calculate casual leaves available for current month
-        # Logic: New leave for current month (1) + unused leaves from all previous months in the year
-        # If leaves were already taken in a month, they don't carry forward
-        # Final available = (new leave + unused from previous) - used in current month
-        
-        # Get all approved casual leaves for the current year
-        all_casual_leaves = db.query(Leave).filter(
-            Leave.empid == current_user.empid,
-            Leave.status == 'approved',
-            extract('year', Leave.from_date) == current_year,
-            Leave.leave_type.in_(['casual', 'Casual', 'CASUAL'])
-        ).all()
-        
-        # Start with current month's new leave
-        casual_this_month = casual_per_month
-        
-        # Calculate unused casual leaves from previous months (Jan to current_month - 1)
-        # Casual Leave: 12 days/year, credited 1 day/month, carried forward monthly if not used
-        for month in range(1, current_month):  # Previous months only (Jan to current_month - 1)
-            # Get casual leaves used in this month (approved only)
-            month_leaves = [leave for leave in all_casual_leaves 
-                          if leave.from_date.month == month]
-            
-            # Calculate total days used in this month
-            used_in_month = 0
-            for leave in month_leaves:
-                # Calculate actual days (handle half days if needed)
-                days = (leave.to_date - leave.from_date).days + 1
-                used_in_month += days
-            
-            # Unused leaves from this month = casual_per_month - used_in_month
-            # Only add if unused > 0 (if leaves were taken, they don't carry forward)
-            unused_from_month = max(0, casual_per_month - used_in_month)
-            casual_this_month += unused_from_month
-        
-        # Subtract used leaves in current month (approved only)
-        current_month_casual_leaves = [leave for leave in all_casual_leaves 
-                                     if leave.from_date.month == current_month]
-        used_in_current_month = 0
-        for leave in current_month_casual_leaves:
-            days = (leave.to_date - leave.from_date).days + 1
-            used_in_current_month += days
-        
-        # Get pending casual leaves for current month (to subtract from available)
-        pending_casual_leaves = db.query(Leave).filter(
-            Leave.empid == current_user.empid,
-            Leave.status == 'pending',
-            extract('year', Leave.from_date) == current_year,
-            extract('month', Leave.from_date) == current_month,
-            Leave.leave_type.in_(['casual', 'Casual', 'CASUAL'])
-        ).all()
-        
-        pending_casual_days = 0
-        for leave in pending_casual_leaves:
-            days = (leave.to_date - leave.from_date).days + 1
-            pending_casual_days += days
-        
-        # Final available = (new leave + unused from previous) - used in current month - pending in current month
-        casual_this_month = max(0, casual_this_month - used_in_current_month - pending_casual_days)
+        month_balances = get_month_balances(db, current_user.empid, current_year, current_month)
+        casual = month_balances.get("casual")
+        sick = month_balances.get("sick")
+        comp_off = month_balances.get("comp_off")
         
-        # Comp-Off: use balance (can be forwarded from previous months)
+        casual_this_month = available_this_month(casual)
+        sick_this_month = available_this_month(sick)
         comp_off_this_month = float(leave_balance.balance_comp_off_leaves) if leave_balance.balance_comp_off_leaves else 0
         
-        # Sick Leave: 12 days/year, credited 1 day/month, DOES NOT carry forward (collapses at month end)
-        # Get total sick leaves per year
-        total_sick_per_year = float(leave_balance.total_sick_leaves) if leave_balance.total_sick_leaves else 12
-        # Calculate leaves per month (e.g., 12 per year / 12 months = 1 per month)
-        sick_per_month = total_sick_per_year / 12.0
-        
-        # Get all approved sick leaves for the current year
-        all_sick_leaves = db.query(Leave).filter(
-            Leave.empid == current_user.empid,
-            Leave.status == 'approved',
-            extract('year', Leave.from_date) == current_year,
-            Leave.leave_type.in_(['sick', 'Sick', 'SICK'])
-        ).all()
-        
-        # Start with current month's new leave ONLY (no carry forward from previous months)
-        sick_this_month = sick_per_month
-        
-        # Subtract used leaves in current month (approved only)
-        current_month_sick_leaves = [leave for leave in all_sick_leaves 
-                                     if leave.from_date.month == current_month]
-        used_in_current_month = 0
-        for leave in current_month_sick_leaves:
-            days = (leave.to_date - leave.from_date).days + 1
-            used_in_current_month += days
-        
-        # Get pending sick leaves for current month (to subtract from available)
-        pending_sick_leaves = db.query(Leave).filter(
-            Leave.empid == current_user.empid,
-            Leave.status == 'pending',
-            extract('year', Leave.from_date) == current_year,
-            extract('month', Leave.from_date) == current_month,
-            Leave.leave_type.in_(['sick', 'Sick', 'SICK'])
-        ).all()
-        
-        pending_sick_days = 0
-        for leave in pending_sick_leaves:
-            days = (leave.to_date - leave.from_date).days + 1
-            pending_sick_days += days
-        
-        # Final available = current month's new leave - used in current month - pending in current month
-        # Note: Sick leave does NOT carry forward from previous months (collapses at month end)
-        sick_this_month = max(0, sick_this_month - used_in_current_month - pending_sick_days)
-        
-        # Calculate actual used leaves for the current year (based on approved leaves)
-        # Used Casual Leaves
-        used_casual_count = 0
-        for leave in all_casual_leaves:
-            days = (leave.to_date - leave.from_date).days + 1
-            used_casual_count += days
-        
-        # Used Sick Leaves
-        used_sick_count = 0
-        for leave in all_sick_leaves:
-            days = (leave.to_date - leave.from_date).days + 1
-            used_sick_count += days
-        
-        # Used Comp-Off Leaves
-        all_comp_off_leaves = db.query(Leave).filter(
-            Leave.empid == current_user.empid,
-            Leave.status == 'approved',
-            extract('year', Leave.from_date) == current_year,
-            Leave.leave_type.in_(['comp-off', 'comp_off', 'compensatory', 'Comp-Off', 'COMP-OFF'])
-        ).all()
-        
-        used_comp_off_count = 0
-        for leave in all_comp_off_leaves:
-            days = (leave.to_date - leave.from_date).days + 1
-            used_comp_off_count += days
+        # Approved leaves taken in the current year
+        used_casual_count = float(casual.year_used) if casual else 0
+        used_sick_count = float(sick.year_used) if sick else 0
+        used_comp_off_count = float(comp_off.year_used) if comp_off else 0
         
         # Calculate balance (Total - Used)
         total_casual = float(leave_balance.total_casual_leaves) if leave_balance.total_casual_leaves else 12
@@ -839,6 +537,8 @@ def get_leave_balance(
         balance_casual = max(0, total_casual - used_casual_count)
         balance_sick = max(0, total_sick - used_sick_count)
         balance_comp_off = max(0, total_comp_off - used_comp_off_count)
+        # Keep any snapshots built by this read
+        db.commit()
     else:
         casual_this_month = 0
         sick_this_month = 0
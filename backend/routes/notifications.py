@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 from database import get_db
-from models import NotificationLog, User
+from models import NotificationLog, User, WhatsAppMessage
 from routes.auth import get_current_user
 from datetime import datetime
 
@@ -24,6 +24,45 @@ def get_notifications(
     
     return notifications
 
+@router.get("/whatsapp")
+def get_whatsapp_messages(
+    status: str = None,
+    context: str = None,
+    limit: int = 50,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """WhatsApp delivery status per message (Admin/HR only)"""
+    if current_user.role not in ["Admin", "HR"]:
+        raise HTTPException(status_code=403, detail="Only Admin and HR can view WhatsApp delivery status")
+    
+    query = db.query(WhatsAppMessage)
+    if status:
+        query = query.filter(WhatsAppMessage.status == status)
+    if context:
+        query = query.filter(WhatsAppMessage.context == context)
+    
+    messages = query.order_by(WhatsAppMessage.created_at.desc()).limit(limit).all()
+    
+    return [
+        {
+            "id": m.id,
+            "provider": m.provider,
+            "context": m.context,
+            "user_id": m.user_id,
+            "destination": m.destination,
+            "status": m.status,
+            "attempts": m.attempts,
+            "max_attempts": m.max_attempts,
+            "next_attempt_at": m.next_attempt_at.isoformat() if m.next_attempt_at else None,
+            "last_status_code": m.last_status_code,
+            "last_error": m.last_error,
+            "sent_at": m.sent_at.isoformat() if m.sent_at else None,
+            "created_at": m.created_at.isoformat() if m.created_at else None
+        }
+        for m in messages
+    ]
+
 @router.get("/unread-count")
 def get_unread_count(
     db: Session = Depends(get_db),
@@ -6,8 +6,12 @@ from datetime import datetime
 from utils import get_ist_now, get_ist_date
 from decimal import Decimal
 from database import get_db
-from models import PayrollStructure, Payroll, User, SalaryStructure, PayslipData
+from models import PayrollStructure, Payroll, User, SalaryStructure, PayslipData, PayslipEmailBatch
 from routes.auth import get_current_user
+from utils.payslip_renderer import get_payslip_pdf, render_payslips, iter_payslip_zip, payslip_snapshot, payslip_filename
+from utils.email_service import build_payslip_email, SMTPSession
+from utils.payslip_email_dispatcher import create_payslip_email_batch, get_batch_progress
+from utils.fast_json import fast_json_response
 from typing import Optional, Dict, Any
 from pydantic import BaseModel
 import io
@@ -925,6 +929,18 @@ def toggle_payslip_freeze(
         "updated_count": len(payslips)
     }
 
+# Columns read by GET /payslip/list
+PAYSLIP_LIST_COLUMNS = [
+    PayslipData.payslip_id, PayslipData.full_name, PayslipData.emp_id, PayslipData.doj,
+    PayslipData.month, PayslipData.year, PayslipData.salary_per_month, PayslipData.salary_per_day,
+    PayslipData.earned_gross, PayslipData.net_salary, PayslipData.earnings, PayslipData.deductions,
+    PayslipData.present, PayslipData.absent, PayslipData.half_days, PayslipData.holidays,
+    PayslipData.wo, PayslipData.leaves, PayslipData.payable_days, PayslipData.arrear_salary,
+    PayslipData.loan_amount, PayslipData.other_deduction, PayslipData.designation,
+    PayslipData.company_name, PayslipData.branch_name, PayslipData.department_name,
+    PayslipData.pf_no, PayslipData.esi_no, PayslipData.freaze_status
+]
+
 @router.get("/payslip/list")
 def get_payslip_list(
     month: Optional[int] = None,
@@ -974,9 +990,11 @@ def get_payslip_list(
         # Get total count
         total_count = query.count()
         
-        # Apply pagination
+        # Apply pagination (only the listed columns are read)
         offset = (page - 1) * limit
-        payslips = query.order_by(PayslipData.year.desc(), PayslipData.month.desc()).offset(offset).limit(limit).all()
+        payslips = query.with_entities(*PAYSLIP_LIST_COLUMNS).order_by(
+            PayslipData.year.desc(), PayslipData.month.desc()
+        ).offset(offset).limit(limit).all()
         
         # Format response
         result = []
@@ -1029,13 +1047,13 @@ def get_payslip_list(
                 "freaze_status": payslip.freaze_status if payslip.freaze_status is not None else False
             })
         
-        return {
+        return fast_json_response({
             "data": result,
             "total": total_count,
             "page": page,
             "limit": limit,
             "total_pages": (total_count + limit - 1) // limit if limit > 0 else 1
-        }
+        })
     except Exception as e:
         print(f"Error in get_payslip_list: {str(e)}")
         import traceback
@@ -1488,19 +1506,6 @@ def send_payslip_email(
 ):
     """Send payslip via email with PDF attachment"""
     try:
-        import smtplib
-        from email.mime.text import MIMEText
-        from email.mime.multipart import MIMEMultipart
-        from email.mime.base import MIMEBase
-        from email import encoders
-        import io
-        from reportlab.lib.pagesizes import A4
-        from reportlab.lib import colors
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-        from reportlab.lib.units import mm
-        import requests
-        
         # Get payslip data
         payslip = db.query(PayslipData).filter(
             and_(
@@ -1513,289 +1518,18 @@ def send_payslip_email(
         if not payslip:
             raise HTTPException(status_code=404, detail="Payslip not found")
         
-        # Email configuration
-        from_email = "hrms@brihaspathi.com"
-        smtp_server = "smtp.gmail.com"
-        smtp_port = 587
-        smtp_password = "aakbcohigtogpyrl"
-        
-        # Create email message
-        msg = MIMEMultipart('alternative')
-        msg['From'] = from_email
-        msg['To'] = to_email
-        msg['Subject'] = subject
-        
-        # Create HTML email body
-        months = ['', 'January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October', 'November', 'December']
-        month_name = months[month] if month <= 12 else ''
-        
-        html_body = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    line-height: 1.6;
-                    color: #333;
-                    max-width: 600px;
-                    margin: 0 auto;
-                    padding: 20px;
-                    background-color: #f4f4f4;
-                }}
-                .email-container {{
-                    background: white;
-                    border-radius: 10px;
-                    padding: 30px;
-                    box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-                }}
-                .header {{
-                    text-align: center;
-                    padding-bottom: 20px;
-                    border-bottom: 2px solid #007bff;
-                    margin-bottom: 30px;
-                }}
-                .header h1 {{
-                    color: #007bff;
-                    margin: 0;
-                    font-size: 24px;
-                }}
-                .content {{
-                    margin-bottom: 30px;
-                }}
-                .content p {{
-                    margin: 15px 0;
-                    font-size: 16px;
-                }}
-                .payslip-info {{
-                    background: #f8f9fa;
-                    padding: 20px;
-                    border-radius: 8px;
-                    margin: 20px 0;
-                }}
-                .payslip-info p {{
-                    margin: 8px 0;
-                    font-size: 14px;
-                }}
-                .footer {{
-                    text-align: center;
-                    padding-top: 20px;
-                    border-top: 1px solid #ddd;
-                    margin-top: 30px;
-                    color: #666;
-                    font-size: 12px;
-                }}
-                .button {{
-                    display: inline-block;
-                    padding: 12px 30px;
-                    background-color: #007bff;
-                    color: white;
-                    text-decoration: none;
-                    border-radius: 5px;
-                    margin: 20px 0;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="email-container">
-                <div class="header">
-                    <h1>📄 Payslip Notification</h1>
-                </div>
-                <div class="content">
-                    <p>{message.replace(chr(10), '<br>')}</p>
-                    <div class="payslip-info">
-                        <p><strong>Employee Name:</strong> {payslip.full_name or 'N/A'}</p>
-                        <p><strong>Employee ID:</strong> {payslip.emp_id or 'N/A'}</p>
-                        <p><strong>Month:</strong> {month_name} {year}</p>
-                        <p><strong>Net Salary:</strong> ₹{float(payslip.net_salary) if payslip.net_salary else 0:.2f}</p>
-                    </div>
-                    <p>Please find your payslip attached to this email in PDF format.</p>
-                </div>
-                <div class="footer">
-                    <p><strong>Brihaspathi Technologies Limited</strong></p>
-                    <p>This is an automated email. Please do not reply to this email.</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        # Plain text version
-        text_body = f"""
-{message}
-
-Employee Name: {payslip.full_name or 'N/A'}
-Employee ID: {payslip.emp_id or 'N/A'}
-Month: {month_name} {year}
-Net Salary: ₹{float(payslip.net_salary) if payslip.net_salary else 0:.2f}
-
-Please find your payslip attached to this email in PDF format.
-
-Best regards,
-Brihaspathi Technologies Limited
-        """
-        
-        # Attach both versions
-        part1 = MIMEText(text_body, 'plain')
-        part2 = MIMEText(html_body, 'html')
-        msg.attach(part1)
-        msg.attach(part2)
-        
-        # Generate PDF
-        pdf_buffer = io.BytesIO()
-        doc = SimpleDocTemplate(pdf_buffer, pagesize=A4, topMargin=20*mm, bottomMargin=20*mm)
-        elements = []
-        styles = getSampleStyleSheet()
-        
-        # Title
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=18,
-            textColor=colors.HexColor('#007bff'),
-            spaceAfter=20,
-            alignment=1
-        )
-        elements.append(Paragraph(f"PAYSLIP FOR THE MONTH OF {month_name.upper()} {year}", title_style))
-        elements.append(Spacer(1, 20))
-        
-        # Employee Details
-        emp_data = [
-            ['NAME OF THE EMPLOYEE:', payslip.full_name or '-'],
-            ['EMPLOYEE ID:', str(payslip.emp_id) if payslip.emp_id else '-', 'MONTH:', month_name, 'PF NO:', payslip.pf_no or '-'],
-            ['DESIGNATION:', payslip.designation or '-', 'PAID DAYS:', f"{float(payslip.payable_days) if payslip.payable_days else 0:.2f}", 'ESI NO:', payslip.esi_no or '-']
-        ]
+        # Generate PDF (cached per payslip content)
+        snapshot = payslip_snapshot(payslip)
+        pdf_bytes = get_payslip_pdf(payslip)
         
-        emp_table = Table(emp_data, colWidths=[80*mm, 50*mm, 40*mm, 30*mm, 40*mm, 30*mm])
-        emp_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f1f3f5')),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 1, colors.grey)
-        ]))
-        elements.append(emp_table)
-        elements.append(Spacer(1, 15))
-        
-        # Extract earnings and deductions from JSONB
-        earnings_dict = payslip.earnings if isinstance(payslip.earnings, dict) else {}
-        deductions_dict = payslip.deductions if isinstance(payslip.deductions, dict) else {}
-        
-        # Earnings
-        elements.append(Paragraph("EARNINGS", ParagraphStyle('SectionHeader', parent=styles['Heading2'], fontSize=14, textColor=colors.white, backColor=colors.HexColor('#6b7785'), alignment=1)))
-        earnings_data = [
-            ['BASIC', 'HRA', 'CONV', 'ARREARS', 'FIX HRA', 'OTHER ALLOW', 'UNIFORM ALLOW', 'MED ALLOW', 'CCA', 'MOBILE ALLOWANCES'],
-            [
-                f"{float(earnings_dict.get('Basic', 0)):.2f}",
-                f"{float(earnings_dict.get('HRA', 0)):.2f}",
-                f"{float(earnings_dict.get('CA', 0)):.2f}",
-                f"{float(payslip.arrear_salary) if payslip.arrear_salary else 0:.2f}",
-                "0.00",
-                f"{float(earnings_dict.get('SA', 0)):.2f}",
-                "0.00",
-                f"{float(earnings_dict.get('MA', 0)):.2f}",
-                "0.00",
-                "0.00"
-            ]
-        ]
-        earnings_table = Table(earnings_data, colWidths=[20*mm] * 10)
-        earnings_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f1f3f5')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 7),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 1, colors.grey)
-        ]))
-        elements.append(earnings_table)
-        elements.append(Spacer(1, 15))
-        
-        # Deductions
-        elements.append(Paragraph("DEDUCTIONS", ParagraphStyle('SectionHeader', parent=styles['Heading2'], fontSize=14, textColor=colors.white, backColor=colors.HexColor('#6b7785'), alignment=1)))
-        deductions_data = [
-            ['PF', 'ESI', 'PROF TAX', 'LWF', 'IT', 'LIC', 'OTHER', 'BANK LOAN', 'COMP LOAN', 'RENT PAID', 'SALARY ADV'],
-            [
-                f"{float(deductions_dict.get('PF', 0)):.2f}",
-                f"{float(deductions_dict.get('ESI', 0)):.2f}",
-                f"{float(deductions_dict.get('PT', 0)):.2f}",
-                "0.00",
-                f"{float(deductions_dict.get('TDS', 0)):.2f}",
-                "0.00",
-                f"{float(payslip.other_deduction) if payslip.other_deduction else 0:.2f}",
-                "0.00",
-                f"{float(payslip.loan_amount) if payslip.loan_amount else 0:.2f}",
-                "0.00",
-                "0.00"
-            ]
-        ]
-        deductions_table = Table(deductions_data, colWidths=[18*mm] * 11)
-        deductions_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f1f3f5')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 7),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 1, colors.grey)
-        ]))
-        elements.append(deductions_table)
-        elements.append(Spacer(1, 15))
-        
-        # Calculate total deductions
-        total_deductions = (
-            float(deductions_dict.get('PF', 0)) +
-            float(deductions_dict.get('ESI', 0)) +
-            float(deductions_dict.get('PT', 0)) +
-            float(deductions_dict.get('TDS', 0)) +
-            float(payslip.other_deduction if payslip.other_deduction else 0) +
-            float(payslip.loan_amount if payslip.loan_amount else 0)
-        )
-        
-        # Totals
-        total_data = [
-            ['TOTAL EARNINGS (IN INR)', f"{float(payslip.earned_gross) if payslip.earned_gross else 0:.2f}"],
-            ['TOTAL DEDUCTIONS (IN INR)', f"{total_deductions:.2f}"],
-            ['NET PAY (IN INR)', f"{float(payslip.net_salary) if payslip.net_salary else 0:.2f}"]
-        ]
-        total_table = Table(total_data, colWidths=[100*mm, 80*mm])
-        total_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f1f3f5')),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-            ('ALIGN', (1, 0), (1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 1, colors.grey)
-        ]))
-        elements.append(total_table)
-        elements.append(Spacer(1, 10))
-        
-        # Footer
-        elements.append(Paragraph("** system generated print out. no signature required **", ParagraphStyle('Footer', parent=styles['Normal'], fontSize=8, textColor=colors.grey, alignment=1)))
-        
-        doc.build(elements)
-        pdf_buffer.seek(0)
-        
-        # Attach PDF
-        attachment = MIMEBase('application', 'octet-stream')
-        attachment.set_payload(pdf_buffer.read())
-        encoders.encode_base64(attachment)
-        attachment.add_header('Content-Disposition', f'attachment; filename=Payslip_{month_name}_{year}_{payslip.emp_id}.pdf')
-        msg.attach(attachment)
+        msg = build_payslip_email(to_email, subject, message, snapshot, pdf_bytes, payslip_filename(snapshot))
         
         # Send email
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(from_email, smtp_password)
-        server.send_message(msg)
-        server.quit()
+        smtp = SMTPSession()
+        try:
+            smtp.send_message(msg, to_email)
+        finally:
+            smtp.close()
         
         return {
             "success": True,
@@ -1810,3 +1544,155 @@ Brihaspathi Technologies Limited
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error sending email: {str(e)}")
 
+
+@router.get("/payslip/download-zip")
+def download_payslips_zip(
+    month: int,
+    year: int,
+    company_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Download every frozen payslip for a month (optionally one company) as a ZIP of PDFs"""
+    from utils import is_admin_or_hr
+    
+    if not is_admin_or_hr(current_user):
+        raise HTTPException(status_code=403, detail="Only Admin or HR can download payslips in bulk")
+    
+    try:
+        query = db.query(PayslipData).filter(
+            PayslipData.month == month,
+            PayslipData.year == year,
+            PayslipData.freaze_status == True
+        )
+        if company_id is not None:
+            query = query.filter(PayslipData.company_id == company_id)
+        payslips = query.order_by(PayslipData.emp_id).all()
+        
+        if not payslips:
+            raise HTTPException(status_code=404, detail="No frozen payslips found for this month/year")
+        
+        # Render cache misses across the process pool before streaming starts
+        rendered = render_payslips(payslips)
+        
+        filename = f"Payslips_{year}_{month:02d}{f'_{company_id}' if company_id is not None else ''}.zip"
+        return StreamingResponse(
+            iter_payslip_zip(rendered),
+            media_type="application/zip",
+            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error building payslip ZIP: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Error building payslip ZIP: {str(e)}")
+
+@router.post("/payslip/send-bulk-email")
+def send_bulk_payslip_email(
+    month: int = Body(...),
+    year: int = Body(...),
+    subject: str = Body(...),
+    message: str = Body(""),
+    company_id: Optional[int] = Body(None),
+    branch_id: Optional[int] = Body(None),
+    dept_id: Optional[int] = Body(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Email every frozen payslip for a month (optionally filtered) in the background"""
+    from utils import is_admin_or_hr
+    
+    if not is_admin_or_hr(current_user):
+        raise HTTPException(status_code=403, detail="Only Admin or HR can send payslips in bulk")
+    
+    try:
+        batch = create_payslip_email_batch(
+            db, month, year, subject, message,
+            company_id=company_id,
+            branch_id=branch_id,
+            dept_id=dept_id,
+            created_by=current_user.name or current_user.empid
+        )
+        if not batch:
+            raise HTTPException(status_code=404, detail="No frozen payslips found for this month/year")
+        return get_batch_progress(db, batch)
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        print(f"Error starting bulk payslip email: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Error starting bulk payslip email: {str(e)}")
+
+@router.get("/payslip/email-batches")
+def get_payslip_email_batches(
+    limit: int = 20,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Recent bulk payslip email runs with their progress counters"""
+    from utils import is_admin_or_hr
+    
+    if not is_admin_or_hr(current_user):
+        raise HTTPException(status_code=403, detail="Only Admin or HR can view payslip email runs")
+    
+    batches = db.query(PayslipEmailBatch).order_by(PayslipEmailBatch.id.desc()).limit(limit).all()
+    return [
+        {
+            "batch_id": batch.id,
+            "month": batch.month,
+            "year": batch.year,
+            "status": batch.status,
+            "total": batch.total,
+            "sent": batch.sent_count,
+            "failed": batch.failed_count,
+            "skipped": batch.skipped_count,
+            "created_by": batch.created_by,
+            "created_at": batch.created_at.isoformat() if batch.created_at else None
+        }
+        for batch in batches
+    ]
+
+@router.get("/payslip/email-batches/{batch_id}")
+def get_payslip_email_batch(
+    batch_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Live progress and per-employee failures of a bulk payslip email run"""
+    from utils import is_admin_or_hr
+    
+    if not is_admin_or_hr(current_user):
+        raise HTTPException(status_code=403, detail="Only Admin or HR can view payslip email runs")
+    
+    batch = db.query(PayslipEmailBatch).filter(PayslipEmailBatch.id == batch_id).first()
+    if not batch:
+        raise HTTPException(status_code=404, detail="Payslip email batch not found")
+    
+    return get_batch_progress(db, batch)
+
+@router.post("/payslip/email-batches/{batch_id}/cancel")
+def cancel_payslip_email_batch(
+    batch_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Stop a bulk payslip email run after the chunk currently being sent"""
+    from utils import is_admin_or_hr
+    
+    if not is_admin_or_hr(current_user):
+        raise HTTPException(status_code=403, detail="Only Admin or HR can cancel payslip email runs")
+    
+    batch = db.query(PayslipEmailBatch).filter(PayslipEmailBatch.id == batch_id).first()
+    if not batch:
+        raise HTTPException(status_code=404, detail="Payslip email batch not found")
+    if batch.status in ('completed', 'cancelled'):
+        raise HTTPException(status_code=400, detail=f"Batch is already {batch.status}")
+    
+    batch.status = 'cancelled'
+    db.commit()
+    
+    return get_batch_progress(db, batch)
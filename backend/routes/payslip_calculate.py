@@ -13,9 +13,13 @@ from models import (
 from routes.auth import get_current_user
 from typing import Optional
 from pydantic import BaseModel
+from utils.tracing import get_logger, log_event, PhaseTimer
+from collections import defaultdict
 import json
+import logging
 
 router = APIRouter()
+logger = get_logger("payslip")
 
 class PayslipCalculationRequest(BaseModel):
     company_id: Optional[int] = None
@@ -57,10 +61,12 @@ def calculate_salary_for_employee(
     salary_structure: SalaryStructure,
     attendance_list: AttendanceList,
     month: int,
-    year: int
+    year: int,
+    loan_installment_records: Optional[list] = None
 ) -> Optional[PayslipData]:
     """
     Calculate salary for a single employee based on C# logic
+    (loan_installment_records: the employee's LoanInstallment rows when already loaded)
     """
     try:
         # Convert empid to int for group checking
@@ -209,19 +215,18 @@ def calculate_salary_for_employee(
         # Check for loan installments matching the payroll month/year
         loan_installment_deduction = Decimal(0)
         try:
-            print(f"  Checking loan installments for {user.empid}, month={month}, year={year}")
-            
-            # Query loan installments for this employee
-            loan_installment_records = db.query(LoanInstallment).filter(
-                LoanInstallment.empid == user.empid
-            ).all()
+            # Query loan installments for this employee unless the caller loaded them
+            if loan_installment_records is None:
+                loan_installment_records = db.query(LoanInstallment).filter(
+                    LoanInstallment.empid == user.empid
+                ).all()
             
-            print(f"  Found {len(loan_installment_records)} loan installment record(s) for {user.empid}")
+            log_event(logger, logging.DEBUG, "payslip.loans.found", empid=user.empid, month=month, year=year,
+                      records=len(loan_installment_records))
             
             # Process each loan installment record
             for loan_inst_record in loan_installment_records:
                 if not loan_inst_record.installments:
-                    print(f"  No installments found in record loan_id={loan_inst_record.loan_id}")
                     continue
                 
                 # Parse installments JSONB (should be a list)
@@ -230,11 +235,10 @@ def calculate_salary_for_employee(
                     installments_list = json.loads(installments_list)
                 
                 if not isinstance(installments_list, list):
-                    print(f"  Installments is not a list for loan_id={loan_inst_record.loan_id}")
+                    log_event(logger, logging.WARNING, "payslip.loans.invalid_installments", empid=user.empid,
+                              loan_id=loan_inst_record.loan_id)
                     continue
                 
-                print(f"  Processing {len(installments_list)} installments for loan_id={loan_inst_record.loan_id}")
-                
                 # Find installments matching the payroll month/year
                 updated_installments = []
                 installment_updated = False
@@ -249,11 +253,8 @@ def calculate_salary_for_employee(
                     installment_amount = Decimal(str(installment.get('amount', 0)))
                     installment_number = installment.get('installment_number', 'N/A')
                     
-                    print(f"    Installment #{installment_number}: due_date={due_date_str}, status={installment_status}, amount={installment_amount}")
-                    
                     # Skip if already paid (status is "Success")
                     if installment_status == 'SUCCESS':
-                        print(f"    Installment #{installment_number} already paid, skipping")
                         updated_installments.append(installment)
                         continue
                     
@@ -266,13 +267,8 @@ def calculate_salary_for_employee(
                             else:
                                 due_date = datetime.strptime(due_date_str, '%Y-%m-%d').date()
                             
-                            print(f"    Parsed due_date: {due_date} (month={due_date.month}, year={due_date.year})")
-                            print(f"    Comparing with payroll: month={month}, year={year}")
-                            
                             # Match month and year
                             if due_date.month == month and due_date.year == year:
-                                print(f"    ✓ Date matches! Checking net salary: {net_salary} >= {installment_amount}")
-                                
                                 # Check if net salary is sufficient for deduction
                                 if net_salary >= installment_amount:
                                     # Deduct from net salary
@@ -285,19 +281,20 @@ def calculate_salary_for_employee(
                                     installment['paid_date'] = get_ist_now().isoformat()
                                     installment_updated = True
                                     
-                                    print(f"    ✓✓✓ Updated installment #{installment_number}: status=Success, paid_date={installment['paid_date']}")
-                                    print(f"    ✓✓✓ Loan installment deducted: Amount={installment_amount}, Net Salary After={net_salary}")
+                                    log_event(logger, logging.INFO, "payslip.loans.installment_deducted", empid=user.empid,
+                                              loan_id=loan_inst_record.loan_id, installment=installment_number,
+                                              amount=installment_amount, net_salary_after=net_salary)
                                 else:
                                     # Skip deduction if net salary is less than installment amount
-                                    print(f"    ✗ Skipping deduction: Amount={installment_amount} > Net Salary={net_salary}")
-                            else:
-                                print(f"    ✗ Date does not match payroll month/year")
+                                    log_event(logger, logging.INFO, "payslip.loans.installment_skipped", empid=user.empid,
+                                              loan_id=loan_inst_record.loan_id, installment=installment_number,
+                                              amount=installment_amount, net_salary=net_salary)
                         except Exception as e:
-                            print(f"    ✗ Error parsing due_date '{due_date_str}': {str(e)}")
-                            import traceback
-                            traceback.print_exc()
+                            log_event(logger, logging.WARNING, "payslip.loans.invalid_due_date", empid=user.empid,
+                                      loan_id=loan_inst_record.loan_id, due_date=due_date_str, error=str(e))
                     else:
-                        print(f"    ✗ No due_date found for installment #{installment_number}")
+                        log_event(logger, logging.DEBUG, "payslip.loans.missing_due_date", empid=user.empid,
+                                  loan_id=loan_inst_record.loan_id, installment=installment_number)
                     
                     updated_installments.append(installment)
                 
@@ -307,23 +304,12 @@ def calculate_salary_for_employee(
                     # IMPORTANT: Flag the JSONB field as modified so SQLAlchemy detects the change
                     flag_modified(loan_inst_record, 'installments')
                     db.add(loan_inst_record)
-                    
-                    # Count how many installments were marked as Success
-                    success_count = len([i for i in updated_installments if isinstance(i, dict) and i.get('status') == 'Success'])
-                    print(f"  ✓✓✓ Updated loan installments for {user.empid}, loan_id={loan_inst_record.loan_id}")
-                    print(f"  ✓✓✓ {success_count} installment(s) marked as Success with paid_date")
-                else:
-                    print(f"  No installments updated for loan_id={loan_inst_record.loan_id}")
         
         except Exception as e:
-            print(f"  ✗✗✗ Error processing loan installments for {user.empid}: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            log_event(logger, logging.ERROR, "payslip.loans.failed", exc_info=True, empid=user.empid, error=str(e))
         
         # Update loan_amount with total deduction
         loan_amount = loan_installment_deduction
-        if loan_amount > 0:
-            print(f"  Total loan deduction for {user.empid}: {loan_amount}")
         
         # Get bank details from user.bank_details JSONB
         bank_name = None
@@ -440,9 +426,7 @@ def calculate_salary_for_employee(
         return payslip_data
         
     except Exception as e:
-        print(f"Error calculating salary for employee {user.empid}: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log_event(logger, logging.ERROR, "payslip.calculate.failed", exc_info=True, empid=user.empid, error=str(e))
         return None
 
 @router.post("/payslip/generate")
@@ -502,7 +486,9 @@ def generate_payslips(
             # No filters provided - return empty (should not happen with required company field)
             return {"message": "Please select at least a company", "generated": 0, "skipped": 0}
         
-        employees = employee_query.all()
+        timer = PhaseTimer()
+        with timer.phase("load_employees"):
+            employees = employee_query.all()
         
         if not employees:
             return {"message": "No employees found", "generated": 0, "skipped": 0}
@@ -511,54 +497,81 @@ def generate_payslips(
         skipped = 0
         errors = []
         
+        # Salary structures, attendance_list rows, existing payslips and loan installments
+        # for all employees, one query each instead of four per employee
+        with timer.phase("prefetch"):
+            empids = [employee.empid for employee in employees]
+            emp_id_ints = []
+            for empid in empids:
+                try:
+                    emp_id_ints.append(int(empid))
+                except (ValueError, TypeError):
+                    pass
+            
+            salary_structures = {}
+            for structure in db.query(SalaryStructure).filter(SalaryStructure.empid.in_(empids)):
+                salary_structures.setdefault(structure.empid, structure)
+            
+            attendance_lists = {}
+            for record in db.query(AttendanceList).filter(
+                and_(
+                    AttendanceList.empid.in_(emp_id_ints),
+                    AttendanceList.month == str(month),
+                    AttendanceList.year == year
+                )
+            ):
+                attendance_lists.setdefault(record.empid, record)
+            
+            existing_payslips = {}
+            for payslip in db.query(PayslipData).filter(
+                and_(
+                    PayslipData.emp_id.in_(emp_id_ints),
+                    PayslipData.month == month,
+                    PayslipData.year == year
+                )
+            ):
+                existing_payslips.setdefault(payslip.emp_id, payslip)
+            
+            loans_by_empid = defaultdict(list)
+            for loan_record in db.query(LoanInstallment).filter(LoanInstallment.empid.in_(empids)):
+                loans_by_empid[loan_record.empid].append(loan_record)
+        
         for employee in employees:
             try:
-                # Get salary structure
-                salary_structure = db.query(SalaryStructure).filter(
-                    SalaryStructure.empid == employee.empid
-                ).first()
+                with timer.phase("lookup"):
+                    # Get salary structure
+                    salary_structure = salary_structures.get(employee.empid)
                 
-                if not salary_structure or not salary_structure.salary_per_month:
-                    skipped += 1
-                    continue
+                    if not salary_structure or not salary_structure.salary_per_month:
+                        skipped += 1
+                        continue
                 
-                # Get attendance list - cast empid to int for comparison since attendance_list.empid is INTEGER
-                try:
-                    emp_id_int = int(employee.empid) if employee.empid else None
-                    if emp_id_int is None:
+                    # Get attendance list - cast empid to int for comparison since attendance_list.empid is INTEGER
+                    try:
+                        emp_id_int = int(employee.empid) if employee.empid else None
+                        if emp_id_int is None:
+                            skipped += 1
+                            continue
+                    except (ValueError, TypeError):
                         skipped += 1
                         continue
-                except (ValueError, TypeError):
-                    skipped += 1
-                    continue
                 
-                attendance_list = db.query(AttendanceList).filter(
-                    and_(
-                        AttendanceList.empid == emp_id_int,
-                        AttendanceList.month == str(month),
-                        AttendanceList.year == year
-                    )
-                ).first()
+                    attendance_list = attendance_lists.get(emp_id_int)
                 
-                if not attendance_list:
-                    skipped += 1
-                    continue
+                    if not attendance_list:
+                        skipped += 1
+                        continue
                 
-                # Check if payslip already exists (based on emp_id, month, year)
-                # This ensures we update existing records instead of creating duplicates
-                existing_payslip = db.query(PayslipData).filter(
-                    and_(
-                        PayslipData.emp_id == emp_id_int,
-                        PayslipData.month == month,
-                        PayslipData.year == year
-                    )
-                ).first()
+                    # Check if payslip already exists (based on emp_id, month, year)
+                    # This ensures we update existing records instead of creating duplicates
+                    existing_payslip = existing_payslips.get(emp_id_int)
                 
                 # Calculate salary
-                payslip_data = calculate_salary_for_employee(
-                    db, employee, salary_structure, attendance_list,
-                    month, year
-                )
+                with timer.phase("calculate"):
+                    payslip_data = calculate_salary_for_employee(
+                        db, employee, salary_structure, attendance_list,
+                        month, year, loans_by_empid.get(employee.empid, [])
+                    )
                 
                 if payslip_data:
                     # Set emp_id correctly (must be integer)
@@ -623,15 +636,20 @@ def generate_payslips(
                 skipped += 1
                 error_msg = f"Error processing {employee.empid}: {str(e)}"
                 errors.append(error_msg)
-                print(error_msg)
+                log_event(logger, logging.ERROR, "payslip.generate.employee_failed", exc_info=True,
+                          empid=employee.empid, error=str(e))
         
-        db.commit()
+        with timer.phase("commit"):
+            db.commit()
+        timer.log_summary(logger, "payslip.generate.done", month=month, year=year,
+                          generated=generated, skipped=skipped, errors=len(errors))
         
         return {
             "message": f"Payslip generation completed",
             "generated": generated,
             "skipped": skipped,
-            "errors": errors[:10]  # Return first 10 errors
+            "errors": errors[:10],  # Return first 10 errors
+            "timings": timer.summary()
         }
         
     except Exception as e:
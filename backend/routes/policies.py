@@ -8,10 +8,10 @@ from database import get_db
 from models import Policy, User
 from schemas import PolicyCreate, PolicyUpdate, PolicyResponse, MarkAsReadRequest
 from routes.auth import get_current_user
+from utils.fast_json import fast_json_response
 import json
 import os
 from pathlib import Path
-import PyPDF2
 
 router = APIRouter(prefix="/policies", tags=["Policies"])
 
@@ -28,27 +28,21 @@ def get_policies(
     """Get all policies - accessible by all roles"""
     try:
         # Limit to 500 policies for performance
-        policies = db.query(Policy).order_by(Policy.created_at.desc()).limit(500).all()
-        
-        # Normalize likes field - ensure it's always a list
-        for policy in policies:
-            if policy.likes is None:
-                policy.likes = []
-            elif isinstance(policy.likes, dict):
-                # Convert object to empty list if it's an object
-                policy.likes = []
-            elif not isinstance(policy.likes, list):
-                policy.likes = []
-            
-            # Normalize readby field - ensure it's always a list
-            if policy.readby is None:
-                policy.readby = []
-            elif isinstance(policy.readby, dict):
-                policy.readby = []
-            elif not isinstance(policy.readby, list):
-                policy.readby = []
-        
-        return policies
+        policies = db.query(
+            Policy.id, Policy.policy, Policy.readby, Policy.likes, Policy.created_at
+        ).order_by(Policy.created_at.desc()).limit(500).all()
+        
+        # PolicyResponse rows; likes / readby that are not lists (None or an object) become []
+        return fast_json_response([
+            {
+                "id": policy.id,
+                "policy": policy.policy,
+                "readby": policy.readby if isinstance(policy.readby, list) else [],
+                "likes": policy.likes if isinstance(policy.likes, list) else [],
+                "created_at": policy.created_at
+            }
+            for policy in policies
+        ])
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -211,6 +205,7 @@ async def upload_policy(
         # Extract page count from PDF
         page_count = 1
         try:
+            import PyPDF2
             with open(file_path, "rb") as pdf_file:
                 pdf_reader = PyPDF2.PdfReader(pdf_file)
                 page_count = len(pdf_reader.pages)
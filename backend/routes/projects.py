@@ -8,6 +8,8 @@ from models import Project, User, Task, Activity
 from schemas import ProjectCreate, ProjectUpdate, ProjectResponse
 from routes.auth import get_current_user
 from utils import is_admin_or_hr
+from utils.user_lookup import resolve_users_by_empid
+from utils.project_rollups import get_project_rollup, reconcile_project_rollups
 from datetime import datetime
 
 router = APIRouter(prefix="/projects", tags=["Projects"])
@@ -45,13 +47,23 @@ def get_projects(
         projects = query.order_by(Project.created_at.desc()).limit(200).all()
         
         # Enrich teams with latest user images and calculate delayed days
+        # All team members across the listed projects are resolved in one query
+        team_users = resolve_users_by_empid(
+            db,
+            [
+                member.get("empid")
+                for project in projects if project.teams
+                for member in project.teams if isinstance(member, dict)
+            ],
+            User.name, User.role, User.image_base64
+        )
         today = datetime.now().date()
         for project in projects:
             if project.teams:
                 enriched_teams = []
                 for member in project.teams:
                     if isinstance(member, dict) and member.get("empid"):
-                        user = db.query(User).filter(User.empid == member.get("empid")).first()
+                        user = team_users.get(member.get("empid"))
                         if user:
                             enriched_teams.append({
                                 "empid": user.empid,
@@ -98,7 +110,8 @@ def get_project_stats(
     current_user: User = Depends(get_current_user)
 ):
     try:
-        query = db.query(Project)
+        # Count per status in the database instead of loading every project
+        query = db.query(Project.status, func.count(Project.id))
         
         if current_user.role == "Manager":
             query = query.filter(Project.project_head_id == current_user.id)
@@ -110,20 +123,14 @@ def get_project_stats(
                 )
             )
         
-        projects = query.all()
-        
-        total = len(projects)
-        planning = sum(1 for p in projects if p.status == "planning")
-        active = sum(1 for p in projects if p.status == "active")
-        on_hold = sum(1 for p in projects if p.status == "on-hold")
-        completed = sum(1 for p in projects if p.status == "completed")
+        counts = dict(query.group_by(Project.status).all())
         
         return {
-            "total": total,
-            "planning": planning,
-            "active": active,
-            "on_hold": on_hold,
-            "completed": completed
+            "total": sum(counts.values()),
+            "planning": counts.get("planning", 0),
+            "active": counts.get("active", 0),
+            "on_hold": counts.get("on-hold", 0),
+            "completed": counts.get("completed", 0)
         }
     except Exception as e:
         print(f"Error in get_project_stats: {e}")
@@ -131,6 +138,25 @@ def get_project_stats(
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error fetching project stats: {str(e)}")
 
+@router.post("/rollups/reconcile")
+def reconcile_rollups(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Recompute all project task rollups from the tasks table (Admin only)"""
+    if current_user.role != "Admin":
+        raise HTTPException(status_code=403, detail="Only Admin can reconcile project rollups")
+    try:
+        count = reconcile_project_rollups(db)
+        db.commit()
+        return {"message": "Project rollups reconciled", "projects": count}
+    except Exception as e:
+        db.rollback()
+        print(f"Error in reconcile_rollups: {e}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Error reconciling project rollups: {str(e)}")
+
 @router.get("/{project_id}", response_model=ProjectResponse)
 def get_project(
     project_id: int,
@@ -160,8 +186,13 @@ def get_project_details(
     # Get team members details
     team_members = []
     if project.teams:
+        users = resolve_users_by_empid(
+            db,
+            [member.get("empid") for member in project.teams],
+            User.id, User.name, User.email, User.role, User.image_base64
+        )
         for member in project.teams:
-            user = db.query(User).filter(User.empid == member.get("empid")).first()
+            user = users.get(member.get("empid"))
             if user:
                 team_members.append({
                     "id": user.id,
@@ -172,13 +203,15 @@ def get_project_details(
                     "image_base64": user.image_base64
                 })
     
-    # Task stats
+    # Task stats (maintained incrementally in project_task_rollups)
+    rollup = get_project_rollup(db, project_id)
     task_stats = {
-        "total": len(tasks),
-        "todo": sum(1 for t in tasks if t.status == "todo"),
-        "in_progress": sum(1 for t in tasks if t.status == "in-progress"),
-        "completed": sum(1 for t in tasks if t.status == "done"),
-        "blocked": sum(1 for t in tasks if t.status == "blocked")
+        "total": rollup["total_tasks"],
+        "todo": rollup["todo_count"],
+        "in_progress": rollup["in_progress_count"],
+        "completed": rollup["done_count"],
+        "blocked": rollup["blocked_count"],
+        "delayed": rollup["overdue_count"]
     }
     
     return {
@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func, or_, cast
+from sqlalchemy import func, or_, and_, cast, values, column, Integer
 from sqlalchemy.dialects.postgresql import JSONB
 from typing import List
 from database import get_db
-from models import TaskRating, User, Task, Activity, Project
+from models import TaskRating, User, Task, Activity, Project, EmployeeRatingSummary
 from schemas import RatingCreate, RatingResponse
 from routes.auth import get_current_user
+from utils import get_ist_now
+from utils.rating_summaries import rating_snapshot, apply_rating_change, summarize
+from utils.report_engine import invalidate_report_cache
 from datetime import datetime
 
 router = APIRouter(prefix="/ratings", tags=["Ratings"])
@@ -40,35 +43,15 @@ def get_rating_stats(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get overall rating statistics"""
-    query = db.query(TaskRating)
-    
+    """Get overall rating statistics (from the per-employee rating summaries)"""
+    user_ids = None
     if current_user.role == "Employee":
-        query = query.filter(TaskRating.ratee_id == current_user.id)
+        user_ids = [current_user.id]
     elif current_user.role == "Manager":
-        team_ids = [u.id for u in db.query(User).filter(User.report_to_id == current_user.empid).all()]
-        team_ids.append(current_user.id)
-        query = query.filter(TaskRating.ratee_id.in_(team_ids))
-    
-    ratings = query.all()
-    
-    if not ratings:
-        return {
-            "total_ratings": 0,
-            "average_score": 0,
-            "score_distribution": {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0}
-        }
-    
-    total = len(ratings)
-    avg_score = sum(r.score for r in ratings) / total
-    
-    distribution = {str(i): sum(1 for r in ratings if r.score == i) for i in range(1, 6)}
+        user_ids = [user_id for (user_id,) in db.query(User.id).filter(User.report_to_id == current_user.empid).all()]
+        user_ids.append(current_user.id)
     
-    return {
-        "total_ratings": total,
-        "average_score": round(avg_score, 2),
-        "score_distribution": distribution
-    }
+    return summarize(db, user_ids)
 
 @router.get("/by-employee")
 def get_ratings_by_employee(
@@ -79,19 +62,23 @@ def get_ratings_by_employee(
     if current_user.role == "Employee":
         raise HTTPException(status_code=403, detail="Access denied")
     
+    # Employees joined with their rating summary in one query
+    query = db.query(
+        User.id, User.empid, User.name, User.email, User.image_base64,
+        EmployeeRatingSummary.total_ratings, EmployeeRatingSummary.score_sum
+    ).outerjoin(EmployeeRatingSummary, EmployeeRatingSummary.user_id == User.id)
+    
     # Get employees based on role
     if current_user.role == "Manager":
-        employees = db.query(User).filter(User.report_to_id == current_user.empid, User.is_active == True).all()
+        query = query.filter(User.report_to_id == current_user.empid, User.is_active == True)
     else:
-        employees = db.query(User).filter(User.role == "Employee", User.is_active == True).all()
+        query = query.filter(User.role == "Employee", User.is_active == True)
     
     result = []
     
-    for emp in employees:
-        ratings = db.query(TaskRating).filter(TaskRating.ratee_id == emp.id).all()
-        
-        total = len(ratings)
-        avg_score = sum(r.score for r in ratings) / total if total > 0 else 0
+    for emp in query.all():
+        total = emp.total_ratings or 0
+        avg_score = emp.score_sum / total if total > 0 else 0
         
         result.append({
             "id": emp.id,
@@ -114,65 +101,80 @@ def get_ratings_by_manager(
     if current_user.role != "Admin":
         raise HTTPException(status_code=403, detail="Access denied - Admin only")
     
-    # Get all managers
-    managers = db.query(User).filter(User.role == "Manager", User.is_active == True).all()
+    # Get all managers with their rating summary
+    managers = db.query(
+        User.id, User.empid, User.name, User.email, User.image_base64,
+        EmployeeRatingSummary.total_ratings, EmployeeRatingSummary.score_sum
+    ).outerjoin(
+        EmployeeRatingSummary, EmployeeRatingSummary.user_id == User.id
+    ).filter(User.role == "Manager", User.is_active == True).all()
     
     result = []
     today = datetime.now().date()
     
+    # Direct reports of every manager in one query
+    team_ids_by_manager = {}
+    manager_empids = [manager.empid for manager in managers if manager.empid]
+    if manager_empids:
+        for user_id, report_to_id in db.query(User.id, User.report_to_id).filter(User.report_to_id.in_(manager_empids)).all():
+            team_ids_by_manager.setdefault(report_to_id, []).append(user_id)
+    
+    # Project counts per project head in one grouped query
+    project_stats = {
+        row.project_head_id: row
+        for row in db.query(
+            Project.project_head_id,
+            func.count(Project.id).label("total"),
+            func.count(Project.id).filter(Project.status == "planning").label("pending"),
+            func.count(Project.id).filter(Project.status == "completed").label("completed"),
+            func.count(Project.id).filter(Project.end_date < today, Project.status != "completed").label("delayed")
+        ).filter(
+            Project.project_head_id.in_([manager.id for manager in managers])
+        ).group_by(Project.project_head_id).all()
+    } if managers else {}
+    
+    # Tasks assigned by each manager or to their team, counted for all managers in one grouped query:
+    # a VALUES list of (manager_id, member_id) pairs, where each manager is also a member of their own team
+    team_pairs = [
+        (manager.id, member_id)
+        for manager in managers
+        for member_id in team_ids_by_manager.get(manager.empid, []) + [manager.id]
+    ]
+    task_stats_by_manager = {}
+    if team_pairs:
+        team_members = values(
+            column("manager_id", Integer), column("member_id", Integer), name="team_members"
+        ).data(team_pairs)
+        # A task can match both the manager's own row (assigned by) and a member row (assigned to)
+        task_count = func.count(Task.id.distinct())
+        task_stats_by_manager = {
+            row.manager_id: row
+            for row in db.query(
+                team_members.c.manager_id,
+                task_count.label("total"),
+                task_count.filter(Task.status.in_(["todo", "in-progress"])).label("pending"),
+                task_count.filter(Task.status == "done").label("completed"),
+                # Delayed tasks (past due date and not completed)
+                task_count.filter(Task.due_date < today, Task.status != "done").label("delayed")
+            ).select_from(team_members).join(
+                Task,
+                or_(
+                    Task.assigned_to_id == team_members.c.member_id,
+                    and_(
+                        team_members.c.member_id == team_members.c.manager_id,
+                        Task.assigned_by_id == team_members.c.manager_id
+                    )
+                )
+            ).group_by(team_members.c.manager_id).all()
+        }
+    
     for manager in managers:
-        # Get ratings received by manager (as ratee)
-        ratings = db.query(TaskRating).filter(TaskRating.ratee_id == manager.id).all()
-        total_ratings = len(ratings)
-        avg_score = sum(r.score for r in ratings) / total_ratings if total_ratings > 0 else 0
-        
-        # Get tasks assigned to manager or their team
-        team_ids = [u.id for u in db.query(User).filter(User.report_to_id == manager.empid).all()]
-        team_ids.append(manager.id)
-        
-        tasks = db.query(Task).filter(
-            or_(
-                Task.assigned_by_id == manager.id,
-                Task.assigned_to_id.in_(team_ids) if team_ids else False
-            )
-        ).all()
-        
-        task_total = len(tasks)
-        task_pending = sum(1 for t in tasks if t.status in ["todo", "in-progress"])
-        task_completed = sum(1 for t in tasks if t.status == "done")
-        
-        # Delayed tasks (past due date and not completed)
-        task_delayed = 0
-        for t in tasks:
-            if t.due_date and t.status != "done":
-                due_date = t.due_date
-                if isinstance(due_date, datetime):
-                    due_date = due_date.date()
-                if due_date < today:
-                    task_delayed += 1
-        
-        # Get projects where manager is project head
-        projects = db.query(Project).filter(Project.project_head_id == manager.id).all()
-        
-        project_total = len(projects)
-        project_pending = sum(1 for p in projects if p.status == "planning")
-        project_completed = sum(1 for p in projects if p.status == "completed")
+        # Ratings received by manager (as ratee)
+        total_ratings = manager.total_ratings or 0
+        avg_score = manager.score_sum / total_ratings if total_ratings > 0 else 0
         
-        # Delayed projects (past end_date and not completed)
-        project_delayed = 0
-        for p in projects:
-            if p.end_date and p.status != "completed":
-                end_date = p.end_date
-                if isinstance(end_date, datetime):
-                    end_date = end_date.date()
-                elif isinstance(end_date, str):
-                    try:
-                        from datetime import datetime as dt
-                        end_date = dt.fromisoformat(end_date).date()
-                    except:
-                        continue
-                if end_date < today:
-                    project_delayed += 1
+        task_stats = task_stats_by_manager.get(manager.id)
+        projects = project_stats.get(manager.id)
         
         result.append({
             "id": manager.id,
@@ -183,15 +185,15 @@ def get_ratings_by_manager(
             "total_ratings": total_ratings,
             "average_score": round(avg_score, 2),
             # Task stats
-            "task_total": task_total,
-            "task_pending": task_pending,
-            "task_completed": task_completed,
-            "task_delayed": task_delayed,
+            "task_total": task_stats.total if task_stats else 0,
+            "task_pending": task_stats.pending if task_stats else 0,
+            "task_completed": task_stats.completed if task_stats else 0,
+            "task_delayed": task_stats.delayed if task_stats else 0,
             # Project stats
-            "project_total": project_total,
-            "project_pending": project_pending,
-            "project_completed": project_completed,
-            "project_delayed": project_delayed
+            "project_total": projects.total if projects else 0,
+            "project_pending": projects.pending if projects else 0,
+            "project_completed": projects.completed if projects else 0,
+            "project_delayed": projects.delayed if projects else 0
         })
     
     return result
@@ -299,8 +301,12 @@ def create_rating(
     )
     
     db.add(rating)
+    # Employee rating summary is updated in the same transaction as the rating
+    apply_rating_change(db, None, rating_snapshot(rating))
     db.commit()
     db.refresh(rating)
+    # Employee reports include the average rating
+    invalidate_report_cache()
     
     # Log activity
     activity = Activity(
@@ -336,13 +342,16 @@ def update_rating(
     if score < 1 or score > 5:
         raise HTTPException(status_code=400, detail="Score must be between 1 and 5")
     
+    previous = rating_snapshot(rating)
     rating.score = score
     if comments:
         rating.comments = comments
     rating.rated_at = get_ist_now()
     
+    apply_rating_change(db, previous, rating_snapshot(rating))
     db.commit()
     db.refresh(rating)
+    invalidate_report_cache()
     
     return rating
 
@@ -359,8 +368,11 @@ def delete_rating(
     if not rating:
         raise HTTPException(status_code=404, detail="Rating not found")
     
+    previous = rating_snapshot(rating)
     db.delete(rating)
+    apply_rating_change(db, previous, None)
     db.commit()
+    invalidate_report_cache()
     
     return {"message": "Rating deleted successfully"}
 
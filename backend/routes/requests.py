@@ -3,13 +3,15 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func
 from datetime import datetime, timedelta, date
 from database import get_db
-from models import Request, User, PunchLog, LeaveBalanceList, WeekOffDate, Holiday
+from models import Request, User, PunchLog, LeaveBalanceList
 from routes.auth import get_current_user
 from typing import Optional
 from pydantic import BaseModel
 from decimal import Decimal
 from utils.email_service import send_request_email_to_manager
 from utils import get_ist_now
+from utils.leave_ledger import record_credit
+from utils.working_calendar import working_calendar
 
 router = APIRouter()
 
@@ -73,22 +75,9 @@ def create_request(
 
     # For overtime-comp-off: allow only Week-Off or Holiday dates (same rule as Requests.jsx dropdown)
     if request_data.type == "overtime-comp-off":
-        # Week off check (employee-specific or global employee_id="0")
-        is_week_off = db.query(WeekOffDate).filter(
-            WeekOffDate.date == request_date,
-            WeekOffDate.employee_id.in_([str(current_user.empid), "0"])
-        ).first() is not None
-
-        # Holiday check - filter by branch_id via holiday_permissions
-        user_branch_id = current_user.branch_id if current_user.branch_id else 1
-        holiday_records = db.query(Holiday).filter(Holiday.date == request_date).all()
-        is_holiday = False
-        for holiday in holiday_records:
-            if not holiday.holiday_permissions or len(holiday.holiday_permissions) == 0:
-                continue
-            if any(perm.get("branch_id") == user_branch_id for perm in holiday.holiday_permissions):
-                is_holiday = True
-                break
+        # Week off (employee-specific or global employee_id="0") or branch holiday
+        is_week_off = working_calendar.is_week_off(db, current_user.empid, request_date)
+        is_holiday = working_calendar.is_holiday(db, current_user.branch_id, request_date)
 
         if not (is_week_off or is_holiday):
             raise HTTPException(
@@ -348,6 +337,12 @@ def update_request_status(
                                 updated_date=get_ist_now()
                             )
                             db.add(new_leave_balance)
+                    
+                    # Record the earned comp-off in the leave ledger
+                    record_credit(
+                        db, request.empid, "comp_off", comp_off_value, current_year, get_ist_now().month,
+                        actor=current_user.empid, note=f"Overtime comp-off (request {request.id})"
+                    )
                 except Exception as e:
                     # Log error but don't fail the request approval
                     print(f"Error updating comp-off leave balance: {e}")
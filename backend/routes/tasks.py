@@ -12,6 +12,9 @@ from schemas import (
     TimerStart, TimerStop, TimerResponse
 )
 from routes.auth import get_current_user
+from utils.project_rollups import task_snapshot, apply_task_change, refresh_project_progress
+from utils.rating_summaries import remove_task_ratings
+from utils.report_engine import invalidate_report_cache
 from datetime import datetime, date, timezone
 from typing import Optional, List
 from sqlalchemy import extract, func as sql_func
@@ -75,6 +78,25 @@ def get_all_subordinate_user_ids(db: Session, manager_empid, _visited: set = Non
     return ids
 
 
+def annotate_task_delays(tasks) -> None:
+    """Set is_delayed / delayed_days on each task (overdue and not done)"""
+    today = datetime.now().date()
+    for task in tasks:
+        if task.due_date:
+            due_date = task.due_date
+            if isinstance(due_date, datetime):
+                due_date = due_date.date()
+            if due_date < today and task.status != "done":
+                task.is_delayed = True
+                task.delayed_days = (today - due_date).days
+            else:
+                task.is_delayed = False
+                task.delayed_days = 0
+        else:
+            task.is_delayed = False
+            task.delayed_days = 0
+
+
 @router.get("/calendar")
 def get_calendar_tasks(
     month: int = None,
@@ -195,21 +217,7 @@ def get_tasks(
         tasks = query.order_by(Task.created_at.desc()).limit(500).all()
         
         # Add delayed days to each task
-        today = datetime.now().date()
-        for task in tasks:
-            if task.due_date:
-                due_date = task.due_date
-                if isinstance(due_date, datetime):
-                    due_date = due_date.date()
-                if due_date < today and task.status != "done":
-                    task.is_delayed = True
-                    task.delayed_days = (today - due_date).days
-                else:
-                    task.is_delayed = False
-                    task.delayed_days = 0
-            else:
-                task.is_delayed = False
-                task.delayed_days = 0
+        annotate_task_delays(tasks)
         
         return tasks
     except Exception as e:
@@ -224,7 +232,17 @@ def get_task_stats(
     current_user: User = Depends(get_current_user)
 ):
     try:
-        query = db.query(Task)
+        # Delayed tasks (past due date and not completed)
+        today = datetime.now().date()
+        # Single grouped aggregate instead of loading every task row
+        query = db.query(
+            func.count(Task.id).label("total"),
+            func.count(Task.id).filter(Task.status == "todo").label("todo"),
+            func.count(Task.id).filter(Task.status == "in-progress").label("in_progress"),
+            func.count(Task.id).filter(Task.status == "done").label("completed"),
+            func.count(Task.id).filter(Task.status == "blocked").label("blocked"),
+            func.count(Task.id).filter(Task.due_date < today, Task.status != "done").label("delayed")
+        )
         
         if current_user.role == "Employee":
             query = query.filter(
@@ -246,25 +264,15 @@ def get_task_stats(
             else:
                 query = query.filter(Task.assigned_by_id == current_user.id)
         
-        tasks = query.all()
-        
-        total = len(tasks)
-        todo = sum(1 for t in tasks if t.status == "todo")
-        in_progress = sum(1 for t in tasks if t.status == "in-progress")
-        completed = sum(1 for t in tasks if t.status == "done")
-        blocked = sum(1 for t in tasks if t.status == "blocked")
-        
-        # Delayed tasks (past due date and not completed)
-        today = datetime.now().date()
-        delayed = sum(1 for t in tasks if t.due_date and t.due_date < today and t.status != "done")
+        stats = query.one()
         
         return {
-            "total": total,
-            "todo": todo,
-            "in_progress": in_progress,
-            "completed": completed,
-            "blocked": blocked,
-            "delayed": delayed
+            "total": stats.total,
+            "todo": stats.todo,
+            "in_progress": stats.in_progress,
+            "completed": stats.completed,
+            "blocked": stats.blocked,
+            "delayed": stats.delayed
         }
     except Exception as e:
         print(f"Error in get_task_stats: {e}")
@@ -629,9 +637,24 @@ def create_task(
     )
     
     db.add(task)
+    db.flush()
+    # Project rollup is updated in the same transaction as the task
+    apply_task_change(db, None, task_snapshot(task))
     db.commit()
     db.refresh(task)
     
+    if task.project_id:
+        try:
+            update_project_progress(db, task.project_id)
+        except Exception as e:
+            print(f"Error updating project progress: {e}")
+            import traceback
+            traceback.print_exc()
+            db.rollback()
+    
+    # Cached report datasets no longer match the task table
+    invalidate_report_cache()
+    
     # Log activity
     activity = Activity(
         user_id=current_user.id,
@@ -687,6 +710,7 @@ def update_task(
         if assignee:
             update_data["assigned_to_name"] = assignee.name
     
+    previous = task_snapshot(task)
     for key, value in update_data.items():
         if value is not None:
             setattr(task, key, value)
@@ -705,6 +729,7 @@ def update_task(
             task.updated_at = datetime.now(IST)
     
     try:
+        apply_task_change(db, previous, task_snapshot(task))
         db.commit()
         db.refresh(task)
     except Exception as e:
@@ -714,6 +739,12 @@ def update_task(
         raise HTTPException(status_code=500, detail=f"Error updating task: {str(e)}")
     
     # Update project progress if task belongs to a project (separate transaction - don't fail main update)
+    if previous["project_id"] and previous["project_id"] != task.project_id:
+        try:
+            update_project_progress(db, previous["project_id"])
+        except Exception as e:
+            print(f"Error updating project progress: {e}")
+            db.rollback()
     if task.project_id:
         try:
             update_project_progress(db, task.project_id)
@@ -723,6 +754,8 @@ def update_task(
             import traceback
             traceback.print_exc()
     
+    invalidate_report_cache()
+    
     # Log activity (separate transaction - don't fail main update)
     try:
         activity = Activity(
@@ -750,22 +783,9 @@ def update_task(
     return task
 
 def update_project_progress(db: Session, project_id: int):
-    """Update project progress based on task completion"""
-    tasks = db.query(Task).filter(Task.project_id == project_id).all()
-    if not tasks:
-        return
-    
-    total_percent = sum(t.percent_complete for t in tasks)
-    avg_percent = total_percent // len(tasks)
-    
-    project = db.query(Project).filter(Project.id == project_id).first()
-    if project:
-        project.progress_percent = avg_percent
-        if avg_percent == 100:
-            project.status = "completed"
-        elif avg_percent > 0:
-            project.status = "active"
-        db.commit()
+    """Update project progress based on task completion (read from the project rollup)"""
+    refresh_project_progress(db, project_id)
+    db.commit()
 
 @router.delete("/{task_id}")
 def delete_task(
@@ -780,9 +800,22 @@ def delete_task(
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
+    previous = task_snapshot(task)
+    # Ratings are cascade-deleted with the task - retract them from the summaries
+    remove_task_ratings(db, task.id)
     db.delete(task)
+    apply_task_change(db, previous, None)
     db.commit()
     
+    if previous["project_id"]:
+        try:
+            update_project_progress(db, previous["project_id"])
+        except Exception as e:
+            print(f"Error updating project progress: {e}")
+            db.rollback()
+    
+    invalidate_report_cache()
+    
     return {"message": "Task deleted successfully"}
 
 # ============ Subtasks ============
@@ -901,7 +934,9 @@ def start_timer(
     db.refresh(timer)
     
     if task.status == "todo":
+        previous = task_snapshot(task)
         task.status = "in-progress"
+        apply_task_change(db, previous, task_snapshot(task))
         db.commit()
     
     return timer
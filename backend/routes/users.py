@@ -7,11 +7,27 @@ from database import get_db
 from models import User, Activity, Company, Branch, Department
 from schemas import UserCreate, UserUpdate, UserResponse
 from utils import hash_password, generate_empid, is_admin_or_hr
+from utils.password_hasher import clear_unknown_usernames
 from routes.auth import get_current_user
+from utils.fast_json import fast_json_response
 from datetime import datetime
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
+# UserResponse columns only - the password and Google credential columns are never read for lists
+USER_RESPONSE_COLUMNS = [getattr(User, name) for name in UserResponse.model_fields]
+
+def user_response_rows(query) -> List[Dict[str, Any]]:
+    """UserResponse-shaped dicts from a User query, without loading ORM objects or re-validating"""
+    rows = []
+    for row in query.with_entities(*USER_RESPONSE_COLUMNS):
+        item = row._asdict()
+        if item["salary_per_annum"] is not None:
+            # UserResponse serialises Decimal as a string
+            item["salary_per_annum"] = str(item["salary_per_annum"])
+        rows.append(item)
+    return rows
+
 def check_admin_or_manager(current_user: User):
     if current_user.role not in ["Admin", "Manager", "HR", "Front Desk"]:
         raise HTTPException(status_code=403, detail="Access denied")
@@ -52,7 +68,7 @@ def get_users(
         )
     
     # Limit to 500 users for performance
-    return query.order_by(User.created_at.desc()).limit(500).all()
+    return fast_json_response(user_response_rows(query.order_by(User.created_at.desc()).limit(500)))
 
 def _get_all_subordinate_users(db: Session, manager_empid: str, _visited: set = None) -> List[User]:
     """Returns all direct and indirect subordinate User rows for a manager (under of under)."""
@@ -180,7 +196,7 @@ def get_hierarchy(
         # Admin and HR can see all
         
         # Limit to 500 users for hierarchy display
-        return query.order_by(User.name).limit(500).all()
+        return fast_json_response(user_response_rows(query.order_by(User.name).limit(500)))
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -280,6 +296,7 @@ def create_user(
     db.add(user)
     db.commit()
     db.refresh(user)
+    clear_unknown_usernames()
     
     # Log activity
     activity = Activity(
@@ -392,6 +409,8 @@ def update_user(
     
     db.commit()
     db.refresh(user)
+    if "username" in update_data or "empid" in update_data:
+        clear_unknown_usernames()
     
     return user
 
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, BackgroundTasks
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import or_, func, text, extract
 from datetime import datetime, date, timedelta
@@ -8,7 +9,6 @@ from models import VMSItem, Visitor, User, StationeryItem, StockTransaction, Ite
 from routes.auth import get_current_user
 from typing import Optional, List
 from pydantic import BaseModel
-import requests
 import smtplib
 import re
 import base64
@@ -28,6 +28,15 @@ try:
 except ImportError:
     # Fallback: define functions inline if module doesn't exist
     pass
+from utils.whatsapp_dispatcher import enqueue_whatsapp_message
+from utils.image_pipeline import (
+    ImageValidationError,
+    save_upload_stream,
+    save_base64_image,
+    generate_image_variants,
+    get_variant_path,
+    IMAGE_VARIANTS
+)
 
 # WhatsApp and Email configuration
 WHATSAPP_API_URL = "https://backend.api-wa.co/campaign/smartping/api/v2"
@@ -44,6 +53,26 @@ FRONTEND_URL = "https://tms.brihaspathi.com/"
 BASE_DIR = Path(__file__).resolve().parent.parent
 VMS_IMAGE_DIR = BASE_DIR / "uploads" / "vms_image"
 VMS_IMAGE_DIR.mkdir(parents=True, exist_ok=True)
+VMS_IMAGE_URL_PREFIX = f"{FRONTEND_URL}api/uploads/vms_image/"
+
+def get_visitor_image_path(image_url: str, variant: str = None) -> Optional[Path]:
+    """Resolve a stored visitor image URL to its local file (or variant), None if not stored locally"""
+    if not image_url or not image_url.startswith(VMS_IMAGE_URL_PREFIX):
+        return None
+    filename = image_url[len(VMS_IMAGE_URL_PREFIX):]
+    if not filename or '/' in filename or '\\' in filename:
+        return None
+    image_path = VMS_IMAGE_DIR / filename
+    if variant:
+        image_path = get_variant_path(image_path, variant)
+    return image_path if image_path.exists() else None
+
+def get_visitor_image_url(image_url: str, variant: str) -> Optional[str]:
+    """Return the URL of a small image variant if it has been generated, else the original URL"""
+    variant_path = get_visitor_image_path(image_url, variant)
+    if variant_path:
+        return f"{VMS_IMAGE_URL_PREFIX}{variant_path.name}"
+    return image_url
 
 def is_valid_email(email: str) -> bool:
     """Validate email format"""
@@ -87,7 +116,7 @@ def get_image_data(image_data: str) -> tuple:
         return None, False
 
 def send_whatsapp_notification(employee_name: str, visitor_name: str, visit_purpose: str, address: str, date_of_visit: str, phone: str, image_data: str = None):
-    """Send WhatsApp notification with image - Based on reference API structure"""
+    """Queue WhatsApp notification with image - Based on reference API structure (sent by the WhatsApp dispatcher)"""
     try:
         if not is_valid_phone(phone):
             print(f"Invalid phone number: {phone}")
@@ -169,39 +198,11 @@ def send_whatsapp_notification(employee_name: str, visitor_name: str, visit_purp
             }
         }
         
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-            "Authorization": f"Bearer {WHATSAPP_API_KEY}"
-        }
-        
-        print(f"WhatsApp API Request:")
-        print(f"  URL: {WHATSAPP_API_URL}")
-        print(f"  Campaign: {WHATSAPP_CAMPAIGN}")
-        print(f"  Phone: {phone_clean}")
-        print(f"  Payload keys: {list(payload.keys())}")
-        
-        response = requests.post(WHATSAPP_API_URL, json=payload, headers=headers, timeout=30)
-        
-        if response.status_code == 200:
-            print(f"WhatsApp notification sent successfully to {phone}")
+        message_id = enqueue_whatsapp_message(payload, destination=phone_clean, context="vms")
+        if message_id:
+            print(f"WhatsApp notification queued for {phone} (message {message_id})")
             return True
-        else:
-            print(f"WhatsApp API error: {response.status_code} - {response.text}")
-            # Try without Authorization header if it fails
-            if response.status_code == 401:
-                print("Trying without Authorization header...")
-                headers_no_auth = {
-                    "Content-Type": "application/json",
-                    "Accept": "application/json"
-                }
-                response = requests.post(WHATSAPP_API_URL, json=payload, headers=headers_no_auth, timeout=30)
-                if response.status_code == 200:
-                    print(f"WhatsApp notification sent successfully to {phone} (without auth header)")
-                    return True
-                else:
-                    print(f"WhatsApp API error (retry): {response.status_code} - {response.text}")
-            return False
+        return False
     except Exception as e:
         print(f"WhatsApp error: {str(e)}")
         import traceback
@@ -210,6 +211,7 @@ def send_whatsapp_notification(employee_name: str, visitor_name: str, visit_purp
 
 def send_email_notification(employee_name: str, employee_email: str, visitor_name: str, visit_purpose: str, address: str, date_of_visit: str, visitor_phone: str, visitor_email: str, image_data: str = None):
     """Send email notification with image embedded in HTML"""
+    import requests
     try:
         if not is_valid_email(employee_email):
             print(f"Invalid employee email: {employee_email}")
@@ -228,8 +230,12 @@ def send_email_notification(employee_name: str, employee_email: str, visitor_nam
         img_data, is_url = get_image_data(image_to_use)
         image_cid = None
         
-        # Download image if URL, or use base64
-        if is_url:
+        # Read locally stored images from disk, download other URLs, or use base64
+        local_image_path = get_visitor_image_path(image_to_use)
+        if local_image_path:
+            with open(local_image_path, "rb") as image_file:
+                img_data = image_file.read()
+        elif is_url:
             try:
                 img_response = requests.get(image_to_use, timeout=10)
                 if img_response.status_code == 200:
@@ -431,6 +437,7 @@ BRIHASPATHI TECHNOLOGIES PRIVATE LIMITED"""
 
 def send_visitor_email_notification(visitor_name: str, visitor_email: str, visit_purpose: str, address: str, date_of_visit: str, employee_name: str, image_data: str = None):
     """Send email notification to visitor with their captured image"""
+    import requests
     try:
         if not is_valid_email(visitor_email):
             print(f"Invalid visitor email: {visitor_email}")
@@ -449,8 +456,12 @@ def send_visitor_email_notification(visitor_name: str, visitor_email: str, visit
         img_data, is_url = get_image_data(image_to_use)
         image_cid = None
         
-        # Download image if URL, or use base64
-        if is_url:
+        # Read locally stored images from disk, download other URLs, or use base64
+        local_image_path = get_visitor_image_path(image_to_use)
+        if local_image_path:
+            with open(local_image_path, "rb") as image_file:
+                img_data = image_file.read()
+        elif is_url:
             try:
                 img_response = requests.get(image_to_use, timeout=10)
                 if img_response.status_code == 200:
@@ -845,7 +856,7 @@ Brihaspathi Technologies Limited"""
         return False
 
 def send_visitor_whatsapp_notification(visitor_name: str, visit_purpose: str, date_of_visit: str, employee_name: str, phone: str, image_data: str = None):
-    """Send WhatsApp notification to visitor with their captured image"""
+    """Queue WhatsApp notification to visitor with their captured image (sent by the WhatsApp dispatcher)"""
     try:
         if not is_valid_phone(phone):
             print(f"Invalid visitor phone number: {phone}")
@@ -877,25 +888,11 @@ def send_visitor_whatsapp_notification(visitor_name: str, visit_purpose: str, da
         if is_url:
             payload["imageUrl"] = image_to_use
         
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-            "Authorization": f"Bearer {WHATSAPP_API_KEY}"
-        }
-        
-        print(f"Visitor WhatsApp API Request:")
-        print(f"  URL: {WHATSAPP_API_URL}")
-        print(f"  Phone: {phone_clean}")
-        print(f"  Payload: {payload}")
-        
-        response = requests.post(WHATSAPP_API_URL, json=payload, headers=headers, timeout=30)
-        
-        if response.status_code == 200:
-            print(f"Visitor WhatsApp notification sent to {phone}")
+        message_id = enqueue_whatsapp_message(payload, destination=phone_clean, context="visitor")
+        if message_id:
+            print(f"Visitor WhatsApp notification queued for {phone} (message {message_id})")
             return True
-        else:
-            print(f"Visitor WhatsApp API error: {response.status_code} - {response.text}")
-            return False
+        return False
     except Exception as e:
         print(f"Visitor WhatsApp error: {str(e)}")
         return False
@@ -926,32 +923,76 @@ class VisitorUpdate(BaseModel):
     checkouttime: Optional[datetime] = None
     status: Optional[str] = None
 
+def send_visitor_arrival_notifications(image_path: Optional[Path], image_url: str, employee: dict, visitor: dict, date_of_visit: str, send_whatsapp: bool, send_email: bool):
+    """
+    Background task run after a visitor check-in has been saved.
+    Generates the compressed image variants first so the WhatsApp message and
+    email carry the small preview instead of the full-size selfie.
+    """
+    if image_path:
+        generate_image_variants(image_path)
+    preview_url = get_visitor_image_url(image_url, "preview")
+    
+    if send_whatsapp:
+        try:
+            result = send_whatsapp_notification(
+                employee_name=employee["name"],
+                visitor_name=visitor["fullname"],
+                visit_purpose=visitor["purpose"],
+                address=visitor["address"],
+                date_of_visit=date_of_visit,
+                phone=employee["phone"],
+                image_data=preview_url
+            )
+            if not result:
+                print(f"WhatsApp notification could not be queued for {employee['name']}")
+        except Exception as wa_error:
+            print(f"WhatsApp notification error for {employee['name']}: {str(wa_error)}")
+            import traceback
+            traceback.print_exc()
+    
+    if send_email:
+        try:
+            send_email_notification(
+                employee_name=employee["name"],
+                employee_email=employee["email"],
+                visitor_name=visitor["fullname"],
+                visit_purpose=visitor["purpose"],
+                address=visitor["address"],
+                date_of_visit=date_of_visit,
+                visitor_phone=visitor["phone"],
+                visitor_email=visitor["email"],
+                image_data=preview_url
+            )
+        except Exception as email_error:
+            print(f"Email notification error: {str(email_error)}")
+
 # Image upload endpoint for visitor images
 @router.post("/vms/visitors/upload-image")
 async def upload_visitor_image(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user)
 ):
-    """Upload visitor image and return public URL"""
+    """Upload visitor image (streamed to disk in chunks) and return public URL"""
     try:
         # Validate file type
         if not file.content_type or not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="Only image files are allowed")
         
-        # Generate unique filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-        file_ext = Path(file.filename).suffix.lower() if file.filename else '.jpg'
-        safe_filename = f"{timestamp}{file_ext}"
-        file_path = VMS_IMAGE_DIR / safe_filename
+        # Stream to disk - size and type limits are enforced while streaming
+        file_path = await save_upload_stream(file, VMS_IMAGE_DIR)
         
-        # Save file
-        content = await file.read()
-        with open(file_path, "wb") as buffer:
-            buffer.write(content)
+        # Thumbnail/preview variants are generated after the response is sent
+        background_tasks.add_task(generate_image_variants, file_path)
         
         # Return public URL
-        image_url = f"{FRONTEND_URL}api/uploads/vms_image/{safe_filename}"
-        return {"image_url": image_url, "filename": safe_filename}
+        image_url = f"{VMS_IMAGE_URL_PREFIX}{file_path.name}"
+        return {"image_url": image_url, "filename": file_path.name}
+    except ImageValidationError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error uploading image: {str(e)}")
 
@@ -959,6 +1000,7 @@ async def upload_visitor_image(
 @router.post("/vms/visitors/add")
 def add_visitor(
     visitor_data: VisitorCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -966,35 +1008,24 @@ def add_visitor(
     try:
         # Handle image upload if it's base64
         image_url = visitor_data.selfie
+        image_path = None
         if visitor_data.selfie and visitor_data.selfie.startswith('data:image'):
             try:
-                # Extract base64 data
-                header, encoded = visitor_data.selfie.split(',', 1)
-                decoded = base64.b64decode(encoded)
-                
-                # Determine file extension from header
-                if 'jpeg' in header or 'jpg' in header:
-                    file_ext = '.jpg'
-                elif 'png' in header:
-                    file_ext = '.png'
-                else:
-                    file_ext = '.jpg'
-                
-                # Generate unique filename
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-                safe_filename = f"{timestamp}{file_ext}"
-                file_path = VMS_IMAGE_DIR / safe_filename
-                
-                # Save file
-                with open(file_path, "wb") as buffer:
-                    buffer.write(decoded)
+                image_path = save_base64_image(visitor_data.selfie, VMS_IMAGE_DIR)
                 
                 # Create public URL
-                image_url = f"{FRONTEND_URL}api/uploads/vms_image/{safe_filename}"
+                image_url = f"{VMS_IMAGE_URL_PREFIX}{image_path.name}"
+            except ImageValidationError as img_error:
+                raise HTTPException(status_code=img_error.status_code, detail=str(img_error))
             except Exception as img_error:
                 print(f"Error saving visitor image: {str(img_error)}")
                 # Continue with original selfie data if save fails
                 image_url = visitor_data.selfie
+        else:
+            # Image uploaded earlier through /vms/visitors/upload-image
+            image_path = get_visitor_image_path(image_url)
+            if image_path and get_visitor_image_path(image_url, "preview"):
+                image_path = None  # Variants already generated
         
         # Get the next vtid - use sequence or manual increment
         try:
@@ -1023,6 +1054,7 @@ def add_visitor(
         db.refresh(new_visitor)
         
         # Send notifications to the person to meet
+        notifications_scheduled = False
         if visitor_data.whometomeet:
             try:
                 # Find the user to meet - check both name and empid
@@ -1041,7 +1073,6 @@ def add_visitor(
                 
                 if user_to_meet:
                     # Get current date and time in IST
-                    from utils import get_ist_now
                     date_of_visit = get_ist_now().strftime("%d/%m/%Y %H:%M:%S")
                     
                     # Send WhatsApp notification if consent is given and phone is valid
@@ -1059,51 +1090,44 @@ def add_visitor(
                         elif whatsapp_consent is True:
                             should_send_whatsapp = True
                     
-                    if should_send_whatsapp:
-                        print(f"Attempting to send WhatsApp to {user_to_meet.name} (Phone: {user_to_meet.phone}, Consent: {whatsapp_consent}, User: {current_user_empid})")
-                        try:
-                            result = send_whatsapp_notification(
-                                employee_name=user_to_meet.name,
-                                visitor_name=visitor_data.fullname,
-                                visit_purpose=visitor_data.purpose or 'Not specified',
-                                address=visitor_data.address or 'Not provided',
-                                date_of_visit=date_of_visit,
-                                phone=user_to_meet.phone,
-                                image_data=image_url
-                            )
-                            if result:
-                                print(f"WhatsApp notification sent successfully to {user_to_meet.name}")
-                            else:
-                                print(f"WhatsApp notification failed for {user_to_meet.name}")
-                        except Exception as wa_error:
-                            print(f"WhatsApp notification error for {user_to_meet.name}: {str(wa_error)}")
-                            import traceback
-                            traceback.print_exc()
-                    else:
+                    if not should_send_whatsapp:
                         print(f"WhatsApp not sent to {user_to_meet.name} - Consent: {whatsapp_consent}, Phone: {user_to_meet.phone if user_to_meet.phone else 'Not provided'}, Current User: {current_user_empid}")
                     
                     # Send Email notification if consent is given and email is valid
-                    if user_to_meet.email_consent and user_to_meet.email:
-                        try:
-                            send_email_notification(
-                                employee_name=user_to_meet.name,
-                                employee_email=user_to_meet.email,
-                                visitor_name=visitor_data.fullname,
-                                visit_purpose=visitor_data.purpose or 'Not specified',
-                                address=visitor_data.address or 'Not provided',
-                                date_of_visit=date_of_visit,
-                                visitor_phone=visitor_data.phone or 'Not provided',
-                                visitor_email=visitor_data.email or 'Not provided',
-                                image_data=image_url
-                            )
-                        except Exception as email_error:
-                            print(f"Email notification error: {str(email_error)}")
+                    should_send_email = bool(user_to_meet.email_consent and user_to_meet.email)
+                    
+                    if should_send_whatsapp or should_send_email:
+                        # Image variants and notifications are processed after the response is sent
+                        background_tasks.add_task(
+                            send_visitor_arrival_notifications,
+                            image_path=image_path,
+                            image_url=image_url,
+                            employee={
+                                "name": user_to_meet.name,
+                                "email": user_to_meet.email,
+                                "phone": user_to_meet.phone
+                            },
+                            visitor={
+                                "fullname": visitor_data.fullname,
+                                "purpose": visitor_data.purpose or 'Not specified',
+                                "address": visitor_data.address or 'Not provided',
+                                "phone": visitor_data.phone or 'Not provided',
+                                "email": visitor_data.email or 'Not provided'
+                            },
+                            date_of_visit=date_of_visit,
+                            send_whatsapp=should_send_whatsapp,
+                            send_email=should_send_email
+                        )
+                        notifications_scheduled = True
             except Exception as e:
                 # Log error but don't fail the visitor creation
                 print(f"Error sending notifications: {str(e)}")
                 import traceback
                 traceback.print_exc()
         
+        if image_path and not notifications_scheduled:
+            background_tasks.add_task(generate_image_variants, image_path)
+        
         # Note: Visitor email/WhatsApp notifications are NOT sent when visitor is added
         # They will be sent only when visitor is checked out (see checkout_visitor endpoint)
         
@@ -1124,6 +1148,8 @@ def add_visitor(
                 "status": new_visitor.status
             }
         }
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error adding visitor: {str(e)}")
@@ -1185,6 +1211,7 @@ def get_all_visitors(
                 "purpose": v.purpose,
                 "whometomeet": v.whometomeet,
                 "selfie": v.selfie,
+                "selfie_thumbnail": get_visitor_image_url(v.selfie, "thumb"),
                 "checkintime": v.checkintime.isoformat() if v.checkintime else None,
                 "checkouttime": v.checkouttime.isoformat() if v.checkouttime else None,
                 "status": v.status,
@@ -1202,63 +1229,54 @@ def get_vms_dashboard(
 ):
     """Get VMS dashboard statistics"""
     try:
-        # Base query - filter by role
-        query = db.query(Visitor)
+        # Date calculations
+        today = date.today()
+        start_of_today = datetime.combine(today, datetime.min.time())
+        start_of_tomorrow = start_of_today + timedelta(days=1)
+        start_of_week = start_of_today - timedelta(days=today.weekday())
+        start_of_month = datetime(today.year, today.month, 1)
+        start_of_year = datetime(today.year, 1, 1)
+        
+        # One grouped aggregate over the (checkintime, purpose) index instead of
+        # loading every visitor row and filtering in Python
+        purpose_label = func.coalesce(Visitor.purpose, 'Other').label('purpose')
+        query = db.query(
+            purpose_label,
+            func.count(Visitor.id).filter(
+                Visitor.checkintime >= start_of_today,
+                Visitor.checkintime < start_of_tomorrow
+            ).label('today'),
+            func.count(Visitor.id).filter(Visitor.checkintime >= start_of_week).label('this_week'),
+            func.count(Visitor.id).filter(Visitor.checkintime >= start_of_month).label('this_month'),
+            func.count(Visitor.id).filter(Visitor.checkintime >= start_of_year).label('this_year')
+        ).filter(
+            Visitor.checkintime >= min(start_of_week, start_of_year)
+        )
         
         # For Employee and Manager roles, filter visitors who came to meet them
         if current_user.role in ["Employee", "Manager"]:
             query = query.filter(
-                or_(
-                    Visitor.whometomeet == current_user.name,
-                    Visitor.whometomeet == str(current_user.empid)
-                )
+                Visitor.whometomeet.in_([current_user.name, str(current_user.empid)])
             )
         
-        # Get all visitors for calculations
-        all_visitors = query.all()
+        rows = query.group_by(purpose_label).all()
         
-        # Date calculations
-        today = date.today()
-        start_of_week = today - timedelta(days=today.weekday())
-        start_of_month = date(today.year, today.month, 1)
-        start_of_year = date(today.year, 1, 1)
-        
-        # Filter visitors by date ranges
-        today_visitors = [v for v in all_visitors if v.checkintime and v.checkintime.date() == today]
-        week_visitors = [v for v in all_visitors if v.checkintime and v.checkintime.date() >= start_of_week]
-        month_visitors = [v for v in all_visitors if v.checkintime and v.checkintime.date() >= start_of_month]
-        year_visitors = [v for v in all_visitors if v.checkintime and v.checkintime.date() >= start_of_year]
-        
-        # All possible purposes
+        # All possible purposes - always shown, even with a zero count
         all_purposes = ['Business', 'Vendor', 'Client', 'Interview', 'Family', 'Friend']
+        periods = ['today', 'this_week', 'this_month', 'this_year']
         
-        # Count by purpose for each period
-        def count_by_purpose(visitors_list, include_all_purposes=False):
-            purpose_counts = {}
-            
-            # Initialize all purposes with 0 if include_all_purposes is True
-            if include_all_purposes:
-                for purpose in all_purposes:
-                    purpose_counts[purpose] = 0
-            
-            for visitor in visitors_list:
-                purpose = visitor.purpose or 'Other'
-                purpose_counts[purpose] = purpose_counts.get(purpose, 0) + 1
-            return purpose_counts
+        counts = {period: 0 for period in periods}
+        purpose_counts = {period: {purpose: 0 for purpose in all_purposes} for period in periods}
+        for row in rows:
+            for period in periods:
+                period_count = getattr(row, period) or 0
+                counts[period] += period_count
+                if period_count or row.purpose in all_purposes:
+                    purpose_counts[period][row.purpose] = period_count
         
         return {
-            "counts": {
-                "today": len(today_visitors),
-                "this_week": len(week_visitors),
-                "this_month": len(month_visitors),
-                "this_year": len(year_visitors)
-            },
-            "purpose_counts": {
-                "today": count_by_purpose(today_visitors, include_all_purposes=True),  # Show all purposes for today
-                "this_week": count_by_purpose(week_visitors, include_all_purposes=True),  # Show all purposes for this week
-                "this_month": count_by_purpose(month_visitors, include_all_purposes=True),  # Show all purposes for this month
-                "this_year": count_by_purpose(year_visitors, include_all_purposes=True)  # Show all purposes for this year
-            }
+            "counts": counts,
+            "purpose_counts": purpose_counts
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching dashboard data: {str(e)}")
@@ -1284,12 +1302,39 @@ def get_visitor(
         "purpose": visitor.purpose,
         "whometomeet": visitor.whometomeet,
         "selfie": visitor.selfie,
+        "selfie_preview": get_visitor_image_url(visitor.selfie, "preview"),
         "checkintime": visitor.checkintime.isoformat() if visitor.checkintime else None,
         "checkouttime": visitor.checkouttime.isoformat() if visitor.checkouttime else None,
         "status": visitor.status,
         "created_at": visitor.created_at.isoformat() if visitor.created_at else None
     }
 
+@router.get("/vms/visitors/{visitor_id}/image")
+def get_visitor_image(
+    visitor_id: int,
+    variant: str = "full",
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Serve a visitor image on demand - variant is full, preview or thumb"""
+    if variant != "full" and variant not in IMAGE_VARIANTS:
+        raise HTTPException(status_code=400, detail="Invalid image variant")
+    
+    selfie = db.query(Visitor.selfie).filter(Visitor.id == visitor_id).scalar()
+    if not selfie:
+        raise HTTPException(status_code=404, detail="Visitor image not found")
+    
+    image_path = None
+    if variant != "full":
+        image_path = get_visitor_image_path(selfie, variant)
+    # Fall back to the full image if the variant has not been generated yet
+    if not image_path:
+        image_path = get_visitor_image_path(selfie)
+    if not image_path:
+        raise HTTPException(status_code=404, detail="Visitor image not found")
+    
+    return FileResponse(image_path, headers={"Cache-Control": "private, max-age=86400"})
+
 @router.put("/vms/visitors/{visitor_id}/checkout")
 def checkout_visitor(
     visitor_id: int,
@@ -1676,18 +1721,23 @@ def get_item_issues(
     current_user: User = Depends(get_current_user)
 ):
     """Get all item issues"""
-    issues = db.query(ItemIssue).order_by(ItemIssue.issue_date.desc()).all()
+    # Item and employee names joined in, not looked up per issue
+    issues = db.query(
+        ItemIssue, StationeryItem.item_name, User.name.label("employee_name")
+    ).outerjoin(
+        StationeryItem, StationeryItem.item_id == ItemIssue.item_id
+    ).outerjoin(
+        User, User.empid == ItemIssue.issued_to_empid
+    ).order_by(ItemIssue.issue_date.desc()).all()
     result = []
-    for issue in issues:
-        item = db.query(StationeryItem).filter(StationeryItem.item_id == issue.item_id).first()
-        employee = db.query(User).filter(User.empid == issue.issued_to_empid).first()
+    for issue, item_name, employee_name in issues:
         result.append({
             "issue_id": issue.issue_id,
             "item_id": issue.item_id,
-            "item_name": item.item_name if item else "Unknown",
+            "item_name": item_name if item_name is not None else "Unknown",
             "quantity": issue.quantity,
             "issued_to_empid": issue.issued_to_empid,
-            "issued_to_name": employee.name if employee else "Unknown",
+            "issued_to_name": employee_name if employee_name is not None else "Unknown",
             "issued_by_name": issue.issued_by_name,
             "issue_date": issue.issue_date.isoformat() if issue.issue_date else None
         })
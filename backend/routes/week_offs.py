@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, extract, or_
-from datetime import datetime, date
+from sqlalchemy.dialects.postgresql import insert
+from datetime import datetime, date, timedelta
+from calendar import monthrange
 from database import get_db
 from models import User, WeekOffDate
 from routes.auth import get_current_user
 from utils import is_admin_or_hr
-from typing import Optional
+from utils.working_calendar import working_calendar
+from typing import Optional, List
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -205,6 +208,7 @@ def create_week_off_date(
         db.add(week_off_date)
         db.commit()
         db.refresh(week_off_date)
+        working_calendar.invalidate_week_offs(target_date.year)
         
         return {
             "id": week_off_date.id,
@@ -222,6 +226,111 @@ def create_week_off_date(
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Failed to create week off: {str(e)}")
 
+WEEKDAY_NAMES = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+# Longest range a single bulk request may expand (about two years)
+MAX_BULK_RANGE_DAYS = 731
+
+class WeekOffBulkCreate(BaseModel):
+    weekdays: List[str]  # e.g. ["sunday"] or ["saturday", "sunday"]
+    nth: Optional[List[int]] = None  # occurrence within the month: 1-5, -1 = last (e.g. [2, 4] for alternate Saturdays)
+    from_date: str
+    to_date: str
+    employee_ids: Optional[List[str]] = None  # None or containing "0" = All employees
+
+def _expand_week_off_dates(start: date, end: date, weekdays: set, nth: Optional[set]) -> list:
+    """Dates between start and end (inclusive) matching the weekday / nth-of-month rule"""
+    dates = []
+    current = start
+    while current <= end:
+        if current.weekday() in weekdays:
+            occurrence = (current.day - 1) // 7 + 1
+            is_last = current.day + 7 > monthrange(current.year, current.month)[1]
+            if not nth or occurrence in nth or (is_last and -1 in nth):
+                dates.append(current)
+        current += timedelta(days=1)
+    return dates
+
+@router.post("/week-offs/dates/bulk")
+def create_week_off_dates_bulk(
+    rule: WeekOffBulkCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Generate date-based week-offs from a recurrence rule - Only HR can add"""
+    if current_user.role != "HR":
+        raise HTTPException(status_code=403, detail="Access denied - Only HR can add week-offs")
+    
+    try:
+        start = datetime.fromisoformat(rule.from_date.split('T')[0]).date()
+        end = datetime.fromisoformat(rule.to_date.split('T')[0]).date()
+    except:
+        raise HTTPException(status_code=400, detail="Invalid date format")
+    if end < start:
+        raise HTTPException(status_code=400, detail="to_date must be on or after from_date")
+    if (end - start).days > MAX_BULK_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range cannot exceed {MAX_BULK_RANGE_DAYS} days")
+    
+    weekday_names = [w.strip().lower() for w in rule.weekdays]
+    invalid_weekdays = [w for w in weekday_names if w not in WEEKDAY_NAMES]
+    if not weekday_names or invalid_weekdays:
+        raise HTTPException(status_code=400, detail=f"Invalid weekdays: {', '.join(invalid_weekdays) or 'none given'}")
+    nth = set(rule.nth) if rule.nth else None
+    if nth and not nth <= {1, 2, 3, 4, 5, -1}:
+        raise HTTPException(status_code=400, detail="nth must contain values 1-5 or -1 (last)")
+    
+    # Employees: "All" (employee_id "0") or the given employees, validated with one query
+    employee_ids = [str(e).strip() for e in (rule.employee_ids or []) if str(e).strip()]
+    if not employee_ids or "0" in employee_ids:
+        employee_names = {"0": "All"}
+    else:
+        employee_names = dict(
+            db.query(User.empid, User.name).filter(User.empid.in_(employee_ids)).all()
+        )
+        missing = sorted(set(employee_ids) - set(employee_names))
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Employees not found: {', '.join(missing)}")
+    
+    dates = _expand_week_off_dates(start, end, {WEEKDAY_NAMES.index(w) for w in weekday_names}, nth)
+    rows = [
+        {
+            "employee_id": employee_id,
+            "employee_name": employee_name,
+            "date": week_off_date,
+            "weekday": WEEKDAY_NAMES[week_off_date.weekday()],
+            "month": week_off_date.month,
+            "year": week_off_date.year,
+            "created_by": current_user.id
+        }
+        for employee_id, employee_name in employee_names.items()
+        for week_off_date in dates
+    ]
+    if not rows:
+        return {"requested": 0, "created": 0, "skipped": 0, "dates": 0, "employees": len(employee_names)}
+    
+    try:
+        # Existing (employee_id, date) pairs are skipped by the unique index
+        statement = insert(WeekOffDate).on_conflict_do_nothing(
+            index_elements=[WeekOffDate.employee_id, WeekOffDate.date]
+        ).returning(WeekOffDate.id)
+        created = len(db.execute(statement, rows).all())
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        import traceback
+        print(f"Error creating week off dates in bulk: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Failed to create week offs: {str(e)}")
+    
+    working_calendar.invalidate_week_offs(*range(start.year, end.year + 1))
+    
+    return {
+        "requested": len(rows),
+        "created": created,
+        "skipped": len(rows) - created,
+        "dates": len(dates),
+        "employees": len(employee_names)
+    }
+
 @router.delete("/week-offs/dates")
 def delete_week_off_date(
     employee_id: str,
@@ -251,6 +360,7 @@ def delete_week_off_date(
     
     db.delete(week_off_date)
     db.commit()
+    working_calendar.invalidate_week_offs(target_date.year)
     
     return {"message": "Week off date deleted successfully"}
 
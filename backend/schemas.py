@@ -282,6 +282,7 @@ class MeetingResponse(BaseModel):
     participants: Optional[List[dict]]
     link: Optional[str]
     status: str
+    calendar_sync_status: Optional[str] = None
     created_by: Optional[int]
     created_by_name: Optional[str]
     created_at: datetime
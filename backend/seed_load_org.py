@@ -0,0 +1,467 @@
+"""
+Synthetic organisation for load testing
+Creates N employees across companies, branches and departments (an Admin,
+two HR users, one Manager per department, the rest Employees reporting to
+their department's Manager) and a year of activity for them:
+- punch logs (in / out) and daily attendance rows for every working day
+- projects per department, leaves, tasks and weekly department meetings
+- stationery items and issues to employees
+- salary structures and frozen payslips for the last 12 months
+- attendance cycle id 1 (26-25) when the database has none
+
+All synthetic users share one password and have usernames lt_admin, lt_hr01,
+lt_hr02 and lt_emp00001 ... (the names test_load_scenarios.py logs in with).
+Random data is seeded, so the same arguments produce the same organisation.
+
+Run it against a dedicated local database: DATABASE_URL must be set in the
+environment (the .env value is not used), and --reset drops and recreates
+every table in that database first.
+
+Usage:
+    DATABASE_URL=postgresql://... python seed_load_org.py [--employees 500] [--days 365] [--reset]
+"""
+import os
+import sys
+import random
+import argparse
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+if not os.environ.get("DATABASE_URL"):
+    print("❌ Set DATABASE_URL to a dedicated load-test database (the .env database is never seeded)")
+    sys.exit(2)
+
+from sqlalchemy import insert, text
+from database import engine, Base, SessionLocal
+from models import (
+    User, Company, Branch, Department, PunchLog, Attendance, Leave, Task, Meeting,
+    SalaryStructure, PayslipData, AttendanceCycle, Project, StationeryItem, ItemIssue
+)
+from migrate import run_migrations
+from utils import hash_password
+from utils.project_rollups import reconcile_project_rollups
+
+USERNAME_PREFIX = "lt_"
+FIRST_EMPID = 800001
+INSERT_CHUNK = 5000
+LEAVE_TYPES = ["casual", "sick", "comp-off", "lop"]
+PROJECTS_PER_DEPARTMENT = 2
+PROJECT_STATUSES = ["planning", "active", "active", "on-hold", "completed"]
+STATIONERY_ITEMS = ["Notebook", "Pen", "Pencil", "Stapler", "Marker", "Folder", "Sticky notes", "Envelope"]
+TASK_STATUSES = ["todo", "in-progress", "done", "done", "done"]
+FIRST_NAMES = ["Aarav", "Vivaan", "Aditya", "Ananya", "Diya", "Ishaan", "Kavya", "Meera", "Rohan", "Saanvi",
+               "Arjun", "Priya", "Rahul", "Sneha", "Kiran", "Lakshmi", "Naveen", "Pooja", "Suresh", "Divya"]
+LAST_NAMES = ["Reddy", "Sharma", "Rao", "Patel", "Naidu", "Iyer", "Gupta", "Varma", "Kumar", "Das"]
+
+
+def money(value) -> Decimal:
+    return Decimal(value).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+def insert_rows(db, model, rows: list, label: str):
+    """Bulk insert in chunks (one multi-row INSERT per chunk)"""
+    started = time.perf_counter()
+    for offset in range(0, len(rows), INSERT_CHUNK):
+        db.execute(insert(model), rows[offset:offset + INSERT_CHUNK])
+    print(f"   ✓ {len(rows):>8} {label} ({time.perf_counter() - started:.1f}s)")
+
+
+def reset_database():
+    print("Dropping and recreating all tables...")
+    Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS schema_migrations"))
+    run_migrations()
+
+
+def working_days(start: date, end: date) -> list:
+    """Every day except Sunday"""
+    days = []
+    day = start
+    while day <= end:
+        if day.weekday() != 6:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def create_structure(db, companies: int, branches: int, departments: int) -> list:
+    """Companies / branches / departments; returns the departments"""
+    created = []
+    for c in range(1, companies + 1):
+        company = Company(name=f"LT Company {c}", email=f"hr@lt-company{c}.test")
+        db.add(company)
+        db.flush()
+        for b in range(1, branches + 1):
+            branch = Branch(name=f"LT Branch {c}.{b}", company_id=company.id, company_name=company.name)
+            db.add(branch)
+            db.flush()
+            for d in range(1, departments + 1):
+                department = Department(
+                    name=f"LT Department {c}.{b}.{d}", company_id=company.id, branch_id=branch.id,
+                    company_name=company.name, branch_name=branch.name
+                )
+                db.add(department)
+                created.append(department)
+    db.flush()
+    return created
+
+
+def create_users(db, rng, employees: int, departments: list, password_hash: str, start: date) -> list:
+    """Admin, two HR users, a Manager per department and Employees; returns user dicts with ids"""
+    rows = []
+    empid = FIRST_EMPID
+
+    def user_row(username, role, department, report_to):
+        nonlocal empid
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        row = {
+            "empid": str(empid),
+            "name": name,
+            "email": f"{username}@loadtest.test",
+            "phone": f"9{empid:09d}"[-10:],
+            "username": username,
+            "password": password_hash,
+            "role": role,
+            "is_active": True,
+            "sms_consent": False,
+            "whatsapp_consent": False,
+            "email_consent": False,
+            "report_to_id": report_to,
+            "dob": date(rng.randint(1970, 2002), rng.randint(1, 12), rng.randint(1, 28)),
+            "doj": start - timedelta(days=rng.randint(30, 3000)),
+            "designation": role,
+            "company_id": department.company_id,
+            "branch_id": department.branch_id,
+            "department_id": department.id,
+            "company_name": department.company_name,
+            "branch_name": department.branch_name,
+            "department_name": department.name,
+            "salary_per_annum": money(rng.randrange(300000, 2400000, 10000)),
+        }
+        empid += 1
+        rows.append(row)
+        return row
+
+    admin = user_row(f"{USERNAME_PREFIX}admin", "Admin", departments[0], None)
+    for index in (1, 2):
+        user_row(f"{USERNAME_PREFIX}hr{index:02d}", "HR", departments[0], admin["empid"])
+
+    number = 0
+    managers = []
+    for department in departments:
+        number += 1
+        managers.append(user_row(f"{USERNAME_PREFIX}emp{number:05d}", "Manager", department, admin["empid"]))
+    while number < employees:
+        number += 1
+        manager_index = (number - 1) % len(departments)
+        user_row(f"{USERNAME_PREFIX}emp{number:05d}", "Employee", departments[manager_index], managers[manager_index]["empid"])
+
+    # Managers before their reports (report_to_id references users.empid)
+    for offset in range(0, len(rows), INSERT_CHUNK):
+        chunk = rows[offset:offset + INSERT_CHUNK]
+        result = db.execute(insert(User).returning(User.id, User.empid), chunk)
+        ids = {row_empid: row_id for row_id, row_empid in result}
+        for row in chunk:
+            row["id"] = ids[row["empid"]]
+    print(f"   ✓ {len(rows):>8} users")
+    return rows
+
+
+def punch_and_attendance_rows(rng, users: list, days: list) -> tuple:
+    punches = []
+    attendance = []
+    for user in users:
+        for day in days:
+            if rng.random() < 0.06:
+                continue  # absent / on leave
+            check_in = datetime(day.year, day.month, day.day, 9) + timedelta(minutes=rng.randint(0, 75))
+            check_out = datetime(day.year, day.month, day.day, 18) + timedelta(minutes=rng.randint(0, 90))
+            for punch_time in (check_in, check_out):
+                punches.append({
+                    "employee_id": user["empid"], "employee_name": user["name"], "date": day,
+                    "punch_type": "punch", "punch_time": punch_time, "location": "LT Office", "status": "present"
+                })
+            attendance.append({
+                "employee_id": user["empid"], "employee_name": user["name"], "date": day,
+                "check_in": check_in, "check_out": check_out,
+                "status": "late" if check_in.minute > 45 or check_in.hour > 9 else "present",
+                "hours": money((check_out - check_in).total_seconds() / 3600)
+            })
+    return punches, attendance
+
+
+def leave_rows(rng, users: list, start: date, end: date, per_employee: int) -> list:
+    rows = []
+    span = (end - start).days
+    for user in users:
+        for _ in range(per_employee):
+            from_date = start + timedelta(days=rng.randint(0, span))
+            duration = rng.choice([1, 1, 1, 2, 3])
+            status = rng.choices(["approved", "pending", "rejected"], weights=[7, 2, 1])[0]
+            rows.append({
+                "empid": user["empid"], "name": user["name"],
+                "applied_date": datetime.combine(from_date - timedelta(days=rng.randint(1, 14)), datetime.min.time()),
+                "from_date": from_date, "to_date": from_date + timedelta(days=duration - 1), "duration": duration,
+                "leave_type": rng.choice(LEAVE_TYPES), "report_to": user["report_to_id"],
+                "reason": "Synthetic load-test leave", "status": status,
+                "approved_by": user["report_to_id"] if status != "pending" else None
+            })
+    return rows
+
+
+def by_department(users: list) -> dict:
+    groups = {}
+    for user in users:
+        groups.setdefault(user["department_id"], []).append(user)
+    return groups
+
+
+def create_projects(db, rng, users: list, start: date, end: date) -> dict:
+    """Projects headed by each department's Manager; returns {department_id: [project ids]}"""
+    rows = []
+    for members in by_department(users).values():
+        head = next((user for user in members if user["role"] == "Manager"), members[0])
+        team = [{"empid": user["empid"], "name": user["name"], "role": user["role"]} for user in members[:15]]
+        for index in range(PROJECTS_PER_DEPARTMENT):
+            rows.append({
+                "name": f"{head['department_name']} project {index + 1}",
+                "description": "Synthetic load-test project",
+                "start_date": start, "end_date": end, "estimated_days": (end - start).days,
+                "progress_percent": rng.randint(0, 100), "status": rng.choice(PROJECT_STATUSES),
+                "priority": rng.choice(["low", "medium", "high"]),
+                "created_by": head["id"], "created_by_name": head["name"],
+                "project_head_id": head["id"], "project_head_name": head["name"],
+                "teams": team, "project_cost": money(rng.randrange(100000, 5000000, 50000)),
+                "_department_id": head["department_id"]
+            })
+    projects = {}
+    for row in rows:
+        department_id = row.pop("_department_id")
+        project_id = db.execute(insert(Project).returning(Project.id), [row]).scalar_one()
+        projects.setdefault(department_id, []).append(project_id)
+    print(f"   ✓ {len(rows):>8} projects")
+    return projects
+
+
+def task_rows(rng, users: list, by_empid: dict, projects: dict, start: date, end: date, per_employee: int) -> list:
+    rows = []
+    span = (end - start).days
+    for user in users:
+        manager = by_empid.get(user["report_to_id"])
+        if manager is None:
+            continue
+        for index in range(per_employee):
+            start_date = start + timedelta(days=rng.randint(0, span))
+            estimated = rng.randint(1, 10)
+            status = rng.choice(TASK_STATUSES)
+            department_projects = projects.get(user["department_id"], [])
+            rows.append({
+                "project_id": rng.choice(department_projects) if department_projects else None,
+                "title": f"LT task {user['empid']}-{index + 1}",
+                "description": "Synthetic load-test task",
+                "status": status,
+                "priority": rng.choice(["low", "medium", "high"]),
+                "assigned_by_id": manager["id"], "assigned_by_name": manager["name"],
+                "assigned_to_id": user["id"], "assigned_to_name": user["name"],
+                "assigned_to_ids": [{"empid": user["empid"], "name": user["name"]}],
+                "start_date": start_date, "due_date": start_date + timedelta(days=estimated),
+                "estimated_days": estimated,
+                "percent_complete": 100 if status == "done" else rng.choice([0, 25, 50, 75]),
+                "remarks": []
+            })
+    return rows
+
+
+def meeting_rows(users: list, start: date, end: date) -> list:
+    """A weekly meeting per department, hosted by its Manager"""
+    rows = []
+    for members in by_department(users).values():
+        host = next((user for user in members if user["role"] == "Manager"), members[0])
+        participants = [{"empid": user["empid"], "name": user["name"]} for user in members[:15]]
+        day = start + timedelta(days=(7 - start.weekday()) % 7)  # first Monday
+        while day <= end:
+            rows.append({
+                "title": f"{host['department_name']} weekly sync",
+                "meeting_datetime": datetime(day.year, day.month, day.day, 11),
+                "duration_minutes": 30, "participants": participants, "meeting_type": "offline",
+                "location": "LT Office", "status": "completed" if day < end else "scheduled",
+                "created_by": host["id"], "created_by_name": host["name"]
+            })
+            day += timedelta(days=7)
+    return rows
+
+
+def create_stationery(db, rng, users: list, start: date, end: date, per_employee: int):
+    item_ids = []
+    for name in STATIONERY_ITEMS:
+        item_ids.append(db.execute(
+            insert(StationeryItem).returning(StationeryItem.item_id),
+            [{"item_name": name, "available_quantity": rng.randint(100, 1000), "description": "Synthetic load-test item"}]
+        ).scalar_one())
+    span = (end - start).days
+    rows = [
+        {
+            "item_id": rng.choice(item_ids), "quantity": rng.randint(1, 5), "issued_by_name": "FrontOffice",
+            "issued_to_empid": user["empid"],
+            "issue_date": datetime.combine(start + timedelta(days=rng.randint(0, span)), datetime.min.time())
+        }
+        for user in users
+        for _ in range(per_employee)
+    ]
+    insert_rows(db, ItemIssue, rows, "stationery issues")
+
+
+def salary_rows(users: list) -> tuple:
+    """Salary structures and the monthly figures payslips are built from"""
+    structures = []
+    monthly = {}
+    for user in users:
+        per_month = money(user["salary_per_annum"] / 12)
+        basic = money(per_month * Decimal("0.5"))
+        hra = money(basic * Decimal("0.4"))
+        ca, ma = Decimal("1600.00"), Decimal("1250.00")
+        sa = per_month - basic - hra - ca - ma
+        pf = min(money(basic * Decimal("0.12")), Decimal("1800.00"))
+        pt = Decimal("200.00")
+        monthly[user["empid"]] = {"per_month": per_month, "basic": basic, "hra": hra, "ca": ca, "ma": ma,
+                                  "sa": sa, "pf": pf, "pt": pt}
+        structures.append({
+            "empid": user["empid"], "name": user["name"], "doj": user["doj"],
+            "salary_per_annum": user["salary_per_annum"], "salary_per_month": per_month,
+            "basic": basic, "hra": hra, "ca": ca, "ma": ma, "sa": sa,
+            "employee_pf": pf, "employee_esi": Decimal("0.00"), "professional_tax": pt,
+            "employer_pf": pf, "employer_esi": Decimal("0.00"), "variable_pay": Decimal("0.00"),
+            "retension_bonus": Decimal("0.00"), "net_salary": per_month - pf - pt,
+            "monthly_ctc": per_month + pf, "pf_check": 1, "esi_check": 0
+        })
+    return structures, monthly
+
+
+def payslip_rows(rng, users: list, monthly: dict, months: list) -> list:
+    rows = []
+    for year, month in months:
+        for user in users:
+            figures = monthly[user["empid"]]
+            absent = Decimal(rng.choice([0, 0, 0, 1, 2]))
+            total_days = Decimal(30)
+            payable = total_days - absent
+            lop = money(figures["per_month"] / total_days * absent)
+            earned_gross = figures["per_month"] - lop
+            net = earned_gross - figures["pf"] - figures["pt"]
+            rows.append({
+                "full_name": user["name"], "emp_id": int(user["empid"]), "doj": user["doj"],
+                "company_name": user["company_name"], "company_id": user["company_id"],
+                "branch_name": user["branch_name"], "branch_id": user["branch_id"],
+                "department_name": user["department_name"], "dept_id": user["department_id"],
+                "designation": user["designation"],
+                "salary_per_annum": user["salary_per_annum"], "salary_per_month": figures["per_month"],
+                "salary_per_day": money(figures["per_month"] / total_days),
+                "earnings": {"GrossSalary": float(figures["per_month"]), "Basic": float(figures["basic"]),
+                             "HRA": float(figures["hra"]), "CA": float(figures["ca"]), "MA": float(figures["ma"]),
+                             "SA": float(figures["sa"])},
+                "deductions": {"PF": float(figures["pf"]), "ESI": 0, "PT": float(figures["pt"]), "TDS": 0,
+                               "LOP": float(lop), "LateLogins": 0, "LateLogDeduction": 0},
+                "net_salary": net, "month": month, "year": year, "total_days": int(total_days),
+                "working_days": Decimal(26), "present": Decimal(26) - absent, "absent": absent,
+                "half_days": Decimal(0), "holidays": Decimal(0), "wo": Decimal(4), "leaves": Decimal(0),
+                "payable_days": payable, "lop_deduction": lop, "earned_gross": earned_gross,
+                "freaze_status": True
+            })
+    return rows
+
+
+def last_months(end: date, count: int) -> list:
+    months = []
+    year, month = end.year, end.month
+    for _ in range(count):
+        month -= 1
+        if month == 0:
+            year, month = year - 1, 12
+        months.append((year, month))
+    return months
+
+
+def seed_load_org(args):
+    rng = random.Random(args.seed)
+    end = date.today() - timedelta(days=1)
+    start = end - timedelta(days=args.days - 1)
+
+    if args.reset:
+        reset_database()
+    else:
+        run_migrations()
+
+    db = SessionLocal()
+    try:
+        if db.query(User.id).filter(User.username == f"{USERNAME_PREFIX}admin").first():
+            print("❌ A synthetic organisation already exists here; run with --reset to rebuild it")
+            return False
+
+        print(f"\nSeeding {args.employees} employees, {start} to {end}...")
+        if not db.query(AttendanceCycle.id).filter(AttendanceCycle.id == 1).first():
+            db.add(AttendanceCycle(
+                id=1, name="LT cycle", shift_start_time=datetime.strptime("09:30", "%H:%M").time(),
+                shift_end_time=datetime.strptime("18:30", "%H:%M").time(),
+                late_log_time=datetime.strptime("09:45", "%H:%M").time(),
+                full_day_duration=datetime.strptime("08:00", "%H:%M").time(),
+                half_day_duration=datetime.strptime("04:00", "%H:%M").time(),
+                attendance_cycle_start_date=26, attendance_cycle_end_date=25
+            ))
+        departments = create_structure(db, args.companies, args.branches, args.departments)
+        users = create_users(db, rng, args.employees, departments, hash_password(args.password), start)
+        by_empid = {user["empid"]: user for user in users}
+
+        punches, attendance = punch_and_attendance_rows(rng, users, working_days(start, end))
+        insert_rows(db, PunchLog, punches, "punch logs")
+        insert_rows(db, Attendance, attendance, "attendance days")
+        insert_rows(db, Leave, leave_rows(rng, users, start, end, args.leaves), "leaves")
+        projects = create_projects(db, rng, users, start, end)
+        insert_rows(db, Task, task_rows(rng, users, by_empid, projects, start, end, args.tasks), "tasks")
+        # Bulk-inserted tasks bypass the incremental project rollups
+        print(f"   ✓ {reconcile_project_rollups(db):>8} project rollups")
+        insert_rows(db, Meeting, meeting_rows(users, start, end), "meetings")
+        create_stationery(db, rng, users, start, end, args.stationery)
+        structures, monthly = salary_rows(users)
+        insert_rows(db, SalaryStructure, structures, "salary structures")
+        insert_rows(db, PayslipData, payslip_rows(rng, users, monthly, last_months(end, 12)), "payslips")
+
+        db.commit()
+        with engine.connect() as conn:
+            conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("ANALYZE"))
+        print(f"\n🎉 Synthetic organisation ready - log in as {USERNAME_PREFIX}admin / {USERNAME_PREFIX}hr01 / "
+              f"{USERNAME_PREFIX}emp00001 with password '{args.password}'")
+        return True
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed a synthetic organisation for load testing")
+    parser.add_argument("--employees", type=int, default=500, help="Managers + Employees (default 500)")
+    parser.add_argument("--companies", type=int, default=2)
+    parser.add_argument("--branches", type=int, default=3, help="per company")
+    parser.add_argument("--departments", type=int, default=4, help="per branch")
+    parser.add_argument("--days", type=int, default=365, help="days of punch / attendance history")
+    parser.add_argument("--leaves", type=int, default=12, help="leaves per employee")
+    parser.add_argument("--tasks", type=int, default=20, help="tasks per employee")
+    parser.add_argument("--stationery", type=int, default=2, help="stationery issues per employee")
+    parser.add_argument("--password", default="loadtest123")
+    parser.add_argument("--seed", type=int, default=42, help="random seed")
+    parser.add_argument("--reset", action="store_true", help="drop and recreate all tables first")
+    args = parser.parse_args()
+
+    if args.employees < args.companies * args.branches * args.departments:
+        print("❌ --employees must be at least one per department (companies x branches x departments)")
+        sys.exit(2)
+    try:
+        sys.exit(0 if seed_load_org(args) else 1)
+    except Exception as e:
+        print(f"\n❌ Error seeding load-test data: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
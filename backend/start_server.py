@@ -1,8 +1,11 @@
 #!/usr/bin/env python
 """Simple script to start the FastAPI server"""
 import uvicorn
+from migrate import run_migrations
 
 if __name__ == "__main__":
+    # Schema changes run once here, not in every (re)loaded worker
+    run_migrations()
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
@@ -0,0 +1,86 @@
+"""
+Sync vs async read endpoint throughput against a running server
+Logs in once, then drives each read endpoint through its sync route and its
+/api/async/... counterpart at CONCURRENCY simultaneous requests and reports
+throughput and latency percentiles side by side.
+
+Usage:
+    python test_async_throughput.py <username> <password> [concurrency] [requests_per_endpoint]
+Environment:
+    BASE_URL (default http://localhost:8000)
+"""
+import os
+import sys
+import asyncio
+import httpx
+from bench_utils import Results, timed, run_bounded
+
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:8000")
+
+# (label, sync path, async path)
+ENDPOINTS = [
+    ("auth/me", "/api/auth/me", "/api/async/auth/me"),
+    ("notifications", "/api/notifications/", "/api/async/notifications/"),
+    ("unread-count", "/api/notifications/unread-count", "/api/async/notifications/unread-count"),
+    ("attendance/today", "/api/attendance/today", "/api/async/attendance/today"),
+    ("dashboard/stats", "/api/dashboard/stats", "/api/async/dashboard/stats"),
+    ("tasks", "/api/tasks/", "/api/async/tasks/"),
+]
+
+
+async def run_path(client: httpx.AsyncClient, path: str, concurrency: int, total: int) -> Results:
+    results = Results(path)
+    await run_bounded(concurrency, [timed(client, results, path, "GET", path) for _ in range(total)])
+    results.finish()
+    return results
+
+
+async def main(username: str, password: str, concurrency: int, total: int) -> bool:
+    limits = httpx.Limits(max_connections=concurrency + 5, max_keepalive_connections=concurrency + 5)
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=120.0, limits=limits) as client:
+        print("\n1. Logging in...")
+        response = await client.post("/api/auth/login", json={"username": username, "password": password})
+        if response.status_code != 200:
+            print(f"❌ FAILED: Login returned {response.status_code}: {response.text[:200]}")
+            return False
+        client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+        print("✅ Logged in")
+
+        print("\n2. Checking that sync and async responses match...")
+        matched = True
+        for label, sync_path, async_path in ENDPOINTS:
+            sync_response = await client.get(sync_path)
+            async_response = await client.get(async_path)
+            same = sync_response.status_code == async_response.status_code and sync_response.json() == async_response.json()
+            matched = matched and same
+            print(f"   {'✅' if same else '❌'} {label}: {sync_response.status_code} / {async_response.status_code}")
+
+        print(f"\n3. {total} requests per endpoint at {concurrency} concurrent...")
+        print(f"   {'endpoint':<18} {'mode':<6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'failed':>7}")
+        failures = 0
+        for label, sync_path, async_path in ENDPOINTS:
+            for mode, path in (("sync", sync_path), ("async", async_path)):
+                results = await run_path(client, path, concurrency, total)
+                failures += results.total_failures()
+                print(f"   {label:<18} {mode:<6} {results.rate():>8.1f} {results.latency_ms(path, 50):>8.0f} "
+                      f"{results.latency_ms(path, 95):>8.0f} {results.total_failures():>7}")
+
+        if failures:
+            print(f"❌ FAILED: {failures} request(s) did not return 200")
+            return False
+        return matched
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(2)
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+    requests_per_endpoint = int(sys.argv[4]) if len(sys.argv) > 4 else 500
+
+    print("=" * 60)
+    print(f"Sync vs async read throughput against {BASE_URL}")
+    print("=" * 60)
+    success = asyncio.run(main(sys.argv[1], sys.argv[2], concurrency, requests_per_endpoint))
+    print("\n" + "=" * 60)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,109 @@
+"""
+Test script for the cached Google Calendar client using a stubbed Calendar API
+Verifies that service objects are built once per credential, tokens are
+refreshed up front and the Meet link is extracted - no network calls are made.
+"""
+import sys
+from datetime import datetime, timedelta
+from google.oauth2.credentials import Credentials
+import google_calendar
+
+build_count = 0
+refresh_count = 0
+
+
+class StubRequest:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+
+class StubEvents:
+    def insert(self, calendarId, body, conferenceDataVersion, sendUpdates):
+        return StubRequest({
+            "id": f"event-{len(body['summary'])}",
+            "htmlLink": "https://calendar.google.com/event?eid=stub",
+            "conferenceData": {
+                "entryPoints": [{"entryPointType": "video", "uri": "https://meet.google.com/abc-defg-hij"}]
+            }
+        })
+
+    def patch(self, calendarId, eventId, body, sendUpdates):
+        return StubRequest({"id": eventId})
+
+    def delete(self, calendarId, eventId):
+        return StubRequest({})
+
+
+class StubService:
+    def events(self):
+        return StubEvents()
+
+
+def stub_build_service(credentials):
+    global build_count
+    build_count += 1
+    return StubService()
+
+
+def stub_refresh(self, request):
+    global refresh_count
+    refresh_count += 1
+    self.token = "stub-access-token"
+    self.expiry = datetime.utcnow() + timedelta(hours=1)
+
+
+def run_test() -> bool:
+    google_calendar.GOOGLE_CLIENT_ID = google_calendar.GOOGLE_CLIENT_ID or "stub-client-id"
+    google_calendar.GOOGLE_CLIENT_SECRET = google_calendar.GOOGLE_CLIENT_SECRET or "stub-client-secret"
+    google_calendar._build_service = stub_build_service
+    Credentials.refresh = stub_refresh
+
+    credentials_dict = {
+        "token": "old-token",
+        "refresh_token": "stub-refresh-token",
+        "client_id": "stub-client-id",
+        "client_secret": "stub-client-secret"
+    }
+    start = datetime.now() + timedelta(hours=1)
+
+    print("\n1. Creating two events with the same credentials...")
+    first = google_calendar.create_calendar_event(credentials_dict, "Stub Meeting", "", start, 30, [])
+    second = google_calendar.create_calendar_event(credentials_dict, "Stub Meeting 2", "", start, 30, [])
+    print(f"   Meet link: {first['meeting_link']}, event ids: {first['calendar_event_id']}, {second['calendar_event_id']}")
+    print(f"   Services built: {build_count}, token refreshes: {refresh_count}")
+    if first["meeting_link"] != "https://meet.google.com/abc-defg-hij":
+        print("❌ FAILED: Meet link not extracted")
+        return False
+    if build_count != 1 or refresh_count != 1:
+        print("❌ FAILED: Service should be built and refreshed once per credential")
+        return False
+    print("✅ Service object and token reused")
+
+    print("\n2. Updating and deleting the event...")
+    updated = google_calendar.update_calendar_event(credentials_dict, first["calendar_event_id"], "Renamed", "", start, 45)
+    deleted = google_calendar.delete_calendar_event(credentials_dict, first["calendar_event_id"])
+    if not (updated and deleted and build_count == 1):
+        print("❌ FAILED: Update/delete did not use the cached service")
+        return False
+    print("✅ Update and delete used the cached service")
+
+    print("\n3. Invalidating the cached service...")
+    google_calendar.invalidate_calendar_service(credentials_dict)
+    google_calendar.create_calendar_event(credentials_dict, "Stub Meeting 3", "", start, 30, [])
+    if build_count != 2:
+        print("❌ FAILED: Service was not rebuilt after invalidation")
+        return False
+    print("✅ Service rebuilt after invalidation")
+    return True
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Testing cached Google Calendar client with a stubbed API")
+    print("=" * 60)
+    success = run_test()
+    print("\n" + "=" * 60)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,106 @@
+"""
+Worker cold-start budget for `import main`
+Imports the app in fresh interpreters with `python -X importtime`, reports the
+best wall time and the slowest modules, and fails when:
+- the import takes longer than IMPORT_BUDGET_SECONDS, or
+- a heavy optional dependency is imported at start-up instead of on first use
+
+Importing main must not touch the database (schema changes run through
+migrate.py), so no server or database is needed.
+
+Usage:
+    python test_import_time.py [runs]
+Environment:
+    IMPORT_BUDGET_SECONDS (default 2.5)
+"""
+import os
+import sys
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+IMPORT_BUDGET_SECONDS = float(os.environ.get("IMPORT_BUDGET_SECONDS", "2.5"))
+TOP_MODULES = 15
+
+# Imported inside the functions that need them (calendar, VMS / company
+# images, policy PDFs, Excel and PDF exports)
+LAZY_MODULES = [
+    "googleapiclient",
+    "google_auth_oauthlib",
+    "google.oauth2",
+    "requests",
+    "PyPDF2",
+    "openpyxl",
+    "reportlab",
+    "PIL",
+]
+
+
+def import_main() -> tuple:
+    """(cumulative microseconds for main, {module: cumulative microseconds}) from one fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import main failed")
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        # import time:   self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        modules[parts[2].strip()] = int(parts[1].strip())
+    return modules.get("main", 0), modules
+
+
+def main(runs: int) -> bool:
+    print(f"\n1. Importing main in {runs} fresh interpreter(s)...")
+    timings = []
+    modules = {}
+    for _ in range(runs):
+        try:
+            total_us, modules = import_main()
+        except RuntimeError as e:
+            print(f"❌ FAILED: {e}")
+            return False
+        timings.append(total_us / 1_000_000)
+    best = min(timings)
+    print(f"   best {best:.2f}s, worst {max(timings):.2f}s (budget {IMPORT_BUDGET_SECONDS:.2f}s)")
+
+    print("\n2. Slowest top-level modules (cumulative)...")
+    top_level = {}
+    for name, cumulative_us in modules.items():
+        root = name.split(".")[0]
+        if root != "main":
+            top_level[root] = max(top_level.get(root, 0), cumulative_us)
+    for name, cumulative_us in sorted(top_level.items(), key=lambda item: -item[1])[:TOP_MODULES]:
+        print(f"   {cumulative_us / 1000:>9.1f} ms  {name}")
+
+    print("\n3. Checking that heavy dependencies are not imported at start-up...")
+    eager = [name for name in LAZY_MODULES if any(m == name or m.startswith(name + ".") for m in modules)]
+    for name in LAZY_MODULES:
+        print(f"   {'❌' if name in eager else '✅'} {name}")
+
+    success = True
+    if eager:
+        print(f"❌ FAILED: imported at start-up: {', '.join(eager)}")
+        success = False
+    if best > IMPORT_BUDGET_SECONDS:
+        print(f"❌ FAILED: import main took {best:.2f}s, over the {IMPORT_BUDGET_SECONDS:.2f}s budget")
+        success = False
+    return success
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    print("=" * 60)
+    print("Start-up import budget")
+    print("=" * 60)
+    success = main(runs)
+    print("\n" + "=" * 60)
+    print("✅ Within budget" if success else "❌ Over budget")
+    sys.exit(0 if success else 1)
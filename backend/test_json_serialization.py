@@ -0,0 +1,96 @@
+"""
+JSON serialization and compression benchmark for the largest list endpoints
+Logs in, then for each endpoint:
+- fetches it uncompressed, with gzip and with brotli and reports bytes on the
+  wire and median request time for each
+- re-serialises the returned payload locally with json.dumps and orjson and
+  reports the median encode time of each
+
+Usage:
+    python test_json_serialization.py <username> <password> [repeats]
+Environment:
+    BASE_URL (default http://localhost:8000)
+"""
+import os
+import sys
+import json
+import time
+import statistics
+import httpx
+import orjson
+
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:8000")
+
+ENDPOINTS = [
+    "/api/users/",
+    "/api/users/hierarchy",
+    "/api/payslip/list?limit=500",
+    "/api/attendance/punch-logs",
+    "/api/policies/",
+]
+
+ENCODINGS = [("identity", "identity"), ("gzip", "gzip"), ("br", "br")]
+
+
+def median_ms(func, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main(username: str, password: str, repeats: int) -> bool:
+    with httpx.Client(base_url=BASE_URL, timeout=120.0) as client:
+        print("\n1. Logging in...")
+        response = client.post("/api/auth/login", json={"username": username, "password": password})
+        if response.status_code != 200:
+            print(f"❌ FAILED: Login returned {response.status_code}: {response.text[:200]}")
+            return False
+        token = response.json()["access_token"]
+        print("✅ Logged in")
+
+        print(f"\n2. Bytes on the wire and median request time ({repeats} requests each)...")
+        print(f"   {'endpoint':<38} {'encoding':<9} {'bytes':>10} {'ms':>8}")
+        payloads = {}
+        success = True
+        for path in ENDPOINTS:
+            for label, accept in ENCODINGS:
+                headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": accept}
+                # Read the raw stream so the size is what was transferred, not the decoded body
+                with client.stream("GET", path, headers=headers) as raw:
+                    wire_bytes = sum(len(chunk) for chunk in raw.iter_raw())
+                    status = raw.status_code
+                    served = raw.headers.get("content-encoding", "identity")
+                if status != 200:
+                    print(f"   ❌ {path}: {status}")
+                    success = False
+                    break
+                elapsed = median_ms(lambda: client.get(path, headers=headers), repeats)
+                print(f"   {path:<38} {served:<9} {wire_bytes:>10} {elapsed:>8.1f}")
+                if label == "identity":
+                    payloads[path] = client.get(path, headers=headers).json()
+
+        print(f"\n3. Local encode time of the same payloads ({repeats} runs each)...")
+        print(f"   {'endpoint':<38} {'json ms':>9} {'orjson ms':>10} {'speed-up':>9}")
+        for path, payload in payloads.items():
+            json_ms = median_ms(lambda: json.dumps(payload).encode("utf-8"), repeats)
+            orjson_ms = median_ms(lambda: orjson.dumps(payload), repeats)
+            speed_up = json_ms / orjson_ms if orjson_ms else 0
+            print(f"   {path:<38} {json_ms:>9.2f} {orjson_ms:>10.2f} {speed_up:>8.1f}x")
+        return success
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(2)
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    print("=" * 60)
+    print(f"JSON serialization benchmark against {BASE_URL}")
+    print("=" * 60)
+    success = main(sys.argv[1], sys.argv[2], repeats)
+    print("\n" + "=" * 60)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,182 @@
+"""
+Load scenarios against a server backed by the seed_load_org.py organisation
+Each scenario drives real endpoints with concurrent clients and reports, per
+endpoint, requests, failures, throughput and p50 / p95 / p99 latency:
+- punch:     morning spike - employees log in, punch in and load today's attendance
+- dashboard: refresh storm - every logged-in user reloads the dashboard widgets
+- monthend:  HR generates last month's attendance, then payslips per company
+- exports:   HR downloads the attendance, payslip, salary and employee Excel exports
+
+Usage:
+    python test_load_scenarios.py [scenario ...] [--users 200] [--concurrency 50] [--rounds 5]
+Scenarios default to all four, in the order above.
+Environment:
+    BASE_URL (default http://localhost:8000)
+    LOADTEST_PASSWORD (default loadtest123, as seeded)
+"""
+import os
+import sys
+import asyncio
+import argparse
+from datetime import date
+import httpx
+from bench_utils import Results, timed, run_bounded
+
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:8000")
+PASSWORD = os.environ.get("LOADTEST_PASSWORD", "loadtest123")
+HR_USERNAME = "lt_hr01"
+SCENARIOS = ["punch", "dashboard", "monthend", "exports"]
+
+DASHBOARD_PATHS = [
+    "/api/dashboard/stats",
+    "/api/notifications/unread-count",
+    "/api/notifications/",
+    "/api/attendance/today",
+    "/api/tasks/",
+    "/api/dashboard/birthdays",
+]
+
+
+async def login(client, results: Results, username: str) -> str:
+    response = await timed(client, results, "POST /api/auth/login", "POST", "/api/auth/login",
+                           json={"username": username, "password": PASSWORD})
+    if response is None or response.status_code != 200:
+        return None
+    return response.json()["access_token"]
+
+
+async def scenario_punch(client, args, tokens: dict) -> Results:
+    results = Results("Morning punch spike")
+    usernames = [f"lt_emp{number:05d}" for number in range(1, args.users + 1)]
+
+    async def employee_morning(username):
+        token = await login(client, results, username)
+        if token is None:
+            return
+        tokens[username] = token
+        await timed(client, results, "POST /api/attendance/punch-in", "POST", "/api/attendance/punch-in",
+                    token, json={"location": "LT Office", "punch_description": "load test"})
+        await timed(client, results, "GET /api/attendance/today", "GET", "/api/attendance/today", token)
+
+    await run_bounded(args.concurrency, [employee_morning(username) for username in usernames])
+    results.finish()
+    return results
+
+
+async def ensure_tokens(client, args, tokens: dict):
+    """Log in the scenario users not already logged in by the punch scenario (not timed)"""
+    scratch = Results("login")
+    missing = [f"lt_emp{number:05d}" for number in range(1, args.users + 1) if f"lt_emp{number:05d}" not in tokens]
+
+    async def one(username):
+        token = await login(client, scratch, username)
+        if token:
+            tokens[username] = token
+
+    await run_bounded(args.concurrency, [one(username) for username in missing])
+
+
+async def scenario_dashboard(client, args, tokens: dict) -> Results:
+    await ensure_tokens(client, args, tokens)
+    results = Results("Dashboard refresh storm")
+    jobs = [
+        timed(client, results, f"GET {path}", "GET", path, token)
+        for _ in range(args.rounds)
+        for token in tokens.values()
+        for path in DASHBOARD_PATHS
+    ]
+    await run_bounded(args.concurrency, jobs)
+    results.finish()
+    return results
+
+
+def previous_month() -> tuple:
+    today = date.today()
+    return (today.year - 1, 12) if today.month == 1 else (today.year, today.month - 1)
+
+
+async def scenario_monthend(client, args, hr_token: str) -> Results:
+    results = Results("Month-end attendance and payroll generation")
+    year, month = previous_month()
+    await timed(client, results, "POST /api/attendance/generate", "POST", "/api/attendance/generate",
+                hr_token, json={"month": month, "year": year})
+    await timed(client, results, "POST /api/hr/leave-balance/generate", "POST", "/api/hr/leave-balance/generate",
+                hr_token, params={"year": year})
+    companies = await client.get("/api/company/list", headers={"Authorization": f"Bearer {hr_token}"})
+    company_ids = [company["id"] for company in companies.json()] if companies.status_code == 200 else []
+    for company_id in company_ids:
+        await timed(client, results, "POST /api/payslip/generate", "POST", "/api/payslip/generate",
+                    hr_token, json={"company_id": company_id, "month": month, "year": year})
+    results.finish()
+    return results
+
+
+async def scenario_exports(client, args, hr_token: str) -> Results:
+    results = Results("HR exports")
+    year, month = previous_month()
+    paths = [
+        f"/api/attendance/export-excel?month={month}&year={year}",
+        f"/api/payslip/export-excel?month={month}&year={year}",
+        "/api/payroll/salary-structure/export-excel",
+        "/api/employee-data/export/excel/employee-details",
+    ]
+    jobs = [
+        timed(client, results, f"GET {path.split('?')[0]}", "GET", path, hr_token)
+        for _ in range(args.rounds)
+        for path in paths
+    ]
+    # Exports are heavy; a handful of HR users at once
+    await run_bounded(min(args.concurrency, 4), jobs)
+    results.finish()
+    return results
+
+
+async def main(args) -> bool:
+    limits = httpx.Limits(max_connections=args.concurrency + 5, max_keepalive_connections=args.concurrency + 5)
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=600.0, limits=limits) as client:
+        print(f"\n1. Logging in as {HR_USERNAME}...")
+        hr_token = await login(client, Results("login"), HR_USERNAME)
+        if hr_token is None:
+            print(f"❌ FAILED: {HR_USERNAME} could not log in - seed the database with seed_load_org.py first")
+            return False
+        print("✅ Logged in")
+
+        print(f"\n2. Running {', '.join(args.scenarios)} ({args.users} users, {args.concurrency} concurrent)...")
+        tokens = {}
+        failures = 0
+        for scenario in args.scenarios:
+            if scenario == "punch":
+                results = await scenario_punch(client, args, tokens)
+            elif scenario == "dashboard":
+                results = await scenario_dashboard(client, args, tokens)
+            elif scenario == "monthend":
+                results = await scenario_monthend(client, args, hr_token)
+            else:
+                results = await scenario_exports(client, args, hr_token)
+            results.print_report()
+            failures += results.total_failures()
+
+        if failures:
+            print(f"\n❌ FAILED: {failures} request(s) did not return 200")
+            return False
+        return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load scenarios against the synthetic organisation")
+    parser.add_argument("scenarios", nargs="*", help=f"any of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--users", type=int, default=200, help="employees taking part (lt_emp00001 ...)")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=5, help="dashboard refreshes per user / export repeats")
+    args = parser.parse_args()
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+    args.scenarios = args.scenarios or SCENARIOS
+
+    print("=" * 60)
+    print(f"Load scenarios against {BASE_URL}")
+    print("=" * 60)
+    success = asyncio.run(main(args))
+    print("\n" + "=" * 60)
+    sys.exit(0 if success else 1)
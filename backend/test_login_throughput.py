@@ -0,0 +1,99 @@
+"""
+Login throughput benchmark against a running server
+Fires CONCURRENCY simultaneous logins (a shift-start burst) for TOTAL_LOGINS
+requests and reports throughput and latency percentiles. A health-check probe
+runs alongside to show whether other requests stay responsive while bcrypt
+is busy (hashing runs on its own pool, not the request threadpool).
+
+Usage:
+    python test_login_throughput.py <username> <password> [concurrency] [total_logins]
+Environment:
+    BASE_URL (default http://localhost:8000)
+"""
+import os
+import sys
+import time
+import asyncio
+import statistics
+import httpx
+from bench_utils import percentile, Results, timed, run_bounded
+
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:8000")
+LOGIN_LABEL = "POST /api/auth/login"
+
+
+async def run_logins(client: httpx.AsyncClient, username: str, password: str, concurrency: int, total: int) -> Results:
+    results = Results("Login burst")
+    jobs = [
+        timed(client, results, LOGIN_LABEL, "POST", "/api/auth/login", json={"username": username, "password": password})
+        for _ in range(total)
+    ]
+    await run_bounded(concurrency, jobs)
+    results.finish()
+    return results
+
+
+async def probe_health(client: httpx.AsyncClient, stop: asyncio.Event) -> list:
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/api/health")
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.05)
+    return latencies
+
+
+async def main(username: str, password: str, concurrency: int, total: int) -> bool:
+    limits = httpx.Limits(max_connections=concurrency + 5, max_keepalive_connections=concurrency + 5)
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=120.0, limits=limits) as client:
+        print("\n1. Warm-up login...")
+        response = await client.post("/api/auth/login", json={"username": username, "password": password})
+        if response.status_code != 200:
+            print(f"❌ FAILED: Warm-up login returned {response.status_code}: {response.text[:200]}")
+            return False
+        print("✅ Credentials accepted")
+
+        print(f"\n2. {total} logins at {concurrency} concurrent users...")
+        stop = asyncio.Event()
+        probe = asyncio.create_task(probe_health(client, stop))
+        results = await run_logins(client, username, password, concurrency, total)
+        stop.set()
+        health_latencies = await probe
+
+        print(f"   Throughput: {results.rate():.1f} logins/s ({results.elapsed:.2f}s total)")
+        print(f"   Login latency p50: {results.latency_ms(LOGIN_LABEL, 50):.0f} ms, "
+              f"p95: {results.latency_ms(LOGIN_LABEL, 95):.0f} ms, "
+              f"max: {max(results.latencies[LOGIN_LABEL]) * 1000:.0f} ms")
+        if health_latencies:
+            print(f"   Health check during burst p50: {statistics.median(health_latencies) * 1000:.0f} ms, "
+                  f"p95: {percentile(health_latencies, 95) * 1000:.0f} ms")
+        failures = results.total_failures()
+        if failures:
+            print(f"❌ FAILED: {failures} login(s) did not return 200")
+            return False
+        print("✅ All logins succeeded")
+
+        print("\n3. Unknown username (served from the negative cache after the first attempt)...")
+        timings = []
+        for _ in range(5):
+            started = time.perf_counter()
+            response = await client.post("/api/auth/login", json={"username": "no-such-user-benchmark", "password": "x"})
+            timings.append(time.perf_counter() - started)
+        print(f"   Status: {response.status_code}, first: {timings[0] * 1000:.1f} ms, "
+              f"repeat p50: {statistics.median(timings[1:]) * 1000:.1f} ms")
+        return response.status_code == 401
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(2)
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    total_logins = int(sys.argv[4]) if len(sys.argv) > 4 else 1000
+
+    print("=" * 60)
+    print(f"Login throughput benchmark against {BASE_URL}")
+    print("=" * 60)
+    success = asyncio.run(main(sys.argv[1], sys.argv[2], concurrency, total_logins))
+    print("\n" + "=" * 60)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,102 @@
+"""
+Test script for resuming bulk payslip email runs abandoned by a dead worker
+Simulates a restart within the lease period: a 'running' run is left claimed
+by a worker that no longer exists, with a lease that is still valid. The
+dispatcher must leave it alone at startup and pick it up from its periodic
+poll once the lease has expired.
+The run's only delivery is 'skipped' (no email address), so no SMTP server is
+needed. Requires a development database (payslip_email_* tables) - the
+dispatcher also resumes any other pending runs it finds there. The test run is
+deleted afterwards.
+"""
+import sys
+import time
+from datetime import timedelta
+from database import SessionLocal
+from models import PayslipEmailBatch, PayslipEmailDelivery
+from utils import get_ist_now
+from utils.payslip_email_dispatcher import PayslipEmailDispatcher
+
+LEASE_LEFT_SECONDS = 3
+POLL_INTERVAL_SECONDS = 1
+
+
+def create_abandoned_batch() -> int:
+    db = SessionLocal()
+    try:
+        batch = PayslipEmailBatch(
+            month=1, year=2000, subject="Resume test", status='running', total=1, skipped_count=1,
+            claimed_by="dead-host:1", lease_expires_at=get_ist_now() + timedelta(seconds=LEASE_LEFT_SECONDS),
+            created_by="test_payslip_email_resume"
+        )
+        db.add(batch)
+        db.flush()
+        db.add(PayslipEmailDelivery(
+            batch_id=batch.id, payslip_id=0, full_name="Resume test", status='skipped',
+            last_error="No email address on the employee record"
+        ))
+        db.commit()
+        return batch.id
+    finally:
+        db.close()
+
+
+def get_batch_state(batch_id: int) -> tuple:
+    db = SessionLocal()
+    try:
+        batch = db.query(PayslipEmailBatch).filter(PayslipEmailBatch.id == batch_id).first()
+        return batch.status, batch.claimed_by
+    finally:
+        db.close()
+
+
+def delete_batch(batch_id: int):
+    db = SessionLocal()
+    try:
+        db.query(PayslipEmailBatch).filter(PayslipEmailBatch.id == batch_id).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def run_test(batch_id: int) -> bool:
+    dispatcher = PayslipEmailDispatcher(poll_interval=POLL_INTERVAL_SECONDS)
+
+    print("\n1. Startup while the dead worker's lease is still valid...")
+    dispatcher.resume_pending_batches()
+    time.sleep(0.5)
+    status, claimed_by = get_batch_state(batch_id)
+    print(f"   Status: {status}, claimed by: {claimed_by}")
+    if status != 'running' or claimed_by != "dead-host:1":
+        print("❌ FAILED: Run was taken over before its lease expired")
+        return False
+    print("✅ Run left alone at startup")
+
+    print("\n2. Waiting for the lease to expire and the periodic poll to resume it...")
+    deadline = time.monotonic() + LEASE_LEFT_SECONDS + POLL_INTERVAL_SECONDS * 5
+    while time.monotonic() < deadline:
+        time.sleep(0.5)
+        status, claimed_by = get_batch_state(batch_id)
+        if status == 'completed':
+            break
+    print(f"   Status: {status}, claimed by: {claimed_by}")
+    if status != 'completed':
+        print("❌ FAILED: Abandoned run was not resumed")
+        return False
+    print("✅ Abandoned run resumed and completed by this worker")
+    return True
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Testing payslip email run resume after a restart")
+    print("=" * 60)
+
+    batch_id = create_abandoned_batch()
+    try:
+        success = run_test(batch_id)
+    finally:
+        delete_batch(batch_id)
+
+    print("\n" + "=" * 60)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,136 @@
+"""
+Query and latency budgets for the endpoints that have regressed into N+1 before
+Runs the app in-process (FastAPI TestClient, startup jobs not started) with
+QUERY_DEBUG_HEADERS on, against the seed_load_org.py organisation. For each
+endpoint it makes one warm-up call, then several timed calls, and checks:
+- the largest X-DB-Query-Count stays within the endpoint's query budget
+- the median request time stays within its latency budget
+Query budgets are constants, not per-employee: at 500+ seeded employees an
+endpoint that turns one query into one query per row blows well past them.
+X-DB-N-Plus-One (statements repeated within one request) is reported too.
+
+Note: attendance and payslip generate write to the database (last month's
+attendance lists and payslips are regenerated); use the load-test database only.
+
+Usage:
+    DATABASE_URL=postgresql://... python test_query_budget.py [--runs 5] [--latency-scale 1.0]
+Environment:
+    LOADTEST_PASSWORD (default loadtest123, as seeded)
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+from datetime import date
+
+if not os.environ.get("DATABASE_URL"):
+    print("❌ Set DATABASE_URL to the seeded load-test database (see seed_load_org.py)")
+    sys.exit(2)
+
+# Read by Settings at import time, so it has to be set before the app is imported
+os.environ["QUERY_DEBUG_HEADERS"] = "true"
+
+from fastapi.testclient import TestClient
+from main import app
+from database import SessionLocal
+from models import Project, Company
+
+PASSWORD = os.environ.get("LOADTEST_PASSWORD", "loadtest123")
+USERS = {"HR": "lt_hr01", "Admin": "lt_admin", "Manager": "lt_emp00001"}
+
+
+def previous_month() -> tuple:
+    today = date.today()
+    return (today.year - 1, 12) if today.month == 1 else (today.year, today.month - 1)
+
+
+def budgets(project_id: int, company_id: int) -> list:
+    """(label, role, method, path, json body, max queries, max median ms)"""
+    year, month = previous_month()
+    return [
+        ("dashboard stats", "Admin", "GET", "/api/dashboard/stats", None, 15, 300),
+        ("task list", "Manager", "GET", "/api/tasks/", None, 10, 300),
+        ("manager calendar", "Manager", "GET", f"/api/tasks/calendar?month={month}&year={year}", None, 10, 300),
+        ("project details", "Manager", "GET", f"/api/projects/{project_id}/details", None, 10, 300),
+        ("stationery issues", "HR", "GET", "/api/stationery/issues", None, 5, 500),
+        ("attendance generate", "HR", "POST", "/api/attendance/generate", {"month": month, "year": year}, 40, 15000),
+        ("payslip generate", "HR", "POST", "/api/payslip/generate",
+         {"company_id": company_id, "month": month, "year": year}, 40, 15000),
+    ]
+
+
+def login(client: TestClient, username: str) -> str:
+    response = client.post("/api/auth/login", json={"username": username, "password": PASSWORD})
+    if response.status_code != 200:
+        return None
+    return response.json()["access_token"]
+
+
+def main(runs: int, latency_scale: float) -> bool:
+    client = TestClient(app)
+
+    print("\n1. Logging in as the seeded users...")
+    tokens = {}
+    for role, username in USERS.items():
+        tokens[role] = login(client, username)
+        if tokens[role] is None:
+            print(f"❌ FAILED: {username} could not log in - seed the database with seed_load_org.py first")
+            return False
+    print(f"✅ Logged in as {', '.join(USERS.values())}")
+
+    db = SessionLocal()
+    try:
+        project_id = db.query(Project.id).order_by(Project.id).limit(1).scalar()
+        company_id = db.query(Company.id).order_by(Company.id).limit(1).scalar()
+    finally:
+        db.close()
+    if project_id is None or company_id is None:
+        print("❌ FAILED: no projects or companies - re-seed with the current seed_load_org.py")
+        return False
+
+    print(f"\n2. Checking budgets ({runs} runs each after a warm-up)...")
+    print(f"   {'endpoint':<22} {'queries':>8} {'budget':>7} {'n+1':>4} {'median ms':>10} {'budget':>8}")
+    success = True
+    for label, role, method, path, body, max_queries, max_ms in budgets(project_id, company_id):
+        headers = {"Authorization": f"Bearer {tokens[role]}"}
+        client.request(method, path, headers=headers, json=body)
+        counts, repeated, timings, failed = [], [], [], None
+        for _ in range(runs):
+            started = time.perf_counter()
+            response = client.request(method, path, headers=headers, json=body)
+            timings.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                failed = f"{response.status_code}: {response.text[:200]}"
+                break
+            counts.append(int(response.headers["x-db-query-count"]))
+            repeated.append(int(response.headers["x-db-n-plus-one"]))
+        if failed:
+            print(f"   ❌ {label:<20} {method} {path} returned {failed}")
+            success = False
+            continue
+
+        queries = max(counts)
+        median_ms = statistics.median(timings) * 1000
+        ms_budget = max_ms * latency_scale
+        ok = queries <= max_queries and median_ms <= ms_budget
+        success = success and ok
+        print(f"   {'✅' if ok else '❌'} {label:<20} {queries:>8} {max_queries:>7} {max(repeated):>4} "
+              f"{median_ms:>10.1f} {ms_budget:>8.0f}")
+    return success
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-endpoint query and latency budgets")
+    parser.add_argument("--runs", type=int, default=5, help="timed calls per endpoint")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="multiplier for the latency budgets (slow CI machines)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Query budgets per endpoint")
+    print("=" * 60)
+    success = main(args.runs, args.latency_scale)
+    print("\n" + "=" * 60)
+    print("✅ All endpoints within budget" if success else "❌ Some endpoints over budget")
+    sys.exit(0 if success else 1)
@@ -0,0 +1,143 @@
+"""
+Security headers middleware: parity, streaming and per-request overhead
+Runs in-process against a two-route Starlette app (no server or database):
+1. The pure ASGI SecurityHeadersMiddleware produces exactly the headers of the
+   previous BaseHTTPMiddleware version (kept below as LegacySecurityHeaders)
+   for app, docs and streamed responses
+2. A streamed response's first chunk reaches the client before the
+   generator has produced the rest (no buffering)
+3. Median time per request for: no middleware, the legacy middleware and the
+   pure ASGI middleware, calling the ASGI app directly
+
+Usage:
+    python test_security_headers.py [requests]
+"""
+import sys
+import time
+import asyncio
+import statistics
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from utils.security_headers import SecurityHeadersMiddleware, APP_CSP, DOCS_CSP, PERMISSIONS_POLICY, DOCS_PATH_PREFIXES
+
+STREAM_CHUNKS = 5
+
+
+class LegacySecurityHeaders(BaseHTTPMiddleware):
+    """The BaseHTTPMiddleware implementation this replaced, as the baseline"""
+
+    async def dispatch(self, request: Request, call_next):
+        response = await call_next(request)
+        is_docs_endpoint = request.url.path.startswith(DOCS_PATH_PREFIXES)
+        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains; preload"
+        response.headers["Content-Security-Policy"] = DOCS_CSP if is_docs_endpoint else APP_CSP
+        response.headers["X-Frame-Options"] = "SAMEORIGIN"
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        response.headers["X-XSS-Protection"] = "1; mode=block"
+        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+        response.headers["Permissions-Policy"] = PERMISSIONS_POLICY
+        return response
+
+
+def build_app(middleware=None, events: list = None):
+    async def data(request):
+        return JSONResponse({"status": "ok"}, headers={"X-Frame-Options": "DENY"})
+
+    async def stream(request):
+        async def chunks():
+            for index in range(STREAM_CHUNKS):
+                if events is not None:
+                    events.append(f"yield {index}")
+                yield f"row {index}\n".encode()
+                await asyncio.sleep(0)
+        return StreamingResponse(chunks(), media_type="text/csv")
+
+    app = Starlette(routes=[Route("/api/data", data), Route("/docs", data), Route("/api/export", stream)])
+    if middleware is not None:
+        app.add_middleware(middleware)
+    return app
+
+
+async def call(app, path: str, events: list = None) -> list:
+    """Run one GET through the ASGI app; returns the response headers"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"testserver")], "client": ("127.0.0.1", 50000), "server": ("testserver", 80)
+    }
+    headers = []
+    request_sent = False
+    response_done = asyncio.Event()
+
+    async def receive():
+        # The request body once, then a disconnect only after the response has finished
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            headers.extend(message["headers"])
+        elif message["type"] == "http.response.body":
+            if message.get("body") and events is not None:
+                events.append("send")
+            if not message.get("more_body", False):
+                response_done.set()
+
+    await app(scope, receive, send)
+    return headers
+
+
+async def main(total: int) -> bool:
+    success = True
+    legacy = build_app(LegacySecurityHeaders)
+    pure = build_app(SecurityHeadersMiddleware)
+
+    print("\n1. Checking header parity with the BaseHTTPMiddleware version...")
+    for path in ("/api/data", "/docs", "/api/export"):
+        same = await call(legacy, path) == await call(pure, path)
+        success = success and same
+        print(f"   {'✅' if same else '❌'} {path}")
+
+    print("\n2. Checking that streamed chunks are not buffered...")
+    events = []
+    await call(build_app(SecurityHeadersMiddleware, events), "/api/export", events)
+    streamed = events.index("send") < events.index(f"yield {STREAM_CHUNKS - 1}")
+    success = success and streamed
+    print(f"   {'✅' if streamed else '❌'} first chunk sent before the last was produced: {' '.join(events)}")
+
+    print(f"\n3. Median per-request time over {total} requests...")
+    print(f"   {'variant':<22} {'/api/data us':>13} {'/api/export us':>15}")
+    baseline = None
+    for label, app in (("no middleware", build_app()), ("BaseHTTPMiddleware", legacy), ("pure ASGI", pure)):
+        row = []
+        for path in ("/api/data", "/api/export"):
+            timings = []
+            for _ in range(total):
+                started = time.perf_counter()
+                await call(app, path)
+                timings.append(time.perf_counter() - started)
+            row.append(statistics.median(timings) * 1_000_000)
+        if baseline is None:
+            baseline = row
+        overhead = " / ".join(f"+{value - base:.0f}" for value, base in zip(row, baseline))
+        print(f"   {label:<22} {row[0]:>13.1f} {row[1]:>15.1f}   overhead {overhead} us")
+    return success
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    print("=" * 60)
+    print("Security headers middleware")
+    print("=" * 60)
+    success = asyncio.run(main(total))
+    print("\n" + "=" * 60)
+    print("✅ All checks passed" if success else "❌ Some checks failed")
+    sys.exit(0 if success else 1)
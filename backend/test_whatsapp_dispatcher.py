@@ -0,0 +1,100 @@
+"""
+Test script for the WhatsApp dispatcher against a local HTTP stub
+The stub fails the first request with 503 and accepts the retry, so the script
+verifies queueing, retry with backoff and delivery status recording.
+Requires the database (whatsapp_messages table) but never calls the real provider.
+"""
+import sys
+import json
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from database import SessionLocal
+from models import WhatsAppMessage
+import utils.whatsapp_dispatcher as dispatcher_module
+from utils.whatsapp_dispatcher import WhatsAppDispatcher, enqueue_whatsapp_message
+
+STUB_HOST = "127.0.0.1"
+STUB_PORT = 8765
+received_requests = []
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        received_requests.append(json.loads(self.rfile.read(length) or b"{}"))
+        # Fail the first request, accept the rest
+        status = 503 if len(received_requests) == 1 else 200
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(json.dumps({"ok": status == 200}).encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+def get_message_status(message_id: int):
+    db = SessionLocal()
+    try:
+        message = db.query(WhatsAppMessage).filter(WhatsAppMessage.id == message_id).first()
+        return (message.status, message.attempts, message.last_status_code) if message else (None, 0, None)
+    finally:
+        db.close()
+
+
+async def run_test() -> bool:
+    # Keep the retry short for the test
+    dispatcher_module.BACKOFF_BASE_SECONDS = 1
+
+    dispatcher = WhatsAppDispatcher(
+        api_url=f"http://{STUB_HOST}:{STUB_PORT}/send",
+        max_concurrency=2,
+        poll_interval=0.5
+    )
+    await dispatcher.start()
+
+    print("\n1. Queueing test message...")
+    message_id = enqueue_whatsapp_message(
+        {"campaignName": "test", "destination": "910000000000", "templateParams": ["Test"]},
+        destination="910000000000",
+        context="test"
+    )
+    if not message_id:
+        print("❌ FAILED: Message could not be queued")
+        await dispatcher.stop()
+        return False
+    print(f"✅ Message queued (id {message_id})")
+
+    print("\n2. Waiting for delivery (first attempt fails with 503)...")
+    status = None
+    for _ in range(30):
+        await asyncio.sleep(0.5)
+        status, attempts, last_status_code = get_message_status(message_id)
+        if status in ("sent", "failed"):
+            break
+    await dispatcher.stop()
+
+    print(f"   Status: {status}, attempts: {attempts}, last status code: {last_status_code}")
+    print(f"   Stub received {len(received_requests)} request(s)")
+    if status == "sent" and attempts == 2:
+        print("✅ Message delivered after one retry")
+        return True
+    print("❌ FAILED: Unexpected delivery status")
+    return False
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Testing WhatsApp Dispatcher against a local HTTP stub")
+    print("=" * 60)
+
+    server = HTTPServer((STUB_HOST, STUB_PORT), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        success = asyncio.run(run_test())
+    finally:
+        server.shutdown()
+
+    print("\n" + "=" * 60)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,48 @@
+"""
+Calendar Worker
+Runs Google Calendar jobs (event create/update/delete) on a single background
+thread so meeting endpoints return without waiting on the Calendar API.
+Jobs are executed in submission order.
+"""
+import queue
+import threading
+
+
+class CalendarWorker:
+    """Single background thread executing submitted calendar jobs"""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="calendar-worker", daemon=True)
+                self._thread.start()
+
+    def submit(self, func, *args, **kwargs):
+        """Queue a job - func(*args, **kwargs) runs on the worker thread"""
+        self._ensure_started()
+        self._queue.put((func, args, kwargs))
+
+    def pending(self) -> int:
+        """Number of jobs waiting to run"""
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            func, args, kwargs = self._queue.get()
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                print(f"Error in calendar worker job {getattr(func, '__name__', func)}: {str(e)}")
+                import traceback
+                traceback.print_exc()
+            finally:
+                self._queue.task_done()
+
+
+# Shared worker instance
+calendar_worker = CalendarWorker()
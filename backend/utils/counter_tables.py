@@ -0,0 +1,106 @@
+"""
+Counter Tables
+Shared upsert / reconcile logic for summary tables holding one row of integer
+counters per key (project_task_rollups per project, employee_rating_summaries
+per employee):
+- apply_change: subtract a row's old contribution and add its new one, as
+  atomic INSERT ... ON CONFLICT DO UPDATE increments in the caller's transaction
+- reconcile: overwrite the stored counters with freshly aggregated values,
+  resetting keys that no longer have any source rows to zero
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
+from utils import get_ist_now
+
+
+class CounterTable:
+    """Summary table with a key column, integer counter columns and updated_at"""
+
+    def __init__(self, model, key_column: str, counter_columns: tuple):
+        self.model = model
+        self.key_column = key_column
+        self.counter_columns = tuple(counter_columns)
+
+    def zero(self) -> dict:
+        return {column: 0 for column in self.counter_columns}
+
+    def upsert_delta(self, db: Session, key, delta: dict):
+        """Atomically add a delta to a key's row, creating it if missing"""
+        if not any(delta.values()):
+            return
+        statement = insert(self.model).values(
+            updated_at=get_ist_now(),
+            **{self.key_column: key},
+            **{column: max(delta[column], 0) for column in self.counter_columns}
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[getattr(self.model, self.key_column)],
+            set_={
+                "updated_at": statement.excluded.updated_at,
+                **{
+                    column: getattr(self.model, column) + delta[column]
+                    for column in self.counter_columns
+                }
+            }
+        )
+        db.execute(statement)
+
+    def apply_change(self, db: Session, old_key=None, old_values: dict = None, new_key=None, new_values: dict = None):
+        """
+        Move a source row's contribution between keys inside the caller's transaction.
+
+        Args:
+            old_key / old_values: key and counter contribution before the change (None for a new row)
+            new_key / new_values: key and counter contribution after the change (None for a deleted row)
+        """
+        deltas = {}
+        if old_key and old_values:
+            deltas[old_key] = {column: -value for column, value in old_values.items()}
+        if new_key and new_values:
+            key_delta = deltas.setdefault(new_key, self.zero())
+            for column, value in new_values.items():
+                key_delta[column] += value
+        for key, delta in deltas.items():
+            self.upsert_delta(db, key, delta)
+
+    def reconcile(self, db: Session, rows: dict, keys: list = None) -> int:
+        """
+        Overwrite stored counters with aggregated values.
+
+        Args:
+            rows: key -> aggregate row with one attribute per counter column
+            keys: restrict the reset of missing keys to these (None for all)
+
+        Returns:
+            int: Number of rows written
+        """
+        key_attribute = getattr(self.model, self.key_column)
+        existing_query = db.query(key_attribute)
+        if keys is not None:
+            existing_query = existing_query.filter(key_attribute.in_(keys))
+        existing_keys = set(key for (key,) in existing_query.all())
+
+        now = get_ist_now()
+        values = [
+            {
+                self.key_column: key,
+                "updated_at": now,
+                **{column: int(getattr(row, column) or 0) for column in self.counter_columns}
+            }
+            for key, row in rows.items()
+        ]
+        # Keys whose source rows are all gone
+        values.extend(
+            {self.key_column: key, "updated_at": now, **self.zero()}
+            for key in existing_keys - set(rows)
+        )
+        if not values:
+            return 0
+
+        statement = insert(self.model).values(values)
+        statement = statement.on_conflict_do_update(
+            index_elements=[key_attribute],
+            set_={column: getattr(statement.excluded, column) for column in self.counter_columns + ("updated_at",)}
+        )
+        db.execute(statement)
+        return len(values)
@@ -0,0 +1,154 @@
+"""
+Employee Document Import
+- ZIP uploads of documents named by empid (e.g. "EMP001.jpg") are read entry by
+  entry from the spooled upload file; the archive is never loaded into memory
+- All empids in the archive are resolved with one query, users are updated in
+  batches with one commit per batch
+- Document files are written under employee_documents/<empid>/ (outside the
+  public uploads/ mount) and the documents JSONB keeps only the file reference;
+  they are served by the authenticated /employee-data/documents/{empid} endpoint
+- A per-file report (updated / skipped / error with a reason) is returned
+"""
+import os
+import re
+import zipfile
+import mimetypes
+from sqlalchemy.orm import Session
+from models import User
+from utils import get_ist_now
+
+EMPLOYEE_DOCUMENTS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "employee_documents")
+MAX_DOCUMENT_BYTES = 20 * 1024 * 1024  # 20 MB per file
+IMPORT_BATCH_SIZE = 200
+COPY_CHUNK_SIZE = 64 * 1024
+
+
+def _safe_name(value: str) -> str:
+    """File-system safe version of an empid or document name"""
+    return re.sub(r'[^A-Za-z0-9_-]+', '_', value).strip('_') or 'document'
+
+
+def document_relative_path(empid: str, document_name: str, extension: str) -> str:
+    return f"{_safe_name(empid)}/{_safe_name(document_name)}{extension}"
+
+
+def get_document_path(document: dict):
+    """Absolute path of a stored document file, None for inline (base64) or missing documents"""
+    relative_path = document.get('file') if isinstance(document, dict) else None
+    if not relative_path:
+        return None
+    base_dir = os.path.realpath(EMPLOYEE_DOCUMENTS_DIR)
+    path = os.path.realpath(os.path.join(base_dir, relative_path))
+    if not path.startswith(base_dir + os.sep) or not os.path.isfile(path):
+        return None
+    return path
+
+
+def _copy_entry(zip_file: zipfile.ZipFile, entry: zipfile.ZipInfo, path: str) -> int:
+    """Stream a ZIP entry to disk (via a .part file), enforcing the size limit while copying"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + '.part'
+    written = 0
+    try:
+        with zip_file.open(entry) as source, open(temp_path, 'wb') as target:
+            while True:
+                chunk = source.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > MAX_DOCUMENT_BYTES:
+                    raise ValueError(f"File exceeds {MAX_DOCUMENT_BYTES // (1024 * 1024)} MB")
+                target.write(chunk)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return written
+
+
+def _store_document(zip_file: zipfile.ZipFile, entry: zipfile.ZipInfo, user: User, folder_name: str, extension: str):
+    """Write one entry to storage and upsert the matching item in user.documents"""
+    relative_path = document_relative_path(user.empid, folder_name, extension)
+    size = _copy_entry(zip_file, entry, os.path.join(EMPLOYEE_DOCUMENTS_DIR, relative_path))
+
+    documents = list(user.documents) if isinstance(user.documents, list) else []
+    document = {
+        'name': folder_name,
+        'file': relative_path,
+        'content_type': mimetypes.guess_type(entry.filename)[0] or 'application/octet-stream',
+        'size': size,
+        'uploaded_at': get_ist_now().isoformat()
+    }
+    for index, existing in enumerate(documents):
+        if isinstance(existing, dict) and existing.get('name') == folder_name:
+            # Remove the previous file if it was stored under another extension
+            previous_path = get_document_path(existing)
+            if previous_path and existing.get('file') != relative_path:
+                os.remove(previous_path)
+            documents[index] = document
+            break
+    else:
+        documents.append(document)
+    user.documents = documents
+
+
+def import_document_zip(db: Session, fileobj, folder_name: str) -> dict:
+    """
+    Import a ZIP of documents named by empid from a seekable file object.
+
+    Returns:
+        dict: updated / skipped / errors counts and a per-file report
+    """
+    report = []
+    with zipfile.ZipFile(fileobj) as zip_file:
+        entries = []
+        for entry in zip_file.infolist():
+            if entry.is_dir():
+                continue
+            filename = entry.filename.split('/')[-1]  # Handle nested paths
+            if not filename or filename.startswith('.'):
+                continue
+            empid, extension = os.path.splitext(filename)
+            entries.append((entry, filename, empid.strip(), extension.lower()))
+
+        # Resolve every empid in the archive with one query
+        empids = {empid for _, _, empid, _ in entries if empid}
+        known_empids = set(
+            empid for (empid,) in db.query(User.empid).filter(User.empid.in_(empids)).all()
+        ) if empids else set()
+
+        for batch_start in range(0, len(entries), IMPORT_BATCH_SIZE):
+            batch = entries[batch_start:batch_start + IMPORT_BATCH_SIZE]
+            batch_empids = {empid for _, _, empid, _ in batch if empid in known_empids}
+            users = {
+                user.empid: user
+                for user in db.query(User).filter(User.empid.in_(batch_empids)).all()
+            } if batch_empids else {}
+
+            for entry, filename, empid, extension in batch:
+                item = {"file": entry.filename, "empid": empid}
+                user = users.get(empid)
+                if not user:
+                    report.append({**item, "status": "skipped", "reason": "No employee with this empid"})
+                    continue
+                if entry.file_size > MAX_DOCUMENT_BYTES:
+                    report.append({**item, "status": "error", "reason": f"File exceeds {MAX_DOCUMENT_BYTES // (1024 * 1024)} MB"})
+                    continue
+                try:
+                    _store_document(zip_file, entry, user, folder_name, extension)
+                    report.append({**item, "status": "updated"})
+                except Exception as e:
+                    print(f"Error importing document {filename}: {str(e)}")
+                    report.append({**item, "status": "error", "reason": str(e)})
+
+            db.commit()
+            # Release the batch's user rows (and their documents JSONB) before the next batch
+            for user in users.values():
+                db.expunge(user)
+
+    return {
+        "updated": sum(1 for item in report if item["status"] == "updated"),
+        "skipped": sum(1 for item in report if item["status"] == "skipped"),
+        "errors": sum(1 for item in report if item["status"] == "error"),
+        "files": report
+    }
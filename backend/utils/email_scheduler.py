@@ -3,10 +3,14 @@ Email Scheduler Service for Automated Emails
 - Birthday Emails
 - Anniversary Emails
 - Weekly Attendance Emails
+- Daily project task rollup and rating summary reconciliation
+- Per-recipient results are logged at DEBUG (failures at WARNING); each run
+  logs one summary line with its sent/failed counts and phase timings
 """
 import schedule
 import time
 import threading
+import logging
 from datetime import datetime, date, timedelta
 from sqlalchemy.orm import Session
 from database import SessionLocal
@@ -16,6 +20,12 @@ from utils.email_service import (
     send_anniversary_email,
     send_weekly_attendance_email
 )
+from utils.project_rollups import run_project_rollup_reconciliation
+from utils.rating_summaries import run_rating_summary_reconciliation
+from utils.metrics import time_job
+from utils.tracing import get_logger, log_event, PhaseTimer
+
+logger = get_logger("email_scheduler")
 
 
 def get_day_name(day_str: str) -> str:
@@ -81,7 +91,7 @@ def should_send_today(config: dict) -> bool:
             if current_time.hour == config_hour and current_time.minute == config_minute:
                 return True
         except Exception as e:
-            print(f"Error parsing time {time_str}: {str(e)}")
+            log_event(logger, logging.WARNING, "email_scheduler.invalid_time", time=time_str, error=str(e))
             return False
     
     # If no time specified, don't send
@@ -113,6 +123,7 @@ def check_and_send_birthday_emails():
             User.is_active == True
         ).all()
         
+        sent = failed = 0
         for employee in employees:
             if not employee.dob:
                 continue
@@ -126,14 +137,15 @@ def check_and_send_birthday_emails():
                             employee_email=employee.email,
                             employee_name=employee.name
                         )
-                        print(f"Birthday email sent to {employee.name} ({employee.email})")
+                        sent += 1
+                        log_event(logger, logging.DEBUG, "email.birthday.sent", empid=employee.empid)
                     except Exception as e:
-                        print(f"Error sending birthday email to {employee.email}: {str(e)}")
+                        failed += 1
+                        log_event(logger, logging.WARNING, "email.birthday.failed", empid=employee.empid, error=str(e))
+        log_event(logger, logging.INFO, "email.birthday.done", sent=sent, failed=failed)
     
     except Exception as e:
-        print(f"Error in check_and_send_birthday_emails: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log_event(logger, logging.ERROR, "email.birthday.run_failed", exc_info=True, error=str(e))
     finally:
         db.close()
 
@@ -163,6 +175,7 @@ def check_and_send_anniversary_emails():
             User.is_active == True
         ).all()
         
+        sent = failed = 0
         for employee in employees:
             if not employee.doj:
                 continue
@@ -180,21 +193,23 @@ def check_and_send_anniversary_emails():
                             employee_name=employee.name,
                             years=years
                         )
-                        print(f"Anniversary email sent to {employee.name} ({employee.email}) - {years} years")
+                        sent += 1
+                        log_event(logger, logging.DEBUG, "email.anniversary.sent", empid=employee.empid, years=years)
                     except Exception as e:
-                        print(f"Error sending anniversary email to {employee.email}: {str(e)}")
+                        failed += 1
+                        log_event(logger, logging.WARNING, "email.anniversary.failed", empid=employee.empid, error=str(e))
+        log_event(logger, logging.INFO, "email.anniversary.done", sent=sent, failed=failed)
     
     except Exception as e:
-        print(f"Error in check_and_send_anniversary_emails: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log_event(logger, logging.ERROR, "email.anniversary.run_failed", exc_info=True, error=str(e))
     finally:
         db.close()
 
 
 def check_and_send_weekly_attendance_emails():
     """Check and send weekly attendance reminder emails - sends only once per week"""
-    from models import Leave, Holiday, WeekOffDate
+    from models import Leave
+    from utils.working_calendar import working_calendar
     from sqlalchemy import and_, or_
     import os
     import json
@@ -234,7 +249,7 @@ def check_and_send_weekly_attendance_emails():
         
         # If already sent this week, skip
         if last_sent_week == current_week and last_sent_year == current_year:
-            print(f"Weekly attendance email already sent this week (Week {current_week}, {current_year})")
+            log_event(logger, logging.DEBUG, "email.weekly_attendance.already_sent", week=current_week, year=current_year)
             return
         
         # Mark as sent for this week
@@ -242,7 +257,7 @@ def check_and_send_weekly_attendance_emails():
             with open(tracking_file, 'w') as f:
                 json.dump({'week': current_week, 'year': current_year, 'date': today.isoformat()}, f)
         except Exception as e:
-            print(f"Warning: Could not save weekly email tracking: {e}")
+            log_event(logger, logging.WARNING, "email.weekly_attendance.tracking_not_saved", error=str(e))
         
         # Get all active employees
         employees = db.query(User).filter(
@@ -255,183 +270,153 @@ def check_and_send_weekly_attendance_emails():
         end_date = today - timedelta(days=1)  # Yesterday (last day of previous 7 days)
         start_date = end_date - timedelta(days=6)  # 7 days back from yesterday
         
+        timer = PhaseTimer()
+        sent = failed = 0
         for employee in employees:
             # Second check: employee email_consent must be true
             if not employee.email_consent or not employee.email:
                 continue
             
-            # Get employee branch_id (default to 1 if None)
-            emp_branch_id = employee.branch_id if employee.branch_id else 1
-            
-            # Get leaves for this employee in the date range
-            leaves = db.query(Leave).filter(
-                and_(
-                    Leave.empid == employee.empid,
-                    Leave.status == 'approved',
-                    Leave.from_date <= end_date,
-                    Leave.to_date >= start_date
-                )
-            ).all()
-            
-            # Build leave map: {date: leave_type}
-            leave_map = {}
-            for leave in leaves:
-                current_leave_date = max(leave.from_date, start_date)
-                leave_end = min(leave.to_date, end_date)
-                while current_leave_date <= leave_end:
-                    leave_map[current_leave_date.isoformat()] = leave.leave_type.upper()
-                    current_leave_date += timedelta(days=1)
-            
-            # Get week-offs for this employee
-            week_offs = db.query(WeekOffDate).filter(
-                and_(
-                    or_(
-                        WeekOffDate.employee_id == "0",  # All employees
-                        WeekOffDate.employee_id == employee.empid  # Specific employee
-                    ),
-                    WeekOffDate.date >= start_date,
-                    WeekOffDate.date <= end_date
-                )
-            ).all()
+            with timer.phase("leaves"):
+                # Get leaves for this employee in the date range
+                leaves = db.query(Leave).filter(
+                    and_(
+                        Leave.empid == employee.empid,
+                        Leave.status == 'approved',
+                        Leave.from_date <= end_date,
+                        Leave.to_date >= start_date
+                    )
+                ).all()
             
-            # Build week-off map
-            week_off_dates = set()
-            for wo in week_offs:
-                if wo.employee_id == "0" or str(wo.employee_id).strip() == str(employee.empid).strip():
-                    week_off_dates.add(wo.date.isoformat())
+                # Build leave map: {date: leave_type}
+                leave_map = {}
+                for leave in leaves:
+                    current_leave_date = max(leave.from_date, start_date)
+                    leave_end = min(leave.to_date, end_date)
+                    while current_leave_date <= leave_end:
+                        leave_map[current_leave_date.isoformat()] = leave.leave_type.upper()
+                        current_leave_date += timedelta(days=1)
             
-            # Get holidays with branch_id matching
-            holidays = db.query(Holiday).filter(
-                and_(
-                    Holiday.date >= start_date,
-                    Holiday.date <= end_date
-                )
-            ).all()
+            with timer.phase("calendar"):
+                # Week-offs (employee-specific and "All") and branch holidays from the shared calendar
+                week_off_dates = {
+                    d.isoformat() for d in working_calendar.week_off_dates(db, employee.empid, start_date, end_date)
+                }
+                holiday_dates = {
+                    d.isoformat() for d in working_calendar.branch_holidays(db, employee.branch_id, start_date, end_date)
+                }
             
-            # Build holiday map (check holiday_permissions JSON for branch_id)
-            holiday_dates = set()
-            for holiday in holidays:
-                if holiday.holiday_permissions:
-                    # Check if employee's branch_id is in holiday_permissions
-                    if isinstance(holiday.holiday_permissions, list):
-                        for perm in holiday.holiday_permissions:
-                            if isinstance(perm, dict) and perm.get('branch_id') == emp_branch_id:
-                                holiday_dates.add(holiday.date.isoformat())
-                                break
-                    elif isinstance(holiday.holiday_permissions, dict):
-                        if holiday.holiday_permissions.get('branch_id') == emp_branch_id:
-                            holiday_dates.add(holiday.date.isoformat())
-                else:
-                    # If no holiday_permissions, it applies to all
-                    holiday_dates.add(holiday.date.isoformat())
+            with timer.phase("punches"):
+                # Get punch logs for previous 7 days
+                punch_logs = db.query(PunchLog).filter(
+                    and_(
+                        PunchLog.employee_id == employee.empid,
+                        PunchLog.date >= start_date,
+                        PunchLog.date <= end_date
+                    )
+                ).order_by(PunchLog.date, PunchLog.punch_time).all()
             
-            # Get punch logs for previous 7 days
-            punch_logs = db.query(PunchLog).filter(
-                and_(
-                    PunchLog.employee_id == employee.empid,
-                    PunchLog.date >= start_date,
-                    PunchLog.date <= end_date
-                )
-            ).order_by(PunchLog.date, PunchLog.punch_time).all()
+                # Organize punch logs by date
+                punch_logs_by_date = {}
+                for log in punch_logs:
+                    date_str = log.date.isoformat()
+                    if date_str not in punch_logs_by_date:
+                        punch_logs_by_date[date_str] = []
+                    punch_logs_by_date[date_str].append(log)
             
-            # Organize punch logs by date
-            punch_logs_by_date = {}
-            for log in punch_logs:
-                date_str = log.date.isoformat()
-                if date_str not in punch_logs_by_date:
-                    punch_logs_by_date[date_str] = []
-                punch_logs_by_date[date_str].append(log)
-            
-            # Build attendance data for each date
-            attendance_data = []
-            current_date = start_date
-            while current_date <= end_date:
-                date_str = current_date.isoformat()
-                status = "Abs"
-                in_time = "00:00"
-                out_time = "00:00"
-                hours = 0.0
-                
-                # Priority: 1. Leaves > 2. Week-offs > 3. Holidays > 4. Punch logs
-                if date_str in leave_map:
-                    # Leave (highest priority)
-                    status = leave_map[date_str]
-                    in_time = "00:00"
-                    out_time = "00:00"
-                    hours = 0.0
-                elif date_str in week_off_dates:
-                    # Week-off
-                    status = "WO"
-                    in_time = "00:00"
-                    out_time = "00:00"
-                    hours = 0.0
-                elif date_str in holiday_dates:
-                    # Holiday
-                    status = "Holiday"
+            with timer.phase("build"):
+                # Build attendance data for each date
+                attendance_data = []
+                current_date = start_date
+                while current_date <= end_date:
+                    date_str = current_date.isoformat()
+                    status = "Abs"
                     in_time = "00:00"
                     out_time = "00:00"
                     hours = 0.0
-                elif date_str in punch_logs_by_date:
-                    # Calculate from punch logs
-                    logs = punch_logs_by_date[date_str]
-                    if logs:
-                        # Get all punch times (ignore punch_type, use min/max)
-                        punch_times = [log.punch_time for log in logs]
-                        min_time = min(punch_times)
-                        max_time = max(punch_times)
+                
+                    # Priority: 1. Leaves > 2. Week-offs > 3. Holidays > 4. Punch logs
+                    if date_str in leave_map:
+                        # Leave (highest priority)
+                        status = leave_map[date_str]
+                        in_time = "00:00"
+                        out_time = "00:00"
+                        hours = 0.0
+                    elif date_str in week_off_dates:
+                        # Week-off
+                        status = "WO"
+                        in_time = "00:00"
+                        out_time = "00:00"
+                        hours = 0.0
+                    elif date_str in holiday_dates:
+                        # Holiday
+                        status = "Holiday"
+                        in_time = "00:00"
+                        out_time = "00:00"
+                        hours = 0.0
+                    elif date_str in punch_logs_by_date:
+                        # Calculate from punch logs
+                        logs = punch_logs_by_date[date_str]
+                        if logs:
+                            # Get all punch times (ignore punch_type, use min/max)
+                            punch_times = [log.punch_time for log in logs]
+                            min_time = min(punch_times)
+                            max_time = max(punch_times)
                         
-                        # Calculate hours
-                        delta = max_time - min_time
-                        hours = delta.total_seconds() / 3600.0
+                            # Calculate hours
+                            delta = max_time - min_time
+                            hours = delta.total_seconds() / 3600.0
                         
-                        # Format times
-                        in_time = min_time.strftime('%H:%M')
-                        out_time = max_time.strftime('%H:%M')
+                            # Format times
+                            in_time = min_time.strftime('%H:%M')
+                            out_time = max_time.strftime('%H:%M')
                         
-                        # Calculate status based on hours
-                        if hours >= 9.0:
-                            status = "P"
-                        elif hours >= 4.5:  # 4:30 to 8:59
-                            status = "H/D"
-                        else:  # Below 4:29
+                            # Calculate status based on hours
+                            if hours >= 9.0:
+                                status = "P"
+                            elif hours >= 4.5:  # 4:30 to 8:59
+                                status = "H/D"
+                            else:  # Below 4:29
+                                status = "Abs"
+                        else:
                             status = "Abs"
+                            in_time = "00:00"
+                            out_time = "00:00"
+                            hours = 0.0
                     else:
+                        # No data - absent
                         status = "Abs"
                         in_time = "00:00"
                         out_time = "00:00"
                         hours = 0.0
-                else:
-                    # No data - absent
-                    status = "Abs"
-                    in_time = "00:00"
-                    out_time = "00:00"
-                    hours = 0.0
                 
-                attendance_data.append({
-                    'date': date_str,
-                    'status': status,
-                    'in_time': in_time,
-                    'out_time': out_time,
-                    'hours': round(hours, 2)
-                })
+                    attendance_data.append({
+                        'date': date_str,
+                        'status': status,
+                        'in_time': in_time,
+                        'out_time': out_time,
+                        'hours': round(hours, 2)
+                    })
                 
-                current_date += timedelta(days=1)
+                    current_date += timedelta(days=1)
             
             # Send email
-            try:
-                send_weekly_attendance_email(
-                    employee_email=employee.email,
-                    employee_name=employee.name,
-                    attendance_data=attendance_data
-                )
-                print(f"Weekly attendance email sent to {employee.name} ({employee.email})")
-            except Exception as e:
-                print(f"Error sending weekly attendance email to {employee.email}: {str(e)}")
+            with timer.phase("send"):
+                try:
+                    send_weekly_attendance_email(
+                        employee_email=employee.email,
+                        employee_name=employee.name,
+                        attendance_data=attendance_data
+                    )
+                    sent += 1
+                    log_event(logger, logging.DEBUG, "email.weekly_attendance.sent", empid=employee.empid)
+                except Exception as e:
+                    failed += 1
+                    log_event(logger, logging.WARNING, "email.weekly_attendance.failed", empid=employee.empid, error=str(e))
+        timer.log_summary(logger, "email.weekly_attendance.done", sent=sent, failed=failed)
     
     except Exception as e:
-        print(f"Error in check_and_send_weekly_attendance_emails: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log_event(logger, logging.ERROR, "email.weekly_attendance.run_failed", exc_info=True, error=str(e))
     finally:
         db.close()
 
@@ -447,7 +432,11 @@ def start_email_scheduler():
     """Start the email scheduler in a background thread"""
     try:
         # Schedule to run every minute
-        schedule.every(1).minutes.do(run_email_checks)
+        # (each job is timed for /metrics: scheduler_job_duration_seconds{job=...})
+        schedule.every(1).minutes.do(time_job("email_checks", run_email_checks))
+        # Recompute project rollups daily (corrects drift, rolls overdue counts forward)
+        schedule.every().day.at("00:05").do(time_job("project_rollup_reconciliation", run_project_rollup_reconciliation))
+        schedule.every().day.at("00:10").do(time_job("rating_summary_reconciliation", run_rating_summary_reconciliation))
         
         def scheduler_loop():
             while True:
@@ -455,17 +444,13 @@ def start_email_scheduler():
                     schedule.run_pending()
                     time.sleep(1)
                 except Exception as e:
-                    print(f"Error in scheduler loop: {str(e)}")
-                    import traceback
-                    traceback.print_exc()
+                    log_event(logger, logging.ERROR, "email_scheduler.loop_failed", exc_info=True, error=str(e))
                     time.sleep(60)  # Wait a minute before retrying
         
         # Start scheduler in a daemon thread
         scheduler_thread = threading.Thread(target=scheduler_loop, daemon=True)
         scheduler_thread.start()
-        print("Email scheduler started successfully")
+        log_event(logger, logging.INFO, "email_scheduler.started")
     except Exception as e:
-        print(f"Error starting email scheduler: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log_event(logger, logging.ERROR, "email_scheduler.start_failed", exc_info=True, error=str(e))
 
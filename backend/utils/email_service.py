@@ -5,6 +5,8 @@ All emails must go through this service only.
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from email.mime.base import MIMEBase
+from email import encoders
 from typing import Optional, List
 import re
 
@@ -1285,3 +1287,187 @@ def send_forgot_password_email(
     
     return send_email(to_email, subject, "", html_body)
 
+
+def build_payslip_email(
+    to_email: str,
+    subject: str,
+    message: str,
+    payslip: dict,
+    pdf_bytes: bytes,
+    filename: str
+) -> MIMEMultipart:
+    """
+    Build the payslip notification email with the PDF attached.
+    
+    Args:
+        payslip: Payslip snapshot (full_name, emp_id, net_salary, month, year)
+        pdf_bytes: Rendered payslip PDF
+        filename: Attachment filename
+    """
+    # Create email message
+    msg = MIMEMultipart('alternative')
+    msg['From'] = EMAIL_FROM
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    
+    # Create HTML email body
+    months = ['', 'January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October', 'November', 'December']
+    month = payslip['month']
+    year = payslip['year']
+    month_name = months[month] if month and month <= 12 else ''
+    
+    html_body = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <style>
+            body {{
+                font-family: Arial, sans-serif;
+                line-height: 1.6;
+                color: #333;
+                max-width: 600px;
+                margin: 0 auto;
+                padding: 20px;
+                background-color: #f4f4f4;
+            }}
+            .email-container {{
+                background: white;
+                border-radius: 10px;
+                padding: 30px;
+                box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+            }}
+            .header {{
+                text-align: center;
+                padding-bottom: 20px;
+                border-bottom: 2px solid #007bff;
+                margin-bottom: 30px;
+            }}
+            .header h1 {{
+                color: #007bff;
+                margin: 0;
+                font-size: 24px;
+            }}
+            .content {{
+                margin-bottom: 30px;
+            }}
+            .content p {{
+                margin: 15px 0;
+                font-size: 16px;
+            }}
+            .payslip-info {{
+                background: #f8f9fa;
+                padding: 20px;
+                border-radius: 8px;
+                margin: 20px 0;
+            }}
+            .payslip-info p {{
+                margin: 8px 0;
+                font-size: 14px;
+            }}
+            .footer {{
+                text-align: center;
+                padding-top: 20px;
+                border-top: 1px solid #ddd;
+                margin-top: 30px;
+                color: #666;
+                font-size: 12px;
+            }}
+            .button {{
+                display: inline-block;
+                padding: 12px 30px;
+                background-color: #007bff;
+                color: white;
+                text-decoration: none;
+                border-radius: 5px;
+                margin: 20px 0;
+            }}
+        </style>
+    </head>
+    <body>
+        <div class="email-container">
+            <div class="header">
+                <h1>📄 Payslip Notification</h1>
+            </div>
+            <div class="content">
+                <p>{message.replace(chr(10), '<br>')}</p>
+                <div class="payslip-info">
+                    <p><strong>Employee Name:</strong> {payslip['full_name'] or 'N/A'}</p>
+                    <p><strong>Employee ID:</strong> {payslip['emp_id'] or 'N/A'}</p>
+                    <p><strong>Month:</strong> {month_name} {year}</p>
+                    <p><strong>Net Salary:</strong> ₹{float(payslip['net_salary'] or 0):.2f}</p>
+                </div>
+                <p>Please find your payslip attached to this email in PDF format.</p>
+            </div>
+            <div class="footer">
+                <p><strong>Brihaspathi Technologies Limited</strong></p>
+                <p>This is an automated email. Please do not reply to this email.</p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+    
+    # Plain text version
+    text_body = f"""
+{message}
+
+Employee Name: {payslip['full_name'] or 'N/A'}
+Employee ID: {payslip['emp_id'] or 'N/A'}
+Month: {month_name} {year}
+Net Salary: ₹{float(payslip['net_salary'] or 0):.2f}
+
+Please find your payslip attached to this email in PDF format.
+
+Best regards,
+Brihaspathi Technologies Limited
+    """
+    
+    # Attach both versions
+    part1 = MIMEText(text_body, 'plain')
+    part2 = MIMEText(html_body, 'html')
+    msg.attach(part1)
+    msg.attach(part2)
+    
+    # Attach PDF
+    attachment = MIMEBase('application', 'octet-stream')
+    attachment.set_payload(pdf_bytes)
+    encoders.encode_base64(attachment)
+    attachment.add_header('Content-Disposition', f'attachment; filename={filename}')
+    msg.attach(attachment)
+    
+    return msg
+
+
+class SMTPSession:
+    """
+    Reusable SMTP connection for sending many emails (e.g. bulk payslips).
+    Connects lazily, reconnects once if the server dropped the session.
+    """
+    
+    def __init__(self):
+        self._server = None
+    
+    def _connect(self):
+        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=30)
+        server.starttls()
+        server.login(EMAIL_FROM, EMAIL_PASSWORD)
+        self._server = server
+    
+    def send_message(self, msg, to_email: str):
+        if self._server is None:
+            self._connect()
+        try:
+            self._server.sendmail(EMAIL_FROM, to_email, msg.as_string())
+        except smtplib.SMTPServerDisconnected:
+            self._connect()
+            self._server.sendmail(EMAIL_FROM, to_email, msg.as_string())
+    
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+            self._server = None
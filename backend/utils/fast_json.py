@@ -0,0 +1,143 @@
+"""
+Fast JSON
+orjson-backed responses and negotiated compression for the API.
+- ORJSONResponse is the app's default_response_class: whatever a route
+  returns (after FastAPI's validation / jsonable_encoder) is rendered by
+  orjson instead of json.dumps
+- fast_json_response(rows) is the fast path for large list endpoints: the
+  route builds slim dict rows from a column projection and returns them as-is,
+  skipping response_model validation and jsonable_encoder. orjson serialises
+  datetime / date / UUID natively; Decimal follows jsonable_encoder (int when
+  whole, float otherwise) unless the route converts it first
+- CompressionMiddleware (pure ASGI) compresses text and JSON responses of
+  RESPONSE_COMPRESSION_MIN_BYTES or more with brotli or gzip, whichever the
+  client accepts (brotli preferred); streamed responses pass through untouched
+"""
+import gzip
+from decimal import Decimal
+import brotli
+import orjson
+from starlette.responses import JSONResponse
+from config import settings
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4  # dynamic responses: close to gzip -6 speed, smaller output
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class ORJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def fast_json_response(content, status_code: int = 200) -> ORJSONResponse:
+    """Return pre-shaped rows without response_model validation (the route owns the output shape)"""
+    return ORJSONResponse(content, status_code=status_code)
+
+
+def choose_encoding(accept_encoding: str):
+    """Pick br, gzip or None from an Accept-Encoding header (q=0 means refused)"""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip()] = quality
+    for encoding in ("br", "gzip"):
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing complete (non-streamed) responses above the size threshold"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                headers = {name.lower(): value for name, value in message.get("headers", [])}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                if b"content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            if start_message is not None:
+                start, start_message = start_message, None
+                body = message.get("body", b"")
+                if message.get("more_body", False) or len(body) < settings.RESPONSE_COMPRESSION_MIN_BYTES:
+                    # Streamed or small: send as is
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                body = compress(body, encoding)
+                vary = [value for name, value in start.get("headers", []) if name.lower() == b"vary"]
+                headers = [
+                    (name, value) for name, value in start.get("headers", [])
+                    if name.lower() not in (b"content-length", b"vary")
+                ]
+                headers += [
+                    (b"content-encoding", encoding.encode()),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"vary", b", ".join(vary + [b"Accept-Encoding"])),
+                ]
+                await send({**start, "headers": headers})
+                await send({"type": "http.response.body", "body": body, "more_body": False})
+                return
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
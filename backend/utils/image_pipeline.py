@@ -0,0 +1,169 @@
+"""
+Image pipeline for uploaded images (visitor selfies)
+- Chunked streaming upload to disk with size and type limits enforced while streaming
+- Base64 data URL decoding with the same limits
+- Compressed thumbnail / preview variants generated off the request (background task);
+  Pillow is imported there, not at module import, to keep app start-up light
+"""
+import os
+import base64
+import binascii
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+import aiofiles
+
+# Limits
+MAX_IMAGE_BYTES = 10 * 1024 * 1024  # 10 MB
+UPLOAD_CHUNK_SIZE = 64 * 1024  # 64 KB
+
+# Variant name -> max (width, height); variants are always saved as JPEG
+IMAGE_VARIANTS = {
+    "thumb": (160, 160),
+    "preview": (640, 640),
+}
+VARIANT_JPEG_QUALITY = 75
+
+
+class ImageValidationError(ValueError):
+    """Raised when an uploaded image is too large or not an allowed image type"""
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def detect_image_extension(header: bytes) -> Optional[str]:
+    """Detect image type from the leading bytes, return file extension or None"""
+    if header.startswith(b'\xff\xd8\xff'):
+        return '.jpg'
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        return '.png'
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return '.webp'
+    if header[:6] in (b'GIF87a', b'GIF89a'):
+        return '.gif'
+    return None
+
+
+def generate_image_filename(extension: str) -> str:
+    """Generate a unique timestamp based filename"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    return f"{timestamp}{extension}"
+
+
+async def save_upload_stream(upload, directory: Path, max_bytes: int = MAX_IMAGE_BYTES) -> Path:
+    """
+    Stream an UploadFile to disk in chunks without holding it in memory.
+
+    The image type is sniffed from the first chunk and the size limit is checked
+    as chunks arrive, so an oversized or non-image upload is rejected early.
+    The file is written to a temporary .part file and renamed once complete.
+
+    Returns:
+        Path: Path of the saved image
+    """
+    first_chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+    if not first_chunk:
+        raise ImageValidationError("Uploaded file is empty")
+
+    extension = detect_image_extension(first_chunk)
+    if not extension:
+        raise ImageValidationError("Only JPEG, PNG, WEBP or GIF images are allowed")
+
+    file_path = directory / generate_image_filename(extension)
+    temp_path = file_path.with_suffix(file_path.suffix + '.part')
+    total_bytes = 0
+
+    try:
+        async with aiofiles.open(temp_path, 'wb') as buffer:
+            chunk = first_chunk
+            while chunk:
+                total_bytes += len(chunk)
+                if total_bytes > max_bytes:
+                    raise ImageValidationError(
+                        f"Image exceeds the maximum size of {max_bytes // (1024 * 1024)} MB",
+                        status_code=413
+                    )
+                await buffer.write(chunk)
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+        os.replace(temp_path, file_path)
+    except Exception:
+        if temp_path.exists():
+            temp_path.unlink()
+        raise
+
+    return file_path
+
+
+def save_base64_image(data: str, directory: Path, max_bytes: int = MAX_IMAGE_BYTES) -> Path:
+    """
+    Decode a base64 image (optionally a data:image/...;base64, URL) and save it to disk.
+
+    The encoded length is checked before decoding so oversized payloads are
+    rejected without allocating the decoded buffer.
+
+    Returns:
+        Path: Path of the saved image
+    """
+    encoded = data.split(',', 1)[1] if data.startswith('data:') else data
+
+    # Decoded size is ~3/4 of the encoded size
+    if (len(encoded) * 3) // 4 > max_bytes:
+        raise ImageValidationError(
+            f"Image exceeds the maximum size of {max_bytes // (1024 * 1024)} MB",
+            status_code=413
+        )
+
+    try:
+        decoded = base64.b64decode(encoded)
+    except (binascii.Error, ValueError):
+        raise ImageValidationError("Invalid base64 image data")
+
+    extension = detect_image_extension(decoded[:16])
+    if not extension:
+        raise ImageValidationError("Only JPEG, PNG, WEBP or GIF images are allowed")
+
+    file_path = directory / generate_image_filename(extension)
+    with open(file_path, 'wb') as buffer:
+        buffer.write(decoded)
+
+    return file_path
+
+
+def get_variant_path(image_path: Path, variant: str) -> Path:
+    """Get the path of a variant (thumb/preview) for an original image path"""
+    return image_path.with_name(f"{image_path.stem}_{variant}.jpg")
+
+
+def generate_image_variants(image_path: Path) -> dict:
+    """
+    Generate compressed JPEG variants (thumb, preview) next to the original image.
+    Intended to run as a background task after the upload has been saved.
+
+    Returns:
+        dict: variant name -> Path for each variant that was generated
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        # Pillow is optional - without it variants are skipped and the full image is used
+        print("Pillow not installed - skipping image variant generation")
+        return {}
+
+    variants = {}
+    try:
+        with Image.open(image_path) as original:
+            original = ImageOps.exif_transpose(original)
+            if original.mode != 'RGB':
+                original = original.convert('RGB')
+
+            for variant, size in IMAGE_VARIANTS.items():
+                resized = original.copy()
+                resized.thumbnail(size)
+                variant_path = get_variant_path(image_path, variant)
+                resized.save(variant_path, 'JPEG', quality=VARIANT_JPEG_QUALITY, optimize=True)
+                variants[variant] = variant_path
+    except Exception as e:
+        print(f"Error generating image variants for {image_path}: {str(e)}")
+
+    return variants
@@ -0,0 +1,286 @@
+"""
+Leave Ledger
+- leave_ledger: append-only record of every balance movement (opening
+  allocation, comp-off credit, consumption when a leave is approved, reversal
+  when an approved leave is rejected/cancelled)
+- leave_month_balances: running snapshot per employee, leave type, year and
+  month (credited, carried in from earlier months, used, pending, used so far
+  in the year), maintained in the same transaction as the leave change
+- leave_balance_list used/balance columns are kept in step with the ledger
+
+Balance reads are a single snapshot lookup instead of reloading the year's
+leaves. Snapshots for an employee/year are built from the leaves table the
+first time they are needed (and rebuilt after leave balance generation).
+"""
+from decimal import Decimal
+from sqlalchemy import func, extract
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
+from models import Leave, LeaveBalanceList, LeaveLedgerEntry, LeaveMonthBalance, User
+from utils import get_ist_now
+
+# Leave type spellings used across the app -> ledger leave type
+LEAVE_TYPE_ALIASES = {
+    "casual": "casual",
+    "sick": "sick",
+    "comp-off": "comp_off",
+    "comp_off": "comp_off",
+    "compensatory": "comp_off",
+}
+TRACKED_LEAVE_TYPES = ("casual", "sick", "comp_off")
+# Unused monthly credit is carried forward for these types only in the balance
+# shown to the employee; a new leave application carries casual and sick credit
+# forward alike (see application_balance)
+CARRY_FORWARD_TYPES = ("casual",)
+# Default yearly allocation when the leave_balance_list total is empty
+DEFAULT_YEARLY_ALLOCATION = {"casual": Decimal("12"), "sick": Decimal("12"), "comp_off": Decimal("0")}
+BALANCE_COLUMNS = {
+    "casual": ("total_casual_leaves", "used_casual_leaves", "balance_casual_leaves"),
+    "sick": ("total_sick_leaves", "used_sick_leaves", "balance_sick_leaves"),
+    "comp_off": ("total_comp_off_leaves", "used_comp_off_leaves", "balance_comp_off_leaves"),
+}
+ZERO = Decimal("0")
+
+
+def normalize_leave_type(leave_type: str):
+    """Ledger leave type for a leave's leave_type, or None if it has no balance"""
+    if not leave_type:
+        return None
+    return LEAVE_TYPE_ALIASES.get(leave_type.strip().lower())
+
+
+def leave_days(leave: Leave) -> Decimal:
+    """Days a leave counts against the balance (calendar days, attributed to the from_date month)"""
+    return Decimal((leave.to_date - leave.from_date).days + 1)
+
+
+def balance_list_empid(user):
+    """leave_balance_list stores numeric empids as integers, other employees under their user id"""
+    try:
+        return int(user.empid) if user.empid and str(user.empid).isdigit() else user.id
+    except (TypeError, ValueError):
+        return user.id
+
+
+def get_balance_list_row(db: Session, user, year: int, for_update: bool = False):
+    """leave_balance_list row of a user (anything with empid and id) for a year"""
+    query = db.query(LeaveBalanceList).filter(
+        LeaveBalanceList.empid == balance_list_empid(user),
+        LeaveBalanceList.year == year
+    )
+    if for_update:
+        query = query.with_for_update()
+    return query.first()
+
+
+def _balance_list_row_for_empid(db: Session, empid: str, year: int, for_update: bool = False):
+    """leave_balance_list row for a Leave.empid (the user is looked up for non-numeric empids)"""
+    user = db.query(User.id, User.empid).filter(User.empid == str(empid)).first()
+    if user is None:
+        return None
+    return get_balance_list_row(db, user, year, for_update=for_update)
+
+
+def _monthly_credit(balance_row, leave_type: str) -> Decimal:
+    if balance_row is None or leave_type not in ("casual", "sick"):
+        return ZERO
+    total = getattr(balance_row, BALANCE_COLUMNS[leave_type][0])
+    total = Decimal(str(total)) if total else DEFAULT_YEARLY_ALLOCATION[leave_type]
+    return total / 12
+
+
+def _recompute(rows: list, leave_type: str):
+    """Recompute carry_in and year_used across the 12 month rows of one leave type"""
+    carry = ZERO
+    year_used = sum((row.used or ZERO) for row in rows)
+    for row in sorted(rows, key=lambda r: r.month):
+        row.carry_in = carry if leave_type in CARRY_FORWARD_TYPES else ZERO
+        row.year_used = year_used
+        carry += max(ZERO, (row.credited or ZERO) - (row.used or ZERO))
+        row.updated_at = get_ist_now()
+
+
+def ensure_month_balances(db: Session, empid: str, year: int, exclude_leave_id: int = None) -> bool:
+    """
+    Build the month snapshots of an employee/year from the leaves table if missing.
+
+    Args:
+        exclude_leave_id: Leave being changed by the caller - left out so the
+            caller can apply its new state on top
+
+    Returns:
+        bool: True if the snapshots were built by this call
+    """
+    exists = db.query(LeaveMonthBalance.month).filter(
+        LeaveMonthBalance.empid == empid,
+        LeaveMonthBalance.year == year
+    ).first()
+    if exists:
+        return False
+
+    balance_row = _balance_list_row_for_empid(db, empid, year)
+
+    # Approved/pending days per type and month in one grouped query
+    month_expr = extract('month', Leave.from_date)
+    query = db.query(
+        Leave.leave_type,
+        Leave.status,
+        month_expr,
+        func.sum(Leave.to_date - Leave.from_date + 1).label("days")
+    ).filter(
+        Leave.empid == empid,
+        Leave.status.in_(['approved', 'pending']),
+        extract('year', Leave.from_date) == year
+    )
+    if exclude_leave_id is not None:
+        query = query.filter(Leave.id != exclude_leave_id)
+    usage = {}
+    for leave_type, status, month, days in query.group_by(Leave.leave_type, Leave.status, month_expr).all():
+        ledger_type = normalize_leave_type(leave_type)
+        if ledger_type:
+            key = (ledger_type, int(month), status)
+            usage[key] = usage.get(key, ZERO) + Decimal(days or 0)
+
+    values = []
+    for leave_type in TRACKED_LEAVE_TYPES:
+        credited = _monthly_credit(balance_row, leave_type)
+        carry = ZERO
+        year_used = sum(usage.get((leave_type, month, 'approved'), ZERO) for month in range(1, 13))
+        for month in range(1, 13):
+            used = usage.get((leave_type, month, 'approved'), ZERO)
+            values.append({
+                "empid": empid,
+                "leave_type": leave_type,
+                "year": year,
+                "month": month,
+                "credited": credited,
+                "carry_in": carry if leave_type in CARRY_FORWARD_TYPES else ZERO,
+                "used": used,
+                "pending": usage.get((leave_type, month, 'pending'), ZERO),
+                "year_used": year_used,
+                "updated_at": get_ist_now()
+            })
+            carry += max(ZERO, credited - used)
+
+    db.execute(insert(LeaveMonthBalance).values(values).on_conflict_do_nothing())
+    return True
+
+
+def get_month_balances(db: Session, empid: str, year: int, month: int) -> dict:
+    """
+    Snapshot rows of all tracked leave types for one month (leave_type -> row).
+    Missing snapshots are built in the caller's transaction (caller commits).
+    """
+    rows = db.query(LeaveMonthBalance).filter(
+        LeaveMonthBalance.empid == empid,
+        LeaveMonthBalance.year == year,
+        LeaveMonthBalance.month == month
+    ).all()
+    if not rows and ensure_month_balances(db, empid, year):
+        return get_month_balances(db, empid, year, month)
+    return {row.leave_type: row for row in rows}
+
+
+def application_balance(db: Session, empid: str, year: int, month: int, leave_type: str) -> tuple:
+    """
+    Days a new casual/sick leave application may take this month: the month's
+    credit plus the unused credit of every earlier month of the year (carried
+    forward for sick leave too, unlike the /leaves/balance figure), less what
+    was used this month and what is pending.
+
+    Returns:
+        tuple: (available, max_available, pending) as floats, or None without snapshots
+    """
+    ensure_month_balances(db, empid, year)
+    rows = db.query(LeaveMonthBalance).filter(
+        LeaveMonthBalance.empid == empid,
+        LeaveMonthBalance.leave_type == leave_type,
+        LeaveMonthBalance.year == year,
+        LeaveMonthBalance.month <= month
+    ).all()
+    current = next((row for row in rows if row.month == month), None)
+    if current is None:
+        return None
+    carried = sum(
+        (max(ZERO, (row.credited or ZERO) - (row.used or ZERO)) for row in rows if row.month < month),
+        ZERO
+    )
+    max_available = current.credited + carried - current.used
+    return float(max(ZERO, max_available - current.pending)), float(max_available), float(current.pending)
+
+
+def available_this_month(row) -> float:
+    """Days still available in the snapshot's month (credit + carry - used - pending)"""
+    if row is None:
+        return 0
+    return float(max(ZERO, row.credited + row.carry_in - row.used - row.pending))
+
+
+def apply_leave_change(db: Session, leave: Leave, old_status: str = None, new_status: str = None, actor: str = None):
+    """
+    Apply a leave status change to the ledger and snapshots inside the caller's transaction.
+
+    Args:
+        old_status: Status before the change (None for a new leave)
+        new_status: Status after the change (None for a deleted leave)
+    """
+    leave_type = normalize_leave_type(leave.leave_type)
+    if not leave_type or not leave.from_date or not leave.to_date:
+        return
+
+    year = leave.from_date.year
+    month = leave.from_date.month
+    if ensure_month_balances(db, leave.empid, year, exclude_leave_id=leave.id):
+        old_status = None
+
+    days = leave_days(leave)
+    used_delta = days * ((new_status == 'approved') - (old_status == 'approved'))
+    pending_delta = days * ((new_status == 'pending') - (old_status == 'pending'))
+    if not used_delta and not pending_delta:
+        return
+
+    rows = db.query(LeaveMonthBalance).filter(
+        LeaveMonthBalance.empid == leave.empid,
+        LeaveMonthBalance.leave_type == leave_type,
+        LeaveMonthBalance.year == year
+    ).with_for_update().all()
+    for row in rows:
+        if row.month == month:
+            row.used = max(ZERO, (row.used or ZERO) + used_delta)
+            row.pending = max(ZERO, (row.pending or ZERO) + pending_delta)
+    _recompute(rows, leave_type)
+
+    if used_delta:
+        db.add(LeaveLedgerEntry(
+            empid=leave.empid,
+            leave_type=leave_type,
+            year=year,
+            month=month,
+            entry_type='consumption' if used_delta > 0 else 'reversal',
+            days=-used_delta,
+            leave_id=leave.id,
+            created_by=actor
+        ))
+        balance_row = _balance_list_row_for_empid(db, leave.empid, year, for_update=True)
+        if balance_row is not None:
+            _, used_column, balance_column = BALANCE_COLUMNS[leave_type]
+            used = Decimal(str(getattr(balance_row, used_column) or 0)) + used_delta
+            balance = Decimal(str(getattr(balance_row, balance_column) or 0)) - used_delta
+            setattr(balance_row, used_column, max(ZERO, used))
+            setattr(balance_row, balance_column, max(ZERO, balance))
+            balance_row.updated_by = actor or balance_row.updated_by
+            balance_row.updated_date = get_ist_now()
+
+
+def record_credit(db: Session, empid: str, leave_type: str, days, year: int, month: int, actor: str = None, note: str = None):
+    """Append a credit (e.g. comp-off earned) to the ledger"""
+    db.add(LeaveLedgerEntry(
+        empid=empid,
+        leave_type=leave_type,
+        year=year,
+        month=month,
+        entry_type='credit',
+        days=Decimal(str(days)),
+        note=note,
+        created_by=actor
+    ))
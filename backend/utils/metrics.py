@@ -0,0 +1,281 @@
+"""
+Metrics
+In-process metrics rendered in the Prometheus text exposition format (0.0.4)
+at GET /metrics (bearer METRICS_TOKEN, or loopback peers when no token is
+set) - no client library or external service involved.
+- Counter / Gauge / Histogram with labels, thread-safe, registered on the
+  shared `metrics` registry
+- MetricsMiddleware (pure ASGI) records per-route latency histograms,
+  status counters and in-flight requests (route = matched route template)
+- TimedQueuePool is the sync engine's pool class: it times every connection
+  checkout (pool wait) and counts waiters; pool size / checked-out / overflow
+  gauges are read from the engines at scrape time
+- Collectors registered with metrics.add_collector run at scrape time for
+  values that live elsewhere (queue depths, pool state)
+- time_job(name, func) wraps scheduler jobs with a duration histogram,
+  last-run timestamp and failure counter
+"""
+import math
+import threading
+import time
+from sqlalchemy.pool import QueuePool
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+JOB_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry["counts"][index] += 1
+                    break
+            entry["sum"] += value
+            entry["count"] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted((key, {**entry, "counts": list(entry["counts"])}) for key, entry in self._values.items())
+        for key, entry in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry["counts"]):
+                cumulative += count
+                labels = _format_labels(self.label_names, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {entry['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(entry['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {entry['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics plus scrape-time collectors"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labels: tuple = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: tuple = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def add_collector(self, collector):
+        """collector() runs before every scrape and sets gauges; errors are logged and skipped"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = list(self._metrics.values())
+        for collector in collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"Error in metrics collector {getattr(collector, '__name__', collector)}: {str(e)}")
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Shared registry
+metrics = MetricsRegistry()
+
+http_requests_total = metrics.counter(
+    "http_requests_total", "HTTP requests by method, route template and status code", ("method", "route", "status")
+)
+http_request_duration_seconds = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by method and route template", ("method", "route")
+)
+http_requests_in_progress = metrics.gauge(
+    "http_requests_in_progress", "HTTP requests currently being handled"
+)
+db_pool_checkout_wait_seconds = metrics.histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a connection from the sync engine pool", (),
+    (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+)
+db_pool_waiting = metrics.gauge(
+    "db_pool_waiting", "Threads currently waiting for a connection from the sync engine pool"
+)
+db_pool_size = metrics.gauge("db_pool_size", "Configured pool size", ("engine",))
+db_pool_checked_out = metrics.gauge("db_pool_checked_out", "Connections currently checked out", ("engine",))
+db_pool_checked_in = metrics.gauge("db_pool_checked_in", "Idle connections in the pool", ("engine",))
+db_pool_overflow = metrics.gauge("db_pool_overflow", "Connections open beyond pool_size (negative when below)", ("engine",))
+scheduler_job_duration_seconds = metrics.histogram(
+    "scheduler_job_duration_seconds", "Scheduled job run time", ("job",), JOB_BUCKETS
+)
+scheduler_job_last_run_timestamp = metrics.gauge(
+    "scheduler_job_last_run_timestamp_seconds", "Unix time the job last finished", ("job",)
+)
+scheduler_job_failures_total = metrics.counter(
+    "scheduler_job_failures_total", "Scheduled job runs that raised", ("job",)
+)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waits for a connection"""
+
+    def _do_get(self):
+        db_pool_waiting.inc()
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_waiting.dec()
+            db_pool_checkout_wait_seconds.observe(time.perf_counter() - started)
+
+
+def add_pool_collector(label: str, engine):
+    """Report pool size / checked-out / checked-in / overflow for an engine (AsyncEngine -> sync_engine)"""
+    pool = getattr(engine, "sync_engine", engine).pool
+
+    def collect_pool():
+        if not hasattr(pool, "checkedout"):
+            return
+        db_pool_size.set(pool.size(), engine=label)
+        db_pool_checked_out.set(pool.checkedout(), engine=label)
+        db_pool_checked_in.set(pool.checkedin(), engine=label)
+        db_pool_overflow.set(pool.overflow(), engine=label)
+
+    metrics.add_collector(collect_pool)
+
+
+def time_job(name: str, func):
+    """Wrap a scheduled job so each run is timed; exceptions are counted and re-raised"""
+    def run(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            scheduler_job_failures_total.inc(job=name)
+            raise
+        finally:
+            scheduler_job_duration_seconds.observe(time.perf_counter() - started, job=name)
+            scheduler_job_last_run_timestamp.set(time.time(), job=name)
+    run.__name__ = getattr(func, "__name__", name)
+    return run
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, status and in-flight HTTP requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+        http_requests_in_progress.inc()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_progress.dec()
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            method = scope.get("method", "")
+            http_request_duration_seconds.observe(time.perf_counter() - started, method=method, route=route)
+            http_requests_total.inc(method=method, route=route, status=status_code)
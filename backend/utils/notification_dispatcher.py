@@ -0,0 +1,57 @@
+"""
+Notification Dispatcher
+Runs notification fan-out (emails, queued WhatsApp messages, in-app logs) on
+background thread pools so request handlers return immediately.
+- Job pool: whole fan-out jobs submitted by request handlers
+- Send pool: individual sends within a job, run concurrently
+- Work waiting in each pool is exported as notification_queue_depth on /metrics
+"""
+from concurrent.futures import ThreadPoolExecutor
+from utils.metrics import metrics
+
+JOB_MAX_WORKERS = 2
+SEND_MAX_WORKERS = 8
+
+_job_executor = ThreadPoolExecutor(max_workers=JOB_MAX_WORKERS, thread_name_prefix="notify-job")
+_send_executor = ThreadPoolExecutor(max_workers=SEND_MAX_WORKERS, thread_name_prefix="notify-send")
+
+
+def _run_logged(func, *args, **kwargs):
+    try:
+        return func(*args, **kwargs)
+    except Exception as e:
+        print(f"Error in notification job {getattr(func, '__name__', func)}: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+
+def submit_notification_job(func, *args, **kwargs):
+    """Run a fan-out job in the background; errors are logged, never raised"""
+    return _job_executor.submit(_run_logged, func, *args, **kwargs)
+
+
+def send_concurrently(func, kwargs_list: list) -> list:
+    """
+    Call func(**kwargs) for every entry concurrently on the send pool.
+
+    Returns:
+        list: Results in input order (None for sends that raised)
+    """
+    if not kwargs_list:
+        return []
+    futures = [_send_executor.submit(_run_logged, func, **kwargs) for kwargs in kwargs_list]
+    return [future.result() for future in futures]
+
+
+notification_queue_depth = metrics.gauge(
+    "notification_queue_depth", "Notification jobs / sends waiting for a worker thread", ("pool",)
+)
+
+
+def _collect_queue_depth():
+    notification_queue_depth.set(_job_executor._work_queue.qsize(), pool="job")
+    notification_queue_depth.set(_send_executor._work_queue.qsize(), pool="send")
+
+
+metrics.add_collector(_collect_queue_depth)
@@ -1,5 +1,4 @@
 """Notification utilities for WhatsApp and Email"""
-import requests
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -16,7 +15,7 @@ SMTP_SERVER = "smtp.gmail.com"
 SMTP_PORT = 587
 
 def send_whatsapp_notification(employee_name: str, visitor_name: str, purpose: str, phone: str):
-    """Send WhatsApp notification to employee about visitor"""
+    """Queue WhatsApp notification to employee about visitor (sent by the WhatsApp dispatcher)"""
     try:
         # Format phone number (remove + and spaces)
         phone_clean = phone.replace("+", "").replace(" ", "").replace("-", "")
@@ -31,21 +30,15 @@ def send_whatsapp_notification(employee_name: str, visitor_name: str, purpose: s
             ]
         }
         
-        headers = {
-            "Authorization": f"Bearer {WHATSAPP_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        response = requests.post(WHATSAPP_API_URL, json=payload, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            print(f"WhatsApp notification sent successfully to {phone}")
+        # Imported here - the dispatcher imports this module for the API key
+        from utils.whatsapp_dispatcher import enqueue_whatsapp_message
+        message_id = enqueue_whatsapp_message(payload, destination=phone_clean, context="vms")
+        if message_id:
+            print(f"WhatsApp notification queued for {phone} (message {message_id})")
             return True
-        else:
-            print(f"WhatsApp notification failed: {response.status_code} - {response.text}")
-            return False
+        return False
     except Exception as e:
-        print(f"Error sending WhatsApp notification: {str(e)}")
+        print(f"Error queueing WhatsApp notification: {str(e)}")
         return False
 
 def send_email_notification(
@@ -0,0 +1,86 @@
+"""
+Password Hasher
+- bcrypt verification and hashing run on a dedicated, bounded thread pool so
+  a burst of logins cannot starve the request threadpool used by every other
+  sync route (bcrypt releases the GIL, so threads hash in parallel)
+- verify_and_update also returns a new hash when the stored one uses a cost
+  other than BCRYPT_ROUNDS, so hashes migrate transparently on login
+- Unknown usernames are remembered for LOGIN_UNKNOWN_USER_CACHE_SECONDS so
+  repeated failed logins skip the database; user create/update clears it
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import settings
+from utils import pwd_context
+
+# Bound on remembered unknown usernames (oldest are dropped first)
+UNKNOWN_USER_CACHE_SIZE = 10000
+
+_executor = None
+_executor_lock = threading.Lock()
+_unknown_usernames = {}
+_unknown_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, settings.PASSWORD_HASH_WORKERS),
+                thread_name_prefix="password-hash"
+            )
+        return _executor
+
+
+def shutdown_hash_executor():
+    """Stop the hashing threads (call from app shutdown)"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple:
+    """
+    Verify a password on the hashing pool.
+
+    Returns:
+        tuple: (valid, new_hash) - new_hash is set when the stored hash should be replaced
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password on the hashing pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), pwd_context.hash, password)
+
+
+def is_known_unknown_username(username: str) -> bool:
+    """True if this username recently matched no user"""
+    with _unknown_lock:
+        expires_at = _unknown_usernames.get(username)
+        if expires_at is None:
+            return False
+        if expires_at < time.monotonic():
+            _unknown_usernames.pop(username, None)
+            return False
+        return True
+
+
+def remember_unknown_username(username: str):
+    with _unknown_lock:
+        if len(_unknown_usernames) >= UNKNOWN_USER_CACHE_SIZE:
+            _unknown_usernames.pop(next(iter(_unknown_usernames)))
+        _unknown_usernames[username] = time.monotonic() + settings.LOGIN_UNKNOWN_USER_CACHE_SECONDS
+
+
+def clear_unknown_usernames():
+    """Forget all unknown usernames (call when users are created or renamed)"""
+    with _unknown_lock:
+        _unknown_usernames.clear()
@@ -0,0 +1,504 @@
+"""
+Bulk Payslip Email Dispatcher
+- A bulk run is persisted as a payslip_email_batches row with one
+  payslip_email_deliveries row per employee, so progress and per-employee
+  failures can be queried live and a run interrupted by a restart is resumed
+  from its pending deliveries on startup
+- Every server worker looks for runs to resume on startup and then every
+  RESUME_POLL_SECONDS, so a run whose worker died (crash, deploy) is picked up
+  once its lease expires. A run is owned by one worker under a lease (renewed
+  each chunk; taken over only once it expires) and each
+  chunk of deliveries is claimed atomically (FOR UPDATE SKIP LOCKED) - no two
+  workers email the same payslip
+- Failed sends are retried with exponential backoff, up to the attempt limit
+- PDFs come from the payslip render cache (misses rendered in parallel per chunk)
+- Emails go out over a few long-lived SMTP sessions instead of one login per
+  email, throttled to the provider's send rate
+- Runs waiting in this process and pending deliveries are exported as
+  payslip_email_queue_depth on /metrics
+"""
+import os
+import time
+import queue
+import socket
+import threading
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import func, or_, and_, select, update, extract
+from sqlalchemy.orm import Session
+from config import settings
+from database import SessionLocal
+from models import PayslipData, PayslipEmailBatch, PayslipEmailDelivery, User
+from utils import get_ist_now
+from utils.email_service import build_payslip_email, SMTPSession
+from utils.payslip_renderer import render_payslips, payslip_filename
+from utils.user_lookup import resolve_users_by_empid
+from utils.metrics import metrics
+
+# Deliveries loaded, rendered and sent per round
+CHUNK_SIZE = 25
+# A run whose lease has not been renewed for this long is considered abandoned
+LEASE_SECONDS = 300
+# Retry delay after the first failed send, doubled per attempt up to the maximum
+RETRY_BACKOFF_SECONDS = 60
+RETRY_BACKOFF_MAX_SECONDS = 900
+# Longest wait between checks while only backed-off deliveries remain
+RETRY_POLL_SECONDS = 30
+# How often an idle dispatcher looks for queued runs and runs with an expired lease
+RESUME_POLL_SECONDS = 60
+# Returned by _prepare_chunk when the run has no pending deliveries left
+NOTHING_PENDING = object()
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class RateLimiter:
+    """Spaces calls evenly so no more than rate_per_minute happen per minute (thread-safe)"""
+
+    def __init__(self, rate_per_minute: int):
+        self.interval = 60.0 / max(rate_per_minute, 1)
+        self._next_allowed = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_allowed - now
+            self._next_allowed = max(now, self._next_allowed) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+def create_payslip_email_batch(
+    db: Session,
+    month: int,
+    year: int,
+    subject: str,
+    message: str,
+    company_id: int = None,
+    branch_id: int = None,
+    dept_id: int = None,
+    created_by: str = None
+) -> PayslipEmailBatch:
+    """
+    Create a bulk run for every frozen payslip matching the filters and queue it.
+    Employees without an email address are recorded as skipped.
+
+    Returns:
+        PayslipEmailBatch: The queued run, or None if no payslips match
+    """
+    query = db.query(PayslipData.payslip_id, PayslipData.emp_id, PayslipData.full_name).filter(
+        PayslipData.month == month,
+        PayslipData.year == year,
+        PayslipData.freaze_status == True
+    )
+    if company_id is not None:
+        query = query.filter(PayslipData.company_id == company_id)
+    if branch_id is not None:
+        query = query.filter(PayslipData.branch_id == branch_id)
+    if dept_id is not None:
+        query = query.filter(PayslipData.dept_id == dept_id)
+    payslips = query.order_by(PayslipData.emp_id).all()
+    if not payslips:
+        return None
+
+    users = resolve_users_by_empid(db, [payslip.emp_id for payslip in payslips], User.email)
+
+    batch = PayslipEmailBatch(
+        month=month,
+        year=year,
+        company_id=company_id,
+        branch_id=branch_id,
+        dept_id=dept_id,
+        subject=subject,
+        message=message,
+        status='queued',
+        total=len(payslips),
+        created_by=created_by
+    )
+    db.add(batch)
+    db.flush()
+
+    deliveries = []
+    for payslip in payslips:
+        user = users.get(str(payslip.emp_id))
+        email = user.email if user and user.email else None
+        deliveries.append(PayslipEmailDelivery(
+            batch_id=batch.id,
+            payslip_id=payslip.payslip_id,
+            emp_id=payslip.emp_id,
+            full_name=payslip.full_name,
+            to_email=email,
+            status='pending' if email else 'skipped',
+            last_error=None if email else "No email address on the employee record"
+        ))
+    batch.skipped_count = sum(1 for delivery in deliveries if delivery.status == 'skipped')
+    db.add_all(deliveries)
+    db.commit()
+    db.refresh(batch)
+
+    payslip_email_dispatcher.submit(batch.id)
+    return batch
+
+
+def get_batch_progress(db: Session, batch: PayslipEmailBatch) -> dict:
+    """Progress counters plus the per-employee failures of a run"""
+    failures = db.query(
+        PayslipEmailDelivery.emp_id,
+        PayslipEmailDelivery.full_name,
+        PayslipEmailDelivery.to_email,
+        PayslipEmailDelivery.status,
+        PayslipEmailDelivery.attempts,
+        PayslipEmailDelivery.last_error
+    ).filter(
+        PayslipEmailDelivery.batch_id == batch.id,
+        PayslipEmailDelivery.status.in_(['failed', 'skipped'])
+    ).order_by(PayslipEmailDelivery.emp_id).all()
+
+    processed = batch.sent_count + batch.failed_count + batch.skipped_count
+    return {
+        "batch_id": batch.id,
+        "month": batch.month,
+        "year": batch.year,
+        "company_id": batch.company_id,
+        "status": batch.status,
+        "total": batch.total,
+        "sent": batch.sent_count,
+        "failed": batch.failed_count,
+        "skipped": batch.skipped_count,
+        "pending": max(batch.total - processed, 0),
+        "percent_complete": round(processed / batch.total * 100, 2) if batch.total else 100,
+        "created_by": batch.created_by,
+        "created_at": batch.created_at.isoformat() if batch.created_at else None,
+        "completed_at": batch.completed_at.isoformat() if batch.completed_at else None,
+        "failures": [
+            {
+                "emp_id": failure.emp_id,
+                "full_name": failure.full_name,
+                "email": failure.to_email,
+                "status": failure.status,
+                "attempts": failure.attempts,
+                "error": failure.last_error
+            }
+            for failure in failures
+        ]
+    }
+
+
+class PayslipEmailDispatcher:
+    """Background thread working through queued bulk payslip email runs, one at a time"""
+
+    def __init__(
+        self,
+        concurrency: int = None,
+        rate_per_minute: int = None,
+        max_attempts: int = None,
+        poll_interval: float = RESUME_POLL_SECONDS
+    ):
+        self.concurrency = concurrency or settings.PAYSLIP_EMAIL_CONCURRENCY
+        self.poll_interval = poll_interval
+        self.rate_limiter = RateLimiter(rate_per_minute or settings.PAYSLIP_EMAIL_RATE_PER_MINUTE)
+        self.max_attempts = max_attempts or settings.PAYSLIP_EMAIL_MAX_ATTEMPTS
+        self._queue = queue.Queue()
+        self._queued_ids = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="payslip-email-dispatcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, batch_id: int) -> bool:
+        """Queue a run (ignored if it is already queued or being sent here); True if queued"""
+        with self._lock:
+            if batch_id in self._queued_ids:
+                return False
+            self._queued_ids.add(batch_id)
+        self._ensure_started()
+        self._queue.put(batch_id)
+        return True
+
+    def resume_pending_batches(self):
+        """
+        Queue queued runs and running runs whose lease has expired. Called on
+        startup (which also starts the dispatcher thread) and then by the
+        thread itself every poll_interval while idle.
+        """
+        self._ensure_started()
+        db = SessionLocal()
+        try:
+            batch_ids = [
+                batch_id for (batch_id,) in db.query(PayslipEmailBatch.id).filter(
+                    or_(
+                        PayslipEmailBatch.status == 'queued',
+                        and_(PayslipEmailBatch.status == 'running', self._lease_expired(get_ist_now()))
+                    )
+                ).order_by(PayslipEmailBatch.id).all()
+            ]
+        except Exception as e:
+            print(f"Error loading pending payslip email batches: {str(e)}")
+            return
+        finally:
+            db.close()
+        resumed = sum(1 for batch_id in batch_ids if self.submit(batch_id))
+        if resumed:
+            print(f"Resuming {resumed} payslip email batch(es)")
+
+    def _run(self):
+        while True:
+            try:
+                batch_id = self._queue.get(timeout=self.poll_interval)
+            except queue.Empty:
+                self.resume_pending_batches()
+                continue
+            try:
+                self.run_batch(batch_id)
+            except Exception as e:
+                print(f"Error in payslip email batch {batch_id}: {str(e)}")
+                import traceback
+                traceback.print_exc()
+            finally:
+                with self._lock:
+                    self._queued_ids.discard(batch_id)
+
+    def run_batch(self, batch_id: int):
+        """Send all pending deliveries of a run, chunk by chunk (if this worker gets the run's lease)"""
+        if not self._claim_batch(batch_id):
+            return
+
+        sessions = []
+        local = threading.local()
+
+        def get_session():
+            if not hasattr(local, "smtp"):
+                local.smtp = SMTPSession()
+                sessions.append(local.smtp)
+            return local.smtp
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="payslip-email") as pool:
+                while True:
+                    jobs = self._prepare_chunk(batch_id)
+                    if jobs is None:
+                        return  # Cancelled, or the lease went to another worker
+                    if jobs is NOTHING_PENDING:
+                        break
+                    if jobs:
+                        list(pool.map(lambda job: self._send(job, get_session), jobs))
+        finally:
+            for session in sessions:
+                session.close()
+
+        self._complete_batch(batch_id)
+
+    @staticmethod
+    def _lease_expired(now):
+        return or_(PayslipEmailBatch.lease_expires_at.is_(None), PayslipEmailBatch.lease_expires_at < now)
+
+    def _claim_batch(self, batch_id: int) -> bool:
+        """Take the run's lease: a queued run, one this worker holds, or one whose lease expired"""
+        db = SessionLocal()
+        try:
+            now = get_ist_now()
+            claimed = db.execute(
+                update(PayslipEmailBatch).where(
+                    PayslipEmailBatch.id == batch_id,
+                    or_(
+                        PayslipEmailBatch.status == 'queued',
+                        and_(
+                            PayslipEmailBatch.status == 'running',
+                            or_(PayslipEmailBatch.claimed_by == WORKER_ID, self._lease_expired(now))
+                        )
+                    )
+                ).values(
+                    status='running', claimed_by=WORKER_ID, lease_expires_at=now + timedelta(seconds=LEASE_SECONDS)
+                ).returning(PayslipEmailBatch.id).execution_options(synchronize_session=False)
+            ).first()
+            if claimed is None:
+                db.rollback()
+                return False
+            # Deliveries a previous owner claimed but never recorded go back to pending
+            db.execute(
+                update(PayslipEmailDelivery).where(
+                    PayslipEmailDelivery.batch_id == batch_id,
+                    PayslipEmailDelivery.status == 'sending'
+                ).values(status='pending', claimed_by=None, claimed_at=None).execution_options(synchronize_session=False)
+            )
+            db.commit()
+            return True
+        finally:
+            db.close()
+
+    def _complete_batch(self, batch_id: int):
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(PayslipEmailBatch).where(
+                    PayslipEmailBatch.id == batch_id,
+                    PayslipEmailBatch.status == 'running',
+                    PayslipEmailBatch.claimed_by == WORKER_ID
+                ).values(
+                    status='completed', completed_at=get_ist_now(), lease_expires_at=None
+                ).execution_options(synchronize_session=False)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _prepare_chunk(self, batch_id: int):
+        """
+        Renew the run's lease, claim the next due pending deliveries and render their PDFs.
+
+        Returns:
+            list of jobs (empty if the claimed payslips were all deleted or only
+            backed-off retries remain), NOTHING_PENDING when the run is done, or
+            None if the run was cancelled or its lease lost
+        """
+        wait = 0
+        db = SessionLocal()
+        try:
+            now = get_ist_now()
+            renewed = db.execute(
+                update(PayslipEmailBatch).where(
+                    PayslipEmailBatch.id == batch_id,
+                    PayslipEmailBatch.status == 'running',
+                    PayslipEmailBatch.claimed_by == WORKER_ID
+                ).values(
+                    lease_expires_at=now + timedelta(seconds=LEASE_SECONDS)
+                ).execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+            if not renewed:
+                return None
+            subject, message = db.query(PayslipEmailBatch.subject, PayslipEmailBatch.message).filter(
+                PayslipEmailBatch.id == batch_id
+            ).one()
+
+            due = select(PayslipEmailDelivery.id).where(
+                PayslipEmailDelivery.batch_id == batch_id,
+                PayslipEmailDelivery.status == 'pending',
+                or_(PayslipEmailDelivery.next_attempt_at.is_(None), PayslipEmailDelivery.next_attempt_at <= now)
+            ).order_by(PayslipEmailDelivery.id).limit(CHUNK_SIZE).with_for_update(skip_locked=True)
+            deliveries = db.execute(
+                update(PayslipEmailDelivery).where(PayslipEmailDelivery.id.in_(due)).values(
+                    status='sending', claimed_by=WORKER_ID, claimed_at=now
+                ).returning(
+                    PayslipEmailDelivery.id, PayslipEmailDelivery.payslip_id,
+                    PayslipEmailDelivery.to_email, PayslipEmailDelivery.attempts
+                ).execution_options(synchronize_session=False)
+            ).all()
+            db.commit()
+            if not deliveries:
+                # Seconds until the earliest backed-off retry is due (computed in SQL, in the column's time zone)
+                remaining, seconds_to_due = db.query(
+                    func.count(PayslipEmailDelivery.id),
+                    extract('epoch', func.min(PayslipEmailDelivery.next_attempt_at) - now)
+                ).filter(
+                    PayslipEmailDelivery.batch_id == batch_id,
+                    PayslipEmailDelivery.status == 'pending'
+                ).one()
+                if not remaining:
+                    return NOTHING_PENDING
+                wait = min(max(float(seconds_to_due or 0), 1), RETRY_POLL_SECONDS)
+                return []
+
+            payslips = db.query(PayslipData).filter(
+                PayslipData.payslip_id.in_([delivery.payslip_id for delivery in deliveries])
+            ).all()
+            rendered = render_payslips(payslips)
+
+            jobs = []
+            for delivery in deliveries:
+                if delivery.payslip_id not in rendered:
+                    self._record_result(db, batch_id, delivery.id, "Payslip no longer exists", final=True)
+                    continue
+                snapshot, path = rendered[delivery.payslip_id]
+                jobs.append({
+                    "batch_id": batch_id,
+                    "delivery_id": delivery.id,
+                    "attempts": delivery.attempts,
+                    "to_email": delivery.to_email,
+                    "subject": subject,
+                    "message": message or "",
+                    "snapshot": snapshot,
+                    "path": path
+                })
+            return jobs
+        finally:
+            db.close()
+            if wait:
+                time.sleep(wait)
+
+    def _send(self, job: dict, get_session):
+        error = None
+        try:
+            with open(job["path"], "rb") as f:
+                pdf_bytes = f.read()
+            msg = build_payslip_email(
+                job["to_email"], job["subject"], job["message"],
+                job["snapshot"], pdf_bytes, payslip_filename(job["snapshot"])
+            )
+            self.rate_limiter.acquire()
+            get_session().send_message(msg, job["to_email"])
+        except Exception as e:
+            error = f"{type(e).__name__}: {str(e)}"
+
+        db = SessionLocal()
+        try:
+            final = error is None or job["attempts"] + 1 >= self.max_attempts
+            self._record_result(db, job["batch_id"], job["delivery_id"], error, final=final)
+        except Exception as e:
+            db.rollback()
+            print(f"Error recording payslip email delivery {job['delivery_id']}: {str(e)}")
+        finally:
+            db.close()
+
+    def _record_result(self, db: Session, batch_id: int, delivery_id: int, error, final: bool):
+        delivery = db.query(PayslipEmailDelivery).filter(PayslipEmailDelivery.id == delivery_id).first()
+        delivery.attempts = (delivery.attempts or 0) + 1
+        delivery.last_error = error
+        counter = None
+        if error is None:
+            delivery.status = 'sent'
+            delivery.sent_at = get_ist_now()
+            counter = PayslipEmailBatch.sent_count
+        elif final:
+            delivery.status = 'failed'
+            counter = PayslipEmailBatch.failed_count
+        else:
+            # Back to pending, due again after an exponential backoff
+            delay = min(RETRY_BACKOFF_SECONDS * 2 ** (delivery.attempts - 1), RETRY_BACKOFF_MAX_SECONDS)
+            delivery.status = 'pending'
+            delivery.claimed_by = None
+            delivery.next_attempt_at = get_ist_now() + timedelta(seconds=delay)
+        if counter is not None:
+            # Atomic increment - several sender threads update the same batch row
+            db.query(PayslipEmailBatch).filter(PayslipEmailBatch.id == batch_id).update(
+                {counter: counter + 1}, synchronize_session=False
+            )
+        db.commit()
+
+
+# Shared dispatcher instance - pending runs are resumed from main.py startup
+payslip_email_dispatcher = PayslipEmailDispatcher()
+
+payslip_email_queue_depth = metrics.gauge(
+    "payslip_email_queue_depth", "Bulk payslip email runs queued in this process and deliveries still pending", ("kind",)
+)
+
+
+def _collect_queue_depth():
+    db = SessionLocal()
+    try:
+        pending = db.query(func.count(PayslipEmailDelivery.id)).filter(
+            PayslipEmailDelivery.status.in_(['pending', 'sending'])
+        ).scalar()
+    finally:
+        db.close()
+    payslip_email_queue_depth.set(payslip_email_dispatcher._queue.qsize(), kind="batches")
+    payslip_email_queue_depth.set(pending or 0, kind="deliveries")
+
+
+metrics.add_collector(_collect_queue_depth)
@@ -0,0 +1,334 @@
+"""
+Payslip Rendering Service
+- Payslip PDFs are rendered from a plain snapshot of the payslip row, so the
+  renderer is a pure function that can run in worker processes
+- Rendered PDFs are cached on disk keyed by payslip id + content hash: re-sends
+  and re-downloads of an unchanged payslip are free, and an edited payslip
+  gets a new hash (stale files for the payslip are removed)
+- A whole month is rendered in parallel across a process pool; workers are
+  spawned, not forked, since the server process runs background threads and
+  holds a DB pool whose locks a forked child could inherit mid-use
+- Frozen payslips for a company/month are streamed as a ZIP archive
+"""
+import os
+import json
+import hashlib
+import zipfile
+import multiprocessing
+import threading
+from decimal import Decimal
+from concurrent.futures import ProcessPoolExecutor
+
+PAYSLIP_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "payslip_cache")
+RENDER_MAX_WORKERS = min(4, os.cpu_count() or 1)
+
+MONTH_NAMES = ['', 'January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October', 'November', 'December']
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+
+def get_month_name(month: int) -> str:
+    return MONTH_NAMES[month] if month and 1 <= month <= 12 else ''
+
+
+def _plain(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    return value
+
+
+def payslip_snapshot(payslip) -> dict:
+    """Picklable snapshot of the payslip fields printed on the PDF"""
+    return {
+        "payslip_id": payslip.payslip_id,
+        "full_name": payslip.full_name,
+        "emp_id": payslip.emp_id,
+        "month": payslip.month,
+        "year": payslip.year,
+        "designation": payslip.designation,
+        "pf_no": payslip.pf_no,
+        "esi_no": payslip.esi_no,
+        "payable_days": _plain(payslip.payable_days),
+        "earnings": _plain(payslip.earnings) if isinstance(payslip.earnings, dict) else {},
+        "deductions": _plain(payslip.deductions) if isinstance(payslip.deductions, dict) else {},
+        "arrear_salary": _plain(payslip.arrear_salary),
+        "other_deduction": _plain(payslip.other_deduction),
+        "loan_amount": _plain(payslip.loan_amount),
+        "earned_gross": _plain(payslip.earned_gross),
+        "net_salary": _plain(payslip.net_salary),
+    }
+
+
+def payslip_content_hash(snapshot: dict) -> str:
+    payload = json.dumps(snapshot, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def payslip_filename(snapshot: dict) -> str:
+    return f"Payslip_{get_month_name(snapshot['month'])}_{snapshot['year']}_{snapshot['emp_id']}.pdf"
+
+
+def _cache_path(snapshot: dict) -> str:
+    return os.path.join(PAYSLIP_CACHE_DIR, f"{snapshot['payslip_id']}_{payslip_content_hash(snapshot)}.pdf")
+
+
+def render_payslip_pdf(snapshot: dict) -> bytes:
+    """Render a payslip PDF from a payslip_snapshot (no database access)"""
+    import io
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    from reportlab.lib.units import mm
+
+    month_name = get_month_name(snapshot["month"])
+    year = snapshot["year"]
+
+    pdf_buffer = io.BytesIO()
+    doc = SimpleDocTemplate(pdf_buffer, pagesize=A4, topMargin=20*mm, bottomMargin=20*mm)
+    elements = []
+    styles = getSampleStyleSheet()
+
+    # Title
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        textColor=colors.HexColor('#007bff'),
+        spaceAfter=20,
+        alignment=1
+    )
+    elements.append(Paragraph(f"PAYSLIP FOR THE MONTH OF {month_name.upper()} {year}", title_style))
+    elements.append(Spacer(1, 20))
+
+    # Employee Details
+    emp_data = [
+        ['NAME OF THE EMPLOYEE:', snapshot["full_name"] or '-'],
+        ['EMPLOYEE ID:', str(snapshot["emp_id"]) if snapshot["emp_id"] else '-', 'MONTH:', month_name, 'PF NO:', snapshot["pf_no"] or '-'],
+        ['DESIGNATION:', snapshot["designation"] or '-', 'PAID DAYS:', f"{float(snapshot['payable_days'] or 0):.2f}", 'ESI NO:', snapshot["esi_no"] or '-']
+    ]
+
+    emp_table = Table(emp_data, colWidths=[80*mm, 50*mm, 40*mm, 30*mm, 40*mm, 30*mm])
+    emp_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f1f3f5')),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ('TOPPADDING', (0, 0), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 1, colors.grey)
+    ]))
+    elements.append(emp_table)
+    elements.append(Spacer(1, 15))
+
+    earnings_dict = snapshot["earnings"]
+    deductions_dict = snapshot["deductions"]
+
+    # Earnings
+    elements.append(Paragraph("EARNINGS", ParagraphStyle('SectionHeader', parent=styles['Heading2'], fontSize=14, textColor=colors.white, backColor=colors.HexColor('#6b7785'), alignment=1)))
+    earnings_data = [
+        ['BASIC', 'HRA', 'CONV', 'ARREARS', 'FIX HRA', 'OTHER ALLOW', 'UNIFORM ALLOW', 'MED ALLOW', 'CCA', 'MOBILE ALLOWANCES'],
+        [
+            f"{float(earnings_dict.get('Basic', 0)):.2f}",
+            f"{float(earnings_dict.get('HRA', 0)):.2f}",
+            f"{float(earnings_dict.get('CA', 0)):.2f}",
+            f"{float(snapshot['arrear_salary'] or 0):.2f}",
+            "0.00",
+            f"{float(earnings_dict.get('SA', 0)):.2f}",
+            "0.00",
+            f"{float(earnings_dict.get('MA', 0)):.2f}",
+            "0.00",
+            "0.00"
+        ]
+    ]
+    earnings_table = Table(earnings_data, colWidths=[20*mm] * 10)
+    earnings_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f1f3f5')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 7),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ('GRID', (0, 0), (-1, -1), 1, colors.grey)
+    ]))
+    elements.append(earnings_table)
+    elements.append(Spacer(1, 15))
+
+    # Deductions
+    elements.append(Paragraph("DEDUCTIONS", ParagraphStyle('SectionHeader', parent=styles['Heading2'], fontSize=14, textColor=colors.white, backColor=colors.HexColor('#6b7785'), alignment=1)))
+    deductions_data = [
+        ['PF', 'ESI', 'PROF TAX', 'LWF', 'IT', 'LIC', 'OTHER', 'BANK LOAN', 'COMP LOAN', 'RENT PAID', 'SALARY ADV'],
+        [
+            f"{float(deductions_dict.get('PF', 0)):.2f}",
+            f"{float(deductions_dict.get('ESI', 0)):.2f}",
+            f"{float(deductions_dict.get('PT', 0)):.2f}",
+            "0.00",
+            f"{float(deductions_dict.get('TDS', 0)):.2f}",
+            "0.00",
+            f"{float(snapshot['other_deduction'] or 0):.2f}",
+            "0.00",
+            f"{float(snapshot['loan_amount'] or 0):.2f}",
+            "0.00",
+            "0.00"
+        ]
+    ]
+    deductions_table = Table(deductions_data, colWidths=[18*mm] * 11)
+    deductions_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f1f3f5')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 7),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ('GRID', (0, 0), (-1, -1), 1, colors.grey)
+    ]))
+    elements.append(deductions_table)
+    elements.append(Spacer(1, 15))
+
+    # Calculate total deductions
+    total_deductions = (
+        float(deductions_dict.get('PF', 0)) +
+        float(deductions_dict.get('ESI', 0)) +
+        float(deductions_dict.get('PT', 0)) +
+        float(deductions_dict.get('TDS', 0)) +
+        float(snapshot['other_deduction'] or 0) +
+        float(snapshot['loan_amount'] or 0)
+    )
+
+    # Totals
+    total_data = [
+        ['TOTAL EARNINGS (IN INR)', f"{float(snapshot['earned_gross'] or 0):.2f}"],
+        ['TOTAL DEDUCTIONS (IN INR)', f"{total_deductions:.2f}"],
+        ['NET PAY (IN INR)', f"{float(snapshot['net_salary'] or 0):.2f}"]
+    ]
+    total_table = Table(total_data, colWidths=[100*mm, 80*mm])
+    total_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f1f3f5')),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+        ('ALIGN', (1, 0), (1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 1, colors.grey)
+    ]))
+    elements.append(total_table)
+    elements.append(Spacer(1, 10))
+
+    # Footer
+    elements.append(Paragraph("** system generated print out. no signature required **", ParagraphStyle('Footer', parent=styles['Normal'], fontSize=8, textColor=colors.grey, alignment=1)))
+
+    doc.build(elements)
+    return pdf_buffer.getvalue()
+
+
+def _render_to_cache(snapshot: dict) -> str:
+    """Render a payslip into the cache (runs in worker processes) and return its path"""
+    path = _cache_path(snapshot)
+    if os.path.exists(path):
+        return path
+    pdf_bytes = render_payslip_pdf(snapshot)
+    os.makedirs(PAYSLIP_CACHE_DIR, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.part"
+    with open(temp_path, "wb") as f:
+        f.write(pdf_bytes)
+    os.replace(temp_path, path)
+
+    # Remove PDFs rendered from older versions of this payslip
+    prefix = f"{snapshot['payslip_id']}_"
+    for name in os.listdir(PAYSLIP_CACHE_DIR):
+        if name.startswith(prefix) and name.endswith(".pdf") and os.path.join(PAYSLIP_CACHE_DIR, name) != path:
+            try:
+                os.remove(os.path.join(PAYSLIP_CACHE_DIR, name))
+            except OSError:
+                pass
+    return path
+
+
+def get_payslip_pdf(payslip) -> bytes:
+    """PDF bytes for a payslip row, rendered on a cache miss"""
+    snapshot = payslip_snapshot(payslip)
+    with open(_render_to_cache(snapshot), "rb") as f:
+        return f.read()
+
+
+def _get_render_pool() -> ProcessPoolExecutor:
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(
+                max_workers=RENDER_MAX_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _render_pool
+
+
+def shutdown_render_pool():
+    """Stop the render worker processes (call from app shutdown)"""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is not None:
+            _render_pool.shutdown(wait=False, cancel_futures=True)
+            _render_pool = None
+
+
+def render_payslips(payslips) -> dict:
+    """
+    Ensure every payslip is rendered, rendering cache misses in parallel
+    across the process pool.
+
+    Returns:
+        dict: payslip_id -> (snapshot, cached PDF path)
+    """
+    results = {}
+    missing = []
+    for payslip in payslips:
+        snapshot = payslip_snapshot(payslip)
+        path = _cache_path(snapshot)
+        results[snapshot["payslip_id"]] = (snapshot, path)
+        if not os.path.exists(path):
+            missing.append(snapshot)
+
+    if len(missing) == 1:
+        _render_to_cache(missing[0])
+    elif missing:
+        os.makedirs(PAYSLIP_CACHE_DIR, exist_ok=True)
+        chunksize = max(1, len(missing) // (RENDER_MAX_WORKERS * 4))
+        list(_get_render_pool().map(_render_to_cache, missing, chunksize=chunksize))
+    return results
+
+
+class _ZipStreamBuffer:
+    """Write-only file object that collects ZIP output between yields"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_payslip_zip(rendered: dict):
+    """Yield a ZIP archive of rendered payslips chunk by chunk (PDFs are stored, not recompressed)"""
+    buffer = _ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for snapshot, path in rendered.values():
+            archive.write(path, arcname=payslip_filename(snapshot))
+            data = buffer.drain()
+            if data:
+                yield data
+    data = buffer.drain()
+    if data:
+        yield data
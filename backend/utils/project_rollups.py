@@ -0,0 +1,134 @@
+"""
+Project Task Rollups
+Per-project task counters (by status, percent_complete sum, overdue count) kept
+in the project_task_rollups table and updated in the same transaction as the
+task create/update/delete, so project progress and stats are single-row reads.
+- apply_task_change: add the delta between two task snapshots (atomic upsert,
+  shared with the rating summaries in utils.counter_tables)
+- refresh_project_progress: recompute project progress/status from the rollup
+- reconcile_project_rollups: recompute rollups from tasks to correct drift
+  (also rolls the overdue count forward as due dates pass - run daily)
+"""
+from datetime import date
+from sqlalchemy import func, and_
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import Project, Task, ProjectTaskRollup
+from utils.counter_tables import CounterTable
+
+# Task status -> rollup counter column
+STATUS_COUNTERS = {
+    "todo": "todo_count",
+    "in-progress": "in_progress_count",
+    "done": "done_count",
+    "blocked": "blocked_count",
+}
+COUNTER_COLUMNS = (
+    "total_tasks", "todo_count", "in_progress_count", "done_count",
+    "blocked_count", "percent_complete_sum", "overdue_count"
+)
+rollups = CounterTable(ProjectTaskRollup, "project_id", COUNTER_COLUMNS)
+
+
+def task_snapshot(task: Task) -> dict:
+    """Capture the task fields the rollup depends on"""
+    return {
+        "project_id": task.project_id,
+        "status": task.status,
+        "percent_complete": task.percent_complete or 0,
+        "due_date": task.due_date,
+    }
+
+
+def _contribution(snapshot: dict, today: date) -> dict:
+    """Counter values a single task contributes to its project's rollup"""
+    values = {column: 0 for column in COUNTER_COLUMNS}
+    values["total_tasks"] = 1
+    counter = STATUS_COUNTERS.get(snapshot["status"])
+    if counter:
+        values[counter] = 1
+    values["percent_complete_sum"] = snapshot["percent_complete"] or 0
+    due_date = snapshot["due_date"]
+    if due_date and due_date < today and snapshot["status"] != "done":
+        values["overdue_count"] = 1
+    return values
+
+
+def apply_task_change(db: Session, old: dict = None, new: dict = None):
+    """
+    Apply a task change to the project rollups inside the caller's transaction.
+
+    Args:
+        old: task_snapshot before the change (None for a new task)
+        new: task_snapshot after the change (None for a deleted task)
+    """
+    today = date.today()
+    rollups.apply_change(
+        db,
+        old["project_id"] if old else None, _contribution(old, today) if old else None,
+        new["project_id"] if new else None, _contribution(new, today) if new else None
+    )
+
+
+def get_project_rollup(db: Session, project_id: int) -> dict:
+    """Task counters for a project (all zero if it has no tasks)"""
+    rollup = db.query(ProjectTaskRollup).filter(ProjectTaskRollup.project_id == project_id).first()
+    return {column: (getattr(rollup, column) or 0) if rollup else 0 for column in COUNTER_COLUMNS}
+
+
+def refresh_project_progress(db: Session, project_id: int):
+    """Update project progress and status from its rollup (caller commits)"""
+    rollup = get_project_rollup(db, project_id)
+    if not rollup["total_tasks"]:
+        return
+
+    avg_percent = rollup["percent_complete_sum"] // rollup["total_tasks"]
+
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if project:
+        project.progress_percent = avg_percent
+        if avg_percent == 100:
+            project.status = "completed"
+        elif avg_percent > 0:
+            project.status = "active"
+
+
+def reconcile_project_rollups(db: Session, project_ids: list = None) -> int:
+    """
+    Recompute rollups from the tasks table with one grouped aggregate and
+    overwrite the stored counters. Projects without tasks are reset to zero.
+
+    Returns:
+        int: Number of rollup rows written
+    """
+    today = date.today()
+    query = db.query(
+        Task.project_id,
+        func.count(Task.id).label("total_tasks"),
+        func.count(Task.id).filter(Task.status == "todo").label("todo_count"),
+        func.count(Task.id).filter(Task.status == "in-progress").label("in_progress_count"),
+        func.count(Task.id).filter(Task.status == "done").label("done_count"),
+        func.count(Task.id).filter(Task.status == "blocked").label("blocked_count"),
+        func.coalesce(func.sum(Task.percent_complete), 0).label("percent_complete_sum"),
+        func.count(Task.id).filter(and_(Task.due_date < today, Task.status != "done")).label("overdue_count"),
+    ).filter(Task.project_id.isnot(None))
+    if project_ids is not None:
+        query = query.filter(Task.project_id.in_(project_ids))
+    rows = {row.project_id: row for row in query.group_by(Task.project_id).all()}
+    return rollups.reconcile(db, rows, keys=project_ids)
+
+
+def run_project_rollup_reconciliation():
+    """Scheduled job: reconcile all project rollups (corrects drift and overdue counts)"""
+    db = SessionLocal()
+    try:
+        count = reconcile_project_rollups(db)
+        db.commit()
+        print(f"Project rollup reconciliation completed - {count} projects")
+    except Exception as e:
+        db.rollback()
+        print(f"Error in project rollup reconciliation: {str(e)}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        db.close()
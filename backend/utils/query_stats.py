@@ -0,0 +1,213 @@
+"""
+Query Stats
+Per-request SQL instrumentation built on SQLAlchemy engine cursor events.
+- QueryStatsMiddleware puts a RequestQueryStats in a context variable for each
+  HTTP request; the cursor events (sync engine and the async engine's
+  sync_engine) record every statement into it, including statements run from
+  sync routes on the threadpool (the context is copied into the worker thread)
+- Per request: query count, total DB time, the slowest statements, and
+  statements executed QUERY_REPEAT_THRESHOLD+ times with the same SQL
+  (different parameters) - the N+1 signature of a query inside a loop
+- With QUERY_DEBUG_HEADERS on, responses carry X-DB-Query-Count, X-DB-Time-Ms,
+  X-DB-Slowest-Ms and X-DB-N-Plus-One, and flagged requests are logged
+- Every request is folded into a per-route aggregate (route template, e.g.
+  /api/tasks/{task_id}) served by GET /api/diagnostics/queries (Admin)
+- Statements outside a request (scheduler, dispatchers, scripts) are ignored
+"""
+import heapq
+import threading
+import time
+from contextvars import ContextVar
+from sqlalchemy import event
+from config import settings
+
+SLOWEST_STATEMENTS = 5
+STATEMENT_PREVIEW_CHARS = 300
+MAX_ROUTE_STATEMENTS = 10
+UNMATCHED_ROUTE = "<unmatched>"
+REPORT_SORT_FIELDS = ("avg_queries", "max_queries", "avg_db_ms", "max_db_ms", "total_db_ms", "requests", "n_plus_one_requests")
+
+_current_stats = ContextVar("request_query_stats", default=None)
+
+
+def _preview(statement: str) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= STATEMENT_PREVIEW_CHARS else statement[:STATEMENT_PREVIEW_CHARS] + "..."
+
+
+class RequestQueryStats:
+    """Statements executed while handling one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.statement_counts = {}
+        self.slowest = []  # min-heap of (seconds, statement)
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, seconds: float):
+        with self._lock:
+            self.count += 1
+            self.total_seconds += seconds
+            self.statement_counts[statement] = self.statement_counts.get(statement, 0) + 1
+            if len(self.slowest) < SLOWEST_STATEMENTS:
+                heapq.heappush(self.slowest, (seconds, statement))
+            elif seconds > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, (seconds, statement))
+
+    def repeated_statements(self) -> dict:
+        """{statement: executions} for statements at or above QUERY_REPEAT_THRESHOLD"""
+        threshold = settings.QUERY_REPEAT_THRESHOLD
+        return {statement: count for statement, count in self.statement_counts.items() if count >= threshold}
+
+    def slowest_statements(self) -> list:
+        return sorted(self.slowest, reverse=True)
+
+
+def current_query_stats():
+    """Stats of the request being handled, None outside a request"""
+    return _current_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info["query_start_time"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    if stats is None:
+        return
+    started = conn.info.pop("query_start_time", None)
+    if started is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+def install_query_listeners(*engines):
+    """Attach the cursor events to the given engines (AsyncEngine -> its sync_engine)"""
+    for engine in engines:
+        target = getattr(engine, "sync_engine", engine)
+        if not event.contains(target, "before_cursor_execute", _before_cursor_execute):
+            event.listen(target, "before_cursor_execute", _before_cursor_execute)
+            event.listen(target, "after_cursor_execute", _after_cursor_execute)
+
+
+class _RouteStats:
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.db_seconds = 0.0
+        self.max_db_seconds = 0.0
+        self.n_plus_one_requests = 0
+        self.repeated = {}  # statement -> highest executions in one request
+
+
+class QueryStatsReport:
+    """Per-route aggregate of request query stats (process-wide)"""
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+        self.since = time.time()
+
+    def add(self, route: str, stats: RequestQueryStats):
+        repeated = stats.repeated_statements()
+        with self._lock:
+            entry = self._routes.get(route)
+            if entry is None:
+                entry = self._routes[route] = _RouteStats()
+            entry.requests += 1
+            entry.queries += stats.count
+            entry.max_queries = max(entry.max_queries, stats.count)
+            entry.db_seconds += stats.total_seconds
+            entry.max_db_seconds = max(entry.max_db_seconds, stats.total_seconds)
+            if repeated:
+                entry.n_plus_one_requests += 1
+                for statement, count in repeated.items():
+                    if count > entry.repeated.get(statement, 0):
+                        entry.repeated[statement] = count
+                if len(entry.repeated) > MAX_ROUTE_STATEMENTS:
+                    keep = heapq.nlargest(MAX_ROUTE_STATEMENTS, entry.repeated.items(), key=lambda item: item[1])
+                    entry.repeated = dict(keep)
+
+    def snapshot(self, sort_by: str = "avg_queries", limit: int = 50) -> dict:
+        with self._lock:
+            routes = [
+                {
+                    "route": route,
+                    "requests": entry.requests,
+                    "avg_queries": round(entry.queries / entry.requests, 2),
+                    "max_queries": entry.max_queries,
+                    "avg_db_ms": round(entry.db_seconds * 1000 / entry.requests, 2),
+                    "max_db_ms": round(entry.max_db_seconds * 1000, 2),
+                    "total_db_ms": round(entry.db_seconds * 1000, 2),
+                    "n_plus_one_requests": entry.n_plus_one_requests,
+                    "repeated_statements": [
+                        {"statement": _preview(statement), "max_executions": count}
+                        for statement, count in sorted(entry.repeated.items(), key=lambda item: -item[1])
+                    ]
+                }
+                for route, entry in self._routes.items()
+            ]
+        if sort_by not in REPORT_SORT_FIELDS:
+            sort_by = "avg_queries"
+        routes.sort(key=lambda item: item[sort_by], reverse=True)
+        return {
+            "since": self.since,
+            "repeat_threshold": settings.QUERY_REPEAT_THRESHOLD,
+            "routes": routes[:limit]
+        }
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+            self.since = time.time()
+
+
+def _route_template(scope) -> str:
+    """Matched route template; unmatched paths and mounts share one bucket so the report stays bounded"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class QueryStatsMiddleware:
+    """Pure ASGI middleware: one RequestQueryStats per HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats()
+        token = _current_stats.set(stats)
+        debug_headers = settings.QUERY_DEBUG_HEADERS
+
+        async def send_with_stats(message):
+            if debug_headers and message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers += [
+                    (b"x-db-query-count", str(stats.count).encode()),
+                    (b"x-db-time-ms", f"{stats.total_seconds * 1000:.1f}".encode()),
+                    (b"x-db-slowest-ms", ",".join(f"{s * 1000:.1f}" for s, _ in stats.slowest_statements()).encode()),
+                    (b"x-db-n-plus-one", str(len(stats.repeated_statements())).encode()),
+                ]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current_stats.reset(token)
+            route = _route_template(scope)
+            query_stats_report.add(route, stats)
+            if debug_headers:
+                for statement, count in stats.repeated_statements().items():
+                    print(f"[query-stats] N+1 on {scope.get('method')} {route}: {count}x {_preview(statement)}")
+
+
+# Shared per-route report
+query_stats_report = QueryStatsReport()
@@ -0,0 +1,112 @@
+"""
+Employee Rating Summaries
+Per-employee rating counters (total, score sum, count per score 1-5) kept in
+the employee_rating_summaries table and updated in the same transaction as
+the rating create/update/delete, so rating stats and leaderboards are served
+from aggregates over one row per employee instead of every rating.
+- apply_rating_change: add the delta between two rating snapshots (atomic upsert,
+  shared with the project rollups in utils.counter_tables)
+- remove_task_ratings: retract ratings about to be cascade-deleted with a task
+- reconcile_rating_summaries: recompute summaries from task_ratings to correct drift
+"""
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import TaskRating, EmployeeRatingSummary
+from utils.counter_tables import CounterTable
+
+SCORE_COLUMNS = ("score_1", "score_2", "score_3", "score_4", "score_5")
+COUNTER_COLUMNS = ("total_ratings", "score_sum") + SCORE_COLUMNS
+summaries = CounterTable(EmployeeRatingSummary, "user_id", COUNTER_COLUMNS)
+
+
+def rating_snapshot(rating: TaskRating) -> dict:
+    """Capture the rating fields the summary depends on"""
+    return {"ratee_id": rating.ratee_id, "score": rating.score}
+
+
+def _contribution(snapshot: dict) -> dict:
+    values = {column: 0 for column in COUNTER_COLUMNS}
+    values["total_ratings"] = 1
+    values["score_sum"] = snapshot["score"] or 0
+    if snapshot["score"] in range(1, 6):
+        values[f"score_{snapshot['score']}"] = 1
+    return values
+
+
+def apply_rating_change(db: Session, old: dict = None, new: dict = None):
+    """
+    Apply a rating change to the employee summaries inside the caller's transaction.
+
+    Args:
+        old: rating_snapshot before the change (None for a new rating)
+        new: rating_snapshot after the change (None for a deleted rating)
+    """
+    summaries.apply_change(
+        db,
+        old["ratee_id"] if old else None, _contribution(old) if old else None,
+        new["ratee_id"] if new else None, _contribution(new) if new else None
+    )
+
+
+def remove_task_ratings(db: Session, task_id: int):
+    """Retract all ratings of a task from the summaries (call before deleting the task)"""
+    ratings = db.query(TaskRating.ratee_id, TaskRating.score).filter(TaskRating.task_id == task_id).all()
+    for ratee_id, score in ratings:
+        apply_rating_change(db, {"ratee_id": ratee_id, "score": score}, None)
+
+
+def summarize(db: Session, user_ids: list = None) -> dict:
+    """
+    Combined rating stats over the summaries of the given users (all users if None).
+
+    Returns:
+        dict: total_ratings, average_score and score_distribution
+    """
+    query = db.query(
+        func.coalesce(func.sum(EmployeeRatingSummary.total_ratings), 0),
+        func.coalesce(func.sum(EmployeeRatingSummary.score_sum), 0),
+        *(func.coalesce(func.sum(getattr(EmployeeRatingSummary, column)), 0) for column in SCORE_COLUMNS)
+    )
+    if user_ids is not None:
+        query = query.filter(EmployeeRatingSummary.user_id.in_(user_ids))
+    total, score_sum, *scores = query.one()
+    total = int(total)
+    return {
+        "total_ratings": total,
+        "average_score": round(int(score_sum) / total, 2) if total else 0,
+        "score_distribution": {str(score): int(count) for score, count in zip(range(1, 6), scores)}
+    }
+
+
+def reconcile_rating_summaries(db: Session) -> int:
+    """
+    Recompute all summaries from task_ratings with one grouped aggregate and
+    overwrite the stored counters. Employees without ratings are reset to zero.
+
+    Returns:
+        int: Number of summary rows written
+    """
+    rows = db.query(
+        TaskRating.ratee_id,
+        func.count(TaskRating.id).label("total_ratings"),
+        func.coalesce(func.sum(TaskRating.score), 0).label("score_sum"),
+        *(func.count(TaskRating.id).filter(TaskRating.score == score).label(f"score_{score}") for score in range(1, 6))
+    ).filter(TaskRating.ratee_id.isnot(None)).group_by(TaskRating.ratee_id).all()
+    return summaries.reconcile(db, {row.ratee_id: row for row in rows})
+
+
+def run_rating_summary_reconciliation():
+    """Scheduled job: reconcile all employee rating summaries"""
+    db = SessionLocal()
+    try:
+        count = reconcile_rating_summaries(db)
+        db.commit()
+        print(f"Rating summary reconciliation completed - {count} employees")
+    except Exception as e:
+        db.rollback()
+        print(f"Error in rating summary reconciliation: {str(e)}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        db.close()
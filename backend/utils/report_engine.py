@@ -0,0 +1,320 @@
+"""
+Report Engine
+Task reports are computed once per filter set and shared by the preview,
+Excel and PDF endpoints:
+- Filtered task query runs once with a server-side cursor (yield_per), selecting
+  only the columns the report needs; summary counts are accumulated while streaming
+- Computed datasets are cached by filter hash for a short TTL, so switching
+  between preview, Excel and PDF for the same filters does not hit the database
+- Excel is written in openpyxl write-only mode and both files are spooled to a
+  temporary file and streamed back in chunks
+"""
+import hashlib
+import json
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from models import Project, Task, User, EmployeeRatingSummary
+
+REPORT_CACHE_TTL_SECONDS = 120
+REPORT_CACHE_MAX_ENTRIES = 32
+# Rows fetched per round trip from the server-side cursor
+REPORT_FETCH_SIZE = 500
+# Files larger than this are spooled to disk instead of memory
+SPOOL_MAX_BYTES = 5 * 1024 * 1024
+STREAM_CHUNK_SIZE = 64 * 1024
+PDF_MAX_TASKS = 50
+
+_report_cache = OrderedDict()
+_report_cache_lock = threading.Lock()
+
+
+def report_cache_key(filters) -> str:
+    """Stable hash of the report filters"""
+    payload = json.dumps(filters.model_dump(mode="json"), sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _build_task_query(db: Session, filters):
+    query = db.query(
+        Task.id, Task.title, Task.status, Task.priority,
+        Task.assigned_to_name, Task.assigned_by_name,
+        Task.start_date, Task.due_date, Task.percent_complete, Task.created_at
+    )
+    if filters.project_id:
+        query = query.filter(Task.project_id == filters.project_id)
+    if filters.employee_id:
+        query = query.filter(
+            or_(
+                Task.assigned_to_id == filters.employee_id,
+                Task.assigned_by_id == filters.employee_id
+            )
+        )
+    if filters.start_date:
+        query = query.filter(Task.created_at >= datetime.combine(filters.start_date, datetime.min.time()))
+    if filters.end_date:
+        query = query.filter(Task.created_at <= datetime.combine(filters.end_date, datetime.max.time()))
+    return query.order_by(Task.id)
+
+
+def build_report_dataset(db: Session, filters) -> dict:
+    """Run the filtered report query once and compute summary and task rows"""
+    today = datetime.now().date()
+    counts = {"total": 0, "done": 0, "in-progress": 0, "todo": 0, "delayed": 0}
+    task_details = []
+
+    query = _build_task_query(db, filters).execution_options(yield_per=REPORT_FETCH_SIZE)
+    for task in query:
+        counts["total"] += 1
+        if task.status in counts:
+            counts[task.status] += 1
+        if task.due_date and task.due_date < today and task.status != "done":
+            counts["delayed"] += 1
+        task_details.append({
+            "id": task.id,
+            "title": task.title,
+            "status": task.status,
+            "priority": task.priority,
+            "assigned_to": task.assigned_to_name,
+            "assigned_by": task.assigned_by_name,
+            "start_date": task.start_date.isoformat() if task.start_date else None,
+            "due_date": task.due_date.isoformat() if task.due_date else None,
+            "percent_complete": task.percent_complete,
+            "created_at": task.created_at.isoformat() if task.created_at else None
+        })
+
+    project = None
+    if filters.project_id:
+        project = db.query(
+            Project.id, Project.name, Project.status, Project.progress_percent
+        ).filter(Project.id == filters.project_id).first()
+
+    employee = None
+    if filters.employee_id:
+        employee = db.query(
+            User.id, User.name, User.empid,
+            EmployeeRatingSummary.total_ratings, EmployeeRatingSummary.score_sum
+        ).outerjoin(
+            EmployeeRatingSummary, EmployeeRatingSummary.user_id == User.id
+        ).filter(User.id == filters.employee_id).first()
+
+    total_tasks = counts["total"]
+    total_ratings = (employee.total_ratings or 0) if employee else 0
+    avg_rating = employee.score_sum / total_ratings if total_ratings else 0
+
+    return {
+        "summary": {
+            "total_tasks": total_tasks,
+            "completed": counts["done"],
+            "in_progress": counts["in-progress"],
+            "pending": counts["todo"],
+            "delayed": counts["delayed"],
+            "completion_rate": round((counts["done"] / total_tasks * 100) if total_tasks > 0 else 0, 2)
+        },
+        "project": {
+            "id": project.id,
+            "name": project.name,
+            "status": project.status,
+            "progress": project.progress_percent
+        } if project else None,
+        "employee": {
+            "id": employee.id,
+            "name": employee.name,
+            "empid": employee.empid,
+            "avg_rating": round(avg_rating, 2),
+            "total_ratings": total_ratings
+        } if employee else None,
+        "tasks": task_details,
+        "generated_at": datetime.now().isoformat()
+    }
+
+
+def get_report_dataset(db: Session, filters) -> dict:
+    """Cached report dataset for the filters (computed on a miss or after the TTL)"""
+    key = report_cache_key(filters)
+    now = time.monotonic()
+    with _report_cache_lock:
+        entry = _report_cache.get(key)
+        if entry and entry[0] > now:
+            _report_cache.move_to_end(key)
+            return entry[1]
+
+    dataset = build_report_dataset(db, filters)
+
+    with _report_cache_lock:
+        _report_cache[key] = (now + REPORT_CACHE_TTL_SECONDS, dataset)
+        _report_cache.move_to_end(key)
+        while len(_report_cache) > REPORT_CACHE_MAX_ENTRIES:
+            _report_cache.popitem(last=False)
+    return dataset
+
+
+def invalidate_report_cache():
+    """Drop all cached report datasets"""
+    with _report_cache_lock:
+        _report_cache.clear()
+
+
+def iter_spooled_file(spooled):
+    """Yield a spooled file in chunks and close it when done"""
+    try:
+        spooled.seek(0)
+        while True:
+            chunk = spooled.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        spooled.close()
+
+
+def render_excel_report(report_data: dict):
+    """Write the report workbook (write-only mode) to a spooled temporary file"""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Task Report")
+
+    # Styles
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
+    thin_border = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+
+    def styled(value, **styles):
+        cell = WriteOnlyCell(ws, value=value)
+        for name, style in styles.items():
+            setattr(cell, name, style)
+        return cell
+
+    # Column widths must be set before the first row in write-only mode
+    for column, width in zip("ABCDEFGHI", (8, 40, 12, 10, 20, 20, 12, 12, 12)):
+        ws.column_dimensions[column].width = width
+
+    # Title and generated date
+    ws.append([styled("Task Management Report", font=Font(bold=True, size=16))])
+    ws.append([f"Generated: {report_data['generated_at']}"])
+    ws.append([])
+
+    # Summary section
+    summary = report_data['summary']
+    ws.append([styled("Summary", font=Font(bold=True, size=12))])
+    ws.append([f"Total Tasks: {summary['total_tasks']}"])
+    ws.append([f"Completed: {summary['completed']}"])
+    ws.append([f"In Progress: {summary['in_progress']}"])
+    ws.append([f"Pending: {summary['pending']}"])
+    ws.append([f"Delayed: {summary['delayed']}"])
+    ws.append([f"Completion Rate: {summary['completion_rate']}%"])
+    ws.append([])
+
+    # Task details header
+    headers = ['ID', 'Title', 'Status', 'Priority', 'Assigned To', 'Assigned By', 'Start Date', 'Due Date', '% Complete']
+    ws.append([
+        styled(header, font=header_font, fill=header_fill, border=thin_border, alignment=Alignment(horizontal='center'))
+        for header in headers
+    ])
+
+    # Task data
+    for task in report_data['tasks']:
+        ws.append([
+            styled(value, border=thin_border)
+            for value in (
+                task['id'], task['title'], task['status'], task['priority'],
+                task['assigned_to'] or '', task['assigned_by'] or '',
+                task['start_date'] or '', task['due_date'] or '', task['percent_complete']
+            )
+        ])
+
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    wb.save(output)
+    return output
+
+
+def render_pdf_report(report_data: dict):
+    """Build the report PDF into a spooled temporary file"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    doc = SimpleDocTemplate(output, pagesize=A4)
+    elements = []
+    styles = getSampleStyleSheet()
+
+    # Title
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        spaceAfter=20,
+        alignment=1
+    )
+    elements.append(Paragraph("Task Management Report", title_style))
+    elements.append(Paragraph(f"Generated: {report_data['generated_at']}", styles['Normal']))
+    elements.append(Spacer(1, 20))
+
+    # Summary
+    elements.append(Paragraph("Summary", styles['Heading2']))
+    summary = report_data['summary']
+    summary_data = [
+        ["Total Tasks", str(summary['total_tasks'])],
+        ["Completed", str(summary['completed'])],
+        ["In Progress", str(summary['in_progress'])],
+        ["Pending", str(summary['pending'])],
+        ["Delayed", str(summary['delayed'])],
+        ["Completion Rate", f"{summary['completion_rate']}%"]
+    ]
+
+    summary_table = Table(summary_data, colWidths=[150, 100])
+    summary_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('PADDING', (0, 0), (-1, -1), 8),
+    ]))
+    elements.append(summary_table)
+    elements.append(Spacer(1, 20))
+
+    # Tasks table
+    elements.append(Paragraph("Task Details", styles['Heading2']))
+
+    task_headers = ['ID', 'Title', 'Status', 'Priority', 'Assigned To', '% Complete']
+    task_data = [task_headers]
+
+    for task in report_data['tasks'][:PDF_MAX_TASKS]:
+        task_data.append([
+            str(task['id']),
+            task['title'][:30] + '...' if len(task['title']) > 30 else task['title'],
+            task['status'],
+            task['priority'],
+            task['assigned_to'] or '-',
+            str(task['percent_complete'])
+        ])
+
+    task_table = Table(task_data, colWidths=[30, 150, 60, 60, 80, 50])
+    task_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4F81BD')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTSIZE', (0, 1), (-1, -1), 8),
+        ('PADDING', (0, 0), (-1, -1), 5),
+    ]))
+    elements.append(task_table)
+
+    doc.build(elements)
+    return output
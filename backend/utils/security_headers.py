@@ -0,0 +1,122 @@
+"""
+Security Headers
+Pure ASGI middleware adding the security headers (HSTS, CSP, framing,
+sniffing, referrer and permissions policies) to every HTTP response.
+- Header values are encoded once at import; each response gets one of two
+  precomputed lists, picked by path prefix (the API docs need a more
+  permissive CSP for Swagger UI / ReDoc assets)
+- Only the http.response.start message is touched, so body chunks of
+  streamed responses (Excel / ZIP exports) go straight through unbuffered
+- Headers the route already set with the same name are replaced, as
+  response.headers[...] = ... did in the BaseHTTPMiddleware version
+"""
+
+# FastAPI docs endpoints: /docs, /redoc, /openapi.json
+DOCS_PATH_PREFIXES = ("/docs", "/redoc", "/openapi.json")
+
+# Content-Security-Policy: More restrictive but allows necessary features
+# Note: 'unsafe-inline' and 'unsafe-eval' are required for React/Vite build
+# In production, consider using nonces for better security
+APP_CSP = (
+    "default-src 'self'; "
+    "script-src 'self' 'unsafe-inline' 'unsafe-eval' https://maps.googleapis.com; "
+    "script-src-elem 'self' 'unsafe-inline' https://maps.googleapis.com; "
+    "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com; "
+    "img-src 'self' data: https: blob: https://i.pinimg.com https://lovenamepix.com; "
+    "font-src 'self' data: https://fonts.gstatic.com; "
+    "connect-src 'self' http://127.0.0.1:8007 https://tms.brihaspathi.com https://maps.googleapis.com https: wss: ws:; "
+    "frame-src 'self' https://maps.googleapis.com; "
+    "frame-ancestors 'self'; "
+    "base-uri 'self'; "
+    "form-action 'self'; "
+    "object-src 'none'; "
+    "upgrade-insecure-requests"
+)
+
+# More permissive CSP for Swagger UI docs
+DOCS_CSP = (
+    "default-src 'self'; "
+    "script-src 'self' 'unsafe-inline' 'unsafe-eval' https://maps.googleapis.com https://cdn.jsdelivr.net https://unpkg.com; "
+    "script-src-elem 'self' 'unsafe-inline' https://maps.googleapis.com https://cdn.jsdelivr.net https://unpkg.com; "
+    "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com https://cdn.jsdelivr.net https://unpkg.com; "
+    "img-src 'self' data: https: blob: https://i.pinimg.com https://lovenamepix.com; "
+    "font-src 'self' data: https://fonts.gstatic.com https://cdn.jsdelivr.net; "
+    "connect-src 'self' http://127.0.0.1:8007 https://tms.brihaspathi.com https://maps.googleapis.com https: wss: ws:; "
+    "frame-src 'self' https://maps.googleapis.com; "
+    "frame-ancestors 'self'; "
+    "base-uri 'self'; "
+    "form-action 'self'; "
+    "object-src 'none'; "
+    "upgrade-insecure-requests"
+)
+
+# Permissions-Policy: Allow necessary features for the application
+# geolocation: Required for punch in/out location tracking
+# camera: Required for selfie capture in attendance
+# microphone: Not currently used but may be needed for future features
+PERMISSIONS_POLICY = (
+    "geolocation=(self), "
+    "camera=(self), "
+    "microphone=(self), "
+    "payment=(), "
+    "usb=(), "
+    "magnetometer=(), "
+    "gyroscope=(), "
+    "accelerometer=()"
+)
+
+
+def _encode_headers(csp: str) -> list:
+    headers = [
+        ("strict-transport-security", "max-age=31536000; includeSubDomains; preload"),
+        ("content-security-policy", csp),
+        ("x-frame-options", "SAMEORIGIN"),
+        ("x-content-type-options", "nosniff"),
+        ("x-xss-protection", "1; mode=block"),
+        # Referrer-Policy: Control referrer information
+        ("referrer-policy", "strict-origin-when-cross-origin"),
+        ("permissions-policy", PERMISSIONS_POLICY),
+    ]
+    return [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+
+
+APP_HEADERS = _encode_headers(APP_CSP)
+DOCS_HEADERS = _encode_headers(DOCS_CSP)
+SECURITY_HEADER_NAMES = frozenset(name for name, _ in APP_HEADERS)
+
+
+def apply_security_headers(headers: list, security_headers: list) -> list:
+    """Response headers with the security headers set (an existing header of the same name is replaced in place)"""
+    if not any(name.lower() in SECURITY_HEADER_NAMES for name, _ in headers):
+        return headers + security_headers
+    headers = list(headers)
+    for name, value in security_headers:
+        positions = [index for index, (existing, _) in enumerate(headers) if existing.lower() == name]
+        if not positions:
+            headers.append((name, value))
+            continue
+        headers[positions[0]] = (name, value)
+        for index in reversed(positions[1:]):
+            del headers[index]
+    return headers
+
+
+class SecurityHeadersMiddleware:
+    """Pure ASGI middleware adding the precomputed security headers to every HTTP response"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        security_headers = DOCS_HEADERS if scope["path"].startswith(DOCS_PATH_PREFIXES) else APP_HEADERS
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": apply_security_headers(list(message.get("headers", [])), security_headers)}
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
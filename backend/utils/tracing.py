@@ -0,0 +1,128 @@
+"""
+Tracing
+Leveled structured logging and timing spans for batch jobs (attendance,
+leave balance and payslip generation, the email scheduler).
+- get_logger(name) returns a stdlib logger under the "tms" namespace;
+  configure_logging() (called once from main.py) applies LOG_LEVEL and
+  LOG_FORMAT ("text": key=value fields, "json": one object per line)
+- log_event(logger, level, event, **fields) checks isEnabledFor first, so a
+  disabled debug line costs one level comparison and no formatting or I/O
+- Sampler(every) lets one in every N per-record debug lines through
+  (LOG_DEBUG_SAMPLE_EVERY), keeping a debug run readable on large batches
+- PhaseTimer times named phases of a batch (`with timer.phase("punches"):`)
+  and summary() returns per-phase totals for the endpoint response
+"""
+import json
+import logging
+import sys
+import time
+import threading
+from contextlib import contextmanager
+from config import settings
+
+ROOT_LOGGER = "tms"
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+class StructuredFormatter(logging.Formatter):
+    """Renders the event plus its fields as key=value text or a JSON object"""
+
+    def __init__(self, fmt_type: str = "text"):
+        super().__init__()
+        self.fmt_type = fmt_type
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", None) or {}
+        timestamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created))
+        if self.fmt_type == "json":
+            payload = {
+                "ts": f"{timestamp}.{int(record.msecs):03d}",
+                "level": record.levelname,
+                "logger": record.name,
+                "event": record.getMessage(),
+                **fields
+            }
+            if record.exc_info:
+                payload["exc"] = self.formatException(record.exc_info)
+            return json.dumps(payload, default=str)
+        line = f"{timestamp} {record.levelname:<7} {record.name} {record.getMessage()}"
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+def configure_logging():
+    """Attach one stdout handler to the "tms" logger (idempotent)"""
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        logger = logging.getLogger(ROOT_LOGGER)
+        logger.setLevel(getattr(logging, str(settings.LOG_LEVEL).upper(), logging.INFO))
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(StructuredFormatter(str(settings.LOG_FORMAT).lower()))
+        logger.addHandler(handler)
+        logger.propagate = False
+        _configured = True
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def log_event(logger: logging.Logger, level: int, event: str, exc_info=None, **fields):
+    """Log an event with structured fields; skipped before any formatting when the level is off"""
+    if logger.isEnabledFor(level):
+        logger.log(level, event, exc_info=exc_info, extra={"fields": fields})
+
+
+class Sampler:
+    """Returns True for the first call and then once every `every` calls (thread-safe)"""
+
+    def __init__(self, every: int = None):
+        self.every = max(1, every or settings.LOG_DEBUG_SAMPLE_EVERY)
+        self._calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self) -> bool:
+        with self._lock:
+            self._calls += 1
+            return (self._calls - 1) % self.every == 0
+
+
+class PhaseTimer:
+    """Accumulated wall time and call count per named phase of one batch run"""
+
+    def __init__(self):
+        self._started = time.perf_counter()
+        self._seconds = {}
+        self._counts = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._seconds[name] = self._seconds.get(name, 0.0) + time.perf_counter() - started
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def summary(self) -> dict:
+        """{"total_ms": ..., "phases": {name: {"ms": ..., "count": ...}}} in first-use order"""
+        return {
+            "total_ms": round((time.perf_counter() - self._started) * 1000, 2),
+            "phases": {
+                name: {"ms": round(seconds * 1000, 2), "count": self._counts[name]}
+                for name, seconds in self._seconds.items()
+            }
+        }
+
+    def log_summary(self, logger: logging.Logger, event: str, **fields):
+        if logger.isEnabledFor(logging.INFO):
+            summary = self.summary()
+            phases = {f"{name}_ms": values["ms"] for name, values in summary["phases"].items()}
+            log_event(logger, logging.INFO, event, total_ms=summary["total_ms"], **fields, **phases)
@@ -0,0 +1,34 @@
+"""
+Batch user lookups
+Resolves many users in a single IN query, loading only the columns the caller
+needs, instead of one User query per participant / team member.
+"""
+from sqlalchemy.orm import Session
+from models import User
+
+# Columns loaded when the caller does not ask for specific ones
+DEFAULT_USER_COLUMNS = (User.id, User.empid, User.name, User.email)
+
+
+def resolve_users_by_empid(db: Session, empids, *columns) -> dict:
+    """
+    Load users for a list of empids in one query.
+
+    Args:
+        db: Database session
+        empids: Iterable of empids (None/empty values and duplicates are ignored)
+        *columns: User columns to load; User.empid is always included
+
+    Returns:
+        dict: empid -> row with the requested columns as attributes
+    """
+    unique_empids = {str(empid) for empid in empids if empid}
+    if not unique_empids:
+        return {}
+
+    selected = list(columns or DEFAULT_USER_COLUMNS)
+    if User.empid not in selected:
+        selected.append(User.empid)
+
+    rows = db.query(*selected).filter(User.empid.in_(unique_empids)).all()
+    return {row.empid: row for row in rows}
@@ -0,0 +1,345 @@
+"""
+WhatsApp Notification Dispatcher
+- Messages are persisted to the whatsapp_messages table (the retry queue) and
+  sent by a background asyncio worker, so request handlers never wait on the provider
+- Pooled async HTTP client (httpx) shared by all sends
+- Per-provider concurrency limit, exponential backoff with jitter on failures
+- Delivery status, attempts and last error recorded per message
+- Queued / sending counts are exported as whatsapp_queue_depth on /metrics
+"""
+import asyncio
+import random
+from datetime import timedelta
+from typing import Optional
+import httpx
+from sqlalchemy import func
+from config import settings
+from database import SessionLocal
+from models import WhatsAppMessage
+from utils import get_ist_now
+from utils.notifications import WHATSAPP_API_KEY
+from utils.metrics import metrics
+
+DEFAULT_PROVIDER = "smartping"
+
+# Retry backoff: 30s, 60s, 120s, ... capped at 1 hour
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+
+# Worker tuning
+POLL_INTERVAL_SECONDS = 5.0
+BATCH_SIZE = 50
+# Messages stuck in 'sending' longer than this (worker died mid-send, result not
+# recorded) are re-queued - checked at startup and then every STALE_CHECK_SECONDS
+STALE_SENDING_SECONDS = 300
+STALE_CHECK_SECONDS = 60.0
+
+
+def compute_backoff_seconds(attempts: int) -> float:
+    """Exponential backoff with jitter for the given number of attempts made so far"""
+    delay = min(BACKOFF_BASE_SECONDS * (2 ** max(attempts - 1, 0)), BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def is_retryable_status(status_code: Optional[int]) -> bool:
+    """Network errors, timeouts, rate limits and 5xx are retried; other 4xx are permanent"""
+    if status_code is None:
+        return True
+    return status_code in (408, 429) or status_code >= 500
+
+
+def enqueue_whatsapp_message(
+    payload: dict,
+    destination: str,
+    context: str = None,
+    user_id: int = None,
+    provider: str = DEFAULT_PROVIDER
+) -> Optional[int]:
+    """
+    Persist a WhatsApp message to the queue and wake the dispatcher.
+    Safe to call from sync route handlers (threadpool) and background tasks.
+
+    Returns:
+        int: Queued message id, or None if it could not be queued
+    """
+    db = SessionLocal()
+    try:
+        message = WhatsAppMessage(
+            provider=provider,
+            context=context,
+            user_id=user_id,
+            destination=destination,
+            payload=payload,
+            status='queued',
+            max_attempts=settings.WHATSAPP_MAX_ATTEMPTS,
+            next_attempt_at=get_ist_now()
+        )
+        db.add(message)
+        db.commit()
+        message_id = message.id
+    except Exception as e:
+        db.rollback()
+        print(f"Error queueing WhatsApp message to {destination}: {str(e)}")
+        return None
+    finally:
+        db.close()
+
+    whatsapp_dispatcher.wake()
+    return message_id
+
+
+def enqueue_whatsapp_messages(messages: list, provider: str = DEFAULT_PROVIDER) -> int:
+    """
+    Persist many WhatsApp messages in one commit and wake the dispatcher.
+
+    Args:
+        messages: List of dicts with 'payload', 'destination' and optional 'context', 'user_id'
+
+    Returns:
+        int: Number of messages queued
+    """
+    if not messages:
+        return 0
+    db = SessionLocal()
+    try:
+        now = get_ist_now()
+        db.add_all([
+            WhatsAppMessage(
+                provider=provider,
+                context=message.get("context"),
+                user_id=message.get("user_id"),
+                destination=message["destination"],
+                payload=message["payload"],
+                status='queued',
+                max_attempts=settings.WHATSAPP_MAX_ATTEMPTS,
+                next_attempt_at=now
+            )
+            for message in messages
+        ])
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Error queueing {len(messages)} WhatsApp messages: {str(e)}")
+        return 0
+    finally:
+        db.close()
+
+    whatsapp_dispatcher.wake()
+    return len(messages)
+
+
+class WhatsAppDispatcher:
+    """Background worker that delivers queued WhatsApp messages"""
+
+    def __init__(
+        self,
+        api_url: str = None,
+        max_concurrency: int = None,
+        poll_interval: float = POLL_INTERVAL_SECONDS,
+        batch_size: int = BATCH_SIZE
+    ):
+        self.api_url = api_url or settings.WHATSAPP_API_URL
+        self.max_concurrency = max_concurrency or settings.WHATSAPP_MAX_CONCURRENCY
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self._client = None
+        self._loop = None
+        self._wake_event = None
+        self._task = None
+        self._semaphores = {}
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Start the worker on the running event loop (call from app startup)"""
+        if self.is_running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake_event = asyncio.Event()
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(10.0, connect=5.0),
+            limits=httpx.Limits(max_connections=self.max_concurrency * 2, max_keepalive_connections=self.max_concurrency)
+        )
+        self._task = asyncio.create_task(self._run())
+        print("WhatsApp dispatcher started")
+
+    async def stop(self):
+        """Stop the worker and close the HTTP client (call from app shutdown)"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    def wake(self):
+        """Wake the worker so newly queued messages go out immediately (thread-safe)"""
+        if self._loop is None or self._wake_event is None or self._loop.is_closed():
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._wake_event.set)
+        except RuntimeError:
+            pass
+
+    async def _run(self):
+        next_stale_check = 0.0
+        while True:
+            if self._loop.time() >= next_stale_check:
+                await asyncio.to_thread(self._requeue_stale_messages)
+                next_stale_check = self._loop.time() + STALE_CHECK_SECONDS
+            try:
+                processed = await self.dispatch_due()
+                if processed >= self.batch_size:
+                    continue  # More messages are probably due
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error in WhatsApp dispatcher loop: {str(e)}")
+                import traceback
+                traceback.print_exc()
+            try:
+                await asyncio.wait_for(self._wake_event.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake_event.clear()
+
+    async def dispatch_due(self) -> int:
+        """Claim and deliver all messages that are due, return the number processed"""
+        messages = await asyncio.to_thread(self._claim_due_messages)
+        if messages:
+            await asyncio.gather(*(self._deliver(message) for message in messages))
+        return len(messages)
+
+    def _requeue_stale_messages(self):
+        db = SessionLocal()
+        try:
+            cutoff = get_ist_now() - timedelta(seconds=STALE_SENDING_SECONDS)
+            db.query(WhatsAppMessage).filter(
+                WhatsAppMessage.status == 'sending',
+                WhatsAppMessage.updated_at < cutoff
+            ).update({"status": 'queued'}, synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Error re-queueing stale WhatsApp messages: {str(e)}")
+        finally:
+            db.close()
+
+    def _claim_due_messages(self) -> list:
+        db = SessionLocal()
+        try:
+            # SKIP LOCKED lets several workers share the queue without double sends
+            rows = db.query(WhatsAppMessage).filter(
+                WhatsAppMessage.status == 'queued',
+                WhatsAppMessage.next_attempt_at <= get_ist_now()
+            ).order_by(
+                WhatsAppMessage.next_attempt_at
+            ).limit(self.batch_size).with_for_update(skip_locked=True).all()
+
+            claimed = []
+            for row in rows:
+                row.status = 'sending'
+                row.attempts = (row.attempts or 0) + 1
+                claimed.append({
+                    "id": row.id,
+                    "provider": row.provider,
+                    "payload": row.payload,
+                    "attempts": row.attempts,
+                    "max_attempts": row.max_attempts
+                })
+            db.commit()
+            return claimed
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def _deliver(self, message: dict):
+        semaphore = self._semaphores.setdefault(message["provider"], asyncio.Semaphore(self.max_concurrency))
+        status_code = None
+        error = None
+        async with semaphore:
+            try:
+                status_code, error = await self.send_payload(message["payload"])
+            except Exception as e:
+                # Network errors and anything else (e.g. an unencodable payload) count as a
+                # failed attempt, so the row never stays in 'sending'
+                error = f"{type(e).__name__}: {str(e)}"
+        await asyncio.to_thread(self._record_result, message, status_code, error)
+
+    async def send_payload(self, payload: dict) -> tuple:
+        """
+        POST a payload to the provider using the pooled client.
+
+        Returns:
+            tuple: (status_code, error) - error is None on success
+        """
+        headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            "Authorization": f"Bearer {WHATSAPP_API_KEY}"
+        }
+        response = await self._client.post(self.api_url, json=payload, headers=headers)
+        if response.status_code == 401:
+            # Provider sometimes rejects the bearer header - retry without it
+            headers.pop("Authorization")
+            response = await self._client.post(self.api_url, json=payload, headers=headers)
+        if response.status_code == 200:
+            return response.status_code, None
+        return response.status_code, response.text[:1000]
+
+    def _record_result(self, message: dict, status_code: Optional[int], error: Optional[str]):
+        db = SessionLocal()
+        try:
+            row = db.query(WhatsAppMessage).filter(WhatsAppMessage.id == message["id"]).first()
+            if not row:
+                return
+            row.last_status_code = status_code
+            if error is None:
+                row.status = 'sent'
+                row.sent_at = get_ist_now()
+                row.last_error = None
+            elif is_retryable_status(status_code) and message["attempts"] < message["max_attempts"]:
+                row.status = 'queued'
+                row.last_error = error
+                row.next_attempt_at = get_ist_now() + timedelta(seconds=compute_backoff_seconds(message["attempts"]))
+            else:
+                row.status = 'failed'
+                row.last_error = error
+                print(f"WhatsApp message {row.id} to {row.destination} failed after {message['attempts']} attempt(s): {error}")
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Error recording WhatsApp delivery status for message {message['id']}: {str(e)}")
+        finally:
+            db.close()
+
+
+# Shared dispatcher instance - started/stopped from main.py
+whatsapp_dispatcher = WhatsAppDispatcher()
+
+whatsapp_queue_depth = metrics.gauge(
+    "whatsapp_queue_depth", "WhatsApp messages waiting to be sent or being sent", ("status",)
+)
+
+
+def _collect_queue_depth():
+    db = SessionLocal()
+    try:
+        counts = dict(db.query(WhatsAppMessage.status, func.count(WhatsAppMessage.id)).filter(
+            WhatsAppMessage.status.in_(['queued', 'sending'])
+        ).group_by(WhatsAppMessage.status).all())
+    finally:
+        db.close()
+    for status in ('queued', 'sending'):
+        whatsapp_queue_depth.set(counts.get(status, 0), status=status)
+
+
+metrics.add_collector(_collect_queue_depth)
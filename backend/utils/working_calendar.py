@@ -0,0 +1,250 @@
+"""
+Working Calendar
+Shared holiday / week-off resolution for leaves, attendance, the punch
+calendar and the weekly attendance emails.
+- Holidays are resolved once per year into per-branch {date: name} maps and
+  day-of-year bitsets from holiday_branches (a holiday applies to the branches
+  listed in its holiday_permissions; employees without a branch belong to branch 1)
+- sync_holiday_branches keeps holiday_branches in step with holiday_permissions;
+  get_branch_holidays / get_holidays_by_branch are the uncached range queries
+- Week-offs are resolved once per year into per-employee day-of-year bitsets;
+  employee_id "0" rows apply to everyone and are merged into every lookup
+- Years are cached in memory and dropped by the holiday / week-off routes
+  (invalidate_holidays / invalidate_week_offs) or after CACHE_TTL_SECONDS,
+  which covers changes made by other worker processes and scripts
+- working_days(empid, branch, A, B) is a mask + popcount over the bitsets
+"""
+import threading
+import time
+from datetime import date, timedelta
+from sqlalchemy.orm import Session
+from models import Holiday, HolidayBranch, WeekOffDate
+
+DEFAULT_BRANCH_ID = 1
+ALL_EMPLOYEES = "0"
+CACHE_TTL_SECONDS = 300
+
+
+def resolve_branch_id(branch_id) -> int:
+    """Branch used for holiday matching (missing/invalid branch -> branch 1)"""
+    try:
+        return int(branch_id) if branch_id else DEFAULT_BRANCH_ID
+    except (ValueError, TypeError):
+        return DEFAULT_BRANCH_ID
+
+
+def _permission_branch_ids(permissions) -> set:
+    """Branch ids listed in a holiday_permissions value (list of dicts or a single dict)"""
+    if isinstance(permissions, dict):
+        permissions = [permissions]
+    if not isinstance(permissions, list):
+        return set()
+    branch_ids = set()
+    for perm in permissions:
+        if isinstance(perm, dict) and perm.get("branch_id") is not None:
+            try:
+                branch_ids.add(int(perm.get("branch_id")))
+            except (ValueError, TypeError):
+                continue
+    return branch_ids
+
+
+def sync_holiday_branches(db: Session, holiday: Holiday):
+    """Rewrite a holiday's holiday_branches rows from its holiday_permissions (caller commits)"""
+    db.flush()
+    db.query(HolidayBranch).filter(HolidayBranch.holiday_id == holiday.id).delete(synchronize_session=False)
+    db.add_all([
+        HolidayBranch(holiday_id=holiday.id, branch_id=branch_id, holiday_date=holiday.date)
+        for branch_id in _permission_branch_ids(holiday.holiday_permissions)
+    ])
+
+
+def _holiday_dict(holiday_id: int, holiday_date: date, name: str, description: str) -> dict:
+    return {
+        "id": holiday_id,
+        "name": name,
+        "date": holiday_date.isoformat(),
+        "description": description
+    }
+
+
+def get_branch_holidays(db: Session, branch_id, start: date, end: date) -> list:
+    """A branch's holidays between start and end (inclusive), ordered by date"""
+    rows = db.query(Holiday.id, HolidayBranch.holiday_date, Holiday.name, Holiday.description).join(
+        Holiday, Holiday.id == HolidayBranch.holiday_id
+    ).filter(
+        HolidayBranch.branch_id == resolve_branch_id(branch_id),
+        HolidayBranch.holiday_date >= start,
+        HolidayBranch.holiday_date <= end
+    ).order_by(HolidayBranch.holiday_date).all()
+    return [_holiday_dict(*row) for row in rows]
+
+
+def get_holidays_by_branch(db: Session, start: date, end: date, branch_ids: list = None) -> dict:
+    """{branch_id: [holidays]} for every branch (or the given branches) between start and end"""
+    query = db.query(
+        HolidayBranch.branch_id, Holiday.id, HolidayBranch.holiday_date, Holiday.name, Holiday.description
+    ).join(
+        Holiday, Holiday.id == HolidayBranch.holiday_id
+    ).filter(
+        HolidayBranch.holiday_date >= start,
+        HolidayBranch.holiday_date <= end
+    )
+    if branch_ids is not None:
+        query = query.filter(HolidayBranch.branch_id.in_([resolve_branch_id(b) for b in branch_ids]))
+    holidays = {}
+    for branch_id, *row in query.order_by(HolidayBranch.branch_id, HolidayBranch.holiday_date).all():
+        holidays.setdefault(branch_id, []).append(_holiday_dict(*row))
+    return holidays
+
+
+def _day_index(day: date) -> int:
+    return day.toordinal() - date(day.year, 1, 1).toordinal()
+
+
+def _year_spans(start: date, end: date):
+    """Split an inclusive date range into (year, first_index, last_index) per calendar year"""
+    for year in range(start.year, end.year + 1):
+        span_start = max(start, date(year, 1, 1))
+        span_end = min(end, date(year, 12, 31))
+        yield year, _day_index(span_start), _day_index(span_end)
+
+
+def _range_mask(first_index: int, last_index: int) -> int:
+    return ((1 << (last_index - first_index + 1)) - 1) << first_index
+
+
+def _bit_dates(year: int, bits: int) -> set:
+    """Dates for the set bits of a day-of-year bitset"""
+    year_start = date(year, 1, 1)
+    dates = set()
+    while bits:
+        lowest = bits & -bits
+        dates.add(year_start + timedelta(days=lowest.bit_length() - 1))
+        bits ^= lowest
+    return dates
+
+
+class _YearHolidays:
+    def __init__(self, names: dict, bits: dict):
+        self.names = names  # {branch_id: {date: name}}
+        self.bits = bits  # {branch_id: int}
+        self.loaded_at = time.monotonic()
+
+
+class _YearWeekOffs:
+    def __init__(self, bits: dict):
+        self.bits = bits  # {empid: int}, ALL_EMPLOYEES for global week-offs
+        self.loaded_at = time.monotonic()
+
+
+class WorkingCalendar:
+    """In-memory per-year holiday and week-off sets shared by all requests"""
+
+    def __init__(self, ttl_seconds: int = CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._holidays = {}
+        self._week_offs = {}
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, entry) -> bool:
+        return entry is not None and time.monotonic() - entry.loaded_at < self.ttl_seconds
+
+    def _holiday_year(self, db: Session, year: int) -> _YearHolidays:
+        entry = self._holidays.get(year)
+        if self._is_fresh(entry):
+            return entry
+        rows = db.query(HolidayBranch.branch_id, HolidayBranch.holiday_date, Holiday.name).join(
+            Holiday, Holiday.id == HolidayBranch.holiday_id
+        ).filter(
+            HolidayBranch.holiday_date >= date(year, 1, 1),
+            HolidayBranch.holiday_date <= date(year, 12, 31)
+        ).all()
+        names = {}
+        bits = {}
+        for branch_id, holiday_date, name in rows:
+            names.setdefault(branch_id, {})[holiday_date] = name
+            bits[branch_id] = bits.get(branch_id, 0) | (1 << _day_index(holiday_date))
+        entry = _YearHolidays(names, bits)
+        with self._lock:
+            self._holidays[year] = entry
+        return entry
+
+    def _week_off_year(self, db: Session, year: int) -> _YearWeekOffs:
+        entry = self._week_offs.get(year)
+        if self._is_fresh(entry):
+            return entry
+        rows = db.query(WeekOffDate.employee_id, WeekOffDate.date).filter(
+            WeekOffDate.date >= date(year, 1, 1),
+            WeekOffDate.date <= date(year, 12, 31)
+        ).all()
+        bits = {}
+        for employee_id, week_off_date in rows:
+            empid = str(employee_id).strip()
+            bits[empid] = bits.get(empid, 0) | (1 << _day_index(week_off_date))
+        entry = _YearWeekOffs(bits)
+        with self._lock:
+            self._week_offs[year] = entry
+        return entry
+
+    def _holiday_bits(self, db: Session, branch_id: int, year: int) -> int:
+        return self._holiday_year(db, year).bits.get(branch_id, 0)
+
+    def _week_off_bits(self, db: Session, empid, year: int) -> int:
+        bits = self._week_off_year(db, year).bits
+        return bits.get(ALL_EMPLOYEES, 0) | bits.get(str(empid).strip(), 0)
+
+    def invalidate_holidays(self, *years):
+        """Drop cached holidays for the given years (all years if none given)"""
+        with self._lock:
+            if not years:
+                self._holidays.clear()
+            for year in years:
+                self._holidays.pop(year, None)
+
+    def invalidate_week_offs(self, *years):
+        """Drop cached week-offs for the given years (all years if none given)"""
+        with self._lock:
+            if not years:
+                self._week_offs.clear()
+            for year in years:
+                self._week_offs.pop(year, None)
+
+    def branch_holidays(self, db: Session, branch_id, start: date, end: date) -> dict:
+        """{date: holiday name} for a branch between start and end (inclusive)"""
+        branch_id = resolve_branch_id(branch_id)
+        holidays = {}
+        for year in range(start.year, end.year + 1):
+            for holiday_date, name in self._holiday_year(db, year).names.get(branch_id, {}).items():
+                if start <= holiday_date <= end:
+                    holidays[holiday_date] = name
+        return holidays
+
+    def week_off_dates(self, db: Session, empid, start: date, end: date) -> set:
+        """Week-off dates (employee-specific and global) between start and end (inclusive)"""
+        dates = set()
+        for year, first_index, last_index in _year_spans(start, end):
+            bits = self._week_off_bits(db, empid, year) & _range_mask(first_index, last_index)
+            dates |= _bit_dates(year, bits)
+        return dates
+
+    def is_week_off(self, db: Session, empid, day: date) -> bool:
+        return bool(self._week_off_bits(db, empid, day.year) >> _day_index(day) & 1)
+
+    def is_holiday(self, db: Session, branch_id, day: date) -> bool:
+        return bool(self._holiday_bits(db, resolve_branch_id(branch_id), day.year) >> _day_index(day) & 1)
+
+    def working_days(self, db: Session, empid, branch_id, start: date, end: date) -> int:
+        """Days between start and end (inclusive) that are neither week-offs nor branch holidays"""
+        if end < start:
+            return 0
+        branch_id = resolve_branch_id(branch_id)
+        days = 0
+        for year, first_index, last_index in _year_spans(start, end):
+            off_bits = self._week_off_bits(db, empid, year) | self._holiday_bits(db, branch_id, year)
+            days += (last_index - first_index + 1) - bin(off_bits & _range_mask(first_index, last_index)).count("1")
+        return days
+
+
+# Shared calendar instance
+working_calendar = WorkingCalendar()
@@ -6,6 +6,37 @@ import DatePicker from '../components/DatePicker';
 import toast from 'react-hot-toast';
 import './Profile.css';
 
+// Documents imported from a ZIP are stored as files and fetched with the auth header
+const fetchStoredDocument = (empid, doc) =>
+  api.get(`/employee-data/documents/${encodeURIComponent(empid)}`, {
+    params: { name: doc.name },
+    responseType: 'blob'
+  });
+
+const StoredDocumentImage = ({ empid, doc }) => {
+  const [src, setSrc] = useState(null);
+
+  useEffect(() => {
+    let objectUrl = null;
+    let cancelled = false;
+    if (doc?.file && (doc.content_type || '').startsWith('image/')) {
+      fetchStoredDocument(empid, doc)
+        .then((response) => {
+          if (cancelled) return;
+          objectUrl = window.URL.createObjectURL(response.data);
+          setSrc(objectUrl);
+        })
+        .catch(() => setSrc(null));
+    }
+    return () => {
+      cancelled = true;
+      if (objectUrl) window.URL.revokeObjectURL(objectUrl);
+    };
+  }, [empid, doc?.file, doc?.name, doc?.uploaded_at]);
+
+  return src ? <img src={src} alt={doc?.name || 'Document'} className="document-image" /> : null;
+};
+
 const Profile = () => {
   const { user, updateUser } = useAuth();
   const [editing, setEditing] = useState(false);
@@ -920,7 +951,26 @@ const Profile = () => {
   };
 
   // Handle document download
-  const handleDocumentDownload = (doc, index) => {
+  const handleDocumentDownload = async (doc, index) => {
+    if (doc.file) {
+      try {
+        const response = await fetchStoredDocument(user.empid, doc);
+        const url = window.URL.createObjectURL(response.data);
+        const link = document.createElement('a');
+        link.href = url;
+        link.download = doc.file.split('/').pop();
+        document.body.appendChild(link);
+        link.click();
+        document.body.removeChild(link);
+        window.URL.revokeObjectURL(url);
+        toast.success('Document downloaded successfully');
+      } catch (error) {
+        console.error('Download error:', error);
+        toast.error('Failed to download document');
+      }
+      return;
+    }
+
     if (!doc.image) {
       toast.error('No image available for download');
       return;
@@ -1846,9 +1896,11 @@ const Profile = () => {
                 <div className="detail-items documents-grid">
                   {user.documents.map((doc, index) => (
                     <div key={`doc-${index}`} className="document-item">
-                      {doc?.image && (
+                      {doc?.image ? (
                         <img src={doc.image} alt={doc?.name || 'Document'} className="document-image" />
-                      )}
+                      ) : doc?.file ? (
+                        <StoredDocumentImage empid={user.empid} doc={doc} />
+                      ) : null}
                       <div className="document-name">{doc?.name || 'Document'}</div>
                       <div className="document-actions">
                         <button className="detail-download-btn" onClick={() => handleDocumentDownload(doc, index)} title="Download">
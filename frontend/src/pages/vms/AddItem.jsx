@@ -1313,7 +1313,7 @@ const AddItem = () => {
                     >
                       {visitor.selfie ? (
                         <img 
-                          src={visitor.selfie} 
+                          src={visitor.selfie_thumbnail || visitor.selfie} 
                           alt={visitor.fullname}
                           style={{
                             width: '100%',
@@ -1636,7 +1636,7 @@ const AddItem = () => {
                               <div className="contact-avatar contact-avatar-small">
                                 {visitor.selfie ? (
                                   <img 
-                                    src={visitor.selfie} 
+                                    src={visitor.selfie_thumbnail || visitor.selfie} 
                                     alt={visitor.fullname}
                                   />
                                 ) : (